@@ -0,0 +1,115 @@
+"""
+Agent Log Buffer — batched writes to ai_agent_logs per stage run
+Checks call insert_agent_log(row) from any stage thread. While a run's buffer
+is open (buffered_agent_logs(run_id)), rows for that run_id are collected and
+written with one multi-row INSERT in one transaction (db.insert_agent_logs):
+at stage end, or earlier once AGENT_LOG_MAX_ROWS are waiting. Rows for runs
+without a buffer (or arriving after the stage closed, e.g. a timed-out check)
+are written immediately as before.
+
+AGENT_LOG_MODE:
+- "batch" (default): a run's rows land together at the end of the stage.
+- "stream": rows are flushed AGENT_LOG_FLUSH_MS after the first one waiting,
+  so checks finishing close together share a commit but the admin view
+  still updates live.
+- "direct": no buffering (one commit per row).
+"""
+
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from ..db import insert_agent_log as _insert_agent_log_now, insert_agent_logs
+from ..logger import logger_agents as logger
+
+AGENT_LOG_MODE = os.getenv("AGENT_LOG_MODE", "batch").lower()
+AGENT_LOG_MAX_ROWS = int(os.getenv("AGENT_LOG_MAX_ROWS", "50"))
+AGENT_LOG_FLUSH_MS = float(os.getenv("AGENT_LOG_FLUSH_MS", "250"))
+
+
+class AgentLogBuffer:
+    def __init__(self, run_id, mode=AGENT_LOG_MODE, max_rows=AGENT_LOG_MAX_ROWS, flush_ms=AGENT_LOG_FLUSH_MS):
+        self.run_id = str(run_id)
+        self.mode = mode
+        self.max_rows = max(1, max_rows)
+        self.flush_ms = flush_ms
+        self.rows = []
+        self.flushes = 0
+        self.written = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()     # keeps flushes (and so row order) sequential
+        self._timer = None
+
+    def add(self, log_data: dict) -> bool:
+        row = {**log_data, "id": str(uuid.uuid4()), "created_at": datetime.now(timezone.utc)}
+        with self._lock:
+            self.rows.append(row)
+            full = len(self.rows) >= self.max_rows
+            if not full and self.mode == "stream" and self._timer is None:
+                self._timer = threading.Timer(self.flush_ms / 1000.0, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            return self.flush()
+        return True
+
+    def flush(self) -> bool:
+        with self._flush_lock:
+            with self._lock:
+                rows, self.rows = self.rows, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not rows:
+                return True
+            if not insert_agent_logs(rows):
+                # Keep them for the next flush (stage end at the latest)
+                with self._lock:
+                    self.rows = rows + self.rows
+                return False
+            self.flushes += 1
+            self.written += len(rows)
+            return True
+
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+@contextmanager
+def buffered_agent_logs(run_id, mode=None):
+    """Buffers insert_agent_log calls for run_id until the block exits."""
+    mode = mode or AGENT_LOG_MODE
+    if mode == "direct":
+        yield None
+        return
+    buffer = AgentLogBuffer(run_id, mode=mode)
+    with _buffers_lock:
+        _buffers[buffer.run_id] = buffer
+    try:
+        yield buffer
+    finally:
+        with _buffers_lock:
+            _buffers.pop(buffer.run_id, None)
+        if not buffer.flush():
+            logger.error(f"[AgentLogs] run {buffer.run_id}: {len(buffer.rows)} log row(s) could not be written")
+        elif buffer.written:
+            logger.info(f"[AgentLogs] run {buffer.run_id}: {buffer.written} row(s) in {buffer.flushes} commit(s)")
+
+
+def flush_agent_logs(run_id) -> bool:
+    """Writes whatever run_id has buffered so far (e.g. before announcing a status change)."""
+    with _buffers_lock:
+        buffer = _buffers.get(str(run_id))
+    return buffer.flush() if buffer else True
+
+
+def insert_agent_log(log_data: dict) -> bool:
+    """Drop-in for db.insert_agent_log that goes through the run's buffer when one is open."""
+    with _buffers_lock:
+        buffer = _buffers.get(str(log_data.get("run_id")))
+    if buffer is None:
+        return _insert_agent_log_now(log_data)
+    return buffer.add(log_data)
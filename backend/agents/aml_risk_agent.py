@@ -6,7 +6,8 @@ When AWS Bedrock is integrated, this module becomes a Lambda Action Group.
 """
 
 import time
-from ..db import get_connection, release_connection, insert_agent_log
+from .agent_log_buffer import insert_agent_log
+from .country_risk_index import get_country_risk_index
 
 # SOF risk map
 _SOF_RISK = {
@@ -35,37 +36,31 @@ _NEW_ENTITY_MONTHS = 12
 
 
 def country_risk(countries: list, run_id: str, onboarding_id: str) -> dict:
-    """Check each country against FATF country_risk_reference table."""
+    """Check each country against the FATF country_risk_reference table (cached in memory)."""
     start = time.time()
-    conn = get_connection()
     results = []
     highest_risk = "LOW"
     flags = []
     risk_order = {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "CRITICAL": 3}
-    try:
-        with conn.cursor() as cursor:
-            for country in countries:
-                cursor.execute("""
-                    SELECT country_name, fatf_status, risk_level
-                    FROM client_onboarding.country_risk_reference
-                    WHERE country_name ILIKE %s OR country_code = %s
-                """, (f"%{country}%", country.upper()[:2]))
-                row = cursor.fetchone()
-                if row:
-                    entry = {"country": country, "fatf_status": row[1], "risk_level": row[2]}
-                    results.append(entry)
-                    if risk_order.get(row[2], 0) > risk_order.get(highest_risk, 0):
-                        highest_risk = row[2]
-                    if row[2] in ("HIGH", "CRITICAL"):
-                        flags.append(f"{row[0]}: FATF {row[1]} ({row[2]})")
-                else:
-                    results.append({"country": country, "fatf_status": "UNKNOWN", "risk_level": "MEDIUM"})
-                    flags.append(f"{country}: not in FATF reference table")
-    except Exception as e:
-        print(f"[AMLRiskAgent] country_risk error: {e}")
-    finally:
-        if conn:
-            release_connection(conn)
+    index = get_country_risk_index()
+    if index is None:
+        print("[AMLRiskAgent] country_risk error: country risk reference unavailable")
+    else:
+        resolved = index.resolve_many(countries)
+        for country in countries:
+            row = resolved[country]
+            if row["risk_level"]:
+                entry = {"country": country, "country_code": row["country_code"],
+                         "fatf_status": row["fatf_status"], "risk_level": row["risk_level"]}
+                results.append(entry)
+                if risk_order.get(row["risk_level"], 0) > risk_order.get(highest_risk, 0):
+                    highest_risk = row["risk_level"]
+                if row["risk_level"] in ("HIGH", "CRITICAL"):
+                    flags.append(f"{row['country_name']}: FATF {row['fatf_status']} ({row['risk_level']})")
+            else:
+                results.append({"country": country, "country_code": row["country_code"],
+                                "fatf_status": "UNKNOWN", "risk_level": "MEDIUM"})
+                flags.append(f"{country}: not in FATF reference table")
 
     duration_ms = int((time.time() - start) * 1000)
     summary = (
@@ -97,33 +92,22 @@ def country_risk(countries: list, run_id: str, onboarding_id: str) -> dict:
 
 
 def ubo_jurisdiction_risk(ubos: list, run_id: str, onboarding_id: str) -> dict:
-    """Check UBO country of residence against FATF risk reference."""
+    """Check UBO country of residence against FATF risk reference (cached in memory)."""
     start = time.time()
-    conn = get_connection()
     flags = []
     highest_risk = "LOW"
     risk_order = {"LOW": 0, "MEDIUM": 1, "HIGH": 2, "CRITICAL": 3}
-    try:
-        with conn.cursor() as cursor:
-            for ubo in ubos:
-                country = ubo.get("country_of_residence", "")
-                if not country:
-                    continue
-                cursor.execute("""
-                    SELECT country_name, fatf_status, risk_level
-                    FROM client_onboarding.country_risk_reference
-                    WHERE country_name ILIKE %s
-                """, (f"%{country}%",))
-                row = cursor.fetchone()
-                if row and risk_order.get(row[2], 0) > 0:
-                    if risk_order.get(row[2], 0) > risk_order.get(highest_risk, 0):
-                        highest_risk = row[2]
-                    flags.append(f"UBO '{ubo.get('full_name')}' domicile: {row[0]} [{row[1]}]")
-    except Exception as e:
-        print(f"[AMLRiskAgent] ubo_jurisdiction_risk error: {e}")
-    finally:
-        if conn:
-            release_connection(conn)
+    index = get_country_risk_index()
+    if index is None:
+        print("[AMLRiskAgent] ubo_jurisdiction_risk error: country risk reference unavailable")
+    else:
+        domiciles = index.resolve_many({ubo.get("country_of_residence", "") for ubo in ubos} - {""})
+        for ubo in ubos:
+            row = domiciles.get(ubo.get("country_of_residence", ""))
+            if row and risk_order.get(row["risk_level"], 0) > 0:
+                if risk_order.get(row["risk_level"], 0) > risk_order.get(highest_risk, 0):
+                    highest_risk = row["risk_level"]
+                flags.append(f"UBO '{ubo.get('full_name')}' domicile: {row['country_name']} [{row['fatf_status']}]")
 
     duration_ms = int((time.time() - start) * 1000)
     summary = (
@@ -0,0 +1,150 @@
+"""
+Country Risk Index — in-process FATF reference lookup
+Loads client_onboarding.country_risk_reference once and resolves country input
+by exact key instead of one `country_name ILIKE '%x%'` query per country
+(which also matched "Niger" to "Nigeria").
+
+Keys are normalized (accents stripped, punctuation split, lower-cased, a
+leading "the" dropped) and cover ISO alpha-2 and alpha-3 codes, ISO short and
+official names, the table's own names and a curated alias list
+(country_codes.py). A whole list of countries is resolved in one call with no
+database round-trip; the snapshot is reloaded when the table changes
+(last_updated, row count or contents).
+"""
+
+import os
+import threading
+import time
+
+from ..db import get_connection, release_connection
+from ..logger import logger_agents as logger
+from .country_codes import ISO_COUNTRIES, COUNTRY_ALIASES
+from .sanctions_index import normalize_tokens
+
+# Seconds between change checks against country_risk_reference
+REFRESH_INTERVAL = int(os.getenv("COUNTRY_RISK_REFRESH_SECONDS", "300"))
+
+
+def normalize_country(value: str) -> str:
+    tokens = normalize_tokens(value)
+    if tokens[:1] == ["the"]:
+        tokens = tokens[1:]
+    return " ".join(tokens)
+
+
+def _build_name_keys():
+    """Static name/alias -> alpha-2 map (ISO names first, aliases never override them)."""
+    keys = {}
+    for alpha2, _, name, other_names in ISO_COUNTRIES:
+        for n in (name, *other_names):
+            keys.setdefault(normalize_country(n), alpha2)
+    for alpha2, aliases in COUNTRY_ALIASES.items():
+        for alias in aliases:
+            keys.setdefault(normalize_country(alias), alpha2)
+    return keys
+
+
+_NAME_KEYS = _build_name_keys()
+_ALPHA3 = {alpha3: alpha2 for alpha2, alpha3, _, _ in ISO_COUNTRIES}
+_ISO_NAMES = {alpha2: name for alpha2, _, name, _ in ISO_COUNTRIES}
+
+
+class CountryRiskIndex:
+    """Immutable snapshot of country_risk_reference rows keyed by alpha-2 code."""
+
+    def __init__(self, rows, signature=None):
+        self.signature = signature
+        self.rows = {}
+        self._names = dict(_NAME_KEYS)
+        for code, name, fatf_status, risk_level in rows:
+            code = (code or "").strip().upper()
+            self.rows[code] = {"country_code": code, "country_name": name,
+                               "fatf_status": fatf_status, "risk_level": risk_level}
+            if name:
+                self._names.setdefault(normalize_country(name), code)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def code_for(self, country: str):
+        """Alpha-2 code for free-text country input, or None if it is not recognised."""
+        raw = (country or "").strip()
+        if not raw:
+            return None
+        upper = raw.upper()
+        if len(upper) == 2 and upper.isalpha() and (upper in self.rows or upper in _ISO_NAMES):
+            return upper
+        if len(upper) == 3 and upper in _ALPHA3:
+            return _ALPHA3[upper]
+        return self._names.get(normalize_country(raw))
+
+    def resolve(self, country: str) -> dict:
+        """
+        {"country_code", "country_name", "fatf_status", "risk_level"}; fatf_status and
+        risk_level are None when the country is unknown or not in the reference table.
+        """
+        code = self.code_for(country)
+        row = self.rows.get(code) if code else None
+        if row:
+            return dict(row)
+        return {"country_code": code, "country_name": _ISO_NAMES.get(code, country),
+                "fatf_status": None, "risk_level": None}
+
+    def resolve_many(self, countries) -> dict:
+        return {c: self.resolve(c) for c in countries}
+
+
+def _load_signature(cursor):
+    """Change marker: last_updated, row count and a digest of the risk columns (the table is small)."""
+    cursor.execute("""
+        SELECT MAX(last_updated), COUNT(*),
+               md5(string_agg(country_code || ':' || COALESCE(country_name, '') || ':' ||
+                              COALESCE(fatf_status, '') || ':' || COALESCE(risk_level, ''),
+                              ',' ORDER BY country_code))
+        FROM client_onboarding.country_risk_reference
+    """)
+    return tuple(str(v) for v in cursor.fetchone())
+
+
+def _load_rows(cursor):
+    cursor.execute("""
+        SELECT country_code, country_name, fatf_status, risk_level
+        FROM client_onboarding.country_risk_reference
+    """)
+    return cursor.fetchall()
+
+
+_index = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def get_country_risk_index(force_refresh: bool = False):
+    """
+    Returns the process-wide CountryRiskIndex, reloading it when
+    country_risk_reference has changed since the last load. Returns None if the
+    table cannot be loaded and no previous snapshot exists.
+    """
+    global _index, _last_check
+    now = time.time()
+    if _index is not None and not force_refresh and now - _last_check < REFRESH_INTERVAL:
+        return _index
+
+    with _lock:
+        if _index is not None and not force_refresh and time.time() - _last_check < REFRESH_INTERVAL:
+            return _index
+        conn = get_connection()
+        if not conn:
+            return _index
+        try:
+            with conn.cursor() as cursor:
+                signature = _load_signature(cursor)
+                if _index is None or force_refresh or signature != _index.signature:
+                    _index = CountryRiskIndex(_load_rows(cursor), signature=signature)
+                    logger.info(f"[CountryRiskIndex] Loaded {len(_index)} countries (last_updated {signature[0]})")
+            _last_check = time.time()
+        except Exception as e:
+            logger.error(f"[CountryRiskIndex] refresh failed: {e}", exc_info=True)
+        finally:
+            release_connection(conn)
+        return _index
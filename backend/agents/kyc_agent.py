@@ -5,8 +5,29 @@ Each check writes one row to ai_agent_logs and returns a structured result dict.
 When AWS Bedrock is integrated, this module becomes a Lambda Action Group.
 """
 
+import os
 import time
-from ..db import get_connection, release_connection, insert_agent_log
+from ..db import get_connection, release_connection
+from .agent_log_buffer import insert_agent_log
+from .sanctions_index import (
+    get_sanctions_index, latest_list_version, significant_tokens, COMMON_TOKENS,
+    MIN_TOKEN_SIMILARITY, MAX_CANDIDATES
+)
+from .lei_index import get_lei_index
+
+# "memory" screens against the in-process SanctionsIndex; "database" runs one
+# pg_trgm query per check so multi-worker deployments share a single copy.
+SANCTIONS_SCREENING_MODE = os.getenv("SANCTIONS_SCREENING_MODE", "memory").lower()
+
+# Minimum pg_trgm similarity for the LEI company-name fallback
+LEI_NAME_SIMILARITY = float(os.getenv("LEI_NAME_SIMILARITY", "0.4"))
+
+# "index" looks LEIs up in the local memory-mapped GLEIF index (lei_index.py)
+# when one has been built, else in entity_verification; "database" always queries the table.
+LEI_LOOKUP_MODE = os.getenv("LEI_LOOKUP_MODE", "index").lower()
+
+# Minimum name-similarity score for the LEI index company-name fallback
+LEI_INDEX_NAME_SCORE = float(os.getenv("LEI_INDEX_NAME_SCORE", "0.6"))
 
 # Public/free email domain blocklist
 _PUBLIC_DOMAINS = {
@@ -15,74 +36,138 @@ _PUBLIC_DOMAINS = {
 }
 
 # Generic corporate tokens to ignore in sanctions fuzzy match to prevent false positives
-_COMMON_TOKENS = {
-    "group", "financial", "services", "corporation", "corp", "limited", "ltd", 
-    "inc", "incorporated", "company", "holdings", "management", "international",
-    "global", "solutions", "partners", "capital", "trust", "investment"
-}
+_COMMON_TOKENS = COMMON_TOKENS
+
+
+def _ilike_match(cursor, names: list) -> dict:
+    """
+    Trigram match of a batch of names against sanctions_list in ONE query.
+    Every significant token of every name is sent at once via unnest() and
+    matched with word similarity (GIN-indexed by db/trgm_search_migration.sql).
+    Returns {name: hits}, hits ranked by score.
+    """
+    names = list(dict.fromkeys(n for n in names if n))
+    input_names, tokens = [], []
+    for name in names:
+        for token in dict.fromkeys(significant_tokens(name)):
+            input_names.append(name)
+            tokens.append(token)
+    results = {name: [] for name in names}
+    if not tokens:
+        return results
+
+    cursor.execute("SET LOCAL pg_trgm.word_similarity_threshold = %s", (MIN_TOKEN_SIMILARITY,))
+    cursor.execute("""
+        WITH q AS (
+            SELECT input_name, token,
+                   COUNT(*) OVER (PARTITION BY input_name) AS n_tokens
+            FROM unnest(%s::text[], %s::text[]) AS q(input_name, token)
+        ),
+        m AS (
+            SELECT q.input_name, q.n_tokens, s.id,
+                   MAX(word_similarity(q.token, s.entity_name)) AS sim
+            FROM q
+            JOIN client_onboarding.sanctions_list s ON q.token <%% s.entity_name
+            GROUP BY q.input_name, q.n_tokens, s.id, q.token
+        ),
+        r AS (
+            SELECT input_name, id, SUM(sim) / MAX(n_tokens) AS score,
+                   ROW_NUMBER() OVER (PARTITION BY input_name ORDER BY SUM(sim) DESC, id) AS rn
+            FROM m
+            GROUP BY input_name, id
+        )
+        SELECT r.input_name, s.entity_name, s.entity_type, s.program, s.list_type,
+               s.country, ROUND(r.score::numeric, 3)
+        FROM r
+        JOIN client_onboarding.sanctions_list s ON s.id = r.id
+        WHERE r.rn <= %s
+        ORDER BY r.input_name, r.rn
+    """, (input_names, tokens, MAX_CANDIDATES))
+    for row in cursor.fetchall():
+        results[row[0]].append({
+            "matched_name": row[1],
+            "entity_type": row[2],
+            "program": row[3],
+            "list_type": row[4],
+            "country": row[5],
+            "score": float(row[6])
+        })
+    return results
+
+
+def _screen_names(names: list) -> tuple:
+    """
+    Screens a batch of names against the sanctions list. Returns
+    ({name: hits}, list_version screened against).
+    In "memory" mode uses the SanctionsIndex and falls back to the database
+    query only when the index cannot be loaded.
+    """
+    if SANCTIONS_SCREENING_MODE != "database":
+        index = get_sanctions_index()
+        if index is not None:
+            return index.match_many(names), index.list_version
+
+    conn = get_connection()
+    if not conn:
+        raise RuntimeError("no database connection")
+    try:
+        with conn.cursor() as cursor:
+            list_version = latest_list_version(cursor)
+            return _ilike_match(cursor, names), list_version
+    finally:
+        release_connection(conn)
 
 
-def _ilike_match(cursor, name: str) -> list:
-    """Simple ILIKE partial match against sanctions_list. Returns list of hits."""
-    # Split name into tokens and check any token against entity_name
-    # Filter out common tokens and short words to reduce false positives
-    tokens = [t.lower() for t in name.split() if len(t) > 3 and t.lower() not in _COMMON_TOKENS]
-    hits = []
-    for token in tokens:
-        cursor.execute("""
-            SELECT entity_name, entity_type, program, list_type, country
-            FROM client_onboarding.sanctions_list
-            WHERE entity_name ILIKE %s
-            LIMIT 5
-        """, (f"%{token}%",))
-        for row in cursor.fetchall():
-            hits.append({
-                "matched_name": row[0],
-                "entity_type": row[1],
-                "program": row[2],
-                "list_type": row[3],
-                "country": row[4]
-            })
-    return hits
+def _screening_error(error) -> tuple:
+    """
+    (risk_level, recommendation, flags, summary) when screening could not run.
+    Never reported as PASS: an unscreened party needs manual review.
+    """
+    return (
+        "UNKNOWN", "FLAG", [f"Sanctions screening failed: {error}"],
+        f"Sanctions screening could not be completed ({error}). Manual screening required."
+    )
 
 
 def sanctions_check(company_name: str, run_id: str, onboarding_id: str) -> dict:
     """Check company name against OFAC SDN sanctions list."""
     start = time.time()
-    conn = get_connection()
     hits = []
+    list_version = None
+    error = None
     try:
-        with conn.cursor() as cursor:
-            hits = _ilike_match(cursor, company_name)
+        screened, list_version = _screen_names([company_name])
+        hits = screened.get(company_name, [])
     except Exception as e:
+        error = str(e)
         print(f"[KYCAgent] sanctions_check error: {e}")
-    finally:
-        if conn:
-            release_connection(conn)
 
     duration_ms = int((time.time() - start) * 1000)
     risk_level = "CRITICAL" if hits else "LOW"
+    recommendation = "REJECT" if hits else "PASS"
     flags = [f"{h['matched_name']} → {h['program']}" for h in hits]
     summary = (
         f"Direct SDN match found: {', '.join(flags)}" if hits
         else f"No sanctions match for '{company_name}'."
     )
+    if error:
+        risk_level, recommendation, flags, summary = _screening_error(error)
     result = {
         "check_name": "sanctions_check",
         "risk_level": risk_level,
-        "recommendation": "REJECT" if hits else "PASS",
+        "recommendation": recommendation,
         "flags": flags,
         "ai_summary": summary,
-        "output": {"input_name": company_name, "hits": hits}
+        "output": {"input_name": company_name, "hits": hits, "list_version": list_version, "error": error}
     }
     insert_agent_log({
         "run_id": run_id, "onboarding_id": onboarding_id,
         "agent_name": "KYC_AGENT", "stage": 1,
         "check_name": "sanctions_check",
         "input_context": {"company_name": company_name},
-        "output": {"hits": hits},
+        "output": {"hits": hits, "list_version": list_version, "error": error},
         "flags": flags, "risk_level": risk_level,
-        "recommendation": result["recommendation"],
+        "recommendation": recommendation,
         "ai_summary": summary,
         "model_used": "rule-based",
         "duration_ms": duration_ms
@@ -95,43 +180,44 @@ def ubo_sanctions_check(ubos: list, run_id: str, onboarding_id: str) -> dict:
     start = time.time()
     all_hits = []
     all_flags = []
-    conn = get_connection()
+    list_version = None
+    error = None
     try:
-        with conn.cursor() as cursor:
-            for ubo in ubos:
-                name = ubo.get("full_name", "")
-                hits = _ilike_match(cursor, name)
-                for h in hits:
-                    all_hits.append({"ubo": name, **h})
-                    all_flags.append(f"{name} → {h['matched_name']} [{h['program']}]")
+        names = [ubo.get("full_name", "") for ubo in ubos]
+        screened, list_version = _screen_names(names)
+        for name in names:
+            for h in screened.get(name, []):
+                all_hits.append({"ubo": name, **h})
+                all_flags.append(f"{name} → {h['matched_name']} [{h['program']}]")
     except Exception as e:
+        error = str(e)
         print(f"[KYCAgent] ubo_sanctions_check error: {e}")
-    finally:
-        if conn:
-            release_connection(conn)
 
     duration_ms = int((time.time() - start) * 1000)
     risk_level = "CRITICAL" if all_hits else "LOW"
+    recommendation = "REJECT" if all_hits else "PASS"
     summary = (
         f"UBO sanctions hits: {', '.join(all_flags)}" if all_hits
         else f"No sanctions matches found for {len(ubos)} UBO(s)."
     )
+    if error:
+        risk_level, recommendation, all_flags, summary = _screening_error(error)
     result = {
         "check_name": "ubo_sanctions_check",
         "risk_level": risk_level,
-        "recommendation": "REJECT" if all_hits else "PASS",
+        "recommendation": recommendation,
         "flags": all_flags,
         "ai_summary": summary,
-        "output": {"hits": all_hits}
+        "output": {"hits": all_hits, "list_version": list_version, "error": error}
     }
     insert_agent_log({
         "run_id": run_id, "onboarding_id": onboarding_id,
         "agent_name": "KYC_AGENT", "stage": 1,
         "check_name": "ubo_sanctions_check",
         "input_context": {"ubo_count": len(ubos)},
-        "output": {"hits": all_hits},
+        "output": {"hits": all_hits, "list_version": list_version, "error": error},
         "flags": all_flags, "risk_level": risk_level,
-        "recommendation": result["recommendation"],
+        "recommendation": recommendation,
         "ai_summary": summary,
         "model_used": "rule-based",
         "duration_ms": duration_ms
@@ -144,43 +230,44 @@ def director_sanctions_check(directors: list, run_id: str, onboarding_id: str) -
     start = time.time()
     all_hits = []
     all_flags = []
-    conn = get_connection()
+    list_version = None
+    error = None
     try:
-        with conn.cursor() as cursor:
-            for director in directors:
-                name = director.get("full_name", "")
-                hits = _ilike_match(cursor, name)
-                for h in hits:
-                    all_hits.append({"director": name, **h})
-                    all_flags.append(f"{name} → {h['matched_name']} [{h['program']}]")
+        names = [director.get("full_name", "") for director in directors]
+        screened, list_version = _screen_names(names)
+        for name in names:
+            for h in screened.get(name, []):
+                all_hits.append({"director": name, **h})
+                all_flags.append(f"{name} → {h['matched_name']} [{h['program']}]")
     except Exception as e:
+        error = str(e)
         print(f"[KYCAgent] director_sanctions_check error: {e}")
-    finally:
-        if conn:
-            release_connection(conn)
 
     duration_ms = int((time.time() - start) * 1000)
     risk_level = "HIGH" if all_hits else "LOW"
+    recommendation = "FLAG" if all_hits else "PASS"
     summary = (
         f"Director sanctions hits: {', '.join(all_flags)}" if all_hits
         else f"No sanctions matches found for {len(directors)} director(s)."
     )
+    if error:
+        risk_level, recommendation, all_flags, summary = _screening_error(error)
     result = {
         "check_name": "director_sanctions_check",
         "risk_level": risk_level,
-        "recommendation": "FLAG" if all_hits else "PASS",
+        "recommendation": recommendation,
         "flags": all_flags,
         "ai_summary": summary,
-        "output": {"hits": all_hits}
+        "output": {"hits": all_hits, "list_version": list_version, "error": error}
     }
     insert_agent_log({
         "run_id": run_id, "onboarding_id": onboarding_id,
         "agent_name": "KYC_AGENT", "stage": 1,
         "check_name": "director_sanctions_check",
         "input_context": {"director_count": len(directors)},
-        "output": {"hits": all_hits},
+        "output": {"hits": all_hits, "list_version": list_version, "error": error},
         "flags": all_flags, "risk_level": risk_level,
-        "recommendation": result["recommendation"],
+        "recommendation": recommendation,
         "ai_summary": summary,
         "model_used": "rule-based",
         "duration_ms": duration_ms
@@ -188,13 +275,22 @@ def director_sanctions_check(directors: list, run_id: str, onboarding_id: str) -
     return result
 
 
-def lei_verify(lei: str, company_name: str, run_id: str, onboarding_id: str, **kwargs) -> dict:
-    """Verify LEI against local entity_verification table."""
-    start = time.time()
+def _lei_lookup_index(index, lei: str, candidate_names: list):
+    """(lei_row, lei_valid, name_match) from the local LEI index — no database round-trip."""
+    record = index.get(lei) if lei else None
+    if record:
+        return record, True, False
+    if candidate_names:
+        record, score = index.search_name(candidate_names, min_score=LEI_INDEX_NAME_SCORE)
+        if record:
+            # We found a record by name even if LEI was missing/wrong
+            return {**record, "name_similarity": score}, False, True
+    return None, False, False
+
+
+def _lei_lookup_database(lei: str, candidate_names: list):
+    """(lei_row, lei_valid, name_match) from client_onboarding.entity_verification."""
     conn = get_connection()
-    lei_valid = False
-    name_match = False
-    lei_row = None
     try:
         with conn.cursor() as cursor:
             # First try LEI
@@ -206,48 +302,75 @@ def lei_verify(lei: str, company_name: str, run_id: str, onboarding_id: str, **k
                 """, (lei,))
                 row = cursor.fetchone()
                 if row:
-                    lei_valid = True
-                    lei_row = {
+                    return {
                         "lei_number": row[0], "company_name": row[1], "status": row[2], 
                         "country": row[3], "ein_number": row[4], "dba_name": row[5]
-                    }
+                    }, True, False
             
-            # If no LEI match, fallback to Company Name fuzzy match
-            if not lei_valid and company_name:
+            # If no LEI match, fallback to Company Name fuzzy match.
+            # All candidate names go in one trigram query (GIN-indexed).
+            if candidate_names:
+                cursor.execute("SET LOCAL pg_trgm.similarity_threshold = %s", (LEI_NAME_SIMILARITY,))
                 cursor.execute("""
-                    SELECT lei_number, company_name, verification_status, country, ein_number, dba_name
-                    FROM client_onboarding.entity_verification
-                    WHERE company_name ILIKE %s
+                    SELECT e.lei_number, e.company_name, e.verification_status, e.country,
+                           e.ein_number, e.dba_name, similarity(e.company_name, c.name) AS score
+                    FROM unnest(%s::text[]) AS c(name)
+                    JOIN client_onboarding.entity_verification e ON e.company_name %% c.name
+                    ORDER BY score DESC
                     LIMIT 1
-                """, (f"%{company_name.split()[0]}%",))
+                """, (candidate_names,))
                 row = cursor.fetchone()
                 if row:
-                    lei_row = {
-                        "lei_number": row[0], "company_name": row[1], "status": row[2], 
-                        "country": row[3], "ein_number": row[4], "dba_name": row[5]
-                    }
                     # We found a record by name even if LEI was missing/wrong
-                    name_match = True 
-
-            # Cross-verify name if LEI was found (OUTSIDE the fallback loop)
-            if lei_valid and not name_match and company_name and lei_row:
-                # Get unique tokens (ignoring common ones like Group, Financial)
-                form_tokens = {t.lower() for t in company_name.split() if t.lower() not in _COMMON_TOKENS and len(t) > 2}
-                reg_name_lower = lei_row['company_name'].lower()
-                
-                # If any unique word from the form is in the registry name, it's a match
-                if any(token in reg_name_lower for token in form_tokens):
-                    name_match = True
-                else:
-                    # Final fallback: check if first word of registry is in form name
-                    first_reg_word = lei_row['company_name'].split()[0].lower()
-                    if first_reg_word in company_name.lower():
-                        name_match = True
-    except Exception as e:
-        print(f"[KYCAgent] lei_verify error: {e}")
+                    return {
+                        "lei_number": row[0], "company_name": row[1], "status": row[2], 
+                        "country": row[3], "ein_number": row[4], "dba_name": row[5],
+                        "name_similarity": round(float(row[6]), 3)
+                    }, False, True
     finally:
         if conn:
             release_connection(conn)
+    return None, False, False
+
+
+def _ein_digits(value):
+    """The 9 digits of an EIN ('12-3456789' -> '123456789'), or None if value is not one."""
+    digits = (value or "").replace("-", "").strip()
+    return digits if len(digits) == 9 and digits.isdigit() else None
+
+
+def lei_verify(lei: str, company_name: str, run_id: str, onboarding_id: str, **kwargs) -> dict:
+    """Verify LEI against the local LEI index, or the entity_verification table."""
+    start = time.time()
+    lei_valid = False
+    name_match = False
+    lei_row = None
+    lookup_source = "database"
+    try:
+        candidate_names = [n for n in (company_name, kwargs.get("dba_name")) if n]
+        index = get_lei_index() if LEI_LOOKUP_MODE == "index" else None
+        if index is not None:
+            lookup_source = "lei_index"
+            lei_row, lei_valid, name_match = _lei_lookup_index(index, lei, candidate_names)
+        else:
+            lei_row, lei_valid, name_match = _lei_lookup_database(lei, candidate_names)
+
+        # Cross-verify name if LEI was found (OUTSIDE the fallback loop)
+        if lei_valid and not name_match and company_name and lei_row:
+            # Get unique tokens (ignoring common ones like Group, Financial)
+            form_tokens = {t.lower() for t in company_name.split() if t.lower() not in _COMMON_TOKENS and len(t) > 2}
+            reg_name_lower = lei_row['company_name'].lower()
+            
+            # If any unique word from the form is in the registry name, it's a match
+            if any(token in reg_name_lower for token in form_tokens):
+                name_match = True
+            else:
+                # Final fallback: check if first word of registry is in form name
+                first_reg_word = lei_row['company_name'].split()[0].lower()
+                if first_reg_word in company_name.lower():
+                    name_match = True
+    except Exception as e:
+        print(f"[KYCAgent] lei_verify error: {e}")
 
     duration_ms = int((time.time() - start) * 1000)
     
@@ -255,10 +378,12 @@ def lei_verify(lei: str, company_name: str, run_id: str, onboarding_id: str, **k
     dba_match = True
     
     if lei_valid:
-        # Cross-verify EIN if record has one
+        # Cross-verify EIN only if the registry record holds a real EIN (9 digits);
+        # other registry identifiers (e.g. state file numbers) are not tax IDs
         submitted_ein = kwargs.get("ein_number")
-        if lei_row.get("ein_number") and submitted_ein:
-            if lei_row["ein_number"].replace("-","") != submitted_ein.replace("-",""):
+        registry_ein = _ein_digits(lei_row.get("ein_number"))
+        if registry_ein and submitted_ein:
+            if registry_ein != submitted_ein.replace("-","").strip():
                 ein_match = False
         
         # Cross-verify DBA if record has one
@@ -270,7 +395,8 @@ def lei_verify(lei: str, company_name: str, run_id: str, onboarding_id: str, **k
 
     if not lei_valid:
         risk_level = "HIGH"
-        flags = [f"LEI '{lei}' not found in entity_verification table"]
+        source = "the LEI index" if lookup_source == "lei_index" else "the entity_verification table"
+        flags = [f"LEI '{lei}' not found in {source}"]
         summary = f"LEI {lei} could not be verified. Entity may not exist or LEI may be invalid."
         recommendation = "FLAG"
     elif not name_match:
@@ -306,6 +432,7 @@ def lei_verify(lei: str, company_name: str, run_id: str, onboarding_id: str, **k
             "submitted_lei": lei,
             "submitted_ein": kwargs.get("ein_number"),
             "registry_record": lei_row,
+            "lookup_source": lookup_source,
             "lei_valid": lei_valid,
             "name_match": name_match,
             "ein_match": ein_match
@@ -0,0 +1,462 @@
+"""
+LEI Index — compact, memory-mapped local LEI registry
+Built offline from a GLEIF golden-copy file (CSV or LEI-CDF XML, millions of
+records) and queried by kyc_agent.lei_verify without a database round-trip.
+
+One immutable file per build, opened with mmap and searched in place:
+
+    header
+    records   UTF-8 lines: lei \\x1f name \\x1f status \\x1f country \\x1f ein \\x1f other names \\x1f registry id
+    leis      sorted (LEI, record offset, record length)      -> exact LEI lookup
+    tokens    sorted (token, postings offset, postings count) -> name lookup
+    strings   token text
+    postings  uint32 positions in the LEI table
+
+Name lookups count hits over the rarest query tokens' postings, then score
+the few best candidate names. Builds and daily deltas write a new file and
+atomically repoint CURRENT (os.replace); readers pick up the new file on
+their next check, and queries already running keep using the old mapping.
+
+    python -m backend.agents.lei_index build golden-copy.csv
+    python -m backend.agents.lei_index delta lei2-delta-20260101.xml
+    python -m backend.agents.lei_index lookup 5493001KJY7UW9K12345
+    python -m backend.agents.lei_index synth synthetic.csv --count 2000000
+"""
+
+import argparse
+import csv
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+from array import array
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from xml.etree import ElementTree
+
+from ..logger import logger_agents as logger
+from .sanctions_index import normalize_tokens, COMMON_TOKENS
+
+LEI_INDEX_DIR = os.getenv(
+    "LEI_INDEX_DIR", os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'lei_index')
+)
+
+# Seconds between checks of CURRENT for a newer build
+LEI_INDEX_REFRESH_SECONDS = float(os.getenv("LEI_INDEX_REFRESH_SECONDS", "60"))
+
+# Postings read per name query, rarest tokens first; generic tokens beyond it are skipped
+LEI_POSTINGS_BUDGET = int(os.getenv("LEI_POSTINGS_BUDGET", "5000"))
+LEI_NAME_CANDIDATES = int(os.getenv("LEI_NAME_CANDIDATES", "50"))
+
+# Builds kept on disk besides the current one
+LEI_INDEX_KEEP = int(os.getenv("LEI_INDEX_KEEP", "1"))
+
+# ein_number is only filled from sources that carry a US EIN (entity_verification.csv);
+# GLEIF's RegistrationAuthorityEntityID is a registry file number and is kept separately
+FIELDS = ("lei_number", "company_name", "status", "country", "ein_number", "dba_name", "registration_authority_id")
+
+# Legal-form suffixes that appear in a large share of GLEIF names
+LEGAL_FORM_TOKENS = {
+    "llc", "lp", "llp", "plc", "gmbh", "ag", "sa", "sas", "sarl", "srl", "spa", "bv", "nv",
+    "kg", "co", "kft", "oy", "ab", "as", "pte", "pty", "se", "the", "and", "of", "de", "fund",
+}
+
+_MAGIC = b"LEIIDX02"
+_HEADER = struct.Struct("<8sIIQQQQQ")   # magic, records, tokens, leis_off, tokens_off, strings_off, postings_off, end
+_LEI = struct.Struct("<20sQI")          # lei, record offset, record length
+_TOKEN = struct.Struct("<QHQI")         # string offset, string length, postings offset, postings count
+_SEP = "\x1f"
+
+# Column names accepted for each field (GLEIF golden copy CSV and the repo's entity_verification.csv)
+_CSV_COLUMNS = {
+    "lei_number": ("LEI", "lei_number", "lei"),
+    "company_name": ("Entity.LegalName", "company_name", "legal_name"),
+    "status": ("Registration.RegistrationStatus", "Entity.EntityStatus", "verification_status", "status"),
+    "country": ("Entity.LegalAddress.Country", "country"),
+    "ein_number": ("ein_number",),
+    "dba_name": ("dba_name", "Entity.OtherEntityNames.OtherEntityName.1", "Entity.TransliteratedOtherEntityNames.TransliteratedOtherEntityName.1"),
+    "registration_authority_id": ("Entity.RegistrationAuthority.RegistrationAuthorityEntityID", "registration_authority_id"),
+}
+
+
+def name_tokens(name: str) -> list:
+    """Tokens indexed for name search (shared by build and query)."""
+    return [t for t in normalize_tokens(name)
+            if len(t) > 1 and t not in COMMON_TOKENS and t not in LEGAL_FORM_TOKENS]
+
+
+def _clean(value) -> str:
+    return " ".join(str(value).split()) if value else ""
+
+
+# --- Source readers ---
+
+def read_csv_records(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        columns = {}
+        for field, names in _CSV_COLUMNS.items():
+            columns[field] = next((n for n in names if n in (reader.fieldnames or [])), None)
+        if not columns["lei_number"] or not columns["company_name"]:
+            raise ValueError(f"{path}: no LEI / legal name columns in {reader.fieldnames}")
+        for row in reader:
+            record = {field: _clean(row.get(col)) if col else "" for field, col in columns.items()}
+            if record["lei_number"]:
+                yield record
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def read_xml_records(path):
+    """Streams LEIRecord elements from a GLEIF LEI-CDF file without loading it whole."""
+    for _, elem in ElementTree.iterparse(path, events=("end",)):
+        if _local(elem.tag) != "LEIRecord":
+            continue
+        record = dict.fromkeys(FIELDS, "")
+        for child in elem.iter():
+            tag = _local(child.tag)
+            text = _clean(child.text)
+            if tag == "LEI":
+                record["lei_number"] = text
+            elif tag == "LegalName":
+                record["company_name"] = text
+            elif tag == "Country" and not record["country"]:
+                record["country"] = text
+            elif tag == "RegistrationStatus":
+                record["status"] = text
+            elif tag == "EntityStatus" and not record["status"]:
+                record["status"] = text
+            elif tag == "OtherEntityName" and not record["dba_name"]:
+                record["dba_name"] = text
+            elif tag == "RegistrationAuthorityEntityID" and not record["registration_authority_id"]:
+                record["registration_authority_id"] = text
+        elem.clear()
+        if record["lei_number"]:
+            yield record
+
+
+def read_records(path):
+    return read_xml_records(path) if path.lower().endswith(".xml") else read_csv_records(path)
+
+
+# --- Build ---
+
+def build_index(records, out_path) -> int:
+    """Writes an index file from an iterable of record dicts. Returns the record count."""
+    tmp_path = out_path + ".tmp"
+    entries = []                                 # (lei bytes, seq, offset, length)
+    postings = defaultdict(lambda: array("I"))   # token -> record seqs
+    with open(tmp_path, "wb") as f:
+        f.write(b"\0" * _HEADER.size)
+        offset = _HEADER.size
+        for seq, record in enumerate(records):
+            lei = record["lei_number"].upper()
+            if len(lei) != 20:
+                continue
+            line = (_SEP.join(_clean(record.get(k)).replace(_SEP, " ") for k in FIELDS) + "\n").encode("utf-8")
+            f.write(line)
+            entries.append((lei.encode("ascii", "replace"), seq, offset, len(line)))
+            offset += len(line)
+            for token in set(name_tokens(record.get("company_name")) + name_tokens(record.get("dba_name"))):
+                postings[token].append(seq)
+
+        # Sort by LEI; the last occurrence of a duplicate LEI wins
+        entries.sort()
+        unique = [e for i, e in enumerate(entries) if i + 1 == len(entries) or entries[i + 1][0] != e[0]]
+        position = {}
+        for pos, (_, seq, _, _) in enumerate(unique):
+            position[seq] = pos
+        del entries
+
+        leis_off = offset
+        for lei, _, rec_off, rec_len in unique:
+            f.write(_LEI.pack(lei, rec_off, rec_len))
+
+        tokens = sorted(postings)
+        tokens_off = leis_off + len(unique) * _LEI.size
+        strings_off = tokens_off + len(tokens) * _TOKEN.size
+        postings_off = strings_off + sum(len(t.encode("utf-8")) for t in tokens)
+
+        token_rows, str_pos, post_pos, encoded = [], 0, 0, []
+        for token in tokens:
+            positions = sorted({position[s] for s in postings[token] if s in position})
+            raw = token.encode("utf-8")
+            token_rows.append(_TOKEN.pack(str_pos, len(raw), post_pos, len(positions)))
+            encoded.append(raw)
+            postings[token] = array("I", positions)
+            str_pos += len(raw)
+            post_pos += len(positions) * 4
+        f.write(b"".join(token_rows))
+        f.write(b"".join(encoded))
+        for token in tokens:
+            postings[token].tofile(f)
+        end = f.tell()
+
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, len(unique), len(tokens), leis_off, tokens_off, strings_off, postings_off, end))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, out_path)
+    return len(unique)
+
+
+def _current_pointer(index_dir):
+    return os.path.join(index_dir, "CURRENT")
+
+
+def current_index_path(index_dir=LEI_INDEX_DIR):
+    try:
+        with open(_current_pointer(index_dir)) as f:
+            name = f.read().strip()
+    except OSError:
+        return None
+    return os.path.join(index_dir, name) if name else None
+
+
+def _publish(index_dir, records) -> str:
+    """Builds a new index file and atomically makes it CURRENT. Returns its path."""
+    os.makedirs(index_dir, exist_ok=True)
+    name = f"lei-{time.time_ns()}-{os.getpid()}.idx"
+    path = os.path.join(index_dir, name)
+    start = time.time()
+    count = build_index(records, path)
+    pointer_tmp = _current_pointer(index_dir) + ".tmp"
+    with open(pointer_tmp, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, _current_pointer(index_dir))
+    logger.info(f"[LEIIndex] Published {name}: {count} records in {time.time() - start:.1f}s")
+
+    # Readers may still map older builds; unlinking them is safe on POSIX
+    builds = sorted(n for n in os.listdir(index_dir) if n.endswith(".idx") and n != name)
+    for old in builds[:max(0, len(builds) - LEI_INDEX_KEEP)]:
+        os.remove(os.path.join(index_dir, old))
+    return path
+
+
+def import_golden_copy(source, index_dir=LEI_INDEX_DIR) -> str:
+    return _publish(index_dir, read_records(source))
+
+
+def apply_delta(source, index_dir=LEI_INDEX_DIR) -> str:
+    """
+    Merges a delta file (new and changed records) into the current build.
+    Changed LEIs replace their record in place; new ones are appended.
+    """
+    current = current_index_path(index_dir)
+    if not current:
+        raise FileNotFoundError(f"No current LEI index in {index_dir}; run a full build first")
+    delta = {r["lei_number"].upper(): r for r in read_records(source)}
+    base = LEIIndex(current)
+
+    def merged():
+        for record in base.iter_records():
+            yield delta.pop(record["lei_number"], record)
+        yield from delta.values()
+
+    try:
+        return _publish(index_dir, merged())
+    finally:
+        base.close()
+
+
+# --- Read ---
+
+class LEIIndex:
+    """Read-only view over one index file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, self.record_count, self.token_count, self._leis_off, self._tokens_off,
+         self._strings_off, self._postings_off, _) = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not an LEI index of this version; rebuild it from the golden copy")
+
+    def __len__(self):
+        return self.record_count
+
+    def close(self):
+        self._mm.close()
+
+    def _record(self, offset, length) -> dict:
+        values = self._mm[offset:offset + length - 1].decode("utf-8").split(_SEP)
+        return {k: (v or None) for k, v in zip(FIELDS, values)}
+
+    def _lei_at(self, pos):
+        return _LEI.unpack_from(self._mm, self._leis_off + pos * _LEI.size)
+
+    def get(self, lei):
+        """Record for an LEI (exact, case-insensitive) or None."""
+        key = (lei or "").strip().upper().encode("ascii", "replace")
+        if len(key) != 20:
+            return None
+        lo, hi = 0, self.record_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._lei_at(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.record_count:
+            found, offset, length = self._lei_at(lo)
+            if found == key:
+                return self._record(offset, length)
+        return None
+
+    def _token_at(self, pos):
+        str_off, str_len, post_off, count = _TOKEN.unpack_from(self._mm, self._tokens_off + pos * _TOKEN.size)
+        start = self._strings_off + str_off
+        return self._mm[start:start + str_len], post_off, count
+
+    def _postings(self, token):
+        key = token.encode("utf-8")
+        lo, hi = 0, self.token_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._token_at(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.token_count:
+            found, post_off, count = self._token_at(lo)
+            if found == key:
+                return post_off, count
+        return None
+
+    def search_name(self, names, min_score=0.0):
+        """
+        Best match for any of `names`: (record, score 0..1) or (None, 0.0).
+        Candidates share the rarest query tokens; scoring is character-level
+        similarity of the normalized names.
+        """
+        best, best_score = None, 0.0
+        for name in names:
+            tokens = list(dict.fromkeys(name_tokens(name)))
+            lists = [p for p in (self._postings(t) for t in tokens) if p]
+            if not lists:
+                continue
+            lists.sort(key=lambda p: p[1])
+            hits, budget = Counter(), LEI_POSTINGS_BUDGET
+            for i, (post_off, count) in enumerate(lists):
+                if i and count > budget:
+                    break
+                start = self._postings_off + post_off
+                hits.update(array("I", self._mm[start:start + min(count, budget) * 4]))
+                budget -= count
+            # seq2 is the fixed query so SequenceMatcher reuses its analysis across candidates
+            matcher = SequenceMatcher(None, "", " ".join(normalize_tokens(name)))
+            for pos, _ in hits.most_common(LEI_NAME_CANDIDATES):
+                _, offset, length = self._lei_at(pos)
+                record = self._record(offset, length)
+                for candidate in (record["company_name"], record["dba_name"]):
+                    if not candidate:
+                        continue
+                    matcher.set_seq1(" ".join(normalize_tokens(candidate)))
+                    # Cheap upper bounds first; most candidates cannot beat the current best
+                    if matcher.real_quick_ratio() <= best_score or matcher.quick_ratio() <= best_score:
+                        continue
+                    score = matcher.ratio()
+                    if score > best_score:
+                        best, best_score = record, score
+        if best is None or best_score < min_score:
+            return None, 0.0
+        return best, round(best_score, 3)
+
+    def iter_records(self):
+        """Records in file order (used to merge deltas)."""
+        offset = _HEADER.size
+        while offset < self._leis_off:
+            end = self._mm.find(b"\n", offset, self._leis_off)
+            yield self._record(offset, end - offset + 1)
+            offset = end + 1
+
+
+_index = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def get_lei_index(index_dir=None):
+    """
+    Returns the process-wide LEIIndex for the CURRENT build, switching to a
+    newer build when CURRENT changes. Returns None if no index has been built.
+    """
+    global _index, _last_check
+    now = time.time()
+    if _index is not None and now - _last_check < LEI_INDEX_REFRESH_SECONDS:
+        return _index
+    with _lock:
+        if _index is not None and time.time() - _last_check < LEI_INDEX_REFRESH_SECONDS:
+            return _index
+        _last_check = time.time()
+        path = current_index_path(index_dir or LEI_INDEX_DIR)
+        if path and (_index is None or _index.path != path):
+            try:
+                # The previous mapping is released once in-flight lookups drop it
+                _index = LEIIndex(path)
+                logger.info(f"[LEIIndex] Opened {os.path.basename(path)} ({len(_index)} records)")
+            except (OSError, ValueError) as e:
+                logger.error(f"[LEIIndex] could not open {path}: {e}")
+        return _index
+
+
+# --- CLI ---
+
+def write_synthetic(path, count, seed=7):
+    """GLEIF-style CSV of `count` synthetic entities, for load testing the importer."""
+    rng = random.Random(seed)
+    words = ["Evergreen", "North", "Star", "Atlas", "Harbor", "Summit", "Crescent", "Pioneer", "Granite",
+             "Silver", "Oak", "River", "Falcon", "Meridian", "Aurora", "Beacon", "Cedar", "Delta", "Nova", "Orion"]
+    kinds = ["Capital", "Partners", "Holdings", "Bank", "Asset Management", "Securities", "Trust", "Fund"]
+    forms = ["LLC", "Ltd", "GmbH", "S.A.", "PLC", "Inc.", "B.V.", "AG"]
+    countries = ["US", "GB", "DE", "FR", "SG", "NL", "CH", "LU", "IE", "JP"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["LEI", "Entity.LegalName", "Entity.LegalAddress.Country",
+                         "Entity.EntityStatus", "Registration.RegistrationStatus"])
+        for i in range(count):
+            lei = f"{5493 + i % 7:04d}00{i:012d}{rng.randint(10, 99)}"
+            name = f"{rng.choice(words)} {rng.choice(words)}{i:x} {rng.choice(kinds)} {rng.choice(forms)}"
+            writer.writerow([lei, name, rng.choice(countries), "ACTIVE", rng.choice(["ISSUED", "ISSUED", "LAPSED"])])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the local LEI index")
+    parser.add_argument("--dir", default=LEI_INDEX_DIR, help="index directory (default: LEI_INDEX_DIR)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="full import of a golden-copy file").add_argument("source")
+    sub.add_parser("delta", help="merge a delta file into the current build").add_argument("source")
+    lookup = sub.add_parser("lookup", help="look up an LEI or a company name")
+    lookup.add_argument("query")
+    synth = sub.add_parser("synth", help="write a synthetic GLEIF-style CSV")
+    synth.add_argument("path")
+    synth.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(import_golden_copy(args.source, args.dir))
+    elif args.command == "delta":
+        print(apply_delta(args.source, args.dir))
+    elif args.command == "synth":
+        write_synthetic(args.path, args.count)
+    else:
+        index = get_lei_index(args.dir)
+        if index is None:
+            parser.error(f"no index in {args.dir}")
+        start = time.perf_counter()
+        record = index.get(args.query)
+        score = 1.0
+        if record is None:
+            record, score = index.search_name([args.query])
+        print(f"{record} (score {score}, {(time.perf_counter() - start) * 1e6:.0f}µs)")
+
+
+if __name__ == "__main__":
+    main()
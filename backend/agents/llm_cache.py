@@ -0,0 +1,189 @@
+"""
+LLM Response Cache — persistent cache for the orchestrator's Bedrock calls
+All model calls run with temperature 0, so a re-run of a stage with the same
+inputs (admin /run-kyc, a repeated stage after a clarification) can reuse the
+earlier answer instead of paying model latency and cost again.
+
+Entries live in client_onboarding.llm_response_cache (db/llm_cache_migration.sql),
+keyed on a SHA-256 of (call kind, model/agent id, system role, normalised prompt,
+document hashes). Entries expire after LLM_CACHE_TTL_HOURS; once the table holds
+more than LLM_CACHE_MAX_MB the least recently used rows are evicted.
+Error responses are never cached. Pass use_cache=False to bypass a lookup
+(the fresh answer still replaces the stored one).
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from ..db import get_connection, release_connection
+from ..logger import logger_agents as logger
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "72"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+
+# Size-based eviction runs after every N stores
+LLM_CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", "100"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+_stats_lock = threading.Lock()
+_stats = {}             # stage -> {"hits", "misses", "bypassed", "saved_ms"}
+_stores = 0
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapses whitespace so formatting-only prompt changes still hit."""
+    return _WHITESPACE.sub(" ", prompt or "").strip()
+
+
+def cache_key(kind, model_id, prompt, system=None, documents=None, params=None) -> str:
+    payload = {
+        "kind": kind,
+        "model": model_id,
+        "system": normalize_prompt(system) if system else None,
+        "prompt": normalize_prompt(prompt),
+        "documents": sorted(documents.items()) if documents else None,
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _record(stage, outcome, saved_ms=0):
+    with _stats_lock:
+        s = _stats.setdefault(str(stage or "unknown"), {"hits": 0, "misses": 0, "bypassed": 0, "saved_ms": 0})
+        s[outcome] += 1
+        s["saved_ms"] += saved_ms
+
+
+def get_stats() -> dict:
+    """Per-stage hit/miss/bypass counts and model milliseconds saved in this process."""
+    with _stats_lock:
+        return {stage: dict(s) for stage, s in _stats.items()}
+
+
+def _lookup(key):
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE client_onboarding.llm_response_cache
+                SET hit_count = hit_count + 1,
+                    saved_ms = saved_ms + latency_ms,
+                    last_hit_at = CURRENT_TIMESTAMP
+                WHERE cache_key = %s AND expires_at > CURRENT_TIMESTAMP
+                RETURNING response, latency_ms
+            """, (key,))
+            row = cursor.fetchone()
+        conn.commit()
+        if not row:
+            return None
+        response, latency_ms = row
+        return (json.loads(response) if isinstance(response, str) else response), latency_ms
+    except Exception as e:
+        logger.error(f"[LLMCache] lookup failed: {e}")
+        conn.rollback()
+        return None
+    finally:
+        release_connection(conn)
+
+
+def _store(key, kind, model_id, stage, response, latency_ms):
+    global _stores
+    body = json.dumps(response, default=str)
+    conn = get_connection()
+    if not conn:
+        return
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO client_onboarding.llm_response_cache
+                    (cache_key, kind, model_id, stage, response, latency_ms, size_bytes, expires_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP + make_interval(secs => %s))
+                ON CONFLICT (cache_key) DO UPDATE
+                SET response = EXCLUDED.response,
+                    latency_ms = EXCLUDED.latency_ms,
+                    size_bytes = EXCLUDED.size_bytes,
+                    created_at = CURRENT_TIMESTAMP,
+                    expires_at = EXCLUDED.expires_at
+            """, (key, kind, model_id, str(stage) if stage else None, body, latency_ms,
+                  len(body), LLM_CACHE_TTL_HOURS * 3600))
+        conn.commit()
+    except Exception as e:
+        logger.error(f"[LLMCache] store failed: {e}")
+        conn.rollback()
+        return
+    finally:
+        release_connection(conn)
+
+    with _stats_lock:
+        _stores += 1
+        due = _stores % LLM_CACHE_EVICT_EVERY == 0
+    if due:
+        evict()
+
+
+def evict() -> int:
+    """Drops expired rows, then least recently used rows beyond LLM_CACHE_MAX_MB."""
+    conn = get_connection()
+    if not conn:
+        return 0
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM client_onboarding.llm_response_cache WHERE expires_at <= CURRENT_TIMESTAMP")
+            removed = cursor.rowcount
+            cursor.execute("""
+                DELETE FROM client_onboarding.llm_response_cache
+                WHERE cache_key IN (
+                    SELECT cache_key FROM (
+                        SELECT cache_key,
+                               SUM(size_bytes) OVER (ORDER BY COALESCE(last_hit_at, created_at) DESC, cache_key) AS running
+                        FROM client_onboarding.llm_response_cache
+                    ) ranked
+                    WHERE running > %s
+                )
+            """, (int(LLM_CACHE_MAX_MB * 1024 * 1024),))
+            removed += cursor.rowcount
+        conn.commit()
+        if removed:
+            logger.info(f"[LLMCache] Evicted {removed} entries")
+        return removed
+    except Exception as e:
+        logger.error(f"[LLMCache] eviction failed: {e}")
+        conn.rollback()
+        return 0
+    finally:
+        release_connection(conn)
+
+
+def cached_call(kind, model_id, prompt, call, system=None, documents=None, params=None,
+                stage=None, use_cache=True):
+    """
+    Returns call()'s result, served from the cache when an identical request
+    was answered before. `call` must return a JSON-serialisable dict.
+    """
+    if not LLM_CACHE_ENABLED:
+        return call()
+
+    key = cache_key(kind, model_id, prompt, system=system, documents=documents, params=params)
+    if use_cache:
+        hit = _lookup(key)
+        if hit:
+            response, latency_ms = hit
+            _record(stage, "hits", latency_ms)
+            logger.info(f"[LLMCache] {kind} hit (stage {stage}), saved ~{latency_ms}ms")
+            return response
+
+    start = time.time()
+    response = call()
+    latency_ms = int((time.time() - start) * 1000)
+    _record(stage, "misses" if use_cache else "bypassed")
+    if isinstance(response, dict) and "error" not in response:
+        _store(key, kind, model_id, stage, response, latency_ms)
+    return response
@@ -2,7 +2,6 @@ import os
 import json
 import uuid
 import time
-import boto3
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -12,20 +11,24 @@ from backend.db import (
     get_connection,
     release_connection,
     update_onboarding_status,
-    insert_agent_log
+    publish_ticket_event,
+    get_document_hashes,
+    get_document_extractions,
+    save_document_extraction
 )
 from backend.agents.kyc_agent import sanctions_check, lei_verify, email_domain_check
+from backend.agents.agent_log_buffer import insert_agent_log, buffered_agent_logs, flush_agent_logs
+from backend.agents.stage_executor import Check, StageExecutor
+from backend.agents.llm_cache import cached_call
+from backend.agents.rate_limiter import rate_limited, estimate_tokens, is_capacity_error
+from backend.agents.streaming_json import IncrementalJSONExtractor
+from backend.agents.trace_sink import trace_sink
+from backend.aws_clients import get_client
 from backend.logger import logger_agents as logger
 
 def get_bedrock_client(client_type='bedrock-agent-runtime'):
-    """Returns a Bedrock client with explicit credentials from environment variables."""
-    return boto3.client(
-        client_type,
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-        aws_session_token=os.getenv("AWS_SESSION_TOKEN"),
-        region_name=os.getenv("AWS_REGION", "us-west-2")
-    )
+    """Returns the process-wide Bedrock client (pooled, keep-alive, adaptive retries)."""
+    return get_client(client_type)
 
 # Agent IDs for fallback/reference (though we prefer direct orchestration)
 # Agent IDs for the new account (us-west-2)
@@ -33,38 +36,89 @@ KYC_AGENT_ID = "UCW81NPRUR"
 AML_EXPERT_AGENT_ID = "YITJZXCFJE"
 AGENT_ALIAS_ID = "TSTALIASID"
 
-def invoke_bedrock_agent(agent_id, alias_id, session_id, prompt, onboarding_id=None, stage=1):
-    """Invokes a Bedrock Agent, parses traces for tool visibility, and extracts JSON."""
-    start_time = time.time()
+# Per-check timeouts (seconds) for the stage DAGs
+RULE_CHECK_TIMEOUT = float(os.getenv("RULE_CHECK_TIMEOUT_SECONDS", "30"))
+AGENT_CALL_TIMEOUT = float(os.getenv("AGENT_CALL_TIMEOUT_SECONDS", "300"))
+MODEL_CALL_TIMEOUT = float(os.getenv("MODEL_CALL_TIMEOUT_SECONDS", "120"))
+
+# Model used for direct Converse reasoning/consolidation calls
+ANALYSIS_MODEL = "us.amazon.nova-lite-v1:0"
+MODEL_INFERENCE_CONFIG = {"maxTokens": 2000, "temperature": 0}
+
+# Token estimates for rate control where the real size is not known up front
+AGENT_TOKEN_ESTIMATE = int(os.getenv("AGENT_TOKEN_ESTIMATE", "6000"))
+DOCUMENT_TOKEN_ESTIMATE = int(os.getenv("DOCUMENT_TOKEN_ESTIMATE", "3000"))
+
+# Stage 1 OCR: what each document contributes, and the onboarding_documents field it is stored under.
+# Extraction results are cached per document hash; bump the version when the model or prompt changes.
+DOCUMENT_OCR_MODEL = "us.amazon.nova-lite-v1:0"
+DOCUMENT_EXTRACTOR_VERSION = f"{DOCUMENT_OCR_MODEL}/doc-prompt-1"
+DOCUMENT_EXTRACTION_SPECS = {
+    "incorporation_doc": ("incorporation_doc", ["legal_name", "registration_number"],
+                          "From Incorporation: Legal name ('legal_name') and Registration number ('registration_number')."),
+    "bod_doc": ("bod_list", ["directors"], "From BOD List: An array of all Director names ('directors')."),
+    "ownership_doc": ("ownership", ["ubos"], "From Ownership Structure: An array of all UBO names ('ubos')."),
+    "ein_doc": ("ein_certificate", ["ein_number"], "From EIN Certificate: The Employer Identification Number ('ein_number')."),
+}
+
+def invoke_bedrock_agent(agent_id, alias_id, session_id, prompt, onboarding_id=None, stage=1, use_cache=True):
+    """Invokes a Bedrock Agent (through the LLM response cache)."""
     # Combined prompt to ensure instructions + identifiers are passed correctly
     input_text = f"As a KYC/AML Specialist, process this request: {prompt}. Return ONLY valid JSON."
-    
+    return cached_call(
+        "agent", f"{agent_id}/{alias_id}", input_text,
+        lambda: _invoke_bedrock_agent(agent_id, alias_id, session_id, input_text, onboarding_id, stage),
+        stage=stage, use_cache=use_cache
+    )
+
+def _publish_partial(onboarding_id, stage, agent_id, kind, key, value):
+    """Pushes one completed field/array item of a streaming agent answer to the ticket's live log."""
+    publish_ticket_event({
+        "type": "agent_partial", "onboarding_id": str(onboarding_id), "stage": stage,
+        "agent_id": agent_id, "kind": kind, "key": key, "value": value
+    })
+
+def _invoke_bedrock_agent(agent_id, alias_id, session_id, input_text, onboarding_id=None, stage=1):
+    """
+    Invokes a Bedrock Agent and consumes its event stream incrementally:
+    completed JSON fields/pillars are published as they arrive, tool calls are
+    logged, and raw traces go to the buffered trace sink.
+    """
+    start_time = time.time()
     try:
-        client = get_bedrock_client('bedrock-agent-runtime')
-        response = client.invoke_agent(
-            agentId=agent_id,
-            agentAliasId=alias_id,
-            sessionId=session_id,
-            inputText=input_text,
-            enableTrace=True
-        )
-        
-        full_text = ""
-        observations = []
-        # For deep debugging, let's log the raw traces to a file
-        with open("agent_trace.log", "a") as trace_log:
-            trace_log.write(f"\n--- SESSION: {session_id} START ---\n")
-            
+        def run_agent():
+            client = get_bedrock_client('bedrock-agent-runtime')
+            response = client.invoke_agent(
+                agentId=agent_id,
+                agentAliasId=alias_id,
+                sessionId=session_id,
+                inputText=input_text,
+                enableTrace=True
+            )
+
+            chunks = []
+            observations = []
+            extractor = IncrementalJSONExtractor()
+            first_partial_ms = None
+            trace_sink.write(session_id, {"event": "start", "agent_id": agent_id})
+
             for event in response['completion']:
-                # Capture JSON Chunks
+                # Capture JSON Chunks; publish every field/pillar as soon as it is complete
                 if 'chunk' in event:
-                    full_text += event['chunk']['bytes'].decode('utf-8')
-                
+                    text = event['chunk']['bytes'].decode('utf-8')
+                    chunks.append(text)
+                    for kind, key, value in extractor.feed(text):
+                        if first_partial_ms is None:
+                            first_partial_ms = int((time.time() - start_time) * 1000)
+                        if onboarding_id:
+                            _publish_partial(onboarding_id, stage, agent_id, kind, key, value)
+
                 # Capture Traces for real-time visibility
                 if 'trace' in event:
                     trace_data = event['trace'].get('trace', {})
+                    trace_sink.write(session_id, trace_data)
                     orch = trace_data.get('orchestrationTrace', {})
-                    
+
                     # 1. Detection of Tool Calls
                     inv_input = orch.get('invocationInput', {})
                     if 'actionGroupInvocationInput' in inv_input:
@@ -72,7 +126,7 @@ def invoke_bedrock_agent(agent_id, alias_id, session_id, prompt, onboarding_id=N
                         func_name = ag.get('function', 'unknown_tool')
                         params = ag.get('parameters', [])
                         logger.info(f"[AgentTrace] INVOKING: {func_name} | {params}")
-# Cleaned up comments here
+
                     # 2. Detection of Tool Results (Observations)
                     observation = orch.get('observation', {})
                     if 'actionGroupInvocationOutput' in observation:
@@ -80,17 +134,22 @@ def invoke_bedrock_agent(agent_id, alias_id, session_id, prompt, onboarding_id=N
                         text_res = ao.get('text', '')
                         logger.info(f"[AgentTrace] OBSERVATION: {text_res[:200]}...")
                         observations.append(text_res)
-                        
-                        if onboarding_id:
-                            # snippet = text_res[:500] + "..." if len(text_res) > 500 else text_res
-                            pass
+            return "".join(chunks), observations, first_partial_ms
 
+        # Throttles while starting or streaming are retried by the limiter until its deadline
+        full_text, observations, first_partial_ms = rate_limited(f"agent:{agent_id}", run_agent, tokens=AGENT_TOKEN_ESTIMATE)
         duration = int((time.time() - start_time) * 1000)
-        logger.info(f"[Orchestrator] Agent {agent_id} finished in {duration}ms. Full Output: {full_text[:200]}...")
+        logger.info(
+            f"[Orchestrator] Agent {agent_id} finished in {duration}ms "
+            f"(first structured output at {first_partial_ms}ms). Full Output: {full_text[:200]}..."
+        )
         
         # Wrap JSON extraction in a function
         return _extract_agent_json(full_text, agent_id, observations=observations)
     except Exception as e:
+        if is_capacity_error(e):
+            # Out of Bedrock capacity: fail the stage so the job is retried with backoff
+            raise
         logger.error(f"[Orchestrator] Bedrock error: {e}", exc_info=True)
         return {"error": str(e), "findings": "Deployment/Connectivity issue.", "_observations": []}
 
@@ -110,17 +169,25 @@ def _extract_agent_json(text, agent_id, observations=None):
     except Exception as e:
         return {"findings": text, "error": str(e), "_observations": observations}
 
-def invoke_bedrock_model_direct(prompt, system_role="Institutional Onboarding Analyst"):
+def invoke_bedrock_model_direct(prompt, system_role="Institutional Onboarding Analyst", stage=None, use_cache=True):
+    """Direct Nova Lite call (through the LLM response cache)."""
+    return cached_call(
+        "converse", ANALYSIS_MODEL, prompt,
+        lambda: _invoke_bedrock_model_direct(prompt, system_role),
+        system=system_role, params=MODEL_INFERENCE_CONFIG, stage=stage, use_cache=use_cache
+    )
+
+def _invoke_bedrock_model_direct(prompt, system_role):
     """Direct Nova Lite call for risk reasoning and JSON consolidation."""
     try:
         bedrock_runtime_rt = get_bedrock_client('bedrock-runtime')
         message = {"role": "user", "content": [{"text": prompt}]}
-        response = bedrock_runtime_rt.converse(
-            modelId="us.amazon.nova-lite-v1:0",
+        response = rate_limited(ANALYSIS_MODEL, lambda: bedrock_runtime_rt.converse(
+            modelId=ANALYSIS_MODEL,
             messages=[message],
             system=[{"text": system_role}],
-            inferenceConfig={"maxTokens": 2000, "temperature": 0}
-        )
+            inferenceConfig=MODEL_INFERENCE_CONFIG
+        ), tokens=estimate_tokens(system_role + prompt, MODEL_INFERENCE_CONFIG["maxTokens"]))
         full_response = response['output']['message']['content'][0]['text']
         json_start = full_response.find('{')
         json_end = full_response.rfind('}') + 1
@@ -128,10 +195,23 @@ def invoke_bedrock_model_direct(prompt, system_role="Institutional Onboarding An
             return json.loads(full_response[json_start:json_end])
         return {"error": "No JSON found", "ai_summary": full_response}
     except Exception as e:
+        if is_capacity_error(e):
+            raise
         logger.error(f"Direct model analysis failed: {e}")
         return {"error": str(e)}
 
-def invoke_bedrock_model_multimodal(prompt, s3_uris_dict):
+def invoke_bedrock_model_multimodal(prompt, s3_uris_dict, documents=None, stage=1, use_cache=True):
+    """
+    Multimodal OCR (through the LLM response cache).
+    documents: {doc_type: content hash} identifying the files; defaults to the URIs.
+    """
+    return cached_call(
+        "multimodal", DOCUMENT_OCR_MODEL, prompt,
+        lambda: _invoke_bedrock_model_multimodal(prompt, s3_uris_dict),
+        documents=documents or s3_uris_dict, params=MODEL_INFERENCE_CONFIG, stage=stage, use_cache=use_cache
+    )
+
+def _invoke_bedrock_model_multimodal(prompt, s3_uris_dict):
     """Directly calls Nova Lite using the Converse API for Multimodal OCR."""
     print(f"[Orchestrator] Direct Multimodal OCR for: {list(s3_uris_dict.keys())}")
     try:
@@ -147,21 +227,37 @@ def invoke_bedrock_model_multimodal(prompt, s3_uris_dict):
                 }
             })
         message = {"role": "user", "content": content}
-        response = bedrock_runtime_rt.converse(
-            modelId="us.amazon.nova-lite-v1:0",
+        tokens = estimate_tokens(prompt, MODEL_INFERENCE_CONFIG["maxTokens"]) + DOCUMENT_TOKEN_ESTIMATE * (len(content) - 1)
+        response = rate_limited(DOCUMENT_OCR_MODEL, lambda: bedrock_runtime_rt.converse(
+            modelId=DOCUMENT_OCR_MODEL,
             messages=[message],
-            inferenceConfig={"maxTokens": 2000, "temperature": 0}
-        )
+            inferenceConfig=MODEL_INFERENCE_CONFIG
+        ), tokens=tokens)
         full_response = response['output']['message']['content'][0]['text']
         json_start = full_response.find('{')
         json_end = full_response.rfind('}') + 1
         return json.loads(full_response[json_start:json_end]) if (json_start != -1 and json_end != -1) else {"error": "No JSON"}
     except Exception as e:
+        if is_capacity_error(e):
+            raise
         logger.error(f"Direct Multimodal failed: {e}")
         return {"error": str(e)}
 
 # --- LOGIC HELPERS ---
 
+def _raise_on_capacity_errors(executor, check_names):
+    """
+    Re-raises a Bedrock capacity error (rate-limit deadline or exhausted
+    throttle retries) from any of the stage's required model checks, so the
+    stage fails and the job queue retries it instead of completing with
+    empty findings.
+    """
+    for name in check_names:
+        error = executor.exceptions.get(name)
+        if error is not None and is_capacity_error(error):
+            logger.error(f"[{executor.label}] '{name}' ran out of Bedrock capacity: {error}")
+            raise error
+
 def _find_key(data, keys, default=None):
     if not isinstance(data, dict): return default
     norm_data = {k.lower().replace("_", "").replace("-", ""): v for k, v in data.items()}
@@ -199,6 +295,51 @@ def _get_onboarding_data(onboarding_id):
             return dict(zip(cols, row))
     finally: release_connection(conn)
 
+def _document_prompt(doc_types):
+    """Multimodal extraction prompt covering only the given documents."""
+    lines = [f"{i}. {DOCUMENT_EXTRACTION_SPECS[d][2]}" for i, d in enumerate(doc_types, 1)]
+    return (
+        "Analyze the provided legal documents and extract the following information in a single JSON object:\n"
+        + "\n".join(lines) + "\n"
+        "Return ONLY the JSON."
+    )
+
+def _extract_documents(s3_uris, doc_hashes, use_cache=True):
+    """
+    OCR for Stage 1 with hash-keyed reuse.
+    Documents whose content hash already has an extraction are served from
+    document_extractions; the rest go to Bedrock in one multimodal call and
+    their per-document fields are cached for the next ticket that submits them.
+    """
+    hashes = {d: doc_hashes.get(DOCUMENT_EXTRACTION_SPECS[d][0]) for d in s3_uris}
+    cached = get_document_extractions([(h, d) for d, h in hashes.items()], DOCUMENT_EXTRACTOR_VERSION) if use_cache else {}
+
+    ocr_res = {}
+    missing = {}
+    for doc_type, uri in s3_uris.items():
+        hit = cached.get((hashes[doc_type], doc_type))
+        if hit is not None:
+            ocr_res.update(hit)
+        else:
+            missing[doc_type] = uri
+
+    if missing:
+        documents = {d: hashes[d] or uri for d, uri in missing.items()}
+        fresh = invoke_bedrock_model_multimodal(_document_prompt(list(missing)), missing,
+                                                documents=documents, use_cache=use_cache)
+        ocr_res.update(fresh)
+        if "error" not in fresh:
+            for doc_type in missing:
+                fields = DOCUMENT_EXTRACTION_SPECS[doc_type][1]
+                values = {f: _find_key(fresh, [f]) for f in fields}
+                # Only complete extractions are reused; a partial answer is retried next time
+                if hashes[doc_type] and all(v is not None for v in values.values()):
+                    save_document_extraction(hashes[doc_type], doc_type, DOCUMENT_EXTRACTOR_VERSION, values, DOCUMENT_OCR_MODEL)
+
+    ocr_res["_document_cache"] = {"reused": sorted(set(s3_uris) - set(missing)), "extracted": sorted(missing)}
+    logger.info(f"[Orchestrator] Document OCR: reused {ocr_res['_document_cache']['reused']}, extracted {sorted(missing)}")
+    return ocr_res
+
 def _get_onboarding_people(onboarding_id, table_name):
     """Fetches a list of full_names from directors or ubos table."""
     conn = get_connection()
@@ -247,14 +388,20 @@ def _get_latest_document_findings(onboarding_id):
 
 # --- MAIN STAGES ---
 
-def run_document_agent_stage(onboarding_id):
+def run_document_agent_stage(onboarding_id, use_cache=True):
     """
     Stage 1: Document Verification (Truth Discovery)
     Extracts data from multiple S3 PDFs (Incorporation, BOD, Ownership, EIN)
     and validates against all corresponding form fields.
+    use_cache=False forces fresh model calls (results still refresh the caches).
     """
-    logger.info(f"Starting Stage 1: Multi-Doc Verification for {onboarding_id}")
     run_id = str(uuid.uuid4())
+    # The run's ai_agent_logs rows are committed together (see agent_log_buffer.py)
+    with buffered_agent_logs(run_id):
+        return _run_document_agent_stage(onboarding_id, run_id, use_cache)
+
+def _run_document_agent_stage(onboarding_id, run_id, use_cache):
+    logger.info(f"Starting Stage 1: Multi-Doc Verification for {onboarding_id}")
     
     data = _get_onboarding_data(onboarding_id)
     if not data: return {"error": "Onboarding record not found"}
@@ -276,17 +423,7 @@ def run_document_agent_stage(onboarding_id):
     if not s3_uris:
         return {"status": "skipped", "message": "No documents provided for verification"}
 
-    # Expanded Multimodal Prompt
-    prompt = (
-        "Analyze the provided legal documents and extract the following information in a single JSON object:\n"
-        "1. From Incorporation: Legal name ('legal_name') and Registration number ('registration_number').\n"
-        "2. From BOD List: An array of all Director names ('directors').\n"
-        "3. From Ownership Structure: An array of all UBO names ('ubos').\n"
-        "4. From EIN Certificate: The Employer Identification Number ('ein_number').\n"
-        "Return ONLY the JSON."
-    )
-    
-    ocr_res = invoke_bedrock_model_multimodal(prompt, s3_uris)
+    ocr_res = _extract_documents(s3_uris, get_document_hashes(onboarding_id), use_cache=use_cache)
     
     # Audit Trail Results
     audit_trail = []
@@ -361,80 +498,106 @@ def run_document_agent_stage(onboarding_id):
         "duration_ms": 0
     })
     
+    flush_agent_logs(run_id)
     update_onboarding_status(onboarding_id, "DOCUMENT_COMPLETE", remarks=f"Stage 1: Multi-Doc Truth established. Risk: {risk_level}")
     
     return {"status": "success", "risk_level": risk_level, "audit_trail": audit_trail}
 
-def run_kyc_stage(onboarding_id):
+def run_kyc_stage(onboarding_id, use_cache=True):
     """
     Stage 2: KYC - Institutional Identity Verification
     Focuses on Registry (LEI/EIN) and Identity Hygiene (Email/Website).
+    use_cache=False forces fresh model calls.
     """
-    logger.info(f"Starting Native KYC Orchestration for {onboarding_id}")
     run_id = str(uuid.uuid4())
+    with buffered_agent_logs(run_id):
+        return _run_kyc_stage(onboarding_id, run_id, use_cache)
+
+def _run_kyc_stage(onboarding_id, run_id, use_cache):
+    logger.info(f"Starting Native KYC Orchestration for {onboarding_id}")
     session_id = f"kyc-{onboarding_id[:8]}"
     data = _get_onboarding_data(onboarding_id)
     if not data: return {"error": "Not Found"}
-    
-    # 1. Fetch Stage 1 Verification Context (The 'Truth' from documents)
-    doc_context = _get_latest_document_findings(onboarding_id)
-    
-    # 2. Rule-Based Ground Truth Checks
-    # Registry Check (EIN/LEI matches)
-    registry_res = lei_verify(
-        lei=data.get('lei_identifier'), 
-        company_name=data['company_name'], 
-        run_id=run_id, 
-        onboarding_id=onboarding_id, 
-        ein_number=data.get('ein_number')
-    )
-    
-    # Hygiene Check (Email domain matches website)
-    directors = _get_directors(onboarding_id)
-    hygiene_res = email_domain_check(
-        email=data.get('email'),
-        run_id=run_id,
-        onboarding_id=onboarding_id,
-        website=data.get('website'),
-        directors=directors
-    )
 
-    # 3. Invoke KYC Agent (Synthesizer & Verification)
-    prompt = (
-        f"Perform a high-fidelity Identity & Registry verification for {data['company_name']}.\n"
-        "Focus on these 3 pillars:\n"
-        "1. Institutional Registry Verification (LEI/EIN/Registration Status)\n"
-        "2. Identity Hygiene (Email vs Website consistency)\n"
-        "3. Document Proofing (Cross-referencing legal docs with form data)\n\n"
-        f"ENTITY DATA: LEI: {data.get('lei_identifier')}, EIN: {data.get('ein_number')}, Website: {data.get('website')}, Country: {data.get('country')}\n"
-        f"CONTEXT - TECHNICAL REGISTRY RESULTS: {json.dumps(registry_res)}\n"
-        f"CONTEXT - TECHNICAL HYGIENE RESULTS: {json.dumps(hygiene_res)}\n"
-        f"STAGE 1 - DOCUMENT OCR FINDINGS: {doc_context}\n\n"
-        "MANDATORY INSTRUCTION:\n"
-        "- Synthesize the document findings with the live registry results to prove the company's existence.\n"
-        "- Do NOT perform Sanctions, PEP, or News searches. Those are Stage 3 AML tasks.\n"
-        "Return ONLY a JSON result with ‘kyc_pillars’ list containing 'Institutional Registry', 'Identity Hygiene', and 'Document Proofing'."
-    )
-    kyc_res = invoke_bedrock_agent(KYC_AGENT_ID, AGENT_ALIAS_ID, session_id, prompt, onboarding_id, stage=2)
-    
+    def kyc_prompt(r):
+        return (
+            f"Perform a high-fidelity Identity & Registry verification for {data['company_name']}.\n"
+            "Focus on these 3 pillars:\n"
+            "1. Institutional Registry Verification (LEI/EIN/Registration Status)\n"
+            "2. Identity Hygiene (Email vs Website consistency)\n"
+            "3. Document Proofing (Cross-referencing legal docs with form data)\n\n"
+            f"ENTITY DATA: LEI: {data.get('lei_identifier')}, EIN: {data.get('ein_number')}, Website: {data.get('website')}, Country: {data.get('country')}\n"
+            f"CONTEXT - TECHNICAL REGISTRY RESULTS: {json.dumps(r['registry'])}\n"
+            f"CONTEXT - TECHNICAL HYGIENE RESULTS: {json.dumps(r['hygiene'])}\n"
+            f"STAGE 1 - DOCUMENT OCR FINDINGS: {r['doc_context']}\n\n"
+            "MANDATORY INSTRUCTION:\n"
+            "- Synthesize the document findings with the live registry results to prove the company's existence.\n"
+            "- Do NOT perform Sanctions, PEP, or News searches. Those are Stage 3 AML tasks.\n"
+            "Return ONLY a JSON result with ‘kyc_pillars’ list containing 'Institutional Registry', 'Identity Hygiene', and 'Document Proofing'."
+        )
+
+    def auditor_prompt(r):
+        kyc_res = r['kyc_agent']
+        findings = kyc_res.get("findings") or kyc_res.get("ai_summary", "Institutional identity verification complete.")
+        return (
+            f"You are a KYC Identity Auditor. Map the following results for {data['company_name']} into a clean 3-pillar JSON.\n"
+            f"TECHNICAL REGISTRY: {json.dumps(r['registry'])}\n"
+            f"TECHNICAL HYGIENE: {json.dumps(r['hygiene'])}\n"
+            f"DOC VERIFICATION: {r['doc_context']}\n"
+            f"SYNTHESIS FINDINGS: {findings}\n\n"
+            "PILLAR DEFINITIONS:\n"
+            "1. Institutional Registry: Must show LEI/EIN/Doc status.\n"
+            "2. Identity Hygiene: Must show Email/Website domain match status.\n"
+            "3. Document Proofing: Must show if OCR names/IDs match the form.\n"
+            "Return ONLY JSON matching the evidence table schema with pillars 1, 2 and 3."
+        )
+
+    # Stage DAG: context reads and the two rule-based checks run concurrently;
+    # the agent needs all of them and the auditor needs the agent's findings.
+    executor = StageExecutor([
+        # 1. Stage 1 Verification Context (The 'Truth' from documents)
+        Check("doc_context", lambda r: _get_latest_document_findings(onboarding_id),
+              timeout=RULE_CHECK_TIMEOUT, default=dict),
+        Check("directors", lambda r: _get_directors(onboarding_id),
+              timeout=RULE_CHECK_TIMEOUT, default=list),
+        # 2. Rule-Based Ground Truth Checks
+        # Registry Check (EIN/LEI matches)
+        Check("registry", lambda r: lei_verify(
+            lei=data.get('lei_identifier'),
+            company_name=data['company_name'],
+            run_id=run_id,
+            onboarding_id=onboarding_id,
+            ein_number=data.get('ein_number')
+        ), timeout=RULE_CHECK_TIMEOUT, default=dict),
+        # Hygiene Check (Email domain matches website)
+        Check("hygiene", lambda r: email_domain_check(
+            email=data.get('email'),
+            run_id=run_id,
+            onboarding_id=onboarding_id,
+            website=data.get('website'),
+            directors=r['directors']
+        ), deps=["directors"], timeout=RULE_CHECK_TIMEOUT, default=dict),
+        # 3. Invoke KYC Agent (Synthesizer & Verification)
+        Check("kyc_agent", lambda r: invoke_bedrock_agent(
+            KYC_AGENT_ID, AGENT_ALIAS_ID, session_id, kyc_prompt(r), onboarding_id, stage=2, use_cache=use_cache
+        ), deps=["registry", "hygiene", "doc_context"], timeout=AGENT_CALL_TIMEOUT, default=dict),
+        # --- AUDITOR FOR KYC STAGE ---
+        Check("auditor", lambda r: invoke_bedrock_model_direct(
+            auditor_prompt(r), system_role="Institutional Identity Auditor", stage=2, use_cache=use_cache
+        ), deps=["kyc_agent"], timeout=MODEL_CALL_TIMEOUT, default=dict),
+    ], label=f"KYC {onboarding_id[:8]}")
+    results = executor.run()
+    _raise_on_capacity_errors(executor, ["kyc_agent", "auditor"])
+
+    doc_context = results["doc_context"] or {}
+    registry_res = results["registry"] or {}
+    hygiene_res = results["hygiene"] or {}
+    kyc_res = results["kyc_agent"] or {}
+    fallback_res = results["auditor"] or {}
+
     risk_lvl = kyc_res.get("risk_level", "LOW")
     findings = kyc_res.get("findings") or kyc_res.get("ai_summary", "Institutional identity verification complete.")
     pillars = kyc_res.get("kyc_pillars", [])
-    
-    # --- AUDITOR FOR KYC STAGE ---
-    auditor_prompt = (
-        f"You are a KYC Identity Auditor. Map the following results for {data['company_name']} into a clean 3-pillar JSON.\n"
-        f"TECHNICAL REGISTRY: {json.dumps(registry_res)}\n"
-        f"TECHNICAL HYGIENE: {json.dumps(hygiene_res)}\n"
-        f"DOC VERIFICATION: {doc_context}\n"
-        f"SYNTHESIS FINDINGS: {findings}\n\n"
-        "PILLAR DEFINITIONS:\n"
-        "1. Institutional Registry: Must show LEI/EIN/Doc status.\n"
-        "2. Identity Hygiene: Must show Email/Website domain match status.\n"
-        "3. Document Proofing: Must show if OCR names/IDs match the form.\n"
-        "Return ONLY JSON matching the evidence table schema with pillars 1, 2 and 3."
-    )
-    fallback_res = invoke_bedrock_model_direct(auditor_prompt, system_role="Institutional Identity Auditor")
     if "kyc_pillars" in fallback_res:
          pillars = fallback_res["kyc_pillars"]
          findings = fallback_res.get("ai_summary", findings)
@@ -548,64 +711,90 @@ def run_kyc_stage(onboarding_id):
         "ai_summary": formatted_summary, "duration_ms": kyc_res.get("_duration_ms", 0)
     })
     
+    flush_agent_logs(run_id)
     _update_risk_level(onboarding_id, risk_lvl)
     update_onboarding_status(onboarding_id, "KYC_COMPLETE", remarks=f"KYC Identity Verification Complete. Status: {risk_lvl}")
     return {"composite_risk": risk_lvl, "composite_score": 10}
 
-def run_aml_risk_stage(onboarding_id):
+def run_aml_risk_stage(onboarding_id, use_cache=True):
     """
     Stage 3: AML - Risk Screening & Scoring
     Performs Sanctions, PEP, and Adverse Media screening.
+    use_cache=False forces fresh model calls.
     """
-    logger.info(f"Starting Native AML Risk Orchestration for {onboarding_id}")
     run_id = str(uuid.uuid4())
+    with buffered_agent_logs(run_id):
+        return _run_aml_risk_stage(onboarding_id, run_id, use_cache)
+
+def _run_aml_risk_stage(onboarding_id, run_id, use_cache):
+    logger.info(f"Starting Native AML Risk Orchestration for {onboarding_id}")
     session_id = f"aml-{onboarding_id[:8]}"
     
     data = _get_onboarding_data(onboarding_id)
     if not data: return {"error": "Not Found"}
 
-    # 1. Fetch Contexts
-    kyc_context = _get_latest_kyc_findings(onboarding_id)
-    doc_context = _get_latest_document_findings(onboarding_id)
-    
-    # 2. Rule-Based Sanctions Screening (Internal DB)
-    sanctions_res = sanctions_check(data['company_name'], run_id, onboarding_id)
-    
-    # 3. Invoke AML Expert Agent (Screener)
-    prompt = (
-        f"Perform an institutional AML risk screening for {data['company_name']} (ID: {onboarding_id}).\n"
-        "YOUR TASKS:\n"
-        "1. Sanctions & AML Screening: Cross-reference internal results and search global lists.\n"
-        "2. PEP Detection: Search for Political Exposure among known associates.\n"
-        "3. Adverse Media: Search for negative news, money laundering, or fraud indicators.\n"
-        "4. Risk Scoring: Provide a final numerical score (0-100) and rationale.\n\n"
-        f"CONTEXT - KYC IDENTITY RESULTS: {kyc_context}\n"
-        f"CONTEXT - TECHNICAL SANCTIONS RESULTS: {json.dumps(sanctions_res)}\n"
-        f"CONTEXT - DOC VERIFICATION: {doc_context}\n\n"
-        "MANDATORY INSTRUCTION:\n"
-        "- YOU MUST perform active search actions for PEP and Adverse Media.\n"
-        "- Return a structured JSON with 'aml_pillars' (Sanctions, PEP, Adverse Media).\n"
-        "- Each pillar must include 'data_point' (what you searched for) and 'evidence' (what you found)."
-    )
-    aml_res = invoke_bedrock_agent(AML_EXPERT_AGENT_ID, AGENT_ALIAS_ID, session_id, prompt, onboarding_id, stage=3)
-    
+    def aml_prompt(r):
+        return (
+            f"Perform an institutional AML risk screening for {data['company_name']} (ID: {onboarding_id}).\n"
+            "YOUR TASKS:\n"
+            "1. Sanctions & AML Screening: Cross-reference internal results and search global lists.\n"
+            "2. PEP Detection: Search for Political Exposure among known associates.\n"
+            "3. Adverse Media: Search for negative news, money laundering, or fraud indicators.\n"
+            "4. Risk Scoring: Provide a final numerical score (0-100) and rationale.\n\n"
+            f"CONTEXT - KYC IDENTITY RESULTS: {r['kyc_context']}\n"
+            f"CONTEXT - TECHNICAL SANCTIONS RESULTS: {json.dumps(r['sanctions'])}\n"
+            f"CONTEXT - DOC VERIFICATION: {r['doc_context']}\n\n"
+            "MANDATORY INSTRUCTION:\n"
+            "- YOU MUST perform active search actions for PEP and Adverse Media.\n"
+            "- Return a structured JSON with 'aml_pillars' (Sanctions, PEP, Adverse Media).\n"
+            "- Each pillar must include 'data_point' (what you searched for) and 'evidence' (what you found)."
+        )
+
+    def auditor_prompt(r):
+        aml_res = r['aml_agent']
+        findings = aml_res.get("ai_summary") or aml_res.get("rationale", "AML Risk Profile Complete.")
+        return (
+            f"You are a Lead AML Risk Auditor. Map these results for {data['company_name']} into a 3-pillar JSON.\n"
+            f"TECHNICAL SANCTIONS: {json.dumps(r['sanctions'])}\n"
+            f"AGENT SCREENING RESULTS: {findings}\n\n"
+            "PILLAR DEFINITIONS:\n"
+            "1. Sanctions & AML: Must show internal DB results + Global list hits.\n"
+            "2. PEP Detection: Must show results of political exposure search.\n"
+            "3. Adverse Media: Must show results of negative news search.\n"
+            "Return ONLY JSON with 'aml_pillars' list."
+        )
+
+    # Stage DAG: context reads and sanctions screening run concurrently;
+    # the expert agent needs all three and the auditor needs the agent's findings.
+    executor = StageExecutor([
+        # 1. Fetch Contexts
+        Check("kyc_context", lambda r: _get_latest_kyc_findings(onboarding_id),
+              timeout=RULE_CHECK_TIMEOUT, default="No prior KYC findings."),
+        Check("doc_context", lambda r: _get_latest_document_findings(onboarding_id),
+              timeout=RULE_CHECK_TIMEOUT, default=dict),
+        # 2. Rule-Based Sanctions Screening (Internal DB)
+        Check("sanctions", lambda r: sanctions_check(data['company_name'], run_id, onboarding_id),
+              timeout=RULE_CHECK_TIMEOUT, default=dict),
+        # 3. Invoke AML Expert Agent (Screener)
+        Check("aml_agent", lambda r: invoke_bedrock_agent(
+            AML_EXPERT_AGENT_ID, AGENT_ALIAS_ID, session_id, aml_prompt(r), onboarding_id, stage=3, use_cache=use_cache
+        ), deps=["kyc_context", "doc_context", "sanctions"], timeout=AGENT_CALL_TIMEOUT, default=dict),
+        # --- AUDITOR FOR AML STAGE ---
+        Check("auditor", lambda r: invoke_bedrock_model_direct(
+            auditor_prompt(r), system_role="Lead Institutional AML Auditor", stage=3, use_cache=use_cache
+        ), deps=["aml_agent"], timeout=MODEL_CALL_TIMEOUT, default=dict),
+    ], label=f"AML {onboarding_id[:8]}")
+    results = executor.run()
+    _raise_on_capacity_errors(executor, ["aml_agent", "auditor"])
+
+    sanctions_res = results["sanctions"] or {}
+    aml_res = results["aml_agent"] or {}
+    fallback_res = results["auditor"] or {}
+
     risk_lvl = aml_res.get("risk_rating", "LOW")
     risk_score = aml_res.get("final_risk_score", 10)
     findings = aml_res.get("ai_summary") or aml_res.get("rationale", "AML Risk Profile Complete.")
     pillars = aml_res.get("aml_pillars", [])
-
-    # --- AUDITOR FOR AML STAGE ---
-    auditor_prompt = (
-        f"You are a Lead AML Risk Auditor. Map these results for {data['company_name']} into a 3-pillar JSON.\n"
-        f"TECHNICAL SANCTIONS: {json.dumps(sanctions_res)}\n"
-        f"AGENT SCREENING RESULTS: {findings}\n\n"
-        "PILLAR DEFINITIONS:\n"
-        "1. Sanctions & AML: Must show internal DB results + Global list hits.\n"
-        "2. PEP Detection: Must show results of political exposure search.\n"
-        "3. Adverse Media: Must show results of negative news search.\n"
-        "Return ONLY JSON with 'aml_pillars' list."
-    )
-    fallback_res = invoke_bedrock_model_direct(auditor_prompt, system_role="Lead Institutional AML Auditor")
     if "aml_pillars" in fallback_res:
          pillars = fallback_res["aml_pillars"]
     
@@ -662,6 +851,7 @@ def run_aml_risk_stage(onboarding_id):
         "ai_summary": formatted_summary, "duration_ms": aml_res.get("_duration_ms", 0)
     })
     
+    flush_agent_logs(run_id)
     _update_risk_level(onboarding_id, risk_lvl)
     update_onboarding_status(onboarding_id, "AML_COMPLETE", remarks=f"AI AML Risk Profile Complete. Final Rating: {risk_lvl}")
     return {"risk_rating": risk_lvl, "final_risk_score": risk_score}
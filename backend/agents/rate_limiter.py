@@ -0,0 +1,188 @@
+"""
+Bedrock Rate Controller — shared admission control for every model call
+Each model (or agent) gets an AdaptiveLimiter combining:
+- token buckets for the account's requests/minute and tokens/minute quotas,
+- an AIMD concurrency window: +1 per window of successful calls, halved on a
+  ThrottlingException,
+- a waiting queue with a deadline, so a burst of signups queues for capacity
+  instead of firing everything at once and failing.
+
+Throttled calls are retried through the limiter (with jittered backoff) until
+their deadline, so throttling shows up as queueing latency rather than as
+{"error": ...} results. get_stats() exports the window and queue length.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+
+from ..logger import logger_agents as logger
+
+BEDROCK_DEFAULT_RPM = float(os.getenv("BEDROCK_DEFAULT_RPM", "100"))
+BEDROCK_DEFAULT_TPM = float(os.getenv("BEDROCK_DEFAULT_TPM", "200000"))
+
+# Per-model overrides: {"us.amazon.nova-lite-v1:0": {"rpm": 200, "tpm": 400000, "max_concurrency": 20}}
+BEDROCK_MODEL_QUOTAS = json.loads(os.getenv("BEDROCK_MODEL_QUOTAS", "{}") or "{}")
+
+BEDROCK_INITIAL_CONCURRENCY = float(os.getenv("BEDROCK_INITIAL_CONCURRENCY", "4"))
+BEDROCK_MAX_CONCURRENCY = float(os.getenv("BEDROCK_MAX_CONCURRENCY", "16"))
+BEDROCK_AIMD_DECREASE = float(os.getenv("BEDROCK_AIMD_DECREASE", "0.5"))
+
+# Longest a call may wait for capacity (including throttle retries)
+BEDROCK_QUEUE_TIMEOUT = float(os.getenv("BEDROCK_QUEUE_TIMEOUT_SECONDS", "90"))
+BEDROCK_THROTTLE_BACKOFF = float(os.getenv("BEDROCK_THROTTLE_BACKOFF_SECONDS", "1"))
+
+_THROTTLE_CODES = ("throttlingexception", "toomanyrequestsexception", "servicequotaexceededexception")
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call could not be admitted before its deadline."""
+
+
+def is_throttle(error) -> bool:
+    code = str(getattr(error, "response", {}).get("Error", {}).get("Code", "")).lower()
+    return code in _THROTTLE_CODES or "throttl" in type(error).__name__.lower() or "throttlingexception" in str(error).lower()
+
+
+def is_capacity_error(error) -> bool:
+    """True for errors that mean Bedrock had no capacity: a throttle retried to the deadline, or no admission."""
+    return isinstance(error, RateLimitTimeout) or is_throttle(error)
+
+
+def estimate_tokens(text, max_output_tokens=0) -> int:
+    """Rough input size (~4 chars/token) plus the output budget."""
+    return len(text or "") // 4 + max_output_tokens
+
+
+class TokenBucket:
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now) -> float:
+        """Seconds until `amount` is available (0 if it is now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= min(amount, self.capacity)
+
+
+class AdaptiveLimiter:
+    def __init__(self, name, rpm=BEDROCK_DEFAULT_RPM, tpm=BEDROCK_DEFAULT_TPM,
+                 initial_concurrency=BEDROCK_INITIAL_CONCURRENCY, max_concurrency=BEDROCK_MAX_CONCURRENCY):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_window = max(1.0, max_concurrency)
+        self.window = min(max(1.0, initial_concurrency), self.max_window)
+        self.in_flight = 0
+        self.queued = 0
+        self.stats = {"admitted": 0, "throttled": 0, "timeouts": 0, "errors": 0, "wait_ms_total": 0}
+        self._cond = threading.Condition()
+
+    def acquire(self, tokens, deadline):
+        """Blocks until a slot and quota are available; raises RateLimitTimeout at the deadline."""
+        start = time.monotonic()
+        with self._cond:
+            self.queued += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait_for = None
+                    if self.in_flight < int(self.window):
+                        wait_for = max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+                        if wait_for == 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            self.in_flight += 1
+                            self.stats["admitted"] += 1
+                            self.stats["wait_ms_total"] += int((now - start) * 1000)
+                            return
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.stats["timeouts"] += 1
+                        raise RateLimitTimeout(f"{self.name}: no capacity within deadline (window {int(self.window)})")
+                    self._cond.wait(min(remaining, wait_for) if wait_for else remaining)
+            finally:
+                self.queued -= 1
+
+    def release(self, outcome):
+        """outcome: "ok" | "throttled" | "error"."""
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == "throttled":
+                self.stats["throttled"] += 1
+                self.window = max(1.0, self.window * BEDROCK_AIMD_DECREASE)
+                logger.warning(f"[RateLimit] {self.name} throttled; window -> {int(self.window)}")
+            elif outcome == "ok":
+                self.window = min(self.max_window, self.window + 1.0 / self.window)
+            else:
+                self.stats["errors"] += 1
+            self._cond.notify_all()
+
+    def call(self, fn, tokens=1, timeout=BEDROCK_QUEUE_TIMEOUT):
+        """Runs fn() under the limiter, retrying throttled attempts until the deadline."""
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            self.acquire(tokens, deadline)
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_throttle(e):
+                    self.release("error")
+                    raise
+                self.release("throttled")
+                attempt += 1
+                pause = random.uniform(0.5, 1.0) * BEDROCK_THROTTLE_BACKOFF * (2 ** min(attempt - 1, 5))
+                if time.monotonic() + pause >= deadline:
+                    raise
+                time.sleep(pause)
+                continue
+            self.release("ok")
+            return result
+
+    def snapshot(self):
+        with self._cond:
+            return {"window": int(self.window), "in_flight": self.in_flight, "queued": self.queued, **self.stats}
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name) -> AdaptiveLimiter:
+    """Process-wide limiter for a model id or agent id."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            quota = BEDROCK_MODEL_QUOTAS.get(name, {})
+            limiter = AdaptiveLimiter(
+                name,
+                rpm=float(quota.get("rpm", BEDROCK_DEFAULT_RPM)),
+                tpm=float(quota.get("tpm", BEDROCK_DEFAULT_TPM)),
+                max_concurrency=float(quota.get("max_concurrency", BEDROCK_MAX_CONCURRENCY)),
+            )
+            _limiters[name] = limiter
+        return limiter
+
+
+def rate_limited(name, fn, tokens=1, timeout=BEDROCK_QUEUE_TIMEOUT):
+    return get_limiter(name).call(fn, tokens=tokens, timeout=timeout)
+
+
+def get_stats() -> dict:
+    """Current window, in-flight and queue length per model in this process."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
@@ -0,0 +1,291 @@
+"""
+Sanctions Index — in-process screening matcher
+Loads client_onboarding.sanctions_list once and answers name queries from memory
+instead of issuing one ILIKE scan per name token.
+
+Each alias is normalized (accents stripped, punctuation split, lower-cased) and
+indexed three ways:
+  - token   -> entries             (exact token hits)
+  - trigram -> vocabulary tokens   (fuzzy / misspelt tokens)
+  - soundex -> vocabulary tokens   (phonetic variants, e.g. Usmanov / Usmanof)
+A whole party (company + UBOs + directors) is screened in one call and every
+candidate carries a 0..1 score. The snapshot is rebuilt when the table changes
+and records the published list_version (sanctions_ingest.py) it was built from,
+so screening results and caches can be keyed on it.
+"""
+
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+
+from ..db import get_connection, release_connection
+from ..logger import logger_agents as logger
+
+# Seconds between change checks against sanctions_list (0 = check on every query)
+REFRESH_INTERVAL = int(os.getenv("SANCTIONS_INDEX_REFRESH_SECONDS", "60"))
+
+# A query token must reach this similarity with an alias token to produce a hit
+MIN_TOKEN_SIMILARITY = float(os.getenv("SANCTIONS_MIN_TOKEN_SIMILARITY", "0.8"))
+
+# Trigram similarity a phonetic (Soundex) match must still reach
+PHONETIC_MIN_SIMILARITY = 0.65
+
+# Candidates returned per screened name
+MAX_CANDIDATES = int(os.getenv("SANCTIONS_MAX_CANDIDATES", "10"))
+
+# Generic corporate tokens ignored during matching to prevent false positives
+COMMON_TOKENS = {
+    "group", "financial", "services", "corporation", "corp", "limited", "ltd",
+    "inc", "incorporated", "company", "holdings", "management", "international",
+    "global", "solutions", "partners", "capital", "trust", "investment"
+}
+
+_SPLIT_RE = re.compile(r"[^0-9a-z]+")
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"), "l": "4", **dict.fromkeys("mn", "5"), "r": "6",
+}
+
+
+def normalize_tokens(name: str) -> list:
+    """Lower-case, strip accents and split a name into alphanumeric tokens."""
+    if not name:
+        return []
+    if name.isascii():
+        text = name.lower()     # NFKD leaves ASCII untouched
+    else:
+        text = unicodedata.normalize("NFKD", name)
+        text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return [t for t in _SPLIT_RE.split(text) if t]
+
+
+def significant_tokens(name: str) -> list:
+    """Tokens that take part in matching: longer than 3 chars and not generic."""
+    return [t for t in normalize_tokens(name) if len(t) > 3 and t not in COMMON_TOKENS]
+
+
+def trigrams(token: str) -> set:
+    """Padded character trigrams, in the style of pg_trgm."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def soundex(token: str) -> str:
+    """American Soundex key for a token (letters only)."""
+    letters = [c for c in token if c.isalpha()]
+    if not letters:
+        return ""
+    key = letters[0].upper()
+    prev = _SOUNDEX_CODES.get(letters[0], "")
+    for c in letters[1:]:
+        code = _SOUNDEX_CODES.get(c, "")
+        if code and code != prev:
+            key += code
+            if len(key) == 4:
+                break
+        if c not in "hw":
+            prev = code
+    return key.ljust(4, "0")
+
+
+class SanctionsIndex:
+    """Immutable in-memory index over a snapshot of sanctions_list rows."""
+
+    def __init__(self, rows, signature=None, list_version=None):
+        self.signature = signature
+        self.list_version = list_version
+        self.entries = []
+        self._postings = defaultdict(set)      # token   -> entry ids
+        self._trigrams = defaultdict(set)      # trigram -> vocabulary tokens
+        self._phonetic = defaultdict(set)      # soundex -> vocabulary tokens
+        self._token_grams = {}                 # vocabulary token -> trigram set
+        self._entry_tokens = []                # entry id -> significant token set
+        self._token_cache = {}
+
+        for row in rows:
+            entry_id = len(self.entries)
+            self.entries.append(self._make_entry(row))
+            tokens = set(significant_tokens(row[0])) or set(normalize_tokens(row[0]))
+            self._entry_tokens.append(tokens)
+            for token in tokens:
+                self._postings[token].add(entry_id)
+                if token not in self._token_grams:
+                    grams = trigrams(token)
+                    self._token_grams[token] = grams
+                    for g in grams:
+                        self._trigrams[g].add(token)
+                    key = soundex(token)
+                    if key:
+                        self._phonetic[key].add(token)
+
+    @staticmethod
+    def _make_entry(row) -> dict:
+        """Candidate fields returned with a hit; row[0] is the indexed name."""
+        return {
+            "matched_name": row[0],
+            "entity_type": row[1],
+            "program": row[2],
+            "list_type": row[3],
+            "country": row[4]
+        }
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _similar_tokens(self, token: str) -> dict:
+        """Returns {vocabulary_token: similarity} for tokens close to `token`."""
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        similar = {}
+        if token in self._postings:
+            similar[token] = 1.0
+
+        grams = trigrams(token)
+        shared = defaultdict(int)
+        for g in grams:
+            for candidate in self._trigrams.get(g, ()):
+                shared[candidate] += 1
+        for candidate, count in shared.items():
+            dice = 2.0 * count / (len(grams) + len(self._token_grams[candidate]))
+            if dice >= MIN_TOKEN_SIMILARITY and dice > similar.get(candidate, 0):
+                similar[candidate] = dice
+
+        key = soundex(token)
+        for candidate in self._phonetic.get(key, ()):
+            # Phonetic agreement only counts when spelling is already close
+            dice = 2.0 * shared.get(candidate, 0) / (len(grams) + len(self._token_grams[candidate]))
+            score = max(dice, MIN_TOKEN_SIMILARITY) if dice >= PHONETIC_MIN_SIMILARITY else 0
+            if score > similar.get(candidate, 0):
+                similar[candidate] = score
+
+        self._token_cache[token] = similar
+        return similar
+
+    def match(self, name: str, limit: int = MAX_CANDIDATES) -> list:
+        """Scored sanctions candidates for a single name, best first."""
+        query = list(dict.fromkeys(significant_tokens(name)))
+        if not query:
+            return []
+
+        # entry id -> {query token: best similarity}
+        matched = defaultdict(dict)
+        for q in query:
+            for vocab_token, sim in self._similar_tokens(q).items():
+                for entry_id in self._postings[vocab_token]:
+                    if sim > matched[entry_id].get(q, 0):
+                        matched[entry_id][q] = sim
+
+        candidates = []
+        for entry_id, per_token in matched.items():
+            entry_tokens = self._entry_tokens[entry_id]
+            query_cov = sum(per_token.values()) / len(query)
+            entry_cov = min(1.0, len(per_token) / len(entry_tokens)) if entry_tokens else 0
+            score = round(0.5 * query_cov + 0.5 * entry_cov, 3)
+            candidates.append({
+                **self.entries[entry_id],
+                "score": score,
+                "matched_tokens": sorted(per_token)
+            })
+        candidates.sort(key=lambda c: (-c["score"], c["matched_name"]))
+        return candidates[:limit]
+
+    def match_many(self, names, limit: int = MAX_CANDIDATES) -> dict:
+        """Batch variant of match(): {name: [candidates]} for every distinct name."""
+        return {n: self.match(n, limit) for n in dict.fromkeys(n for n in names if n)}
+
+    def screen_party(self, company_name: str, ubos: list = None, directors: list = None,
+                     limit: int = MAX_CANDIDATES) -> dict:
+        """Screens a company, all its UBOs and all its directors in one call."""
+        ubo_names = [u.get("full_name", "") for u in (ubos or [])]
+        director_names = [d.get("full_name", "") for d in (directors or [])]
+        results = self.match_many([company_name, *ubo_names, *director_names], limit)
+        return {
+            "company": {"name": company_name, "hits": results.get(company_name, [])},
+            "ubos": [{"name": n, "hits": results.get(n, [])} for n in ubo_names],
+            "directors": [{"name": n, "hits": results.get(n, [])} for n in director_names]
+        }
+
+
+def latest_list_version(cursor):
+    """
+    Latest published sanctions list version, or None when nothing has been
+    published or db/sanctions_versioning_migration.sql has not been run.
+    Screening must keep working without it, so the table is probed first.
+    """
+    cursor.execute("SELECT to_regclass('client_onboarding.sanctions_list_versions') IS NOT NULL")
+    if not cursor.fetchone()[0]:
+        return None
+    cursor.execute("SELECT MAX(list_version) FROM client_onboarding.sanctions_list_versions")
+    return cursor.fetchone()[0]
+
+
+def _load_signature(cursor):
+    """
+    Cheap change marker for sanctions_list: latest published list_version
+    (covers in-place CHANGEs) + row count + max id + max created_at.
+    """
+    list_version = latest_list_version(cursor)
+    cursor.execute("""
+        SELECT COUNT(*), MAX(id), MAX(created_at)
+        FROM client_onboarding.sanctions_list
+    """)
+    return tuple(str(v) for v in (list_version, *cursor.fetchone()))
+
+
+def _list_version(signature):
+    return int(signature[0]) if signature and signature[0] not in (None, "None") else None
+
+
+def _load_rows(cursor):
+    cursor.execute("""
+        SELECT entity_name, entity_type, program, list_type, country
+        FROM client_onboarding.sanctions_list
+    """)
+    return cursor.fetchall()
+
+
+_index = None
+_last_check = 0.0
+_lock = threading.Lock()
+
+
+def get_sanctions_index(force_refresh: bool = False):
+    """
+    Returns the process-wide SanctionsIndex, rebuilding it when sanctions_list
+    has changed since the last load. Returns None if the list cannot be loaded
+    and no previous snapshot exists.
+    """
+    global _index, _last_check
+    now = time.time()
+    if _index is not None and not force_refresh and now - _last_check < REFRESH_INTERVAL:
+        return _index
+
+    with _lock:
+        if _index is not None and not force_refresh and time.time() - _last_check < REFRESH_INTERVAL:
+            return _index
+        conn = get_connection()
+        if not conn:
+            return _index
+        try:
+            with conn.cursor() as cursor:
+                signature = _load_signature(cursor)
+                if _index is None or force_refresh or signature != _index.signature:
+                    start = time.time()
+                    _index = SanctionsIndex(_load_rows(cursor), signature=signature,
+                                            list_version=_list_version(signature))
+                    logger.info(
+                        f"[SanctionsIndex] Loaded {len(_index)} aliases (list version "
+                        f"{_index.list_version}) in {int((time.time() - start) * 1000)}ms"
+                    )
+            _last_check = time.time()
+        except Exception as e:
+            logger.error(f"[SanctionsIndex] refresh failed: {e}", exc_info=True)
+        finally:
+            release_connection(conn)
+        return _index
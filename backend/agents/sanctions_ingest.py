@@ -0,0 +1,469 @@
+"""
+Sanctions Ingest — versioned bulk loads of OFAC / UN / EU list files
+Replaces the hand-built INSERT scripts (db/sanctions_data.sql, db/fix_sql_data.py)
+for real list files. One load runs in one transaction:
+
+    parse file -> COPY into a temp staging table -> diff against sanctions_list
+    by (source, source_uid) and record_hash -> apply ADD / CHANGE / REMOVE
+    -> write a sanctions_list_versions row plus its sanctions_list_changes
+
+Readers see the old list or the new one, never a mix. A file that changes
+nothing publishes no version, so caches keyed on list_version (SanctionsIndex,
+rescreening) stay valid. A load that would remove more than
+SANCTIONS_MAX_REMOVAL_RATIO of a source's entries (e.g. a truncated download)
+is refused unless forced.
+
+Formats:
+- ofac   SDN / consolidated CSV (sdn.csv, no header, "-0-" for empty)
+- un     UN Security Council consolidated list XML
+- eu     EU financial sanctions consolidated list XML (export format)
+- local  CSV with the sanctions_list columns (db/csv/sanctions_list.csv)
+
+Aliases (UN ALIAS_NAME, EU extra nameAlias) become rows of their own so the
+screening index matches them; their source_uid is "<list id>#<name hash>".
+
+Requires db/sanctions_versioning_migration.sql.
+
+    python -m backend.agents.sanctions_ingest load sdn.csv [--rescreen]
+    python -m backend.agents.sanctions_ingest load consolidated.xml --source UN
+    python -m backend.agents.sanctions_ingest synth sdn-synthetic.csv --count 100000 --revision 1
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import os
+import random
+import time
+from xml.etree import ElementTree
+
+from ..db import get_connection, release_connection
+from ..logger import logger_agents as logger
+from .sanctions_index import normalize_tokens
+
+# Refuse loads that drop more than this share of a source's current entries
+SANCTIONS_MAX_REMOVAL_RATIO = float(os.getenv("SANCTIONS_MAX_REMOVAL_RATIO", "0.2"))
+
+COLUMNS = ("source_uid", "entity_name", "entity_type", "program", "list_type",
+           "country", "entity_address", "tax_id", "remarks")
+
+# sanctions_list column widths; longer values are cut before hashing
+_WIDTHS = {"source_uid": 100, "entity_name": 255, "entity_type": 50, "program": 100,
+           "list_type": 50, "country": 100, "tax_id": 50}
+
+DEFAULT_SOURCES = {"ofac": "OFAC", "un": "UN", "eu": "EU", "local": "LOCAL"}
+
+_OFAC_TYPES = {"individual": "INDIVIDUAL", "vessel": "VESSEL", "aircraft": "AIRCRAFT"}
+_EU_TYPES = {"person": "INDIVIDUAL", "enterprise": "ENTITY"}
+
+
+def _clean(value):
+    value = " ".join(str(value).split()) if value is not None else ""
+    return value if value and value != "-0-" else None
+
+
+def _record(**fields) -> dict:
+    record = {}
+    for column in COLUMNS:
+        value = _clean(fields.get(column))
+        width = _WIDTHS.get(column)
+        record[column] = value[:width] if value and width else value
+    return record
+
+
+def record_hash(record: dict) -> str:
+    """Content hash of everything but the id; a changed hash is a CHANGE."""
+    joined = "\x1f".join(record.get(c) or "" for c in COLUMNS[1:])
+    return hashlib.md5(joined.encode("utf-8")).hexdigest()
+
+
+def _alias_uid(uid: str, name: str) -> str:
+    digest = hashlib.md5(" ".join(normalize_tokens(name)).encode("utf-8")).hexdigest()[:10]
+    return f"{uid}#{digest}"
+
+
+def _with_aliases(primary: dict, aliases) -> list:
+    """The primary record plus one record per distinct alias name."""
+    records, seen = [primary], {" ".join(normalize_tokens(primary["entity_name"]))}
+    for alias in aliases:
+        key = " ".join(normalize_tokens(alias))
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        records.append(_record(**{**primary, "source_uid": _alias_uid(primary["source_uid"], alias),
+                                  "entity_name": alias,
+                                  "remarks": f"Alias of {primary['entity_name']}"}))
+    return records
+
+
+# --- Source readers ---
+
+def read_ofac_csv(path, list_type="SDN"):
+    """OFAC sdn.csv / cons_prim.csv: ent_num, name, type, program, title, call sign, vessel ..., remarks."""
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        for row in csv.reader(f):
+            if len(row) < 4 or not row[0].strip().isdigit():
+                continue
+            row += [""] * (12 - len(row))
+            sdn_type = (_clean(row[2]) or "").lower()
+            yield _record(
+                source_uid=row[0].strip(),
+                entity_name=row[1],
+                entity_type=_OFAC_TYPES.get(sdn_type, "ENTITY"),
+                program=(_clean(row[3]) or "").replace("] [", "; ").strip("[] ") or "UNKNOWN",
+                list_type=list_type,
+                country=row[9] if sdn_type == "vessel" else None,     # vessel flag
+                remarks=row[11],
+            )
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(elem, *names):
+    for child in elem:
+        if _local(child.tag) in names and _clean(child.text):
+            return _clean(child.text)
+    return None
+
+
+def read_un_xml(path, list_type="UN"):
+    """INDIVIDUAL and ENTITY elements of the UN consolidated list, streamed."""
+    for _, elem in ElementTree.iterparse(path, events=("end",)):
+        tag = _local(elem.tag)
+        if tag not in ("INDIVIDUAL", "ENTITY"):
+            continue
+        uid = _child_text(elem, "DATAID")
+        if tag == "INDIVIDUAL":
+            name = " ".join(filter(None, (_child_text(elem, n) for n in
+                                          ("FIRST_NAME", "SECOND_NAME", "THIRD_NAME", "FOURTH_NAME"))))
+        else:
+            name = _child_text(elem, "FIRST_NAME")
+        aliases, country, address = [], None, None
+        for child in elem:
+            child_tag = _local(child.tag)
+            if child_tag.endswith("_ALIAS") and _child_text(child, "QUALITY") != "Low":
+                alias = _child_text(child, "ALIAS_NAME")
+                if alias:
+                    aliases.append(alias)
+            elif child_tag.endswith("_ADDRESS") and not country:
+                country = _child_text(child, "COUNTRY")
+                address = ", ".join(filter(None, (_child_text(child, n) for n in ("STREET", "CITY", "COUNTRY")))) or None
+            elif child_tag == "NATIONALITY" and not country:
+                country = _child_text(child, "VALUE")
+        if uid and name:
+            primary = _record(
+                source_uid=uid, entity_name=name,
+                entity_type="INDIVIDUAL" if tag == "INDIVIDUAL" else "ENTITY",
+                program=_child_text(elem, "UN_LIST_TYPE") or "UN", list_type=list_type,
+                country=country, entity_address=address,
+                tax_id=_child_text(elem, "REFERENCE_NUMBER"), remarks=_child_text(elem, "COMMENTS1"),
+            )
+            yield from _with_aliases(primary, aliases)
+        elem.clear()
+
+
+def read_eu_xml(path, list_type="EU"):
+    """sanctionEntity elements of the EU consolidated list (attributes carry the data)."""
+    for _, elem in ElementTree.iterparse(path, events=("end",)):
+        if _local(elem.tag) != "sanctionEntity":
+            continue
+        names, program, entity_type, country, address, remark = [], None, "ENTITY", None, None, None
+        for child in elem:
+            tag = _local(child.tag)
+            if tag == "nameAlias" and _clean(child.get("wholeName")):
+                names.append(child.get("wholeName"))
+            elif tag == "regulation" and not program:
+                program = child.get("programme")
+            elif tag == "subjectType":
+                entity_type = _EU_TYPES.get(child.get("code"), "ENTITY")
+            elif tag == "citizenship" and not country:
+                country = child.get("countryDescription")
+            elif tag == "address" and not address:
+                address = ", ".join(filter(None, (_clean(child.get(a)) for a in
+                                                  ("street", "city", "countryDescription")))) or None
+                country = country or child.get("countryDescription")
+            elif tag == "remark" and not remark:
+                remark = child.text
+        uid = elem.get("logicalId")
+        if uid and names:
+            primary = _record(
+                source_uid=uid, entity_name=names[0], entity_type=entity_type,
+                program=program or "EU", list_type=list_type, country=country,
+                entity_address=address, tax_id=elem.get("euReferenceNumber"), remarks=remark,
+            )
+            yield from _with_aliases(primary, names[1:])
+        elem.clear()
+
+
+def read_local_csv(path, list_type=None):
+    """Repo CSV export; rows without a source_uid get one derived from name, type and program."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if not _clean(row.get("entity_name")):
+                continue
+            uid = _clean(row.get("source_uid")) or hashlib.md5(
+                "|".join(_clean(row.get(c)) or "" for c in ("entity_name", "entity_type", "program"))
+                .encode("utf-8")).hexdigest()[:16]
+            yield _record(**{**{c: row.get(c) for c in COLUMNS}, "source_uid": uid,
+                             "entity_type": _clean(row.get("entity_type")) or "ENTITY",
+                             "program": _clean(row.get("program")) or "UNKNOWN",
+                             "list_type": list_type or _clean(row.get("list_type")) or "LOCAL"})
+
+
+_READERS = {"ofac": read_ofac_csv, "un": read_un_xml, "eu": read_eu_xml, "local": read_local_csv}
+
+
+def detect_format(path) -> str:
+    if path.lower().endswith(".xml"):
+        for _, elem in ElementTree.iterparse(path, events=("start",)):
+            return "un" if _local(elem.tag) == "CONSOLIDATED_LIST" else "eu"
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        header = f.readline()
+    return "local" if "entity_name" in header else "ofac"
+
+
+def read_records(path, fmt=None, list_type=None) -> dict:
+    """{source_uid: record} for a list file; a repeated id keeps its last record."""
+    fmt = fmt or detect_format(path)
+    reader = _READERS[fmt]
+    records = reader(path, list_type) if list_type else reader(path)
+    return {r["source_uid"]: r for r in records}
+
+
+def _file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _copy_buffer(records) -> io.StringIO:
+    """CSV for COPY ... (FORMAT csv): None is an unquoted empty field, i.e. NULL."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow([*(record[c] for c in COLUMNS), record_hash(record)])
+    buffer.seek(0)
+    return buffer
+
+
+# --- Load ---
+
+_STAGING_DDL = """
+    CREATE TEMP TABLE sanctions_staging (
+        source_uid TEXT NOT NULL, entity_name TEXT NOT NULL, entity_type TEXT, program TEXT,
+        list_type TEXT, country TEXT, entity_address TEXT, tax_id TEXT, remarks TEXT,
+        record_hash CHAR(32) NOT NULL
+    ) ON COMMIT DROP
+"""
+
+_DELTA_SQL = """
+    CREATE TEMP TABLE sanctions_delta ON COMMIT DROP AS
+    SELECT 'ADD'::text AS change_type, NULL::int AS id, s.source_uid, s.entity_name,
+           NULL::text AS previous_name, s.entity_type, s.program, s.list_type, s.country
+    FROM sanctions_staging s
+    LEFT JOIN client_onboarding.sanctions_list l ON l.source = %(source)s AND l.source_uid = s.source_uid
+    WHERE l.id IS NULL
+    UNION ALL
+    SELECT 'CHANGE', l.id, s.source_uid, s.entity_name,
+           l.entity_name, s.entity_type, s.program, s.list_type, s.country
+    FROM sanctions_staging s
+    JOIN client_onboarding.sanctions_list l ON l.source = %(source)s AND l.source_uid = s.source_uid
+    WHERE l.record_hash IS DISTINCT FROM s.record_hash
+    UNION ALL
+    SELECT 'REMOVE', l.id, l.source_uid, l.entity_name,
+           NULL, l.entity_type, l.program, l.list_type, l.country
+    FROM client_onboarding.sanctions_list l
+    WHERE l.source = %(source)s AND l.source_uid IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM sanctions_staging s WHERE s.source_uid = l.source_uid)
+"""
+
+_APPLY_SQL = (
+    """
+    INSERT INTO client_onboarding.sanctions_list_changes
+        (list_version, change_type, source, source_uid, entity_name, previous_name,
+         entity_type, program, list_type, country)
+    SELECT %(version)s, change_type, %(source)s, source_uid, entity_name, previous_name,
+           entity_type, program, list_type, country
+    FROM sanctions_delta
+    """,
+    """
+    DELETE FROM client_onboarding.sanctions_list l
+    USING sanctions_delta d
+    WHERE d.change_type = 'REMOVE' AND l.id = d.id
+    """,
+    """
+    UPDATE client_onboarding.sanctions_list l
+    SET entity_name = s.entity_name, entity_type = s.entity_type, program = s.program,
+        list_type = s.list_type, country = s.country, entity_address = s.entity_address,
+        tax_id = s.tax_id, remarks = s.remarks, record_hash = s.record_hash,
+        list_version = %(version)s, updated_at = CURRENT_TIMESTAMP
+    FROM sanctions_delta d
+    JOIN sanctions_staging s ON s.source_uid = d.source_uid
+    WHERE d.change_type = 'CHANGE' AND l.id = d.id
+    """,
+    """
+    INSERT INTO client_onboarding.sanctions_list
+        (source, source_uid, entity_name, entity_type, program, list_type, country,
+         entity_address, tax_id, remarks, record_hash, list_version)
+    SELECT %(source)s, s.source_uid, s.entity_name, s.entity_type, s.program, s.list_type, s.country,
+           s.entity_address, s.tax_id, s.remarks, s.record_hash, %(version)s
+    FROM sanctions_staging s
+    JOIN sanctions_delta d ON d.source_uid = s.source_uid AND d.change_type = 'ADD'
+    """,
+)
+
+
+def ingest_file(path, source=None, fmt=None, list_type=None, allow_mass_removal=False):
+    """
+    Loads a list file and publishes its delta as a new list_version.
+    Returns {"source", "list_version", "entries", "added", "changed", "removed",
+    "duration_ms", "published"} (list_version is the current one when nothing
+    changed), or None if the load failed or was refused.
+    """
+    start = time.time()
+    fmt = fmt or detect_format(path)
+    source = (source or DEFAULT_SOURCES[fmt]).upper()
+    file_sha = _file_sha256(path)
+    records = read_records(path, fmt, list_type)
+    parsed_ms = int((time.time() - start) * 1000)
+
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            # One publisher at a time: versions are global across sources
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('client_onboarding.sanctions_ingest'))")
+            cursor.execute("SELECT MAX(list_version) FROM client_onboarding.sanctions_list_versions")
+            current_version = cursor.fetchone()[0]
+
+            cursor.execute(_STAGING_DDL)
+            cursor.copy_expert(
+                f"COPY sanctions_staging ({', '.join(COLUMNS)}, record_hash) FROM STDIN WITH (FORMAT csv)",
+                _copy_buffer(records.values())
+            )
+            cursor.execute("ALTER TABLE sanctions_staging ADD PRIMARY KEY (source_uid)")
+            cursor.execute("ANALYZE sanctions_staging")     # temp tables are never auto-analyzed
+            cursor.execute(_DELTA_SQL, {"source": source})
+            cursor.execute("SELECT change_type, COUNT(*) FROM sanctions_delta GROUP BY change_type")
+            counts = dict(cursor.fetchall())
+            added, changed, removed = (counts.get(k, 0) for k in ("ADD", "CHANGE", "REMOVE"))
+            summary = {"source": source, "list_version": current_version, "entries": len(records),
+                       "added": added, "changed": changed, "removed": removed, "published": False}
+
+            existing = len(records) - added + removed
+            if existing and removed > SANCTIONS_MAX_REMOVAL_RATIO * existing and not allow_mass_removal:
+                conn.rollback()
+                logger.error(
+                    f"[SanctionsIngest] {source}: {path} would remove {removed} of {existing} entries; "
+                    f"refusing (SANCTIONS_MAX_REMOVAL_RATIO={SANCTIONS_MAX_REMOVAL_RATIO})"
+                )
+                return None
+            if not (added or changed or removed):
+                conn.rollback()
+                summary["duration_ms"] = int((time.time() - start) * 1000)
+                logger.info(f"[SanctionsIngest] {source}: no changes in {path} (list version {current_version})")
+                return summary
+
+            cursor.execute("""
+                INSERT INTO client_onboarding.sanctions_list_versions
+                    (source, file_name, file_sha256, entries, added, changed, removed)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING list_version
+            """, (source, os.path.basename(path), file_sha, len(records), added, changed, removed))
+            version = cursor.fetchone()[0]
+            for statement in _APPLY_SQL:
+                cursor.execute(statement, {"version": version, "source": source})
+            duration_ms = int((time.time() - start) * 1000)
+            cursor.execute(
+                "UPDATE client_onboarding.sanctions_list_versions SET duration_ms = %s WHERE list_version = %s",
+                (duration_ms, version)
+            )
+        conn.commit()
+        summary.update(list_version=version, duration_ms=duration_ms, published=True)
+        logger.info(
+            f"[SanctionsIngest] {source}: published list version {version} "
+            f"(+{added} ~{changed} -{removed} of {len(records)}) in {duration_ms}ms (parse {parsed_ms}ms)"
+        )
+        return summary
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"[SanctionsIngest] {source}: loading {path} failed: {e}", exc_info=True)
+        return None
+    finally:
+        release_connection(conn)
+
+
+# --- CLI ---
+
+def write_synthetic(path, count, revision=0, seed=11):
+    """
+    OFAC sdn.csv-style file of `count` synthetic entries. Revision N renames
+    about 0.5% of entries, drops 0.1% and appends 100 * N new ones, so two
+    revisions make a realistic delta.
+    """
+    rng = random.Random(seed)
+    first = ["Ivan", "Ali", "Kim", "Omar", "Viktor", "Hassan", "Sergei", "Yusuf", "Dmitri", "Farid"]
+    last = ["Petrov", "Rahman", "Jong", "Haddad", "Orlov", "Karimi", "Volkov", "Nasser", "Sokolov", "Aziz"]
+    words = ["Trading", "Shipping", "Petrochemical", "Logistics", "Metals", "Energy", "Defense", "Finance"]
+    programs = ["RUSSIA-EO14024", "IRAN", "SDGT", "DPRK3", "SYRIA", "CYBER2", "VENEZUELA-EO13850"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        for i in range(count + 100 * revision):
+            # Draw per entry before any skip so every revision sees the same base entries
+            individual, surname, given, word, program = (
+                rng.random() < 0.6, rng.choice(last), rng.choice(first), rng.choice(words), rng.choice(programs)
+            )
+            if i < count and revision and (i + revision) % 1000 == 1:
+                continue
+            if individual:
+                name, sdn_type = f"{surname.upper()}{i:x}, {given}", "individual"
+            else:
+                name, sdn_type = f"{surname} {word}{i:x} LLC", "-0-"
+            if i < count and revision and (i * 7919 + revision) % 200 == 0:
+                name += f" (rev {revision})"
+            writer.writerow([10000 + i, name, sdn_type, program,
+                             "-0-", "-0-", "-0-", "-0-", "-0-", "-0-", "-0-", "-0-"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load sanctions list files into sanctions_list")
+    sub = parser.add_subparsers(dest="command", required=True)
+    load = sub.add_parser("load", help="load a list file and publish its delta")
+    load.add_argument("path")
+    load.add_argument("--source", help="list source (default: OFAC / UN / EU / LOCAL by format)")
+    load.add_argument("--format", choices=sorted(_READERS), help="file format (default: detected)")
+    load.add_argument("--list-type", help="list_type for every row (default: SDN / UN / EU)")
+    load.add_argument("--allow-mass-removal", action="store_true",
+                      help="publish even if more than SANCTIONS_MAX_REMOVAL_RATIO of entries disappear")
+    load.add_argument("--rescreen", action="store_true",
+                      help="rescreen stored customers against the new version (rescreen.py)")
+    synth = sub.add_parser("synth", help="write a synthetic OFAC-style sdn.csv")
+    synth.add_argument("path")
+    synth.add_argument("--count", type=int, default=100000)
+    synth.add_argument("--revision", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "synth":
+        write_synthetic(args.path, args.count, args.revision)
+        return
+    summary = ingest_file(args.path, source=args.source, fmt=args.format, list_type=args.list_type,
+                          allow_mass_removal=args.allow_mass_removal)
+    if summary is None:
+        raise SystemExit(1)
+    print(summary)
+    if args.rescreen and summary["published"]:
+        from .rescreen import rescreen_portfolio
+        rescreen = rescreen_portfolio()
+        if rescreen is None:
+            raise SystemExit(1)
+        print(rescreen)
+
+
+if __name__ == "__main__":
+    main()
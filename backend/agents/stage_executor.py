@@ -0,0 +1,145 @@
+"""
+Stage Executor — runs the checks of one pipeline stage as a small DAG
+Each Check names the checks it depends on; every check whose dependencies
+are satisfied is submitted to a shared, bounded thread pool, so independent
+rule-based checks, context reads and model calls overlap and stage wall-clock
+approaches the longest dependency chain instead of the sum of all calls.
+
+A check that raises or exceeds its timeout resolves to its `default` value
+and the stage carries on. Threads cannot be killed, so a timed-out call keeps
+running in the background; its late result is discarded.
+
+Checks run in a copy of the submitting thread's context, so context variables
+set for the stage (e.g. the benchmark's per-stage attribution) reach them.
+"""
+
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from ..logger import logger_agents as logger
+
+# Worker threads shared by all stages running in this process
+STAGE_MAX_WORKERS = int(os.getenv("STAGE_MAX_WORKERS", "16"))
+
+# Fallback per-check timeout in seconds (individual checks may override)
+STAGE_CHECK_TIMEOUT = float(os.getenv("STAGE_CHECK_TIMEOUT_SECONDS", "120"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=STAGE_MAX_WORKERS, thread_name_prefix="stage-check")
+        return _pool
+
+
+class Check:
+    """
+    One node of a stage DAG.
+    fn receives a dict of the results produced so far (at least all of `deps`).
+    """
+
+    def __init__(self, name, fn, deps=(), timeout=None, default=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.default = default
+
+
+class StageExecutor:
+    def __init__(self, checks, label="stage", default_timeout=None):
+        self.checks = {c.name: c for c in checks}
+        self.label = label
+        self.default_timeout = STAGE_CHECK_TIMEOUT if default_timeout is None else default_timeout
+        self.timings = {}       # check name -> ms until resolved (from start of execution)
+        self.errors = {}        # check name -> "timeout" | exception text
+        self.exceptions = {}    # check name -> exception raised by the check
+
+        for check in checks:
+            missing = [d for d in check.deps if d not in self.checks]
+            if missing:
+                raise ValueError(f"Check '{check.name}' depends on unknown checks: {missing}")
+        self._assert_acyclic()
+
+    def _assert_acyclic(self):
+        state = {}
+
+        def visit(name):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Dependency cycle through check '{name}'")
+            state[name] = "visiting"
+            for dep in self.checks[name].deps:
+                visit(dep)
+            state[name] = "done"
+
+        for name in self.checks:
+            visit(name)
+
+    def _resolve_default(self, check, results, reason):
+        self.errors[check.name] = reason
+        results[check.name] = check.default() if callable(check.default) else check.default
+        logger.warning(f"[{self.label}] check '{check.name}' {reason}; using default")
+
+    def run(self, initial=None):
+        """Executes every check and returns {check name: result}, merged over `initial`."""
+        results = dict(initial or {})
+        pending = dict(self.checks)
+        running = {}            # future -> (check, started_at holder)
+        pool = _get_pool()
+        stage_start = time.monotonic()
+
+        def execute(check, started):
+            started.append(time.monotonic())
+            return check.fn(results)
+
+        while pending or running:
+            for name, check in list(pending.items()):
+                if all(d in results for d in check.deps):
+                    started = []
+                    context = contextvars.copy_context()
+                    running[pool.submit(context.run, execute, check, started)] = (check, started)
+                    del pending[name]
+
+            if not running:
+                break
+
+            # Wake up on the first completion or the nearest per-check deadline
+            now = time.monotonic()
+            deadlines = []
+            for check, started in running.values():
+                if started:
+                    deadlines.append(started[0] + (check.timeout or self.default_timeout))
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else None
+            done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                check, started = running.pop(future)
+                self.timings[check.name] = int((time.monotonic() - (started[0] if started else stage_start)) * 1000)
+                try:
+                    results[check.name] = future.result()
+                except Exception as e:
+                    self.exceptions[check.name] = e
+                    self._resolve_default(check, results, f"failed: {e}")
+
+            now = time.monotonic()
+            for future, (check, started) in list(running.items()):
+                if started and now - started[0] >= (check.timeout or self.default_timeout):
+                    running.pop(future)
+                    future.cancel()
+                    self.timings[check.name] = int((now - started[0]) * 1000)
+                    self._resolve_default(check, results, f"timed out after {check.timeout or self.default_timeout}s")
+
+        logger.info(
+            f"[{self.label}] {len(self.checks)} checks in {int((time.monotonic() - stage_start) * 1000)}ms "
+            f"(per check ms: {self.timings})"
+        )
+        return results
@@ -0,0 +1,103 @@
+"""
+Incremental JSON extraction for streamed agent completions
+Bedrock agents stream their answer as text chunks; the JSON result usually
+follows some prose. IncrementalJSONExtractor scans chunks as they arrive and
+reports each top-level field of the first JSON object as soon as its value is
+complete, plus each element of a top-level array (e.g. one KYC pillar) as soon
+as that element closes, long before the full completion is available.
+
+The final result is still parsed from the whole text by the caller; partial
+values are only for early display.
+"""
+
+import json
+
+
+class IncrementalJSONExtractor:
+    def __init__(self):
+        self.text = ""
+        self._pos = 0               # next character to scan
+        self._started = False       # seen the opening brace of the top-level object
+        self._done = False
+        self._stack = []            # open containers: "{" or "["
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None    # (start, end) of the last string closed at depth 1
+        self._key = None            # current top-level key
+        self._value_start = None
+        self._item_start = None     # start of the current element of a top-level array
+
+    def feed(self, chunk):
+        """Consumes a text chunk. Returns a list of ("field", key, value) / ("item", key, value)."""
+        self.text += chunk
+        events = []
+        text = self.text
+        while self._pos < len(text) and not self._done:
+            i = self._pos
+            c = text[i]
+            self._pos += 1
+
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._stack.append("{")
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1 and self._key is None:
+                        self._last_string = (self._string_start, i + 1)
+                continue
+
+            depth = len(self._stack)
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and depth == 1 and self._key is None and self._last_string:
+                self._key = self._parse(text[self._last_string[0]:self._last_string[1]])
+                self._value_start = i + 1
+            elif c in "{[":
+                self._stack.append(c)
+                if c == "[" and depth == 1:
+                    self._item_start = i + 1
+            elif c in "}]":
+                if depth == 2 and self._stack[-1] == "[" and c == "]":
+                    self._emit_item(text[self._item_start:i], events)
+                self._stack.pop()
+                if depth == 1:
+                    self._emit_field(text[self._value_start:i] if self._key is not None else "", events)
+                    self._done = True
+            elif c == ",":
+                if depth == 1:
+                    self._emit_field(text[self._value_start:i], events)
+                elif depth == 2 and self._stack[-1] == "[":
+                    self._emit_item(text[self._item_start:i], events)
+                    self._item_start = i + 1
+        return events
+
+    @staticmethod
+    def _parse(raw):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def _emit_field(self, raw, events):
+        if self._key is not None and raw.strip():
+            value = self._parse(raw)
+            if value is not None:
+                events.append(("field", self._key, value))
+        self._key = None
+        self._last_string = None
+
+    def _emit_item(self, raw, events):
+        if raw.strip() and self._key is not None:
+            value = self._parse(raw)
+            if value is not None:
+                events.append(("item", self._key, value))
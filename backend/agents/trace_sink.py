@@ -0,0 +1,78 @@
+"""
+Trace Sink — buffered, non-blocking writer for raw Bedrock agent traces
+The agent streaming loop only enqueues; one background thread appends batches
+to AGENT_TRACE_LOG and flushes every AGENT_TRACE_FLUSH_SECONDS. If the disk
+falls behind, traces are dropped (and counted) rather than stalling agents.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+from ..logger import logger_agents as logger
+
+AGENT_TRACE_ENABLED = os.getenv("AGENT_TRACE_ENABLED", "true").lower() == "true"
+AGENT_TRACE_LOG = os.getenv("AGENT_TRACE_LOG", "agent_trace.log")
+AGENT_TRACE_QUEUE_SIZE = int(os.getenv("AGENT_TRACE_QUEUE_SIZE", "10000"))
+AGENT_TRACE_FLUSH_SECONDS = float(os.getenv("AGENT_TRACE_FLUSH_SECONDS", "1"))
+
+
+class TraceSink:
+    def __init__(self, path=AGENT_TRACE_LOG, maxsize=AGENT_TRACE_QUEUE_SIZE):
+        self.path = path
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="agent-trace-sink", daemon=True)
+                self._thread.start()
+
+    def write(self, session_id, record):
+        """Enqueues one trace record; never blocks."""
+        if not AGENT_TRACE_ENABLED:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(f"{time.strftime('%Y-%m-%dT%H:%M:%S')} [{session_id}] {json.dumps(record, default=str)}\n")
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first=None):
+        lines = [first] if first is not None else []
+        while True:
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                return lines
+
+    def _append(self, lines):
+        if not lines:
+            return
+        try:
+            with open(self.path, "a") as f:
+                f.writelines(lines)
+        except OSError as e:
+            logger.warning(f"[TraceSink] write to {self.path} failed: {e}")
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=AGENT_TRACE_FLUSH_SECONDS)
+            except queue.Empty:
+                continue
+            self._append(self._drain(first))
+
+    def flush(self):
+        """Writes everything queued so far from the calling thread."""
+        self._append(self._drain())
+
+
+trace_sink = TraceSink()
+atexit.register(trace_sink.flush)
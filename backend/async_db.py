@@ -0,0 +1,850 @@
+"""
+Async data-access layer for the FastAPI endpoints.
+Mirrors the public functions of db.py on an asyncpg pool so request handlers
+never block the event loop on a database round-trip. db.py stays the driver
+for background tasks and agent stages, which run in worker threads.
+"""
+
+import base64
+import json
+import os
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+import asyncpg
+
+from .db import (
+    DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, DB_SSL_MODE, DB_INIT_COMMAND,
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, _generate_temp_password,
+    _TICKET_DETAIL_SQL, _TICKET_STATUS_SQL, TICKET_EVENTS_CHANNEL
+)
+from .logger import logger_db as logger
+from .password_hasher import hash_password
+
+# Driver tuning (pool sizing is shared with db.py)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "30"))
+
+_pool = None
+
+
+async def _init_connection(conn):
+    """Per-connection session setup: runs once per physical connection, not per query."""
+    await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+    await conn.set_type_codec("json", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+    await conn.execute(DB_INIT_COMMAND)
+    await conn.execute("SET search_path TO client_onboarding, public;")
+
+
+async def init_pool():
+    """Creates the asyncpg pool. Called from the FastAPI lifespan on startup."""
+    global _pool
+    if _pool is not None:
+        return _pool
+    try:
+        _pool = await asyncpg.create_pool(
+            host=DB_HOST,
+            port=int(DB_PORT),
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            ssl=DB_SSL_MODE,
+            min_size=DB_POOL_MIN_SIZE,
+            max_size=DB_POOL_MAX_SIZE,
+            statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+            command_timeout=DB_COMMAND_TIMEOUT,
+            init=_init_connection
+        )
+        logger.info(f"Async connection pool created (min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE})")
+    except Exception as e:
+        logger.error(f"Error while creating async PostgreSQL pool: {e}", exc_info=True)
+        _pool = None
+    return _pool
+
+
+async def close_pool():
+    """Closes the asyncpg pool. Called from the FastAPI lifespan on shutdown."""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def _as_date(value):
+    """asyncpg needs date objects where psycopg2 accepted ISO strings."""
+    if not value or isinstance(value, date):
+        return value or None
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _as_decimal(value):
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return None
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "y", "1", "on")
+    return bool(value)
+
+
+async def generate_tracking_id(conn):
+    """Generates a sequential tracking ID from the database sequence."""
+    seq_val = await conn.fetchval("SELECT nextval('client_onboarding.onboarding_tracking_seq')")
+    date_str = datetime.now().strftime("%Y%m")
+    return f"KTX-{date_str}-{seq_val:05d}"
+
+
+async def get_next_tracking_id():
+    """Public helper to pre-generate a tracking ID before full database insertion."""
+    if not _pool:
+        return None
+    async with _pool.acquire() as conn:
+        return await generate_tracking_id(conn)
+
+
+_ONBOARDING_COLUMNS = (
+    "company_name", "company_address", "city", "state", "country", "zip_code",
+    "phone_number", "email", "lei_identifier", "entity_type",
+    "registration_number", "incorporation_date", "ownership_type",
+    "regulatory_status", "regulatory_authority",
+    "business_need",
+    "bod_list_s3_uri", "financials_s3_uri", "ownership_s3_uri",
+    "incorporation_doc_s3_uri",
+    "bank_statement_s3_uri", "ein_certificate_s3_uri", "ubo_id_s3_uri",
+    "business_activity", "source_of_funds", "source_of_wealth",
+    "expected_volume", "countries_operation", "tax_residency_country",
+    "pep_declaration", "adverse_media_consent", "website",
+    "correspondent_bank", "aml_program_description", "trading_address",
+    "aml_questions", "tracking_id",
+    "dba_name", "ein_number", "routing_number", "account_number", "mcc_code", "bank_name"
+)
+
+
+async def save_onboarding_details(data, ip=None, workstation=None, provided_tracking_id=None):
+    """
+    Inserts data into onboarding_details, creates a participant user account
+    with a temporary password, inserts UBOs and Directors, and writes the initial audit log.
+    Accepts an optional provided_tracking_id to skip auto-generation.
+    """
+    if not _pool:
+        return False, "Database connection failed", None, None
+
+    try:
+        # Generate temporary password and hash it (process pool, before holding a connection)
+        temp_password = _generate_temp_password()
+        password_hash = await hash_password(temp_password)
+
+        async with _pool.acquire() as conn:
+            async with conn.transaction():
+                tracking_id = provided_tracking_id or await generate_tracking_id(conn)
+
+                # Same normalisation rules as db.save_onboarding_details
+                raw_countries = data.get('countries_operation') or ''
+                countries_list = [c.strip() for c in raw_countries.split(',') if c.strip()] if isinstance(raw_countries, str) else (raw_countries or [])
+                business_need_val = data.get('product') or data.get('business_need')
+                raw_aml = data.get('aml_questions', '{}')
+                aml_dict = json.loads(raw_aml) if isinstance(raw_aml, str) else (raw_aml or {})
+                aml_dict.pop('pep_declaration', None)   # enforce single-source-of-truth
+                aml_dict['product_interest'] = business_need_val  # convenience copy
+
+                # 1. Insert onboarding details
+                values = (
+                    data['company_name'], data['company_address'], data['city'], data['state'],
+                    data['country'], data['zip_code'],
+                    data['phone_number'], data['email'], data['lei_identifier'], data['entity_type'],
+                    data.get('registration_number'), _as_date(data.get('incorporation_date')), data.get('ownership_type'),
+                    data.get('regulatory_status'), data.get('regulatory_authority'),
+                    business_need_val,
+                    data.get('bod_list_s3_uri'),
+                    data.get('financials_s3_uri'),
+                    data.get('ownership_s3_uri'),
+                    data.get('incorporation_doc_s3_uri'),
+                    data.get('bank_statement_s3_uri'),
+                    data.get('ein_certificate_s3_uri'),
+                    data.get('ubo_id_s3_uri'),
+                    data['business_activity'], data['source_of_funds'], data.get('source_of_wealth'),
+                    data['expected_volume'], countries_list, data.get('tax_residency_country'),
+                    _as_bool(data.get('pep_declaration', False)), _as_bool(data.get('adverse_media_consent', False)), data.get('website'),
+                    data.get('correspondent_bank'), data.get('aml_program_description'), data.get('trading_address'),
+                    aml_dict, tracking_id,
+                    data.get('dba_name'), data.get('ein_number'), data.get('routing_number'),
+                    data.get('account_number'), data.get('mcc_code'), data.get('bank_name')
+                )
+                placeholders = ", ".join(f"${i}" for i in range(1, len(_ONBOARDING_COLUMNS) + 1))
+                onboarding_id = await conn.fetchval(f"""
+                    INSERT INTO client_onboarding.onboarding_details (
+                        {", ".join(_ONBOARDING_COLUMNS)}, status, submitted_at
+                    ) VALUES (
+                        {placeholders}, 'PENDING_REVIEW', CURRENT_TIMESTAMP
+                    ) RETURNING id
+                """, *values)
+
+                # 1b. Content hashes of the uploaded documents (see document_store.py)
+                documents = data.get('documents') or {}
+                if documents:
+                    await conn.executemany(
+                        """INSERT INTO client_onboarding.document_blobs (sha256, s3_uri, size_bytes)
+                           VALUES ($1, $2, $3) ON CONFLICT (sha256) DO NOTHING""",
+                        [(d['sha256'], d['uri'], d['size']) for d in documents.values()]
+                    )
+                    await conn.executemany(
+                        """INSERT INTO client_onboarding.onboarding_documents (onboarding_id, doc_field, sha256)
+                           VALUES ($1, $2, $3)""",
+                        [(onboarding_id, field, d['sha256']) for field, d in documents.items()]
+                    )
+
+                # 2. Insert directors
+                directors = data.get('directors', [])
+                if directors:
+                    await conn.executemany(
+                        """INSERT INTO client_onboarding.onboarding_directors
+                           (onboarding_id, full_name, role, nationality, country_of_residence)
+                           VALUES ($1, $2, $3, $4, $5)""",
+                        [(onboarding_id, d.get('full_name'), d.get('role'),
+                          d.get('nationality'), d.get('country_of_residence')) for d in directors]
+                    )
+
+                # 3. Insert UBOs
+                ubos = data.get('ubos', [])
+                if ubos:
+                    await conn.executemany(
+                        """INSERT INTO client_onboarding.onboarding_ubos
+                           (onboarding_id, full_name, stake_percent, nationality,
+                            country_of_residence, date_of_birth, is_pep, tax_id)
+                           VALUES ($1, $2, $3, $4, $5, $6, $7, $8)""",
+                        [(onboarding_id, u.get('full_name'), _as_decimal(u.get('stake_percent')),
+                          u.get('nationality'), u.get('country_of_residence'),
+                          _as_date(u.get('date_of_birth')), _as_bool(u.get('is_pep', False)), u.get('tax_id'))
+                         for u in ubos]
+                    )
+
+                # 4. Create participant user account
+                user_id = await conn.fetchval(
+                    "INSERT INTO client_onboarding.users (email, password_hash, full_name, must_change_password) VALUES ($1, $2, $3, TRUE) RETURNING id",
+                    data['email'], password_hash, data['company_name']
+                )
+
+                # 5. Assign PARTICIPANT role
+                role_id = await conn.fetchval("SELECT id FROM client_onboarding.roles WHERE name = 'PARTICIPANT'")
+                if role_id:
+                    await conn.execute("INSERT INTO client_onboarding.user_roles (user_id, role_id) VALUES ($1, $2)", user_id, role_id)
+
+                # 6. Link user to onboarding case
+                await conn.execute("UPDATE client_onboarding.onboarding_details SET user_id = $1 WHERE id = $2", user_id, onboarding_id)
+
+                # 7. Initial audit log
+                await conn.execute("""
+                    INSERT INTO client_onboarding.onboarding_audit_log (
+                        onboarding_id, old_status, new_status, ip_address, workstation_info, remarks
+                    ) VALUES ($1, $2, $3, $4, $5, $6)
+                """, onboarding_id, None, 'PENDING_REVIEW', ip, workstation, 'Initial Application Submitted')
+
+            return True, onboarding_id, tracking_id, temp_password
+    except Exception as e:
+        logger.error(f"Failed to save onboarding details: {e}", exc_info=True)
+        return False, str(e), None, None
+
+
+# Ticket listing: page size bounds and how long the status/risk aggregate is reused
+TICKET_PAGE_SIZE = int(os.getenv("TICKET_PAGE_SIZE", "50"))
+TICKET_PAGE_MAX = int(os.getenv("TICKET_PAGE_MAX", "200"))
+TICKET_COUNTS_CACHE_SECONDS = float(os.getenv("TICKET_COUNTS_CACHE_SECONDS", "30"))
+
+_ticket_counts = {"at": 0.0, "value": None}
+
+
+def encode_ticket_cursor(submitted_at, ticket_id) -> str:
+    """Opaque keyset cursor for (submitted_at, id)."""
+    raw = json.dumps([_iso(submitted_at), str(ticket_id)])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_ticket_cursor(cursor: str):
+    """Inverse of encode_ticket_cursor. Raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        submitted_at, ticket_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(submitted_at), str(uuid.UUID(ticket_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+async def get_ticket_counts(force_refresh: bool = False) -> dict:
+    """
+    Status / risk-level totals for the dashboard header. One GROUP BY over
+    onboarding_details, cached for TICKET_COUNTS_CACHE_SECONDS.
+    """
+    cached = _ticket_counts["value"]
+    if cached is not None and not force_refresh and time.monotonic() - _ticket_counts["at"] < TICKET_COUNTS_CACHE_SECONDS:
+        return cached
+    if not _pool:
+        return cached or {"total": 0, "by_status": {}, "by_risk": {}}
+    try:
+        async with _pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT status, ai_risk_level, COUNT(*) AS n
+                FROM client_onboarding.onboarding_details
+                GROUP BY status, ai_risk_level
+            """)
+        counts = {"total": 0, "by_status": {}, "by_risk": {}}
+        for r in rows:
+            counts["total"] += r["n"]
+            if r["status"]:
+                counts["by_status"][r["status"]] = counts["by_status"].get(r["status"], 0) + r["n"]
+            if r["ai_risk_level"]:
+                counts["by_risk"][r["ai_risk_level"]] = counts["by_risk"].get(r["ai_risk_level"], 0) + r["n"]
+        _ticket_counts.update(at=time.monotonic(), value=counts)
+        return counts
+    except Exception as e:
+        logger.error(f"Error counting tickets: {e}", exc_info=True)
+        return cached or {"total": 0, "by_status": {}, "by_risk": {}}
+
+
+async def get_tickets_page(status=None, country=None, risk_level=None, entity_type=None,
+                           submitted_from=None, submitted_to=None, search=None,
+                           cursor=None, limit=TICKET_PAGE_SIZE) -> dict:
+    """
+    One page of onboarding requests, newest first, keyset-paginated on (submitted_at, id).
+    - cursor: (submitted_at, id) of the last row of the previous page (see decode_ticket_cursor)
+    - search: case-insensitive substring of company_name or tracking_id (trigram-indexed)
+    - submitted_from / submitted_to: inclusive dates
+    total is exact (from the cached aggregate) when filtering by status only,
+    otherwise the planner's row estimate; total_is_estimate says which.
+    """
+    page = {"tickets": [], "next_cursor": None, "total": 0, "total_is_estimate": False,
+            "counts": await get_ticket_counts()}
+    if not _pool:
+        return page
+    limit = max(1, min(int(limit or TICKET_PAGE_SIZE), TICKET_PAGE_MAX))
+
+    conditions, params = [], []
+
+    def bind(value):
+        params.append(value)
+        return f"${len(params)}"
+
+    if status:
+        conditions.append(f"status = {bind(status)}")
+    if country:
+        conditions.append(f"country = {bind(country)}")
+    if risk_level:
+        conditions.append(f"ai_risk_level = {bind(risk_level)}")
+    if entity_type:
+        conditions.append(f"entity_type = {bind(entity_type)}")
+    if submitted_from:
+        conditions.append(f"submitted_at >= {bind(submitted_from)}::date")
+    if submitted_to:
+        conditions.append(f"submitted_at < {bind(submitted_to)}::date + 1")
+    if search:
+        escaped = search.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        p = bind(f"%{escaped}%")
+        conditions.append(f"(company_name ILIKE {p} OR tracking_id ILIKE {p})")
+    filter_sql = " AND ".join(conditions) or "TRUE"
+    filter_params = list(params)
+
+    keyset_sql = ""
+    if cursor:
+        after_ts, after_id = cursor
+        keyset_sql = f" AND (submitted_at, id) < ({bind(after_ts)}::timestamptz, {bind(after_id)}::uuid)"
+
+    try:
+        async with _pool.acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT id, company_name, tracking_id, status, submitted_at,
+                       email, country, entity_type, ai_risk_level
+                FROM client_onboarding.onboarding_details
+                WHERE {filter_sql}{keyset_sql}
+                ORDER BY submitted_at DESC, id DESC
+                LIMIT {bind(limit + 1)}
+            """, *params)
+
+            only_status = not any((country, risk_level, entity_type, submitted_from, submitted_to, search))
+            if only_status:
+                counts = page["counts"]
+                page["total"] = counts["by_status"].get(status, 0) if status else counts["total"]
+            else:
+                plan = await conn.fetchval(
+                    f"EXPLAIN (FORMAT JSON) SELECT 1 FROM client_onboarding.onboarding_details WHERE {filter_sql}",
+                    *filter_params
+                )
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                page["total"] = int(plan[0]["Plan"]["Plan Rows"])
+                page["total_is_estimate"] = True
+
+        tickets = [dict(r) for r in rows[:limit]]
+        if len(rows) > limit:
+            last = tickets[-1]
+            page["next_cursor"] = encode_ticket_cursor(last["submitted_at"], last["id"])
+        page["tickets"] = tickets
+        return page
+    except Exception as e:
+        logger.error(f"Error fetching tickets: {e}", exc_info=True)
+        return page
+
+
+async def get_ticket_by_id(onboarding_id):
+    """
+    Fetches full details of a single ticket including audit history, UBOs and directors.
+    One round-trip: related rows are aggregated as JSON and document blobs are skipped.
+    """
+    if not _pool:
+        return None
+    try:
+        async with _pool.acquire() as conn:
+            row = await conn.fetchrow(_TICKET_DETAIL_SQL.format(param="$1"), onboarding_id)
+            return dict(row) if row else None
+    except Exception as e:
+        logger.error(f"Error fetching ticket detail: {e}", exc_info=True)
+        return None
+
+
+async def get_ticket_status(onboarding_id):
+    """Lightweight status lookup for pollers: id, tracking_id, status, ai_risk_level, email, updated_at."""
+    if not _pool:
+        return None
+    try:
+        async with _pool.acquire() as conn:
+            row = await conn.fetchrow(_TICKET_STATUS_SQL.format(param="$1"), onboarding_id)
+            return dict(row) if row else None
+    except Exception as e:
+        logger.error(f"Error fetching ticket status: {e}", exc_info=True)
+        return None
+
+
+async def get_user_by_email(email):
+    """Fetches user details and their roles for authentication."""
+    if not _pool:
+        return None
+    try:
+        async with _pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT u.id, u.email, u.password_hash, u.full_name, u.is_active, u.must_change_password,
+                       COALESCE(array_agg(r.name) FILTER (WHERE r.name IS NOT NULL), '{}') AS roles
+                FROM client_onboarding.users u
+                LEFT JOIN client_onboarding.user_roles ur ON ur.user_id = u.id
+                LEFT JOIN client_onboarding.roles r ON r.id = ur.role_id
+                WHERE u.email = $1
+                GROUP BY u.id
+            """, email)
+            if not row:
+                return None
+            user = dict(row)
+            user['roles'] = list(user['roles'])
+            return user
+    except Exception as e:
+        logger.error(f"Error fetching user {email}: {e}", exc_info=True)
+        return None
+
+
+async def update_user_password(email, password_hash):
+    """Stores a new password hash and clears the must_change_password flag."""
+    if not _pool:
+        return False, "Database connection failed"
+    try:
+        async with _pool.acquire() as conn:
+            await conn.execute(
+                "UPDATE client_onboarding.users SET password_hash = $1, must_change_password = FALSE, updated_at = CURRENT_TIMESTAMP WHERE email = $2",
+                password_hash, email
+            )
+        return True, "Password updated successfully"
+    except Exception as e:
+        logger.error(f"Password update failed for {email}: {e}", exc_info=True)
+        return False, str(e)
+
+
+async def update_onboarding_status(onboarding_id, new_status, action_by=None, ip=None, workstation=None, remarks=None):
+    """Updates ticket status and logs the audit entry."""
+    if not _pool:
+        return False, "Database connection failed"
+    try:
+        async with _pool.acquire() as conn:
+            async with conn.transaction():
+                old_status = await conn.fetchval(
+                    "SELECT status FROM client_onboarding.onboarding_details WHERE id = $1 FOR UPDATE", onboarding_id
+                )
+                await conn.execute(
+                    "UPDATE client_onboarding.onboarding_details SET status = $1, updated_at = CURRENT_TIMESTAMP WHERE id = $2",
+                    new_status, onboarding_id
+                )
+                await conn.execute("""
+                    INSERT INTO client_onboarding.onboarding_audit_log (
+                        onboarding_id, old_status, new_status, action_by, ip_address, workstation_info, remarks
+                    ) VALUES ($1, $2, $3, $4, $5, $6, $7)
+                """, onboarding_id, old_status, new_status, action_by, ip, workstation, remarks)
+                await notify_ticket_event(conn, {
+                    "type": "status", "onboarding_id": str(onboarding_id),
+                    "old_status": old_status, "new_status": new_status
+                })
+        return True, "Status updated successfully"
+    except Exception as e:
+        return False, str(e)
+
+
+_DOC_CONTENT_COLUMNS = {
+    "bod": "bod_list_content",
+    "financials": "financials_content",
+    "ownership": "ownership_content",
+    "incorporation": "incorporation_doc_content"
+}
+
+
+_DOC_URI_COLUMNS = {
+    "bod": "bod_list_s3_uri",
+    "financials": "financials_s3_uri",
+    "ownership": "ownership_s3_uri",
+    "incorporation": "incorporation_doc_s3_uri",
+    "bank": "bank_statement_s3_uri",
+    "ein": "ein_certificate_s3_uri",
+    "ubo_id": "ubo_id_s3_uri"
+}
+
+
+async def get_document_uri(onboarding_id, doc_type):
+    """
+    Resolves only the S3 URI column for one document.
+    Returns {"s3_uri": uri or None}, or None when the ticket does not exist.
+    """
+    if not _pool:
+        return None
+    col_name = _DOC_URI_COLUMNS.get(doc_type, "NULL")
+    try:
+        async with _pool.acquire() as conn:
+            row = await conn.fetchrow(
+                f"SELECT {col_name} AS s3_uri FROM client_onboarding.onboarding_details WHERE id = $1", onboarding_id
+            )
+            return dict(row) if row else None
+    except Exception as e:
+        logger.error(f"Error resolving document URI: {e}", exc_info=True)
+        return None
+
+
+async def get_document_content(onboarding_id, doc_type):
+    """Retrieves binary content of a specific document."""
+    col_name = _DOC_CONTENT_COLUMNS.get(doc_type)
+    if not _pool or not col_name:
+        return None
+    try:
+        async with _pool.acquire() as conn:
+            return await conn.fetchval(
+                f"SELECT {col_name} FROM client_onboarding.onboarding_details WHERE id = $1", onboarding_id
+            )
+    except Exception as e:
+        logger.error(f"Error fetching document: {e}", exc_info=True)
+        return None
+
+
+async def get_audit_logs(onboarding_id):
+    """Returns all audit log entries for an onboarding ticket."""
+    if not _pool:
+        return []
+    try:
+        async with _pool.acquire() as conn:
+            return [dict(r) for r in await conn.fetch("""
+                SELECT id, old_status, new_status, action_by, action_timestamp,
+                       ip_address, workstation_info, remarks
+                FROM client_onboarding.onboarding_audit_log
+                WHERE onboarding_id = $1
+                ORDER BY action_timestamp DESC
+            """, onboarding_id)]
+    except Exception as e:
+        logger.error(f"Error fetching audit logs: {e}", exc_info=True)
+        return []
+
+
+async def add_audit_log(onboarding_id, old_status, new_status, remarks=None, action_by=None, ip=None, workstation=None):
+    """Writes a single audit entry."""
+    if not _pool:
+        return False
+    try:
+        async with _pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO client_onboarding.onboarding_audit_log
+                    (onboarding_id, old_status, new_status, action_by, ip_address, workstation_info, remarks)
+                VALUES ($1, $2, $3, $4, $5, $6, $7)
+            """, onboarding_id, old_status, new_status, action_by, ip, workstation, remarks)
+        return True
+    except Exception as e:
+        logger.error(f"Audit log write failed: {e}", exc_info=True)
+        return False
+
+
+async def notify_ticket_event(conn, event: dict):
+    """Async twin of db.notify_ticket_event: NOTIFY delivered when the transaction commits."""
+    await conn.execute("SELECT pg_notify($1, $2)", TICKET_EVENTS_CHANNEL, json.dumps(event))
+
+
+async def insert_agent_log(log_data: dict) -> bool:
+    """Inserts one row into ai_agent_logs."""
+    if not _pool:
+        return False
+    try:
+        async with _pool.acquire() as conn, conn.transaction():
+            log_id = await conn.fetchval("""
+                INSERT INTO client_onboarding.ai_agent_logs (
+                    run_id, onboarding_id, agent_name, stage, check_name,
+                    input_context, output, flags, risk_level, recommendation,
+                    ai_summary, model_used, duration_ms
+                ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
+                RETURNING id
+            """,
+                log_data.get("run_id"),
+                log_data.get("onboarding_id"),
+                log_data.get("agent_name"),
+                log_data.get("stage"),
+                log_data.get("check_name"),
+                log_data.get("input_context", {}),
+                log_data.get("output", {}),
+                log_data.get("flags", []),
+                log_data.get("risk_level"),
+                log_data.get("recommendation"),
+                log_data.get("ai_summary"),
+                log_data.get("model_used", "rule-based"),
+                log_data.get("duration_ms", 0)
+            )
+            await notify_ticket_event(conn, {
+                "type": "agent_log", "onboarding_id": str(log_data.get("onboarding_id")), "id": str(log_id)
+            })
+        return True
+    except Exception as e:
+        logger.error(f"insert_agent_log failed: {e}", exc_info=True)
+        return False
+
+
+# Projectable ai_agent_logs fields for get_agent_logs(fields=...).
+# has_evidence lets list views show the evidence button without shipping output JSON.
+AGENT_LOG_FIELDS = {
+    "id": "l.id",
+    "run_id": "l.run_id",
+    "agent_name": "l.agent_name",
+    "stage": "l.stage",
+    "check_name": "l.check_name",
+    "flags": "l.flags",
+    "risk_level": "l.risk_level",
+    "recommendation": "l.recommendation",
+    "ai_summary": "l.ai_summary",
+    "model_used": "l.model_used",
+    "duration_ms": "l.duration_ms",
+    "created_at": "l.created_at",
+    "input_context": "l.input_context",
+    "output": "l.output",
+    "has_evidence": """(l.ai_summary IS NOT NULL
+                         OR l.output ?| ARRAY['decision_logic', 'rationale', 'audit_trail']
+                         OR COALESCE(jsonb_typeof(l.output -> 'hits') = 'array'
+                                     AND l.output -> 'hits' <> '[]'::jsonb, FALSE))""",
+}
+
+# Named projections accepted in place of an explicit field list
+AGENT_LOG_FIELD_SETS = {
+    "summary": ("id", "run_id", "agent_name", "stage", "check_name", "flags", "risk_level",
+                "recommendation", "model_used", "duration_ms", "created_at", "has_evidence"),
+    "full": ("id", "run_id", "agent_name", "stage", "check_name", "flags", "risk_level",
+             "recommendation", "ai_summary", "model_used", "duration_ms", "created_at",
+             "input_context", "output"),
+}
+
+
+def _agent_log_row(record) -> dict:
+    row = dict(record)
+    if "id" in row:
+        row["id"] = str(row["id"])
+    if "run_id" in row and row["run_id"] is not None:
+        row["run_id"] = str(row["run_id"])
+    if "flags" in row:
+        row["flags"] = list(row["flags"]) if row["flags"] else []
+    if "created_at" in row:
+        row["created_at"] = _iso(row["created_at"])
+    return row
+
+
+async def get_agent_logs(onboarding_id: str, since_id: str = None, since_ts=None,
+                         limit: int = None, stage: int = None, fields=None) -> list:
+    """
+    Returns ai_agent_logs rows for a given onboarding_id, ordered by (created_at, id) ASC.
+    - since_id / since_ts: only rows after that log entry / timestamp (resumption cursors)
+    - stage: restrict to one pipeline stage
+    - fields: iterable of AGENT_LOG_FIELDS keys (id and created_at are always included);
+      defaults to the full row
+    """
+    if not _pool:
+        return []
+    fields = fields or AGENT_LOG_FIELD_SETS["full"]
+    wanted = dict.fromkeys(("id", "created_at", *fields))
+    select_list = ", ".join(f"{AGENT_LOG_FIELDS[f]} AS {f}" for f in wanted if f in AGENT_LOG_FIELDS)
+    try:
+        async with _pool.acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT {select_list}
+                FROM client_onboarding.ai_agent_logs l
+                LEFT JOIN client_onboarding.ai_agent_logs c ON c.id = $2::uuid
+                WHERE l.onboarding_id = $1
+                  AND ($2::uuid IS NULL OR c.id IS NULL OR (l.created_at, l.id) > (c.created_at, c.id))
+                  AND ($3::timestamptz IS NULL OR l.created_at > $3::timestamptz)
+                  AND ($4::int IS NULL OR l.stage = $4::int)
+                ORDER BY l.created_at ASC, l.id ASC
+                LIMIT $5::int
+            """, onboarding_id, since_id, since_ts, stage, limit)
+        return [_agent_log_row(r) for r in rows]
+    except Exception as e:
+        logger.error(f"get_agent_logs failed for ticket {onboarding_id}: {e}", exc_info=True)
+        return []
+
+
+async def get_agent_log(onboarding_id: str, log_id: str) -> dict | None:
+    """Full payload (input_context, output, ai_summary) of one agent check, for on-demand evidence views."""
+    if not _pool:
+        return None
+    select_list = ", ".join(f"{AGENT_LOG_FIELDS[f]} AS {f}" for f in AGENT_LOG_FIELD_SETS["full"])
+    try:
+        async with _pool.acquire() as conn:
+            row = await conn.fetchrow(f"""
+                SELECT {select_list}
+                FROM client_onboarding.ai_agent_logs l
+                WHERE l.id = $1::uuid AND l.onboarding_id = $2
+            """, log_id, onboarding_id)
+        return _agent_log_row(row) if row else None
+    except Exception as e:
+        logger.error(f"get_agent_log failed for log {log_id}: {e}", exc_info=True)
+        return None
+
+
+async def enqueue_agent_job(job_type: str, onboarding_id: str, payload: dict = None, max_attempts: int = 3):
+    """
+    Queues an agent stage for backend/worker.py. Idempotent per (onboarding_id, job_type):
+    if that stage is already QUEUED or RUNNING, the existing job id is returned.
+    Returns (job_id, created) or (None, False) on failure.
+    """
+    if not _pool:
+        return None, False
+    try:
+        async with _pool.acquire() as conn:
+            job_id = await conn.fetchval("""
+                INSERT INTO client_onboarding.agent_jobs (job_type, onboarding_id, payload, max_attempts)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (onboarding_id, job_type) WHERE status IN ('QUEUED', 'RUNNING') DO NOTHING
+                RETURNING id
+            """, job_type, onboarding_id, payload or {}, max_attempts)
+            if job_id is not None:
+                return job_id, True
+            job_id = await conn.fetchval("""
+                SELECT id FROM client_onboarding.agent_jobs
+                WHERE onboarding_id = $1 AND job_type = $2 AND status IN ('QUEUED', 'RUNNING')
+            """, onboarding_id, job_type)
+            return job_id, False
+    except Exception as e:
+        logger.error(f"enqueue_agent_job failed for {job_type}/{onboarding_id}: {e}", exc_info=True)
+        return None, False
+
+
+async def enqueue_emails(messages: list, max_attempts: int = 5) -> bool:
+    """
+    Puts rendered messages (see email_utils) on client_onboarding.email_outbox
+    in one statement; backend/mailer.py delivers them in batches.
+    """
+    messages = [m for m in messages if m and m.get("recipient")]
+    if not messages:
+        return True
+    if not _pool:
+        return False
+    try:
+        async with _pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO client_onboarding.email_outbox (template, recipient, subject, html_body, max_attempts)
+                SELECT t, r, s, h, $5
+                FROM unnest($1::text[], $2::text[], $3::text[], $4::text[]) AS m(t, r, s, h)
+            """,
+                [m["template"] for m in messages], [m["recipient"] for m in messages],
+                [m["subject"] for m in messages], [m["html"] for m in messages], max_attempts)
+        return True
+    except Exception as e:
+        logger.error(f"enqueue_emails failed for {len(messages)} message(s): {e}", exc_info=True)
+        return False
+
+
+async def get_job_queue_stats() -> list:
+    """Per stage type: queue depth, running/dead counts, oldest queued age and last-hour latencies."""
+    if not _pool:
+        return []
+    try:
+        async with _pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT job_type,
+                       COUNT(*) FILTER (WHERE status = 'QUEUED') AS queued,
+                       COUNT(*) FILTER (WHERE status = 'QUEUED' AND attempts > 0) AS retrying,
+                       COUNT(*) FILTER (WHERE status = 'RUNNING') AS running,
+                       COUNT(*) FILTER (WHERE status = 'DEAD') AS dead,
+                       EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - MIN(created_at) FILTER (WHERE status = 'QUEUED'))::float AS oldest_queued_s,
+                       AVG(EXTRACT(EPOCH FROM started_at - created_at))
+                           FILTER (WHERE started_at > CURRENT_TIMESTAMP - INTERVAL '1 hour')::float AS avg_wait_s,
+                       AVG(EXTRACT(EPOCH FROM finished_at - started_at))
+                           FILTER (WHERE status = 'SUCCEEDED' AND finished_at > CURRENT_TIMESTAMP - INTERVAL '1 hour')::float AS avg_run_s
+                FROM client_onboarding.agent_jobs
+                WHERE status IN ('QUEUED', 'RUNNING', 'DEAD')
+                   OR finished_at > CURRENT_TIMESTAMP - INTERVAL '1 hour'
+                   OR started_at > CURRENT_TIMESTAMP - INTERVAL '1 hour'
+                GROUP BY job_type
+                ORDER BY job_type
+            """)
+        return [dict(r) for r in rows]
+    except Exception as e:
+        logger.error(f"get_job_queue_stats failed: {e}", exc_info=True)
+        return []
+
+
+async def get_llm_cache_stats() -> list:
+    """Per stage and call kind: cached entries, size, hits and model milliseconds saved."""
+    if not _pool:
+        return []
+    try:
+        async with _pool.acquire() as conn:
+            rows = await conn.fetch("""
+                SELECT COALESCE(stage, 'unknown') AS stage, kind,
+                       COUNT(*) AS entries,
+                       COUNT(*) FILTER (WHERE expires_at <= CURRENT_TIMESTAMP) AS expired,
+                       SUM(size_bytes)::bigint AS size_bytes,
+                       SUM(hit_count)::bigint AS hits,
+                       SUM(saved_ms)::bigint AS saved_ms
+                FROM client_onboarding.llm_response_cache
+                GROUP BY 1, 2
+                ORDER BY 1, 2
+            """)
+        return [dict(r) for r in rows]
+    except Exception as e:
+        logger.error(f"get_llm_cache_stats failed: {e}", exc_info=True)
+        return []
+
+
+async def get_onboarding_by_user_id(user_id: str) -> dict | None:
+    """Fetch the onboarding record linked to a participant user_id."""
+    if not _pool:
+        return None
+    try:
+        async with _pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT id, company_name, tracking_id, status, ai_risk_level, submitted_at, email
+                FROM client_onboarding.onboarding_details
+                WHERE user_id = $1
+                ORDER BY submitted_at DESC
+                LIMIT 1
+            """, user_id)
+        if not row:
+            return None
+        result = dict(row)
+        result["submitted_at"] = _iso(result.get("submitted_at"))
+        return result
+    except Exception as e:
+        logger.error(f"get_onboarding_by_user_id failed: {e}", exc_info=True)
+        return None
@@ -0,0 +1,132 @@
+"""
+AWS Client Registry — one tuned boto3 client per service per process
+Building a boto3 client resolves credentials and endpoints and creates a new
+HTTPS connection pool, so doing it per call adds a TLS handshake to every
+Bedrock/S3 request. Clients here are built once and shared: boto3 clients are
+thread-safe, so all stage threads reuse one keep-alive pool per service
+(sized by AWS_MAX_POOL_CONNECTIONS). Clients are rebuilt after a fork.
+
+Credentials come from the environment (.dbenv, rewritten by
+refresh_sso_creds.py). The file is re-read when it changes and clients are
+rebuilt when the key/token differs; refresh_clients() forces the same.
+
+install_client() puts a stand-in client in front of the registry (used by
+backend/bench to run the pipeline against fake S3 / Bedrock).
+"""
+
+import os
+import threading
+import time
+
+import boto3
+from botocore.config import Config
+from dotenv import load_dotenv
+
+from .logger import logger_main as logger
+
+AWS_REGION = os.getenv("AWS_REGION", "us-west-2")
+
+# Connection pool per client; keep >= STAGE_MAX_WORKERS + upload/download concurrency
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_CONNECT_TIMEOUT = float(os.getenv("AWS_CONNECT_TIMEOUT_SECONDS", "5"))
+AWS_READ_TIMEOUT = float(os.getenv("AWS_READ_TIMEOUT_SECONDS", "60"))
+AWS_RETRY_MODE = os.getenv("AWS_RETRY_MODE", "adaptive")
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "5"))
+
+# Agent invocations stream for minutes; give them a longer read timeout
+_READ_TIMEOUTS = {
+    "bedrock-agent-runtime": float(os.getenv("AWS_AGENT_READ_TIMEOUT_SECONDS", "300")),
+}
+
+# Credentials file watched for rotated session tokens
+AWS_CREDENTIALS_FILE = os.getenv(
+    "AWS_CREDENTIALS_FILE", os.path.join(os.path.dirname(__file__), '..', '.dbenv')
+)
+AWS_CREDENTIALS_CHECK_SECONDS = float(os.getenv("AWS_CREDENTIALS_CHECK_SECONDS", "30"))
+
+_lock = threading.Lock()
+_clients = {}           # service -> client
+_installed = {}         # service -> stand-in client (install_client)
+_state = {"pid": None, "credentials": None, "checked_at": 0.0, "mtime": None}
+
+
+def _credentials():
+    return (
+        os.getenv("AWS_ACCESS_KEY_ID"),
+        os.getenv("AWS_SECRET_ACCESS_KEY"),
+        os.getenv("AWS_SESSION_TOKEN"),
+    )
+
+
+def client_config(service):
+    return Config(
+        region_name=os.getenv("AWS_REGION", AWS_REGION),
+        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+        connect_timeout=AWS_CONNECT_TIMEOUT,
+        read_timeout=_READ_TIMEOUTS.get(service, AWS_READ_TIMEOUT),
+        retries={"mode": AWS_RETRY_MODE, "max_attempts": AWS_MAX_ATTEMPTS},
+        tcp_keepalive=True,
+    )
+
+
+def _reload_credentials_file(now):
+    """Re-reads the credentials file if it changed since the last check (throttled)."""
+    if now - _state["checked_at"] < AWS_CREDENTIALS_CHECK_SECONDS:
+        return
+    _state["checked_at"] = now
+    try:
+        mtime = os.path.getmtime(AWS_CREDENTIALS_FILE)
+    except OSError:
+        return
+    if _state["mtime"] is not None and mtime != _state["mtime"]:
+        load_dotenv(dotenv_path=AWS_CREDENTIALS_FILE, override=True)
+    _state["mtime"] = mtime
+
+
+def get_client(service):
+    """Returns the shared client for an AWS service ('s3', 'bedrock-runtime', ...)."""
+    with _lock:
+        if service in _installed:
+            return _installed[service]
+        _reload_credentials_file(time.monotonic())
+        credentials = _credentials()
+        if _state["pid"] != os.getpid() or _state["credentials"] != credentials:
+            if _clients:
+                logger.info("[AWS] Credentials or process changed; rebuilding clients")
+            _clients.clear()
+            _state["pid"] = os.getpid()
+            _state["credentials"] = credentials
+
+        client = _clients.get(service)
+        if client is None:
+            access_key, secret_key, session_token = credentials
+            client = boto3.client(
+                service,
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                aws_session_token=session_token,
+                config=client_config(service),
+            )
+            _clients[service] = client
+        return client
+
+
+def refresh_clients(reload_env=True):
+    """Refresh hook: re-reads rotated credentials and drops every cached client."""
+    with _lock:
+        if reload_env and os.path.exists(AWS_CREDENTIALS_FILE):
+            load_dotenv(dotenv_path=AWS_CREDENTIALS_FILE, override=True)
+        _clients.clear()
+        _state["credentials"] = None
+        _state["checked_at"] = time.monotonic()
+    logger.info("[AWS] Client registry refreshed")
+
+
+def install_client(service, client):
+    """Serves `client` for a service instead of a boto3 client until it is removed (client=None)."""
+    with _lock:
+        if client is None:
+            _installed.pop(service, None)
+        else:
+            _installed[service] = client
+    logger.info(f"[AWS] {'Removed' if client is None else 'Installed'} stand-in client for {service}")
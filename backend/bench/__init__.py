@@ -0,0 +1,19 @@
+"""
+End-to-end benchmark for the onboarding pipeline.
+
+Runs the FastAPI app and the stage worker in one process against a local
+PostgreSQL (schema and migrations applied) with S3 and Bedrock replaced by
+in-process fakes with configurable latency, then drives /signup and the admin
+endpoints with concurrent virtual users. Results (throughput, per-stage and
+per-endpoint p50/p95/p99, DB queries per stage, pool waits, fake AWS call
+latencies) are written as JSON for run-to-run comparison.
+
+    python -m backend.bench run --applications 50 --concurrency 8
+    python -m backend.bench run --latency-scale 0.05 --latency bedrock.agent=fixed:2000
+    python -m backend.bench compare bench_results/BASE.json bench_results/NEW.json
+
+Modules: synthetic (applications and PDFs), fake_aws (S3 / Bedrock stand-ins),
+probe (DB and pool instrumentation), runner (the run), report (JSON, summary,
+comparison). Use a disposable database: every run adds applications, users,
+agent logs and queued emails.
+"""
@@ -0,0 +1,86 @@
+"""
+Usage (from repo root):
+    python -m backend.bench run [--applications 50] [--concurrency 8] [--mode queue|inline]
+                                [--latency OP=SPEC ...] [--latency-scale 1.0] [--throttle-rate 0]
+                                [--workers document=2,kyc=4,aml=4] [--results-dir bench_results]
+    python -m backend.bench compare BASELINE.json CURRENT.json [--threshold 0.10]
+"""
+
+import argparse
+import os
+import sys
+
+from . import report
+
+BENCH_RESULTS_DIR = os.getenv("BENCH_RESULTS_DIR", "bench_results")
+
+
+def _pairs(value, convert=str):
+    """'a=1,b=2' -> {'a': convert('1'), 'b': convert('2')}"""
+    pairs = {}
+    for item in value.split(","):
+        key, sep, val = item.partition("=")
+        if not sep:
+            raise argparse.ArgumentTypeError(f"expected KEY=VALUE, got '{item}'")
+        pairs[key.strip()] = convert(val.strip())
+    return pairs
+
+
+def _latency(value):
+    op, sep, spec = value.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected OP=SPEC (e.g. bedrock.agent=lognormal:8000,20000), got '{value}'")
+    return op.strip(), spec.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m backend.bench",
+                                     description="End-to-end onboarding pipeline benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run a benchmark and save its results")
+    run.add_argument("--applications", type=int, default=50)
+    run.add_argument("--concurrency", type=int, default=8, help="virtual users driving applications at once")
+    run.add_argument("--mode", choices=["queue", "inline"], default="queue",
+                     help="queue: agent_jobs + in-process worker; inline: FastAPI background tasks")
+    run.add_argument("--workers", type=lambda v: _pairs(v, int), default=None,
+                     help="worker threads per stage, e.g. document=2,kyc=4,aml=4 (queue mode)")
+    run.add_argument("--latency", type=_latency, action="append", default=[],
+                     help="fake AWS latency OP=SPEC; SPEC is fixed:MS, uniform:LO,HI or lognormal:MEDIAN,P95")
+    run.add_argument("--latency-scale", type=float, default=1.0, help="multiplies every fake AWS latency")
+    run.add_argument("--throttle-rate", type=float, default=0.0, help="share of Bedrock calls that are throttled")
+    run.add_argument("--doc-kb", type=int, default=64, help="size of each generated PDF")
+    run.add_argument("--mismatch-rate", type=float, default=0.1,
+                     help="share of applications whose registration number differs from the certificate")
+    run.add_argument("--poll-interval", type=float, default=0.25, help="seconds between status polls")
+    run.add_argument("--stage-timeout", type=float, default=600, help="seconds to wait for one stage")
+    run.add_argument("--no-llm-cache", dest="llm_cache", action="store_false",
+                     help="disable the LLM response cache (LLM_CACHE_ENABLED=false)")
+    run.add_argument("--seed", type=int, default=7)
+    run.add_argument("--port", type=int, default=0, help="API port (default: a free port)")
+    run.add_argument("--label", default=None, help="free text stored with the results")
+    run.add_argument("--results-dir", default=BENCH_RESULTS_DIR)
+
+    cmp = commands.add_parser("compare", help="compare two result files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("current")
+    cmp.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        rows = report.compare(report.load(args.baseline), report.load(args.current), args.threshold)
+        report.print_comparison(rows, args.threshold)
+        return 1 if any(r[4] for r in rows) else 0
+
+    from .runner import run as run_benchmark
+
+    args.latency = dict(args.latency)
+    results = run_benchmark(args)
+    report.print_summary(results)
+    print(f"\nResults: {report.save(results, args.results_dir)}")
+    return 0 if not results["failures"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
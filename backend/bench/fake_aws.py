@@ -0,0 +1,238 @@
+"""
+In-process stand-ins for the S3 and Bedrock clients used by the pipeline.
+
+Each call sleeps for a latency drawn from a configurable distribution and is
+recorded as "aws.<op>". Specs are strings:
+
+    fixed:MS                  always MS
+    uniform:LO,HI             uniform between LO and HI ms
+    lognormal:MEDIAN,P95      log-normal with that median and 95th percentile
+
+FakeS3 keeps objects in memory. FakeBedrockRuntime answers Converse calls:
+with documents attached it "reads" the PDFs from FakeS3 (synthetic.py wrote
+them) and returns the OCR fields, otherwise it returns auditor pillars.
+FakeBedrockAgentRuntime streams KYC / AML agent answers in chunks with a
+trace event, like invoke_agent. throttle_rate makes that share of Bedrock
+calls fail with ThrottlingException so the adaptive rate limiter is exercised.
+"""
+
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from ..aws_clients import install_client
+from .synthetic import parse_document, read_pdf_text
+
+DEFAULT_LATENCIES = {
+    "s3.head_object": "lognormal:8,30",
+    "s3.put_object": "lognormal:40,150",
+    "s3.upload_part": "lognormal:150,500",
+    "s3.other": "lognormal:20,60",
+    "bedrock.converse": "lognormal:1800,4500",
+    "bedrock.ocr": "lognormal:5000,12000",
+    "bedrock.agent": "lognormal:12000,30000",
+}
+
+
+class Latency:
+    """A latency distribution parsed from a spec string; sample() returns seconds."""
+
+    def __init__(self, spec: str, scale: float = 1.0):
+        self.spec = spec
+        self.scale = scale
+        kind, _, params = spec.partition(":")
+        values = [float(v) for v in params.split(",") if v.strip()] if params else []
+        if kind == "fixed" and len(values) == 1:
+            self._sample = lambda rng: values[0]
+        elif kind == "uniform" and len(values) == 2:
+            self._sample = lambda rng: rng.uniform(values[0], values[1])
+        elif kind == "lognormal" and len(values) == 2 and 0 < values[0] <= values[1]:
+            mu = math.log(values[0])
+            sigma = (math.log(values[1]) - mu) / 1.645
+            self._sample = lambda rng: rng.lognormvariate(mu, sigma)
+        else:
+            raise ValueError(f"Invalid latency spec '{spec}' (fixed:MS, uniform:LO,HI or lognormal:MEDIAN,P95)")
+
+    def sample(self, rng) -> float:
+        return max(0.0, self._sample(rng)) * self.scale / 1000
+
+
+class _FakeClient:
+    def __init__(self, latencies, recorder, seed, throttle_rate=0.0):
+        self._latencies = latencies
+        self._recorder = recorder
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._throttle_rate = throttle_rate
+
+    def _wait(self, op, fraction=1.0):
+        with self._rng_lock:
+            seconds = self._latencies[op].sample(self._rng) * fraction
+            throttled = self._throttle_rate and op.startswith("bedrock.") and self._rng.random() < self._throttle_rate
+        if throttled:
+            time.sleep(seconds * 0.05)
+            self._recorder.count(f"aws.{op}.throttled")
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, op)
+        time.sleep(seconds)
+        self._recorder.observe(f"aws.{op}", seconds * 1000)
+        return seconds
+
+
+class FakeS3(_FakeClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self._objects = {}          # (bucket, key) -> (body, content_type, last_modified)
+        self._uploads = {}          # upload id -> {part number: bytes}
+
+    def read(self, uri: str) -> bytes:
+        bucket, _, key = uri[len("s3://"):].partition("/")
+        with self._lock:
+            obj = self._objects.get((bucket, key))
+        return obj[0] if obj else b""
+
+    def _missing(self, operation):
+        return ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, operation)
+
+    def head_object(self, Bucket, Key, **kwargs):
+        self._wait("s3.head_object")
+        with self._lock:
+            obj = self._objects.get((Bucket, Key))
+        if obj is None:
+            raise self._missing("HeadObject")
+        return {"ContentLength": len(obj[0]), "ContentType": obj[1], "LastModified": obj[2]}
+
+    def put_object(self, Bucket, Key, Body, ContentType="binary/octet-stream", **kwargs):
+        self._wait("s3.put_object")
+        with self._lock:
+            self._objects[(Bucket, Key)] = (bytes(Body), ContentType, datetime.now(timezone.utc))
+        return {"ETag": f'"{uuid.uuid4().hex}"'}
+
+    def create_multipart_upload(self, Bucket, Key, ContentType="binary/octet-stream", **kwargs):
+        self._wait("s3.other")
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self._wait("s3.upload_part")
+        with self._lock:
+            self._uploads[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f'"{uuid.uuid4().hex}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        self._wait("s3.other")
+        with self._lock:
+            parts = self._uploads.pop(UploadId)
+            body = b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"])
+            self._objects[(Bucket, Key)] = (body, "application/pdf", datetime.now(timezone.utc))
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self._wait("s3.other")
+        with self._lock:
+            self._uploads.pop(UploadId, None)
+        return {}
+
+    def delete_object(self, Bucket, Key, **kwargs):
+        self._wait("s3.other")
+        with self._lock:
+            self._objects.pop((Bucket, Key), None)
+        return {}
+
+
+def _pillars(names):
+    return [{"pillar_name": name, "evidence": f"Synthetic evidence for {name}.", "result": "PASS"} for name in names]
+
+
+class FakeBedrockRuntime(_FakeClient):
+    def __init__(self, s3: FakeS3, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._s3 = s3
+
+    def converse(self, modelId, messages, system=None, inferenceConfig=None, **kwargs):
+        content = messages[-1]["content"]
+        prompt = "".join(block.get("text", "") for block in content)
+        documents = [block["document"] for block in content if "document" in block]
+        if documents:
+            seconds = self._wait("bedrock.ocr")
+            answer = {}
+            for doc in documents:
+                answer.update(parse_document(read_pdf_text(self._s3.read(doc["source"]["s3Location"]["uri"]))))
+        else:
+            seconds = self._wait("bedrock.converse")
+            if "aml_pillars" in prompt:
+                answer = {"aml_pillars": _pillars(["Sanctions & AML", "PEP Detection", "Adverse Media"])}
+            else:
+                answer = {"kyc_pillars": _pillars(["Institutional Registry", "Identity Hygiene", "Document Proofing"]),
+                          "ai_summary": "Identity verified against registry and documents."}
+        text = json.dumps(answer)
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": text}]}},
+            "stopReason": "end_turn",
+            "usage": {"inputTokens": len(prompt) // 4, "outputTokens": len(text) // 4,
+                      "totalTokens": (len(prompt) + len(text)) // 4},
+            "metrics": {"latencyMs": int(seconds * 1000)},
+        }
+
+
+class FakeBedrockAgentRuntime(_FakeClient):
+    CHUNKS = 4
+
+    def invoke_agent(self, agentId, agentAliasId, sessionId, inputText, enableTrace=False, **kwargs):
+        # Time to first event; the rest of the latency is spread over the stream
+        self._wait("bedrock.agent", fraction=0.3)
+        if "aml_pillars" in inputText:
+            answer = {"risk_rating": "LOW", "final_risk_score": 18,
+                      "ai_summary": "No sanctions, PEP or adverse media findings.",
+                      "aml_pillars": _pillars(["Sanctions & AML", "PEP Detection", "Adverse Media"])}
+        else:
+            answer = {"risk_level": "LOW", "findings": "Entity existence confirmed from registry and documents.",
+                      "kyc_pillars": _pillars(["Institutional Registry", "Identity Hygiene", "Document Proofing"])}
+        text = json.dumps(answer)
+        with self._rng_lock:
+            remaining = self._latencies["bedrock.agent"].sample(self._rng) * 0.7
+        return {"completion": self._stream(text, remaining, agentId), "sessionId": sessionId,
+                "contentType": "application/json"}
+
+    def _stream(self, text, seconds, agent_id):
+        yield {"trace": {"agentId": agent_id, "trace": {"orchestrationTrace": {
+            "invocationInput": {"actionGroupInvocationInput": {"function": "bench_lookup", "parameters": []}}}}}}
+        step = max(1, len(text) // self.CHUNKS + 1)
+        for start in range(0, len(text), step):
+            time.sleep(seconds / self.CHUNKS)
+            yield {"chunk": {"bytes": text[start:start + step].encode("utf-8")}}
+        self._recorder.observe("aws.bedrock.agent_stream", seconds * 1000)
+
+
+def install(recorder, overrides=None, scale=1.0, seed=0, throttle_rate=0.0):
+    """
+    Installs the fakes in the AWS client registry and returns them as
+    {service: client}. overrides: {op: spec} on top of DEFAULT_LATENCIES.
+    """
+    specs = {**DEFAULT_LATENCIES, **(overrides or {})}
+    unknown = set(specs) - set(DEFAULT_LATENCIES)
+    if unknown:
+        raise ValueError(f"Unknown latency ops: {', '.join(sorted(unknown))} (known: {', '.join(DEFAULT_LATENCIES)})")
+    latencies = {op: Latency(spec, scale) for op, spec in specs.items()}
+    s3 = FakeS3(latencies, recorder, seed)
+    clients = {
+        "s3": s3,
+        "bedrock-runtime": FakeBedrockRuntime(s3, latencies, recorder, seed + 1, throttle_rate),
+        "bedrock-agent-runtime": FakeBedrockAgentRuntime(latencies, recorder, seed + 2, throttle_rate),
+    }
+    for service, client in clients.items():
+        install_client(service, client)
+    return clients
+
+
+def uninstall():
+    for service in ("s3", "bedrock-runtime", "bedrock-agent-runtime"):
+        install_client(service, None)
@@ -0,0 +1,189 @@
+"""
+Benchmark probes: latency samples, DB query counts and pool waits.
+
+Everything is recorded into one Recorder as named series of millisecond
+samples ("api.signup", "stage.kyc.run", "db.sync.aml", ...). DB queries are
+attributed to the pipeline stage running them through the `current_stage`
+context variable, which instrument_stages() sets around run_job (and
+StageExecutor carries into its check threads); everything else counts as
+"api".
+
+The driver hooks wrap psycopg2.connect and asyncpg.create_pool, so
+instrument_psycopg2() must run before backend.db is imported (it opens its
+pool at import time) and instrument_asyncpg() before the API starts up.
+"""
+
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+current_stage = contextvars.ContextVar("bench_stage", default="api")
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of unsorted samples (0 when empty)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def summarize(samples) -> dict:
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "total_ms": round(sum(samples), 1),
+        "mean_ms": round(sum(samples) / len(samples), 2),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+
+class Recorder:
+    """Thread-safe named series of millisecond samples plus plain counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.series = defaultdict(list)
+        self.counters = defaultdict(int)
+
+    def observe(self, name, ms):
+        with self._lock:
+            self.series[name].append(ms)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def summary(self, name) -> dict:
+        with self._lock:
+            samples = list(self.series.get(name, ()))
+        return summarize(samples)
+
+    def names(self, prefix):
+        with self._lock:
+            return sorted(n for n in self.series if n.startswith(prefix))
+
+
+def _elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def instrument_psycopg2(recorder):
+    """Counts and times every statement run through psycopg2 cursors, per stage."""
+    import psycopg2
+    from psycopg2 import extensions
+
+    class CountingCursor(extensions.cursor):
+        def execute(self, query, vars=None):
+            start = time.perf_counter()
+            try:
+                return super().execute(query, vars)
+            finally:
+                recorder.observe(f"db.sync.{current_stage.get()}", _elapsed_ms(start))
+
+        def executemany(self, query, vars_list):
+            start = time.perf_counter()
+            try:
+                return super().executemany(query, vars_list)
+            finally:
+                recorder.observe(f"db.sync.{current_stage.get()}", _elapsed_ms(start))
+
+        def copy_expert(self, sql, file, size=8192):
+            start = time.perf_counter()
+            try:
+                return super().copy_expert(sql, file, size)
+            finally:
+                recorder.observe(f"db.sync.{current_stage.get()}", _elapsed_ms(start))
+
+    connect = psycopg2.connect
+
+    def counting_connect(*args, **kwargs):
+        kwargs.setdefault("cursor_factory", CountingCursor)
+        return connect(*args, **kwargs)
+
+    psycopg2.connect = counting_connect
+
+
+def instrument_sync_pool(pool, recorder):
+    """Times every checkout from db.py's ConnectionPool (includes waits for a free slot)."""
+    getconn = pool.getconn
+
+    def timed_getconn(timeout=None):
+        start = time.perf_counter()
+        try:
+            return getconn(timeout)
+        finally:
+            recorder.observe("pool.sync.checkout", _elapsed_ms(start))
+
+    pool.getconn = timed_getconn
+
+
+class _TimedAcquire:
+    def __init__(self, context, recorder):
+        self._context = context
+        self._recorder = recorder
+
+    async def __aenter__(self):
+        start = time.perf_counter()
+        try:
+            return await self._context.__aenter__()
+        finally:
+            self._recorder.observe("pool.async.acquire", _elapsed_ms(start))
+
+    async def __aexit__(self, *exc):
+        return await self._context.__aexit__(*exc)
+
+
+def instrument_asyncpg(recorder):
+    """Adds a query logger to every asyncpg pool connection and times pool.acquire()."""
+    import asyncpg
+
+    create_pool = asyncpg.create_pool
+
+    def log_query(record):
+        recorder.observe(f"db.async.{current_stage.get()}", record.elapsed * 1000)
+
+    async def build(args, init, kwargs):
+        async def init_connection(conn):
+            if hasattr(conn, "add_query_logger"):       # asyncpg >= 0.29
+                conn.add_query_logger(log_query)
+            if init:
+                await init(conn)
+
+        pool = await create_pool(*args, init=init_connection, **kwargs)
+        acquire = pool.acquire
+        pool.acquire = lambda *a, **kw: _TimedAcquire(acquire(*a, **kw), recorder)
+        return pool
+
+    def counting_create_pool(*args, init=None, **kwargs):
+        return build(args, init, kwargs)
+
+    asyncpg.create_pool = counting_create_pool
+
+
+def instrument_stages(recorder, *modules):
+    """
+    Wraps run_job in each module (backend.worker for queue mode, backend.main
+    for inline mode): stage run time, errors, and the stage label for DB counts.
+    """
+    for module in modules:
+        run_job = module.run_job
+
+        def timed_run_job(job_type, onboarding_id, payload, _run_job=run_job):
+            token = current_stage.set(job_type)
+            start = time.perf_counter()
+            try:
+                return _run_job(job_type, onboarding_id, payload)
+            except Exception:
+                recorder.count(f"stage.{job_type}.errors")
+                raise
+            finally:
+                recorder.observe(f"stage.{job_type}.run", _elapsed_ms(start))
+                current_stage.reset(token)
+
+        module.run_job = timed_run_job
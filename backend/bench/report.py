@@ -0,0 +1,179 @@
+"""
+Benchmark results: JSON documents built from a Recorder, a console summary,
+and run-to-run comparison for regressions.
+
+compare() checks throughput, per-stage and per-endpoint p95 latency, DB
+queries per application and pool waits. A metric regresses when it is worse
+than the baseline by more than `threshold` (relative) and by more than a small
+absolute floor, so sub-millisecond jitter is not reported.
+"""
+
+import json
+import os
+
+from .probe import summarize
+
+RESULTS_VERSION = 1
+STAGES = ("document", "kyc", "aml")
+
+# Absolute change below which a latency / count difference is ignored
+_FLOORS = {"ms": 5.0, "queries": 1.0, "per_min": 0.5}
+
+
+def build(recorder, meta: dict, wall_seconds: float, applications: int, completed: int,
+          failures: list, queue_waits: dict, pool_stats: dict, extra: dict) -> dict:
+    """Results document for one run. queue_waits: {stage: [ms]} read from agent_jobs."""
+    api = {}
+    requests = 0
+    for name in recorder.names("api."):
+        endpoint = name[len("api."):]
+        api[endpoint] = {**recorder.summary(name), "errors": recorder.counters.get(f"{name}.errors", 0)}
+        requests += api[endpoint]["count"]
+
+    stages = {}
+    for stage in STAGES:
+        stages[stage] = {
+            "e2e": recorder.summary(f"stage.{stage}.e2e"),
+            "run": recorder.summary(f"stage.{stage}.run"),
+            "queue_wait": summarize(queue_waits.get(stage, [])),
+            "errors": recorder.counters.get(f"stage.{stage}.errors", 0),
+        }
+
+    db = {}
+    for label in ["api", *STAGES]:
+        queries = sum(recorder.summary(f"db.{layer}.{label}").get("count", 0) for layer in ("sync", "async"))
+        db[label] = {
+            "sync": recorder.summary(f"db.sync.{label}"),
+            "async": recorder.summary(f"db.async.{label}"),
+            "queries": queries,
+            "queries_per_application": round(queries / completed, 2) if completed else None,
+        }
+
+    aws = {name[len("aws."):]: recorder.summary(name) for name in recorder.names("aws.")}
+    for name, value in recorder.counters.items():
+        if name.startswith("aws.") and name.endswith(".throttled"):
+            aws.setdefault(name[len("aws."):-len(".throttled")], {})["throttled"] = value
+
+    return {
+        "version": RESULTS_VERSION,
+        "meta": meta,
+        "throughput": {
+            "applications": applications,
+            "completed": completed,
+            "failed": applications - completed,
+            "wall_seconds": round(wall_seconds, 2),
+            "applications_per_min": round(completed / wall_seconds * 60, 2) if wall_seconds else 0,
+            "requests": requests,
+            "requests_per_second": round(requests / wall_seconds, 2) if wall_seconds else 0,
+            "application_e2e": recorder.summary("app.e2e"),
+        },
+        "api": api,
+        "stages": stages,
+        "db": {
+            "queries": db,
+            "pool": {
+                "sync_checkout": recorder.summary("pool.sync.checkout"),
+                "async_acquire": recorder.summary("pool.async.acquire"),
+                "sync_stats": pool_stats,
+            },
+        },
+        "aws": aws,
+        "failures": failures[:50],
+        **extra,
+    }
+
+
+def save(results: dict, directory: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{results['meta']['run_id']}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, default=str)
+    return path
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def _fmt(stats):
+    if not stats or not stats.get("count"):
+        return "—"
+    return f"p50 {stats['p50_ms']:>9.1f}  p95 {stats['p95_ms']:>9.1f}  p99 {stats['p99_ms']:>9.1f}  (n={stats['count']})"
+
+
+def print_summary(results: dict):
+    t = results["throughput"]
+    print(f"\n{t['completed']}/{t['applications']} applications in {t['wall_seconds']}s "
+          f"-> {t['applications_per_min']} applications/min, {t['requests_per_second']} API requests/s")
+    print(f"{'application end-to-end':<28} {_fmt(t['application_e2e'])}")
+    print("\nStages (ms)")
+    for stage, s in results["stages"].items():
+        print(f"  {stage + ' e2e':<26} {_fmt(s['e2e'])}")
+        print(f"  {stage + ' run':<26} {_fmt(s['run'])}")
+        print(f"  {stage + ' queue wait':<26} {_fmt(s['queue_wait'])}")
+    print("\nAPI (ms)")
+    for endpoint, s in results["api"].items():
+        errors = f"  errors {s['errors']}" if s["errors"] else ""
+        print(f"  {endpoint:<26} {_fmt(s)}{errors}")
+    print("\nDB queries per application")
+    for label, q in results["db"]["queries"].items():
+        print(f"  {label:<26} {q['queries_per_application']}  ({q['queries']} total)")
+    pool = results["db"]["pool"]
+    print("\nPool waits (ms)")
+    print(f"  {'sync checkout':<26} {_fmt(pool['sync_checkout'])}")
+    print(f"  {'async acquire':<26} {_fmt(pool['async_acquire'])}")
+    stats = pool.get("sync_stats") or {}
+    if stats:
+        print(f"  exhaustion events {stats.get('exhaustion_events', 0)}, timeouts {stats.get('timeouts', 0)}")
+    if results["failures"]:
+        print(f"\n{len(results['failures'])} failure(s), first: {results['failures'][0]}")
+
+
+def _metrics(results: dict) -> dict:
+    """{metric: (value, unit, higher_is_better)} for comparison."""
+    metrics = {"throughput.applications_per_min": (results["throughput"]["applications_per_min"], "per_min", True)}
+    e2e = results["throughput"].get("application_e2e") or {}
+    if e2e.get("count"):
+        metrics["application.e2e.p95"] = (e2e["p95_ms"], "ms", False)
+    for stage, s in results["stages"].items():
+        for part in ("e2e", "run", "queue_wait"):
+            if s[part].get("count"):
+                metrics[f"stage.{stage}.{part}.p95"] = (s[part]["p95_ms"], "ms", False)
+    for endpoint, s in results["api"].items():
+        if s.get("count"):
+            metrics[f"api.{endpoint}.p95"] = (s["p95_ms"], "ms", False)
+    for label, q in results["db"]["queries"].items():
+        if q["queries_per_application"] is not None:
+            metrics[f"db.{label}.queries_per_application"] = (q["queries_per_application"], "queries", False)
+    for pool in ("sync_checkout", "async_acquire"):
+        s = results["db"]["pool"][pool]
+        if s.get("count"):
+            metrics[f"pool.{pool}.p95"] = (s["p95_ms"], "ms", False)
+    return metrics
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> list:
+    """
+    [(metric, baseline, current, relative change, regressed)] for metrics in
+    both runs; relative change is positive when `current` is worse.
+    """
+    base, cur = _metrics(baseline), _metrics(current)
+    rows = []
+    for metric in sorted(set(base) & set(cur)):
+        old, unit, higher_is_better = base[metric]
+        new = cur[metric][0]
+        worse_by = (old - new) if higher_is_better else (new - old)
+        change = worse_by / old if old else (1.0 if worse_by > 0 else 0.0)
+        regressed = change > threshold and worse_by > _FLOORS[unit]
+        rows.append((metric, old, new, round(change, 4), regressed))
+    return rows
+
+
+def print_comparison(rows: list, threshold: float):
+    print(f"{'metric':<44} {'baseline':>12} {'current':>12} {'worse by':>9}")
+    for metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{metric:<44} {old:>12} {new:>12} {change * 100:>8.1f}%{flag}")
+    regressions = sum(1 for r in rows if r[4])
+    print(f"\n{regressions} regression(s) over {threshold * 100:.0f}%")
@@ -0,0 +1,324 @@
+"""
+End-to-end benchmark run: API + stage workers in this process, fake AWS,
+real PostgreSQL, virtual users driving the HTTP endpoints.
+
+Each virtual user takes the next synthetic application and walks it through
+the pipeline the way an applicant and a reviewer would:
+
+  POST /signup -> poll /status until DOCUMENT_COMPLETE -> open the ticket and
+  its agent logs -> approve -> ... KYC_COMPLETE -> approve -> AML_COMPLETE ->
+  approve (APPROVED)
+
+Stage e2e time runs from the triggering response (signup or approve) to the
+poll that sees the stage's COMPLETE status, so it includes queue wait and up
+to one poll interval. The run time of each stage is measured around run_job;
+queue wait is read from agent_jobs afterwards (queue mode).
+"""
+
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from . import fake_aws, probe, report
+from .synthetic import make_application
+
+# Stage -> (status that ends it, agent-logs stage number)
+_STAGE_FLOW = (("document", "DOCUMENT_COMPLETE", 1), ("kyc", "KYC_COMPLETE", 2), ("aml", "AML_COMPLETE", 3))
+_DEAD_END_STATUSES = {"REJECTED", "CANCELLED", "CLARIFICATION_REQUIRED"}
+
+
+class BenchError(Exception):
+    """An application could not be driven through the pipeline."""
+
+
+def encode_multipart(fields: dict, files: dict):
+    """(body, content type) for a multipart/form-data POST. files: {field: (filename, bytes)}."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        if value is None:
+            continue
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8"))
+    for name, (filename, data) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/pdf\r\n\r\n'.encode("utf-8") + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+class ApiClient:
+    """Keep-alive HTTP client, one connection per virtual-user thread; every call is recorded as api.<name>."""
+
+    def __init__(self, host, port, recorder, timeout=300):
+        self.host = host
+        self.port = port
+        self.recorder = recorder
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def request(self, name, method, path, body=None, content_type=None):
+        headers = {"User-Agent": "aml-bench"}
+        if content_type:
+            headers["Content-Type"] = content_type
+        for attempt in (1, 2):
+            conn = self._connection()
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                self._local.conn = None
+                # The server may have closed an idle keep-alive connection; retry once on a new one
+                if attempt == 2 or not isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                    self.recorder.count(f"api.{name}.errors")
+                    raise BenchError(f"{method} {path}: {e}")
+        self.recorder.observe(f"api.{name}", (time.perf_counter() - start) * 1000)
+        if response.status >= 400:
+            self.recorder.count(f"api.{name}.errors")
+            raise BenchError(f"{method} {path}: HTTP {response.status} {data[:200]!r}")
+        return json.loads(data) if data else {}
+
+
+def _wait_for_status(client, ticket_id, status, poll_interval, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        current = client.request("status", "GET", f"/admin/tickets/{ticket_id}/status")["ticket"]["status"]
+        if current == status:
+            return
+        if current in _DEAD_END_STATUSES:
+            raise BenchError(f"ticket {ticket_id} reached {current} while waiting for {status}")
+        if time.monotonic() >= deadline:
+            raise BenchError(f"ticket {ticket_id} still {current} after {timeout}s waiting for {status}")
+        time.sleep(poll_interval)
+
+
+def drive_application(client, application, recorder, poll_interval, stage_timeout):
+    """Signs up one application and approves it through all three stages. Returns its onboarding id."""
+    start = time.perf_counter()
+    body, content_type = encode_multipart(application["form"], application["files"])
+    ticket_id = client.request("signup", "POST", "/signup", body, content_type)["onboarding_id"]
+    client.request("list_tickets", "GET", "/admin/tickets?limit=50")
+    triggered = time.perf_counter()
+
+    for stage, done_status, log_stage in _STAGE_FLOW:
+        _wait_for_status(client, ticket_id, done_status, poll_interval, stage_timeout)
+        recorder.observe(f"stage.{stage}.e2e", (time.perf_counter() - triggered) * 1000)
+        # The reviewer reads the ticket and the stage's findings before acting
+        client.request("ticket_detail", "GET", f"/admin/tickets/{ticket_id}")
+        client.request("agent_logs", "GET", f"/admin/tickets/{ticket_id}/agent-logs?stage={log_stage}&fields=summary")
+        client.request("action", "POST", f"/admin/tickets/{ticket_id}/action",
+                       json.dumps({"action": "approve", "remarks": "benchmark"}), "application/json")
+        triggered = time.perf_counter()
+
+    recorder.observe("app.e2e", (time.perf_counter() - start) * 1000)
+    return ticket_id
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _queue_waits(db, onboarding_ids) -> dict:
+    """{stage: [ms from enqueue to first claim]} for this run's jobs."""
+    waits = {}
+    if not onboarding_ids:
+        return waits
+    token = probe.current_stage.set("bench")
+    conn = db.get_connection()
+    if not conn:
+        probe.current_stage.reset(token)
+        return waits
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT job_type, EXTRACT(EPOCH FROM (started_at - created_at)) * 1000
+                FROM client_onboarding.agent_jobs
+                WHERE onboarding_id = ANY(%s::uuid[]) AND started_at IS NOT NULL
+            """, (list(onboarding_ids),))
+            for job_type, wait_ms in cursor.fetchall():
+                waits.setdefault(job_type, []).append(float(wait_ms))
+    except Exception as e:
+        print(f"Could not read queue waits from agent_jobs: {e}")
+    finally:
+        db.release_connection(conn)
+        probe.current_stage.reset(token)
+    return waits
+
+
+_POOL_COUNTERS = ("checkouts", "wait_ms_total", "exhaustion_events", "timeouts", "connections_opened",
+                  "connections_recycled", "validation_failures")
+
+
+def _pool_delta(before: dict, after: dict) -> dict:
+    if not after:
+        return {}
+    delta = {k: round(after.get(k, 0) - before.get(k, 0), 3) for k in _POOL_COUNTERS}
+    delta["wait_ms_max"] = after.get("wait_ms_max")
+    delta["max"] = after.get("max")
+    return delta
+
+
+class _Server:
+    """uvicorn in a background thread (signal handling stays with the main thread)."""
+
+    def __init__(self, app, port):
+        import uvicorn
+
+        class Server(uvicorn.Server):
+            def install_signal_handlers(self):
+                pass
+
+        self.server = Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                            access_log=False, lifespan="on"))
+        self.thread = threading.Thread(target=self.server.run, name="bench-api", daemon=True)
+
+    def start(self, timeout=60):
+        self.thread.start()
+        deadline = time.monotonic() + timeout
+        while not self.server.started:
+            if not self.thread.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError("API server did not start")
+            time.sleep(0.05)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(30)
+
+
+def run(options) -> dict:
+    """Runs one benchmark and returns its results document (see report.build)."""
+    if "backend.db" in sys.modules:
+        raise RuntimeError("backend.db is already imported; run the benchmark in a fresh process")
+
+    # Settings the backend reads at import time
+    os.environ["AGENT_JOBS_MODE"] = options.mode
+    os.environ["EMAIL_DELIVERY_MODE"] = "outbox"      # queued, never sent (no sender threads)
+    if not options.llm_cache:
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+
+    recorder = probe.Recorder()
+    probe.instrument_psycopg2(recorder)
+    probe.instrument_asyncpg(recorder)
+
+    from .. import db, main, worker
+    from ..agents import llm_cache, rate_limiter
+
+    if db.connection_pool:
+        probe.instrument_sync_pool(db.connection_pool, recorder)
+    probe.instrument_stages(recorder, worker, main)
+
+    token = probe.current_stage.set("bench")
+    conn = db.get_connection()
+    probe.current_stage.reset(token)
+    if not conn:
+        raise RuntimeError("No database connection; check DB_HOST / DB_NAME / DB_USER in .dbenv")
+    db.release_connection(conn)
+
+    fake_aws.install(recorder, options.latency, scale=options.latency_scale, seed=options.seed,
+                     throttle_rate=options.throttle_rate)
+
+    run_tag = uuid.uuid4().hex[:6]
+    rng = random.Random(options.seed)
+    applications = [make_application(i, run_tag, rng, options.doc_kb * 1024, options.mismatch_rate)
+                    for i in range(options.applications)]
+
+    stage_workers = None
+    if options.mode == "queue":
+        stage_workers = worker.Worker(concurrency=options.workers, email_senders=0)
+
+    port = options.port or _free_port()
+    server = _Server(main.app, port)
+    server.start()
+    if stage_workers:
+        stage_workers.start()
+
+    client = ApiClient("127.0.0.1", port, recorder)
+    pool_before = db.get_pool_stats()
+    started_at = datetime.now(timezone.utc)
+    print(f"Run {run_tag}: {options.applications} applications, concurrency {options.concurrency}, "
+          f"mode {options.mode}, latency scale {options.latency_scale}")
+
+    onboarding_ids, failures = [], []
+    wall_start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=options.concurrency, thread_name_prefix="bench-user") as users:
+            futures = {users.submit(drive_application, client, app, recorder, options.poll_interval,
+                                    options.stage_timeout): i for i, app in enumerate(applications)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    onboarding_ids.append(future.result())
+                except Exception as e:
+                    failures.append({"application": futures[future], "error": f"{type(e).__name__}: {e}"})
+                if done % max(1, options.applications // 10) == 0:
+                    print(f"  {done}/{options.applications} done ({len(failures)} failed)")
+        wall_seconds = time.perf_counter() - wall_start
+    finally:
+        if stage_workers:
+            stage_workers.stop(timeout=30)
+        server.stop()
+        fake_aws.uninstall()
+
+    meta = {
+        "run_id": f"{started_at.strftime('%Y%m%dT%H%M%SZ')}-{run_tag}",
+        "label": options.label,
+        "started_at": started_at.isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "applications": options.applications,
+            "concurrency": options.concurrency,
+            "mode": options.mode,
+            "seed": options.seed,
+            "doc_kb": options.doc_kb,
+            "mismatch_rate": options.mismatch_rate,
+            "poll_interval": options.poll_interval,
+            "llm_cache": options.llm_cache,
+            "latency_scale": options.latency_scale,
+            "latency": {**fake_aws.DEFAULT_LATENCIES, **(options.latency or {})},
+            "throttle_rate": options.throttle_rate,
+            "workers": stage_workers.concurrency if stage_workers else None,
+            "db_pool_max": db.DB_POOL_MAX_SIZE,
+            "stage_max_workers": int(os.getenv("STAGE_MAX_WORKERS", "16")),
+        },
+    }
+    extra = {
+        "llm_cache": llm_cache.get_stats(),
+        "rate_limits": rate_limiter.get_stats(),
+        "worker": stage_workers.stats if stage_workers else None,
+    }
+    queue_waits = _queue_waits(db, onboarding_ids) if options.mode == "queue" else {}
+    return report.build(recorder, meta, wall_seconds, options.applications, len(onboarding_ids), failures,
+                        queue_waits, _pool_delta(pool_before, db.get_pool_stats()), extra)
@@ -0,0 +1,174 @@
+"""
+Synthetic onboarding applications for the benchmark.
+
+make_application() returns the /signup form fields and the uploaded PDFs for
+one applicant. The PDFs are plain one-page documents whose text lines carry
+the facts the Stage 1 OCR prompt asks for ("Legal Name: ...",
+"Director: ..."), so the fake Bedrock backend can "read" them back with
+read_pdf_text() / parse_document() and the document checks compare real
+values. A fraction of applications (mismatch_rate) declare a registration
+number that differs from their certificate.
+
+The PDF writer has no dependencies; documents are padded with ledger lines to
+a target size so uploads move realistic byte counts.
+"""
+
+import json
+import re
+
+_ONSETS = ["b", "br", "c", "d", "f", "g", "h", "k", "l", "m", "n", "p", "r", "s", "st", "t", "tr", "v", "w"]
+_VOWELS = ["a", "e", "i", "o", "u", "ea", "io", "ai"]
+_CODAS = ["", "", "n", "r", "s", "l", "m", "x", "th"]
+
+_FIRST_NAMES = ["James", "Sarah", "Michael", "Olivia", "Daniel", "Priya", "Ahmed", "Elena", "Carlos", "Mei",
+                "Thomas", "Aisha", "Lukas", "Sofia", "Kenji", "Amara", "Ravi", "Hannah", "Omar", "Ingrid"]
+
+_COMPANY_KINDS = ["Holdings", "Capital", "Trading", "Logistics", "Partners", "Financial Group", "Ventures", "Bank"]
+_ENTITY_TYPES = ["bank", "broker_dealer", "asset_manager", "corporate", "fintech"]
+_COUNTRIES = [
+    ("US", "New York", "New York", "10005"), ("GB", "", "London", "EC2V 7HH"), ("SG", "", "Singapore", "048583"),
+    ("DE", "Hesse", "Frankfurt", "60311"), ("AE", "", "Dubai", "00000"), ("IN", "Maharashtra", "Mumbai", "400001"),
+    ("CH", "Zurich", "Zurich", "8001"), ("HK", "", "Hong Kong", "999077"),
+]
+
+
+def _word(rng):
+    return "".join(rng.choice(_ONSETS) + rng.choice(_VOWELS) + rng.choice(_CODAS)
+                   for _ in range(rng.randint(2, 3))).capitalize()
+
+
+def _person(rng):
+    return f"{rng.choice(_FIRST_NAMES)} {_word(rng)}"
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_pdf(title: str, lines: list, pad_to: int = 0) -> bytes:
+    """
+    Minimal single-page PDF (Helvetica, uncompressed content stream). When
+    pad_to is set, ledger lines are appended until the file reaches that size.
+    """
+    body = [title, ""] + list(lines)
+    text_ops = [f"({_escape(line)}) Tj T*" for line in body]
+    size = sum(len(op) for op in text_ops)
+    row = 0
+    while size < pad_to - 600:
+        row += 1
+        op = f"(Ledger {row:06d}  account {row * 7919 % 100000:05d}  amount {row * 104729 % 10000000 / 100:>12.2f}) Tj T*"
+        text_ops.append(op)
+        size += len(op) + 1
+    stream = "BT /F1 10 Tf 12 TL 50 800 Td\n" + "\n".join(text_ops) + "\nET"
+
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+_TEXT_OP = re.compile(rb"\(((?:[^()\\]|\\.)*)\) Tj")
+
+
+def read_pdf_text(data: bytes) -> list:
+    """Text lines of a PDF written by render_pdf()."""
+    return [re.sub(r"\\(.)", r"\1", m.group(1).decode("latin-1")) for m in _TEXT_OP.finditer(data)]
+
+
+# Document line label -> (OCR field, is list)
+_FIELDS = {
+    "Legal Name": ("legal_name", False),
+    "Registration Number": ("registration_number", False),
+    "Employer Identification Number": ("ein_number", False),
+    "Director": ("directors", True),
+    "Beneficial Owner": ("ubos", True),
+}
+
+
+def parse_document(lines: list) -> dict:
+    """The OCR fields ('legal_name', 'directors', ...) found in a document's lines."""
+    fields = {}
+    for line in lines:
+        label, sep, value = line.partition(": ")
+        if not sep or label not in _FIELDS:
+            continue
+        field, is_list = _FIELDS[label]
+        if is_list:
+            fields.setdefault(field, []).append(value.split(" (")[0])
+        else:
+            fields[field] = value
+    return fields
+
+
+def make_application(index: int, run_tag: str, rng, doc_bytes: int = 64 * 1024, mismatch_rate: float = 0.1) -> dict:
+    """
+    {"form": /signup fields, "files": {form field: (filename, pdf bytes)}, "company": name}.
+    Emails, LEIs and registration numbers embed run_tag and index, so runs do
+    not collide on unique columns or hit each other's LLM cache entries.
+    """
+    company = f"{_word(rng)} {_word(rng)} {rng.choice(_COMPANY_KINDS)}"
+    domain = f"{company.split()[0].lower()}{index}-{run_tag}.example.com"
+    country, state, city, zip_code = rng.choice(_COUNTRIES)
+    registration = f"{country}-{run_tag.upper()}-{index:06d}"
+    ein = f"{rng.randint(10, 99)}-{rng.randint(1000000, 9999999)}"
+    lei = f"BENCH{run_tag.upper()[:6]:0<6}{index % 10 ** 9:09d}"       # 20 characters
+    directors = [{"full_name": _person(rng), "role": role, "nationality": country, "country_of_residence": country}
+                 for role in ["Director", "Chief Executive Officer", "Chief Compliance Officer"][:rng.randint(2, 3)]]
+    stakes = [60, 40] if rng.random() < 0.5 else [100]
+    ubos = [{"full_name": _person(rng), "stake_percent": stake, "nationality": country,
+             "country_of_residence": country, "date_of_birth": f"19{rng.randint(50, 95)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+             "is_pep": False, "tax_id": f"TX{rng.randint(100000, 999999)}"} for stake in stakes]
+
+    declared_registration = registration
+    if rng.random() < mismatch_rate:
+        declared_registration = registration[:-1] + str((int(registration[-1]) + 1) % 10)
+
+    pad = max(0, doc_bytes)
+    files = {
+        "file_incorporation": ("certificate_of_incorporation.pdf", render_pdf("Certificate of Incorporation", [
+            f"Legal Name: {company}", f"Registration Number: {registration}",
+            f"Jurisdiction: {country}", "Date of Incorporation: 2012-05-15"], pad)),
+        "file_bod": ("bod_list.pdf", render_pdf("Board of Directors", [
+            f"Company: {company}", *[f"Director: {d['full_name']} ({d['role']})" for d in directors]], pad)),
+        "file_ownership": ("ownership_structure.pdf", render_pdf("Ownership Structure", [
+            f"Company: {company}", *[f"Beneficial Owner: {u['full_name']} ({u['stake_percent']}%)" for u in ubos]], pad)),
+        "file_ein": ("ein_certificate.pdf", render_pdf("EIN Confirmation", [
+            f"Company: {company}", f"Employer Identification Number: {ein}"], pad)),
+        "file_financials": ("financials_2024.pdf", render_pdf("Audited Financial Statements 2024", [
+            f"Company: {company}", f"Revenue: {rng.randint(5, 900)}.{rng.randint(0, 9)}M"], pad)),
+        "file_bank_statement": ("bank_statement.pdf", render_pdf("Bank Statement", [
+            f"Account Holder: {company}", f"Closing Balance: {rng.randint(100000, 9000000)}.00"], pad)),
+    }
+    form = {
+        "fname": directors[0]["full_name"].split()[0], "lname": directors[0]["full_name"].split()[-1],
+        "email": f"compliance.{index}@{domain}",
+        "company": company, "address": f"{rng.randint(1, 400)} {_word(rng)} Street", "country": country,
+        "state": state, "city": city, "zip": zip_code, "phone": f"+1{rng.randint(2000000000, 9999999999)}",
+        "lei": lei, "entity_type": rng.choice(_ENTITY_TYPES), "registration_number": declared_registration,
+        "incorporation_date": "2012-05-15", "ownership_type": "Private" if len(ubos) > 1 else "Subsidiary",
+        "regulatory_status": "regulated", "regulatory_authority": "Financial Conduct Authority",
+        "website": f"https://www.{domain}",
+        "directors": json.dumps(directors), "ubos": json.dumps(ubos),
+        "product": "custody", "business_activity": "Securities trading and custody",
+        "source_of_funds": "Operating revenues", "source_of_wealth": "Retained earnings",
+        "expected_volume": "$10M - $100M", "countries_operation": f"{country}, GB, US",
+        "tax_residency_country": country, "sanctions": "no", "pep_declaration": "no", "aml": "yes",
+        "aml_program_description": "Board-approved AML program with annual independent audit",
+        "trading_address_different": "no", "adverse_media_consent": "yes",
+        "ein_number": ein, "bank_name": f"{_word(rng)} Bank",
+    }
+    return {"form": form, "files": files, "company": company}
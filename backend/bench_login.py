@@ -0,0 +1,84 @@
+"""
+Benchmark: login latency with bcrypt inline on the event loop vs the
+password_hasher process pool, under concurrent requests.
+
+For each mode it fires --concurrency logins at once (--rounds times) while a
+probe coroutine measures event-loop responsiveness (what every other request
+on the same worker experiences). A final round replays the same wrong
+password to show the negative cache.
+
+Usage (from repo root):  python -m backend.bench_login [--concurrency 32] [--rounds 5] [--cost 12]
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import bcrypt
+
+from backend import password_hasher
+
+
+def _pct(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+async def _probe(stop, lags):
+    """Schedules a no-op every 5ms and records how late it actually runs."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append((time.perf_counter() - start - 0.005) * 1000)
+
+
+async def _login_inline(password, hashed):
+    start = time.perf_counter()
+    bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    return (time.perf_counter() - start) * 1000
+
+
+async def _login_pool(password, hashed):
+    start = time.perf_counter()
+    await password_hasher.verify_password(password, hashed)
+    return (time.perf_counter() - start) * 1000
+
+
+async def _run(label, login, password, hashed, concurrency, rounds):
+    stop, lags, latencies = asyncio.Event(), [], []
+    probe = asyncio.create_task(_probe(stop, lags))
+    wall = time.perf_counter()
+    for _ in range(rounds):
+        round_start = time.perf_counter()
+        await asyncio.gather(*(login(password, hashed) for _ in range(concurrency)))
+        # Request latency = time from the burst arriving until this login finished
+        latencies.append((time.perf_counter() - round_start) * 1000)
+    wall = (time.perf_counter() - wall) * 1000
+    stop.set()
+    await probe
+    print(f"{label:<28} burst p50 {statistics.median(latencies):8.1f}ms  p99 {_pct(latencies, 99):8.1f}ms  "
+          f"loop lag p99 {_pct(lags or [0], 99):8.1f}ms  max {max(lags or [0]):8.1f}ms  total {wall:8.0f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--cost", type=int, default=12, help="bcrypt cost factor (gensalt rounds)")
+    args = parser.parse_args()
+
+    hashed = bcrypt.hashpw(b"correct horse", bcrypt.gensalt(args.cost)).decode('utf-8')
+    await asyncio.to_thread(password_hasher.start)
+    print(f"{args.concurrency} concurrent logins x {args.rounds} rounds, cost {args.cost}, "
+          f"{password_hasher.PASSWORD_HASH_WORKERS} hashing processes\n")
+    try:
+        await _run("inline bcrypt (before)", _login_inline, "correct horse", hashed, args.concurrency, args.rounds)
+        await _run("process pool", _login_pool, "correct horse", hashed, args.concurrency, args.rounds)
+        await _run("pool, repeated bad password", _login_pool, "wrong", hashed, args.concurrency, args.rounds)
+    finally:
+        password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
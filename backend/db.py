@@ -2,9 +2,9 @@ import os
 import secrets
 import psycopg2
 from datetime import datetime, timedelta
-from psycopg2 import pool
 from dotenv import load_dotenv
 from .logger import logger_db as logger
+from .db_pool import ConnectionPool, PoolTimeout
 
 # Load database environment variables
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.dbenv'))
@@ -21,10 +21,19 @@ DB_INIT_COMMAND = os.getenv("DB_INIT_COMMAND", "SET SESSION CHARACTERISTICS AS T
 S3_BUCKET_NAME = os.getenv("S3_BUCKET_NAME", "kinetix-onboarding-docs")
 AWS_REGION = os.getenv("AWS_REGION", "us-west-2")
 
-# Connection pool
-try:
-    connection_pool = psycopg2.pool.SimpleConnectionPool(
-        1, 10,
+# LISTEN/NOTIFY channel for ticket status transitions and new agent log rows
+TICKET_EVENTS_CHANNEL = os.getenv("TICKET_EVENTS_CHANNEL", "aml_ticket_events")
+
+# Connection pool sizing and health (shared with async_db)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_MAX_LIFETIME = int(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))        # seconds before a connection is recycled
+DB_POOL_IDLE_TIMEOUT = int(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))         # idle seconds before closing extras above min
+DB_POOL_VALIDATE_AFTER = int(os.getenv("DB_POOL_VALIDATE_AFTER", "30"))      # idle seconds before a SELECT 1 ping on checkout
+DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", "10"))  # seconds to wait when the pool is full
+
+def _connect():
+    return psycopg2.connect(
         user=DB_USER,
         password=DB_PASSWORD,
         host=DB_HOST,
@@ -32,25 +41,50 @@ try:
         database=DB_NAME,
         sslmode=DB_SSL_MODE
     )
-    if connection_pool:
-        logger.info("Connection pool created successfully")
+
+# Connection pool
+try:
+    connection_pool = ConnectionPool(
+        _connect,
+        minconn=DB_POOL_MIN_SIZE,
+        maxconn=DB_POOL_MAX_SIZE,
+        session_init=[DB_INIT_COMMAND, "SET search_path TO client_onboarding, public;"],
+        max_lifetime=DB_POOL_MAX_LIFETIME,
+        idle_timeout=DB_POOL_IDLE_TIMEOUT,
+        validate_after=DB_POOL_VALIDATE_AFTER,
+        checkout_timeout=DB_POOL_CHECKOUT_TIMEOUT,
+        logger=logger
+    )
+    logger.info(f"Connection pool created successfully (min={DB_POOL_MIN_SIZE}, max={DB_POOL_MAX_SIZE})")
 except (Exception, psycopg2.DatabaseError) as error:
     logger.error(f"Error while connecting to PostgreSQL: {error}")
     connection_pool = None
 
 def get_connection():
+    """
+    Checks out a pooled connection. Session settings (DB_INIT_COMMAND, search_path)
+    are applied once when the physical connection is opened, not per checkout.
+    Returns None if the pool is unavailable or exhausted past DB_POOL_CHECKOUT_TIMEOUT.
+    """
     if connection_pool:
-        conn = connection_pool.getconn()
-        with conn.cursor() as cursor:
-            cursor.execute(DB_INIT_COMMAND)
-            cursor.execute("SET search_path TO client_onboarding, public;")
-        return conn
+        try:
+            return connection_pool.getconn()
+        except PoolTimeout as e:
+            logger.error(f"Connection pool exhausted: {e}")
+        except (Exception, psycopg2.DatabaseError) as e:
+            logger.error(f"Error checking out connection: {e}")
     return None
 
 def release_connection(conn):
-    if connection_pool:
+    if connection_pool and conn is not None:
         connection_pool.putconn(conn)
 
+def get_pool_stats():
+    """Checkout wait times, in-use/idle counts and exhaustion events for the sync pool."""
+    if connection_pool:
+        return connection_pool.stats()
+    return {}
+
 def generate_tracking_id(cursor):
     """Generates a sequential tracking ID from the database sequence."""
     cursor.execute("SELECT nextval('client_onboarding.onboarding_tracking_seq')")
@@ -172,6 +206,19 @@ def save_onboarding_details(data, ip=None, workstation=None, provided_tracking_i
             ))
             onboarding_id = cursor.fetchone()[0]
 
+            # 1b. Content hashes of the uploaded documents (see document_store.py)
+            for doc_field, doc in (data.get('documents') or {}).items():
+                cursor.execute(
+                    """INSERT INTO client_onboarding.document_blobs (sha256, s3_uri, size_bytes)
+                       VALUES (%s, %s, %s) ON CONFLICT (sha256) DO NOTHING""",
+                    (doc['sha256'], doc['uri'], doc['size'])
+                )
+                cursor.execute(
+                    """INSERT INTO client_onboarding.onboarding_documents (onboarding_id, doc_field, sha256)
+                       VALUES (%s, %s, %s)""",
+                    (onboarding_id, doc_field, doc['sha256'])
+                )
+
             # 2. Insert directors
             directors = data.get('directors', [])
             for d in directors:
@@ -257,26 +304,80 @@ def get_all_tickets(status_filter=None):
     finally:
         release_connection(conn)
 
+# Explicit detail column list: legacy BYTEA *_content columns are never shipped,
+# only a FILE_BLOB_<n>_BYTES marker built from octet_length (no detoasting).
+_TICKET_DETAIL_SQL = """
+    SELECT
+        d.id, d.user_id, d.tracking_id, d.status, d.email, d.phone_number,
+        d.company_name, d.lei_identifier, d.entity_type, d.registration_number,
+        d.incorporation_date, d.ownership_type, d.regulatory_status, d.regulatory_authority,
+        d.business_need, d.dba_name, d.ein_number,
+        d.company_address, d.city, d.state, d.country, d.zip_code, d.trading_address,
+        d.bod_list_s3_uri, d.financials_s3_uri, d.ownership_s3_uri, d.incorporation_doc_s3_uri,
+        d.bank_statement_s3_uri, d.ein_certificate_s3_uri, d.ubo_id_s3_uri,
+        'FILE_BLOB_' || octet_length(d.bod_list_content) || '_BYTES' AS bod_list_content,
+        'FILE_BLOB_' || octet_length(d.financials_content) || '_BYTES' AS financials_content,
+        'FILE_BLOB_' || octet_length(d.ownership_content) || '_BYTES' AS ownership_content,
+        'FILE_BLOB_' || octet_length(d.incorporation_doc_content) || '_BYTES' AS incorporation_doc_content,
+        d.business_activity, d.source_of_funds, d.source_of_wealth, d.expected_volume,
+        d.countries_operation, d.tax_residency_country, d.correspondent_bank,
+        d.aml_program_description, d.pep_declaration, d.adverse_media_consent,
+        d.routing_number, d.account_number, d.bank_name, d.mcc_code,
+        d.aml_questions, d.ai_risk_level, d.website, d.submitted_at, d.updated_at,
+        COALESCE((
+            SELECT json_agg(h ORDER BY h.action_timestamp DESC)
+            FROM (
+                SELECT id, onboarding_id, old_status, new_status, action_by,
+                       action_timestamp, ip_address, workstation_info, remarks
+                FROM client_onboarding.onboarding_audit_log
+                WHERE onboarding_id = d.id
+            ) h
+        ), '[]'::json) AS history,
+        COALESCE((
+            SELECT json_agg(json_build_object(
+                'full_name', dir.full_name, 'role', dir.role,
+                'nationality', dir.nationality, 'country_of_residence', dir.country_of_residence
+            ))
+            FROM client_onboarding.onboarding_directors dir
+            WHERE dir.onboarding_id = d.id
+        ), '[]'::json) AS directors,
+        COALESCE((
+            SELECT json_agg(json_build_object(
+                'full_name', u.full_name, 'stake_percent', u.stake_percent,
+                'nationality', u.nationality, 'country_of_residence', u.country_of_residence,
+                'date_of_birth', u.date_of_birth, 'is_pep', u.is_pep, 'tax_id', u.tax_id
+            ))
+            FROM client_onboarding.onboarding_ubos u
+            WHERE u.onboarding_id = d.id
+        ), '[]'::json) AS ubos
+    FROM client_onboarding.onboarding_details d
+    WHERE d.id = {param}
+"""
+
+# Poller-sized projection: enough to drive status badges and action routing
+_TICKET_STATUS_SQL = """
+    SELECT id, tracking_id, status, ai_risk_level, email, updated_at
+    FROM client_onboarding.onboarding_details
+    WHERE id = {param}
+"""
+
 def get_ticket_by_id(onboarding_id):
-    """Fetches full details of a single ticket including related UBOs and directors."""
+    """
+    Fetches full details of a single ticket including audit history, UBOs and directors.
+    One round-trip: related rows are aggregated as JSON and document blobs are skipped.
+    """
     conn = get_connection()
     if not conn:
         return None
     try:
         with conn.cursor() as cursor:
-            query = "SELECT * FROM client_onboarding.onboarding_details WHERE id = %s"
-            cursor.execute(query, (onboarding_id,))
+            cursor.execute(_TICKET_DETAIL_SQL.format(param="%s"), (onboarding_id,))
             row = cursor.fetchone()
             if not row:
                 return None
             columns = [desc[0] for desc in cursor.description]
             ticket = dict(zip(columns, row))
 
-            # Binary fields cleanup (Legacy - keeping for fallback)
-            for key in ['bod_list_content', 'financials_content', 'ownership_content', 'incorporation_doc_content']:
-                if ticket.get(key):
-                    ticket[key] = f"FILE_BLOB_{len(ticket[key])}_BYTES"
-
             # Parse aml_questions JSONB
             if ticket.get('aml_questions') and isinstance(ticket['aml_questions'], str):
                 try:
@@ -284,33 +385,6 @@ def get_ticket_by_id(onboarding_id):
                 except:
                     pass
 
-            # Fetch audit history
-            audit_query = """
-                SELECT id, onboarding_id, old_status, new_status, action_by,
-                       action_timestamp, ip_address, workstation_info, remarks
-                FROM client_onboarding.onboarding_audit_log
-                WHERE onboarding_id = %s ORDER BY action_timestamp DESC
-            """
-            cursor.execute(audit_query, (onboarding_id,))
-            audit_cols = [desc[0] for desc in cursor.description]
-            ticket['history'] = [dict(zip(audit_cols, r)) for r in cursor.fetchall()]
-
-            # Fetch directors
-            cursor.execute(
-                "SELECT full_name, role, nationality, country_of_residence FROM client_onboarding.onboarding_directors WHERE onboarding_id = %s",
-                (onboarding_id,)
-            )
-            dir_cols = [desc[0] for desc in cursor.description]
-            ticket['directors'] = [dict(zip(dir_cols, r)) for r in cursor.fetchall()]
-
-            # Fetch UBOs
-            cursor.execute(
-                "SELECT full_name, stake_percent, nationality, country_of_residence, date_of_birth, is_pep, tax_id FROM client_onboarding.onboarding_ubos WHERE onboarding_id = %s",
-                (onboarding_id,)
-            )
-            ubo_cols = [desc[0] for desc in cursor.description]
-            ticket['ubos'] = [dict(zip(ubo_cols, r)) for r in cursor.fetchall()]
-
             return ticket
     except Exception as e:
         print(f"Error fetching ticket detail: {e}")
@@ -318,6 +392,25 @@ def get_ticket_by_id(onboarding_id):
     finally:
         release_connection(conn)
 
+def get_ticket_status(onboarding_id):
+    """Lightweight status lookup for pollers: id, tracking_id, status, ai_risk_level, email, updated_at."""
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(_TICKET_STATUS_SQL.format(param="%s"), (onboarding_id,))
+            row = cursor.fetchone()
+            if not row:
+                return None
+            columns = [desc[0] for desc in cursor.description]
+            return dict(zip(columns, row))
+    except Exception as e:
+        print(f"Error fetching ticket status: {e}")
+        return None
+    finally:
+        release_connection(conn)
+
 def get_user_by_email(email):
     """Fetches user details and their roles for authentication."""
     conn = get_connection()
@@ -350,6 +443,42 @@ def get_user_by_email(email):
     finally:
         release_connection(conn)
 
+def notify_ticket_event(cursor, event: dict):
+    """
+    Queues a NOTIFY on TICKET_EVENTS_CHANNEL inside the caller's transaction,
+    so listeners only see it once the change is committed. Payloads carry ids
+    only; subscribers read the rows themselves (NOTIFY payloads cap at 8000 bytes).
+    """
+    import json as _json
+    cursor.execute("SELECT pg_notify(%s, %s)", (TICKET_EVENTS_CHANNEL, _json.dumps(event)))
+
+# NOTIFY payloads are capped at 8000 bytes; larger live events are sent without their value
+_MAX_EVENT_BYTES = 7500
+
+def publish_ticket_event(event: dict) -> bool:
+    """
+    Sends a transient event (not backed by a row, e.g. partial agent output)
+    to ticket subscribers immediately, outside any business transaction.
+    """
+    import json as _json
+    if len(_json.dumps(event, default=str)) > _MAX_EVENT_BYTES:
+        event = {k: v for k, v in event.items() if k != "value"}
+        event["truncated"] = True
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", (TICKET_EVENTS_CHANNEL, _json.dumps(event, default=str)))
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.warning(f"publish_ticket_event failed: {e}")
+        conn.rollback()
+        return False
+    finally:
+        release_connection(conn)
+
 def update_onboarding_status(onboarding_id, new_status, action_by=None, ip=None, workstation=None, remarks=None):
     """Updates ticket status and logs the audit entry."""
     conn = get_connection()
@@ -372,6 +501,10 @@ def update_onboarding_status(onboarding_id, new_status, action_by=None, ip=None,
                 ) VALUES (%s, %s, %s, %s, %s, %s, %s)
             """
             cursor.execute(audit_query, (onboarding_id, old_status, new_status, action_by, ip, workstation, remarks))
+            notify_ticket_event(cursor, {
+                "type": "status", "onboarding_id": str(onboarding_id),
+                "old_status": old_status, "new_status": new_status
+            })
 
             conn.commit()
             return True, "Status updated successfully"
@@ -468,6 +601,7 @@ def insert_agent_log(log_data: dict) -> bool:
                     input_context, output, flags, risk_level, recommendation,
                     ai_summary, model_used, duration_ms
                 ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
             """, (
                 log_data.get("run_id"),
                 log_data.get("onboarding_id"),
@@ -483,6 +617,10 @@ def insert_agent_log(log_data: dict) -> bool:
                 log_data.get("model_used", "rule-based"),
                 log_data.get("duration_ms", 0)
             ))
+            log_id = cursor.fetchone()[0]
+            notify_ticket_event(cursor, {
+                "type": "agent_log", "onboarding_id": str(log_data.get("onboarding_id")), "id": str(log_id)
+            })
         conn.commit()
         return True
     except Exception as e:
@@ -494,6 +632,72 @@ def insert_agent_log(log_data: dict) -> bool:
         release_connection(conn)
 
 
+def write_agent_logs(cursor, rows: list):
+    """
+    Inserts ai_agent_logs rows (and their NOTIFYs) in one statement on the
+    caller's cursor. Does not commit, so the rows can be part of a larger
+    transaction.
+    """
+    import json as _json
+    params = []
+    for log_data in rows:
+        params.extend((
+            log_data["id"],
+            log_data.get("run_id"),
+            log_data.get("onboarding_id"),
+            log_data.get("agent_name"),
+            log_data.get("stage"),
+            log_data.get("check_name"),
+            _json.dumps(log_data.get("input_context", {})),
+            _json.dumps(log_data.get("output", {})),
+            log_data.get("flags", []),
+            log_data.get("risk_level"),
+            log_data.get("recommendation"),
+            log_data.get("ai_summary"),
+            log_data.get("model_used", "rule-based"),
+            log_data.get("duration_ms", 0),
+            log_data["created_at"],
+        ))
+    values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s::text[], %s, %s, %s, %s, %s, %s)"] * len(rows))
+    cursor.execute(f"""
+        INSERT INTO client_onboarding.ai_agent_logs (
+            id, run_id, onboarding_id, agent_name, stage, check_name,
+            input_context, output, flags, risk_level, recommendation,
+            ai_summary, model_used, duration_ms, created_at
+        ) VALUES {values}
+    """, params)
+    # One NOTIFY per row, queued in a single round trip
+    cursor.execute("SELECT pg_notify(%s, e) FROM unnest(%s::text[]) AS e", (
+        TICKET_EVENTS_CHANNEL,
+        [_json.dumps({"type": "agent_log", "onboarding_id": str(r.get("onboarding_id")), "id": str(r["id"])})
+         for r in rows],
+    ))
+
+
+def insert_agent_logs(rows: list) -> bool:
+    """
+    Inserts many ai_agent_logs rows in one statement and one transaction
+    (see agents/agent_log_buffer.py). Rows carry their own id and created_at
+    so ordering matches the order the checks finished, not the flush time.
+    """
+    if not rows:
+        return True
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cursor:
+            write_agent_logs(cursor, rows)
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"[DB] insert_agent_logs failed for {len(rows)} row(s): {e}")
+        conn.rollback()
+        return False
+    finally:
+        release_connection(conn)
+
+
 def get_agent_logs(onboarding_id: str) -> list:
     """Returns all ai_agent_logs rows for a given onboarding_id, ordered by created_at ASC."""
     import json as _json
@@ -566,3 +770,85 @@ def get_onboarding_by_user_id(user_id: str) -> dict | None:
         return None
     finally:
         release_connection(conn)
+
+
+def get_document_hashes(onboarding_id: str) -> dict:
+    """Returns {doc_field: sha256} for the documents recorded at signup (empty for older tickets)."""
+    conn = get_connection()
+    if not conn:
+        return {}
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT doc_field, sha256 FROM client_onboarding.onboarding_documents
+                WHERE onboarding_id = %s
+            """, (onboarding_id,))
+            return {field: sha256 for field, sha256 in cursor.fetchall()}
+    except Exception as e:
+        logger.error(f"get_document_hashes failed for ticket {onboarding_id}: {e}")
+        return {}
+    finally:
+        release_connection(conn)
+
+
+def get_document_extractions(keys, extractor_version: str) -> dict:
+    """
+    Looks up cached OCR results. keys: iterable of (sha256, doc_type).
+    Returns {(sha256, doc_type): result dict} for the ones already extracted.
+    """
+    import json as _json
+    keys = [k for k in keys if k[0]]
+    if not keys:
+        return {}
+    conn = get_connection()
+    if not conn:
+        return {}
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT sha256, doc_type, result FROM client_onboarding.document_extractions
+                WHERE (sha256, doc_type) IN (SELECT * FROM unnest(%s::text[], %s::text[]))
+                  AND extractor_version = %s
+            """, ([k[0] for k in keys], [k[1] for k in keys], extractor_version))
+            found = {}
+            for sha256, doc_type, result in cursor.fetchall():
+                found[(sha256, doc_type)] = _json.loads(result) if isinstance(result, str) else result
+            if found:
+                cursor.execute("""
+                    UPDATE client_onboarding.document_extractions
+                    SET hit_count = hit_count + 1, last_used_at = CURRENT_TIMESTAMP
+                    WHERE (sha256, doc_type) IN (SELECT * FROM unnest(%s::text[], %s::text[]))
+                      AND extractor_version = %s
+                """, ([k[0] for k in found], [k[1] for k in found], extractor_version))
+        conn.commit()
+        return found
+    except Exception as e:
+        logger.error(f"get_document_extractions failed: {e}")
+        conn.rollback()
+        return {}
+    finally:
+        release_connection(conn)
+
+
+def save_document_extraction(sha256: str, doc_type: str, extractor_version: str, result: dict, model_used: str = None) -> bool:
+    """Stores the OCR result for one document hash; an existing entry is kept."""
+    import json as _json
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO client_onboarding.document_extractions
+                    (sha256, doc_type, extractor_version, result, model_used)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (sha256, doc_type, extractor_version) DO NOTHING
+            """, (sha256, doc_type, extractor_version, _json.dumps(result), model_used))
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"save_document_extraction failed for {sha256[:12]}/{doc_type}: {e}")
+        conn.rollback()
+        return False
+    finally:
+        release_connection(conn)
@@ -0,0 +1,252 @@
+"""
+Thread-safe PostgreSQL connection pool for the synchronous db.py layer.
+Replaces psycopg2's SimpleConnectionPool, which is not safe to share between
+FastAPI background tasks and threadpool workers.
+
+- Session settings run once per physical connection, not on every checkout.
+- Connections idle for longer than `validate_after` are pinged before reuse.
+- Connections are recycled after `max_lifetime` and idle ones above `minconn`
+  are closed after `idle_timeout`.
+- When the pool is at `maxconn`, callers wait up to `checkout_timeout` instead
+  of failing immediately with "connection pool exhausted".
+- stats() exposes checkout wait time, in-use count and exhaustion events.
+"""
+
+import threading
+import time
+from collections import deque
+
+from psycopg2 import extensions
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    def __init__(self, connect, minconn=1, maxconn=10, session_init=(),
+                 max_lifetime=1800, idle_timeout=300, validate_after=30,
+                 checkout_timeout=10, logger=None):
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.session_init = list(session_init)
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.validate_after = validate_after
+        self.checkout_timeout = checkout_timeout
+        self._logger = logger
+
+        self._cond = threading.Condition()
+        self._idle = deque()          # (conn, created_at, last_used)
+        self._created = {}            # id(conn) -> created_at, for every open connection
+        self._checked_out = set()     # id(conn) of connections handed out and not yet returned
+        self._in_use = 0
+        self._opening = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "wait_ms_last": 0.0,
+            "exhaustion_events": 0,
+            "timeouts": 0,
+            "connections_opened": 0,
+            "connections_recycled": 0,
+            "validation_failures": 0,
+        }
+
+        for _ in range(minconn):
+            conn = self._open()
+            self._idle.append((conn, self._created[id(conn)], time.monotonic()))
+
+    # -- internals -------------------------------------------------------
+
+    def _log(self, level, msg):
+        if self._logger:
+            getattr(self._logger, level)(msg)
+
+    def _open(self):
+        """Opens a physical connection and applies session settings once."""
+        conn = self._connect()
+        try:
+            with conn.cursor() as cursor:
+                for statement in self.session_init:
+                    cursor.execute(statement)
+            conn.commit()   # SET must survive later rollbacks
+        except Exception:
+            conn.close()
+            raise
+        with self._cond:
+            self._created[id(conn)] = time.monotonic()
+            self._stats["connections_opened"] += 1
+        return conn
+
+    def _discard(self, conn):
+        """Closes a connection and frees its slot. Caller must NOT hold the lock."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created.pop(id(conn), None)
+            self._cond.notify()
+
+    def _expired(self, created_at, now):
+        return self.max_lifetime and now - created_at > self.max_lifetime
+
+    def _reap_idle_locked(self, now):
+        """Removes idle connections past idle_timeout (above minconn) or max_lifetime."""
+        stale = []
+        keep = deque()
+        open_count = len(self._created)
+        for conn, created_at, last_used in self._idle:
+            too_old = self._expired(created_at, now)
+            too_idle = self.idle_timeout and now - last_used > self.idle_timeout and open_count > self.minconn
+            if too_old or too_idle or conn.closed:
+                stale.append(conn)
+                open_count -= 1
+            else:
+                keep.append((conn, created_at, last_used))
+        self._idle = keep
+        return stale
+
+    def _validate(self, conn):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    # -- public API ------------------------------------------------------
+
+    def getconn(self, timeout=None):
+        """Checks out a connection, waiting up to `timeout` seconds if the pool is full."""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        while True:
+            candidate = None
+            must_open = False
+            stale = []
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("connection pool is closed")
+                while True:
+                    now = time.monotonic()
+                    for conn in self._reap_idle_locked(now):
+                        self._created.pop(id(conn), None)
+                        self._stats["connections_recycled"] += 1
+                        stale.append(conn)
+                    if self._idle:
+                        candidate = self._idle.pop()      # LIFO keeps hot connections warm
+                        break
+                    if len(self._created) + self._opening < self.maxconn:
+                        self._opening += 1
+                        must_open = True
+                        break
+                    if not waited:
+                        waited = True
+                        self._stats["exhaustion_events"] += 1
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"no connection available within {timeout}s "
+                            f"({self._in_use} in use, max {self.maxconn})"
+                        )
+                    self._cond.wait(remaining)
+
+            for conn in stale:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+            if must_open:
+                try:
+                    conn = self._open()
+                finally:
+                    with self._cond:
+                        self._opening -= 1
+                        self._cond.notify()
+            else:
+                conn, created_at, last_used = candidate
+                if conn.closed or (time.monotonic() - last_used > self.validate_after and not self._validate(conn)):
+                    with self._cond:
+                        self._stats["validation_failures"] += 1
+                    self._log("warning", "Discarding stale pooled connection")
+                    self._discard(conn)
+                    continue
+
+            with self._cond:
+                wait_ms = (time.monotonic() - start) * 1000
+                self._in_use += 1
+                self._checked_out.add(id(conn))
+                self._stats["checkouts"] += 1
+                self._stats["wait_ms_total"] += wait_ms
+                self._stats["wait_ms_last"] = wait_ms
+                self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+            return conn
+
+    def putconn(self, conn, close=False):
+        """
+        Returns a connection; rolls back open transactions and recycles broken or old ones.
+        A connection that is not checked out (e.g. released twice) is ignored.
+        """
+        with self._cond:
+            if id(conn) not in self._checked_out:
+                self._log("error", "Ignoring release of a connection that is not checked out")
+                return
+            self._checked_out.discard(id(conn))
+            self._in_use -= 1
+            created_at = self._created.get(id(conn))
+
+        now = time.monotonic()
+        expired = created_at is not None and self._expired(created_at, now)
+        if close or self._closed or conn.closed or created_at is None or expired:
+            if expired:
+                with self._cond:
+                    self._stats["connections_recycled"] += 1
+            self._discard(conn)
+            return
+
+        try:
+            status = conn.info.transaction_status
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                self._discard(conn)
+                return
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, created_at, now))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for conn, _, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Point-in-time pool metrics."""
+        with self._cond:
+            checkouts = self._stats["checkouts"]
+            return {
+                **self._stats,
+                "wait_ms_avg": round(self._stats["wait_ms_total"] / checkouts, 3) if checkouts else 0.0,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "open": len(self._created),
+                "max": self.maxconn,
+            }
@@ -0,0 +1,292 @@
+"""
+Document Store — content-addressed storage of onboarding documents in S3
+Each document is stored once, under its SHA-256 (blobs/sha256/ab/abcd….pdf).
+The spooled upload is hashed first (cheap, local); if a blob with that hash
+already exists the S3 upload is skipped entirely, otherwise the file is read
+in UPLOAD_PART_SIZE chunks and streamed to S3 (multipart upload once it
+exceeds one part), so at most one part per file is held in memory.
+
+The per-file size limit is enforced during the hashing pass, so an oversized
+file rejects the request before anything is written. Hashes are recorded in
+client_onboarding.onboarding_documents and key the OCR extraction cache
+(document_extractions) used by the document agent.
+
+The signup documents are processed concurrently on a bounded thread pool, so
+/signup waits on the slowest upload rather than the sum of all of them.
+Works with any boto3-compatible S3 endpoint (AWS, MinIO, moto).
+"""
+
+import asyncio
+import hashlib
+import os
+from email.utils import format_datetime, parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone
+
+from botocore.exceptions import ClientError
+
+from .logger import logger_main as logger
+
+# Largest accepted document (MB)
+MAX_UPLOAD_BYTES = int(float(os.getenv("DOC_MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+
+# Multipart part size (S3 minimum for all but the last part is 5 MB)
+UPLOAD_PART_SIZE = max(5 * 1024 * 1024, int(float(os.getenv("DOC_UPLOAD_PART_MB", "8")) * 1024 * 1024))
+
+# Concurrent uploads across all requests in this process
+UPLOAD_CONCURRENCY = int(os.getenv("DOC_UPLOAD_CONCURRENCY", "8"))
+
+# Downloads: "stream" proxies bytes through the API, "presigned" redirects to S3
+DOC_DOWNLOAD_MODE = os.getenv("DOC_DOWNLOAD_MODE", "stream").lower()
+DOC_PRESIGNED_TTL = int(os.getenv("DOC_PRESIGNED_TTL_SECONDS", "300"))
+DOC_STREAM_CHUNK = int(os.getenv("DOC_STREAM_CHUNK_KB", "256")) * 1024
+
+# Key prefix for content-addressed blobs
+BLOB_PREFIX = os.getenv("DOC_BLOB_PREFIX", "blobs/sha256/")
+
+_executor = ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY, thread_name_prefix="s3-upload")
+
+
+class UploadTooLarge(Exception):
+    """Raised when a document exceeds MAX_UPLOAD_BYTES while streaming."""
+
+    def __init__(self, filename, limit):
+        super().__init__(f"{filename} exceeds the {limit // (1024 * 1024)} MB upload limit")
+        self.filename = filename
+        self.limit = limit
+
+
+def _read_exact(fileobj, size):
+    """Reads up to `size` bytes, looping over short reads."""
+    chunks, remaining = [], size
+    while remaining > 0:
+        chunk = fileobj.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def stream_to_s3(client, fileobj, bucket, key, max_bytes=MAX_UPLOAD_BYTES,
+                 part_size=UPLOAD_PART_SIZE, content_type="application/pdf"):
+    """
+    Streams a file object to s3://bucket/key. Returns {uri, bucket, key, sha256, size}.
+    Files that fit in one part use a single PutObject; larger ones use multipart
+    upload, which is aborted on any error or when max_bytes is exceeded.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    upload_id = None
+    parts = []
+
+    try:
+        chunk = _read_exact(fileobj, part_size)
+        while True:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(key.rsplit("/", 1)[-1], max_bytes)
+            digest.update(chunk)
+            next_chunk = _read_exact(fileobj, part_size) if len(chunk) == part_size else b""
+
+            if upload_id is None and not next_chunk:
+                # Whole file fits in one part: plain PUT, no multipart round-trips
+                client.put_object(
+                    Bucket=bucket, Key=key, Body=chunk, ContentType=content_type,
+                    Metadata={"sha256": digest.hexdigest()}
+                )
+                break
+
+            if upload_id is None:
+                upload_id = client.create_multipart_upload(
+                    Bucket=bucket, Key=key, ContentType=content_type
+                )["UploadId"]
+            part_number = len(parts) + 1
+            etag = client.upload_part(
+                Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=chunk
+            )["ETag"]
+            parts.append({"ETag": etag, "PartNumber": part_number})
+
+            if not next_chunk:
+                client.complete_multipart_upload(
+                    Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+                )
+                break
+            chunk = next_chunk
+    except Exception:
+        if upload_id is not None:
+            try:
+                client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+            except Exception as abort_error:
+                logger.warning(f"Failed to abort multipart upload for {key}: {abort_error}")
+        raise
+
+    return {
+        "uri": f"s3://{bucket}/{key}",
+        "bucket": bucket,
+        "key": key,
+        "sha256": digest.hexdigest(),
+        "size": size,
+    }
+
+
+def blob_key(sha256):
+    """S3 key of the blob with this content hash (two-char fan-out keeps listings short)."""
+    return f"{BLOB_PREFIX}{sha256[:2]}/{sha256}.pdf"
+
+
+def hash_file(fileobj, filename, max_bytes=MAX_UPLOAD_BYTES, chunk_size=1024 * 1024):
+    """Returns (sha256, size) of a file object, raising UploadTooLarge past max_bytes."""
+    digest = hashlib.sha256()
+    size = 0
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLarge(filename, max_bytes)
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest(), size
+
+
+def _blob_exists(client, bucket, key):
+    try:
+        client.head_object(Bucket=bucket, Key=key)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+            logger.warning(f"HEAD {key} failed, uploading anyway: {e}")
+        return False
+
+
+def store_document(client, fileobj, bucket, sha256, size, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Stores an already-hashed file under its content address.
+    Returns {uri, bucket, key, sha256, size, deduplicated}.
+    """
+    key = blob_key(sha256)
+    if _blob_exists(client, bucket, key):
+        return {"uri": f"s3://{bucket}/{key}", "bucket": bucket, "key": key,
+                "sha256": sha256, "size": size, "deduplicated": True}
+
+    result = stream_to_s3(client, fileobj, bucket, key, max_bytes)
+    if result["sha256"] != sha256:
+        # File changed between hashing and upload; never leave a blob under the wrong address
+        client.delete_object(Bucket=bucket, Key=key)
+        raise ValueError(f"Content of {key} changed during upload")
+    result["deduplicated"] = False
+    return result
+
+
+async def upload_documents(client, bucket, documents, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Hashes and stores several documents concurrently.
+    documents: {field: (fileobj, filename)}; None entries are skipped.
+    Returns {field: result dict or None}. UploadTooLarge is raised before
+    anything is uploaded so the caller can reject the request; other
+    failures are logged and yield None (as before).
+    """
+    loop = asyncio.get_running_loop()
+    present = {field: doc for field, doc in documents.items() if doc is not None}
+
+    # Pass 1: hash + size check on the spooled files
+    hashes = await asyncio.gather(*(
+        loop.run_in_executor(_executor, hash_file, fileobj, filename, max_bytes)
+        for fileobj, filename in present.values()
+    ))
+
+    # Pass 2: upload blobs that are not stored yet
+    outcomes = await asyncio.gather(*(
+        loop.run_in_executor(_executor, store_document, client, fileobj, bucket, sha256, size, max_bytes)
+        for (fileobj, _), (sha256, size) in zip(present.values(), hashes)
+    ), return_exceptions=True)
+
+    results = {field: None for field in documents}
+    for field, outcome in zip(present, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"S3 Upload failed for {field}: {outcome}", exc_info=outcome)
+        else:
+            results[field] = outcome
+    deduplicated = [f for f, r in results.items() if r and r["deduplicated"]]
+    if deduplicated:
+        logger.info(f"Reused existing blobs for {deduplicated}")
+    return results
+
+
+def parse_s3_uri(uri):
+    """s3://bucket/key -> (bucket, key)"""
+    bucket, _, key = uri[len("s3://"):].partition("/")
+    return bucket, key
+
+
+def presigned_document_url(client, uri, ttl=DOC_PRESIGNED_TTL):
+    """Short-lived GET URL for a stored document (signed locally, no S3 round-trip)."""
+    bucket, key = parse_s3_uri(uri)
+    try:
+        return client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": bucket, "Key": key, "ResponseContentType": "application/pdf",
+                    "ResponseContentDisposition": "inline"},
+            ExpiresIn=ttl,
+        )
+    except Exception as e:
+        logger.error(f"Presigning {uri} failed: {e}")
+        return None
+
+
+def open_document(client, uri, range_header=None, if_none_match=None, if_modified_since=None):
+    """
+    GetObject with the client's Range and conditional headers passed through,
+    so S3 answers 206/304 itself and only the requested bytes are fetched.
+    Returns (status, headers, body); body is a botocore StreamingBody or None.
+    Raises ClientError for anything else (e.g. NoSuchKey).
+    """
+    bucket, key = parse_s3_uri(uri)
+    params = {"Bucket": bucket, "Key": key}
+    if range_header and range_header.startswith("bytes="):
+        params["Range"] = range_header
+    if if_none_match:
+        params["IfNoneMatch"] = if_none_match
+    elif if_modified_since:
+        # If-None-Match takes precedence when both are sent (RFC 9110 13.2.2)
+        try:
+            params["IfModifiedSince"] = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            pass
+
+    try:
+        obj = client.get_object(**params)
+    except ClientError as e:
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        code = e.response.get("Error", {}).get("Code")
+        if status == 304 or code in ("304", "NotModified"):
+            return 304, {"ETag": if_none_match} if if_none_match else {}, None
+        if status == 416 or code == "InvalidRange":
+            return 416, {"Accept-Ranges": "bytes"}, None
+        raise
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(obj["ContentLength"]),
+        "Cache-Control": "private, no-cache",
+    }
+    if obj.get("ETag"):
+        headers["ETag"] = obj["ETag"]
+    if obj.get("LastModified"):
+        # botocore uses dateutil's tzutc, which format_datetime(usegmt=True) rejects
+        headers["Last-Modified"] = format_datetime(obj["LastModified"].astimezone(timezone.utc), usegmt=True)
+    if obj.get("ContentRange"):
+        headers["Content-Range"] = obj["ContentRange"]
+        return 206, headers, obj["Body"]
+    return 200, headers, obj["Body"]
+
+
+def iter_document(body, chunk_size=DOC_STREAM_CHUNK):
+    """Yields an S3 body in chunks and always releases the connection."""
+    try:
+        yield from body.iter_chunks(chunk_size)
+    finally:
+        body.close()
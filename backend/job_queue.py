@@ -0,0 +1,185 @@
+"""
+Agent Job Queue — durable PostgreSQL queue for the pipeline stages
+Jobs live in client_onboarding.agent_jobs (see db/job_queue_migration.sql).
+The API enqueues through async_db.enqueue_agent_job; workers (backend/worker.py)
+claim them here with FOR UPDATE SKIP LOCKED so any number of worker processes
+can share the table without double-processing.
+
+- At most one QUEUED/RUNNING job per (onboarding_id, job_type) — re-enqueueing
+  an active stage returns the existing job.
+- Failed jobs are retried with exponential backoff, then marked DEAD.
+- RUNNING jobs whose worker vanished are re-queued after JOB_VISIBILITY_TIMEOUT.
+"""
+
+import json
+import os
+import random
+
+from .db import get_connection, release_connection
+from .logger import logger_agents as logger
+
+# Stage types handled by the worker
+JOB_TYPES = ("document", "kyc", "aml")
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "900"))
+
+# Seconds a RUNNING job may go without finishing before it is considered abandoned
+JOB_VISIBILITY_TIMEOUT = int(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "900"))
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter for the given number of attempts made."""
+    ceiling = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def run_job(job_type: str, onboarding_id: str, payload: dict):
+    """
+    Executes one stage and its notification email. Raises on failure so the
+    caller (worker or inline background task) can decide about retries.
+    """
+    from .agents.orchestrator import run_document_agent_stage, run_kyc_stage, run_aml_risk_stage
+    from .email_utils import send_kyc_complete_email, send_aml_stage_complete_email
+
+    email = payload.get("email", "")
+    tracking_id = payload.get("tracking_id", "")
+    use_cache = payload.get("use_llm_cache", True)
+
+    if job_type == "document":
+        return run_document_agent_stage(onboarding_id, use_cache=use_cache)
+    if job_type == "kyc":
+        result = run_kyc_stage(onboarding_id, use_cache=use_cache)
+        risk = result.get("composite_risk", "UNKNOWN")
+        send_kyc_complete_email(email, tracking_id, risk)
+        return result
+    if job_type == "aml":
+        result = run_aml_risk_stage(onboarding_id, use_cache=use_cache)
+        risk = result.get("composite_risk", "UNKNOWN")
+        send_aml_stage_complete_email(email, tracking_id, risk)
+        return result
+    raise ValueError(f"Unknown job type: {job_type}")
+
+
+def claim_job(job_type: str, worker_id: str):
+    """Atomically claims the oldest due job of a type. Returns a job dict or None."""
+    conn = get_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE client_onboarding.agent_jobs j
+                SET status = 'RUNNING',
+                    attempts = j.attempts + 1,
+                    locked_by = %s,
+                    locked_at = CURRENT_TIMESTAMP,
+                    started_at = COALESCE(j.started_at, CURRENT_TIMESTAMP)
+                WHERE j.id = (
+                    SELECT id FROM client_onboarding.agent_jobs
+                    WHERE status = 'QUEUED' AND job_type = %s AND run_after <= CURRENT_TIMESTAMP
+                    ORDER BY run_after, id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING j.id, j.job_type, j.onboarding_id, j.payload, j.attempts, j.max_attempts, j.created_at
+            """, (worker_id, job_type))
+            row = cursor.fetchone()
+            conn.commit()
+            if not row:
+                return None
+            cols = [d[0] for d in cursor.description]
+            job = dict(zip(cols, row))
+            job["onboarding_id"] = str(job["onboarding_id"])
+            if isinstance(job.get("payload"), str):
+                job["payload"] = json.loads(job["payload"])
+            return job
+    except Exception as e:
+        logger.error(f"[JobQueue] claim failed for {job_type}: {e}")
+        conn.rollback()
+        return None
+    finally:
+        release_connection(conn)
+
+
+def complete_job(job_id: int) -> bool:
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE client_onboarding.agent_jobs
+                SET status = 'SUCCEEDED', finished_at = CURRENT_TIMESTAMP, locked_by = NULL, locked_at = NULL
+                WHERE id = %s
+            """, (job_id,))
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"[JobQueue] complete failed for job {job_id}: {e}")
+        conn.rollback()
+        return False
+    finally:
+        release_connection(conn)
+
+
+def fail_job(job: dict, error: str) -> str:
+    """Schedules a retry with backoff, or marks the job DEAD. Returns the new status."""
+    dead = job["attempts"] >= job["max_attempts"]
+    status = "DEAD" if dead else "QUEUED"
+    delay = 0 if dead else retry_delay(job["attempts"])
+    conn = get_connection()
+    if not conn:
+        return "RUNNING"
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE client_onboarding.agent_jobs
+                SET status = %s,
+                    last_error = %s,
+                    run_after = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                    finished_at = CASE WHEN %s THEN CURRENT_TIMESTAMP END,
+                    locked_by = NULL,
+                    locked_at = NULL
+                WHERE id = %s
+            """, (status, error[:4000], delay, dead, job["id"]))
+        conn.commit()
+        return status
+    except Exception as e:
+        logger.error(f"[JobQueue] fail update failed for job {job['id']}: {e}")
+        conn.rollback()
+        return "RUNNING"
+    finally:
+        release_connection(conn)
+
+
+def requeue_abandoned_jobs() -> int:
+    """Returns RUNNING jobs locked longer than JOB_VISIBILITY_TIMEOUT to the queue (or DEAD)."""
+    conn = get_connection()
+    if not conn:
+        return 0
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE client_onboarding.agent_jobs
+                SET status = CASE WHEN attempts >= max_attempts THEN 'DEAD' ELSE 'QUEUED' END,
+                    finished_at = CASE WHEN attempts >= max_attempts THEN CURRENT_TIMESTAMP END,
+                    last_error = 'worker lock expired',
+                    run_after = CURRENT_TIMESTAMP,
+                    locked_by = NULL,
+                    locked_at = NULL
+                WHERE status = 'RUNNING'
+                  AND locked_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+            """, (JOB_VISIBILITY_TIMEOUT,))
+            count = cursor.rowcount
+        conn.commit()
+        if count:
+            logger.warning(f"[JobQueue] Re-queued {count} abandoned job(s)")
+        return count
+    except Exception as e:
+        logger.error(f"[JobQueue] requeue failed: {e}")
+        conn.rollback()
+        return 0
+    finally:
+        release_connection(conn)
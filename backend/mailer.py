@@ -0,0 +1,465 @@
+"""
+Mailer — batched email delivery over pooled SMTP sessions
+Messages wait in client_onboarding.email_outbox (see
+db/email_outbox_migration.sql). Sender threads (started by backend/worker.py)
+claim up to EMAIL_BATCH_SIZE due messages with FOR UPDATE SKIP LOCKED and send
+them through SMTPPool, which keeps authenticated sessions open between
+batches: a bulk status change costs one STARTTLS + login, not one per email.
+
+- Sessions are health-checked with NOOP after EMAIL_SMTP_IDLE_CHECK_SECONDS
+  idle, closed after EMAIL_SMTP_MAX_IDLE_SECONDS, and recycled after
+  EMAIL_SMTP_MAX_MESSAGES so relays that cap per-connection volume are happy.
+- Transient failures are retried with exponential backoff; permanent 5xx
+  rejections and messages past max_attempts are marked DEAD.
+- Sent rows have their body cleared (it may contain a temporary password).
+"""
+
+import os
+import random
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from .db import get_connection, release_connection
+from .email_utils import (
+    SMTP_SERVER, SMTP_PORT, SMTP_USER, SMTP_PASS, SMTP_SENDER, SMTP_STARTTLS, SMTP_MOCK
+)
+from .logger import logger_main as logger
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_SMTP_POOL_SIZE = int(os.getenv("EMAIL_SMTP_POOL_SIZE", "2"))
+EMAIL_SMTP_TIMEOUT = float(os.getenv("EMAIL_SMTP_TIMEOUT_SECONDS", "30"))
+EMAIL_SMTP_MAX_MESSAGES = int(os.getenv("EMAIL_SMTP_MAX_MESSAGES", "100"))
+EMAIL_SMTP_IDLE_CHECK = float(os.getenv("EMAIL_SMTP_IDLE_CHECK_SECONDS", "30"))
+EMAIL_SMTP_MAX_IDLE = float(os.getenv("EMAIL_SMTP_MAX_IDLE_SECONDS", "240"))
+
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "2"))
+# Seconds a SENDING batch may stay locked before it is considered abandoned
+EMAIL_VISIBILITY_TIMEOUT = int(os.getenv("EMAIL_VISIBILITY_TIMEOUT_SECONDS", "300"))
+
+
+def build_message(recipient, subject, html_body, sender=None):
+    msg = MIMEMultipart()
+    msg['From'] = f"Kinetix Onboarding <{sender or SMTP_SENDER}>"
+    msg['To'] = recipient
+    msg['Subject'] = subject
+    msg.attach(MIMEText(html_body, 'html'))
+    return msg
+
+
+def is_permanent(error) -> bool:
+    """5xx replies (unknown mailbox, policy rejection) will not succeed on retry."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500 \
+        and not isinstance(error, smtplib.SMTPAuthenticationError)
+
+
+class _Session:
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class SMTPPool:
+    """Up to `size` authenticated SMTP sessions shared by the sender threads."""
+
+    def __init__(self, host=SMTP_SERVER, port=SMTP_PORT, user=SMTP_USER, password=SMTP_PASS,
+                 starttls=SMTP_STARTTLS, size=EMAIL_SMTP_POOL_SIZE, timeout=EMAIL_SMTP_TIMEOUT,
+                 sender=None):
+        self.host, self.port = host, port
+        self.user, self.password = user, password
+        self.starttls = starttls
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.sender = sender
+        self._idle = []             # LIFO: the most recently used session is the most likely alive
+        self._open = 0
+        self._cond = threading.Condition()
+        self.stats = {"connections": 0, "sent": 0, "failed": 0, "reconnects": 0}
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.starttls:
+                smtp.starttls()
+                smtp.ehlo()
+            if self.user and self.password:
+                smtp.login(self.user, self.password)
+        except Exception:
+            self._quit(smtp)
+            raise
+        with self._cond:
+            self.stats["connections"] += 1
+        return _Session(smtp)
+
+    @staticmethod
+    def _quit(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            try:
+                smtp.close()
+            except Exception:
+                pass
+
+    def _usable(self, session) -> bool:
+        idle = time.monotonic() - session.last_used
+        if idle > EMAIL_SMTP_MAX_IDLE or session.sent >= EMAIL_SMTP_MAX_MESSAGES:
+            return False
+        if idle > EMAIL_SMTP_IDLE_CHECK:
+            try:
+                return session.smtp.noop()[0] == 250
+            except Exception:
+                return False
+        return True
+
+    def _checkout(self):
+        with self._cond:
+            while not self._idle and self._open >= self.size:
+                self._cond.wait()
+            session = self._idle.pop() if self._idle else None
+            if session is None:
+                self._open += 1
+        if session is not None:
+            if self._usable(session):
+                return session
+            self._quit(session.smtp)
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def _checkin(self, session, healthy):
+        session.last_used = time.monotonic()
+        keep = healthy and session.sent < EMAIL_SMTP_MAX_MESSAGES
+        if not keep:
+            self._quit(session.smtp)
+        with self._cond:
+            if keep:
+                self._idle.append(session)
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+    def _replace(self, session):
+        """Swaps a dropped or exhausted connection for a fresh one in place."""
+        fresh = self._connect()
+        self._quit(session.smtp)
+        session.smtp, session.sent = fresh.smtp, 0
+        with self._cond:
+            self.stats["reconnects"] += 1
+
+    @contextmanager
+    def session(self):
+        session = self._checkout()
+        healthy = False
+        try:
+            yield session
+            healthy = True
+        finally:
+            self._checkin(session, healthy)
+
+    def send_batch(self, messages):
+        """
+        Sends [{id?, recipient, subject, html}] over one pooled session.
+        Returns a list of (message, error) where error is None on success.
+        A dropped connection is re-established once per batch.
+        """
+        results = []
+        broken = None
+        with self.session() as session:
+            for message in messages:
+                if broken is not None:
+                    results.append((message, broken))
+                    continue
+                if session.sent >= EMAIL_SMTP_MAX_MESSAGES:
+                    try:
+                        self._replace(session)
+                    except Exception as connect_error:
+                        broken = connect_error
+                        results.append((message, broken))
+                        continue
+                msg = build_message(message["recipient"], message["subject"], message["html"], self.sender)
+                error = None
+                for attempt in range(2):
+                    try:
+                        session.smtp.send_message(msg)
+                        session.sent += 1
+                        error = None
+                        break
+                    except smtplib.SMTPServerDisconnected as e:
+                        error = e
+                        if attempt:
+                            break
+                        try:
+                            self._replace(session)
+                        except Exception as connect_error:
+                            # Server unreachable: fail the rest of the batch without retrying each one
+                            error = broken = connect_error
+                            session.sent = EMAIL_SMTP_MAX_MESSAGES
+                            break
+                    except Exception as e:
+                        error = e
+                        # Leave the session usable for the rest of the batch
+                        try:
+                            session.smtp.rset()
+                        except Exception:
+                            pass
+                        break
+                with self._cond:
+                    self.stats["sent" if error is None else "failed"] += 1
+                results.append((message, error))
+        return results
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for session in idle:
+            self._quit(session.smtp)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> SMTPPool:
+    """Process-wide SMTP session pool built from the SMTP_* settings."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SMTPPool()
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def deliver_now(messages) -> bool:
+    """Sends immediately, bypassing the outbox (EMAIL_DELIVERY_MODE=inline)."""
+    if SMTP_MOCK:
+        for m in messages:
+            logger.info(f"[Mailer] Mock send -> {m['recipient']} | {m['subject']} (set SMTP_PASS in .dbenv for real mail)")
+        return True
+    try:
+        results = get_pool().send_batch(messages)
+    except Exception as e:
+        logger.error(f"[Mailer] SMTP session failed: {e}")
+        return False
+    for message, error in results:
+        if error:
+            logger.error(f"[Mailer] Failed to send {message['template']} to {message['recipient']}: {error}")
+    return all(error is None for _, error in results)
+
+
+# --- Outbox (client_onboarding.email_outbox) ---
+
+def retry_delay(attempts: int) -> float:
+    ceiling = min(EMAIL_RETRY_MAX_SECONDS, EMAIL_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def enqueue_emails(messages, max_attempts=EMAIL_MAX_ATTEMPTS) -> bool:
+    """Inserts rendered messages in one statement."""
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO client_onboarding.email_outbox (template, recipient, subject, html_body, max_attempts)
+                SELECT t, r, s, h, %s
+                FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[]) AS m(t, r, s, h)
+            """, (
+                max_attempts,
+                [m["template"] for m in messages], [m["recipient"] for m in messages],
+                [m["subject"] for m in messages], [m["html"] for m in messages],
+            ))
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"[Mailer] enqueue failed: {e}")
+        conn.rollback()
+        return False
+    finally:
+        release_connection(conn)
+
+
+def claim_emails(worker_id: str, limit: int = EMAIL_BATCH_SIZE) -> list:
+    """Atomically claims up to `limit` due messages."""
+    conn = get_connection()
+    if not conn:
+        return []
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE client_onboarding.email_outbox o
+                SET status = 'SENDING',
+                    attempts = o.attempts + 1,
+                    locked_by = %s,
+                    locked_at = CURRENT_TIMESTAMP
+                WHERE o.id IN (
+                    SELECT id FROM client_onboarding.email_outbox
+                    WHERE status = 'QUEUED' AND run_after <= CURRENT_TIMESTAMP
+                    ORDER BY run_after, id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT %s
+                )
+                RETURNING o.id, o.template, o.recipient, o.subject, o.html_body AS html, o.attempts, o.max_attempts
+            """, (worker_id, limit))
+            rows = cursor.fetchall()
+            cols = [d[0] for d in cursor.description]
+        conn.commit()
+        return [dict(zip(cols, row)) for row in rows]
+    except Exception as e:
+        logger.error(f"[Mailer] claim failed: {e}")
+        conn.rollback()
+        return []
+    finally:
+        release_connection(conn)
+
+
+def mark_sent(ids) -> bool:
+    if not ids:
+        return True
+    conn = get_connection()
+    if not conn:
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE client_onboarding.email_outbox
+                SET status = 'SENT', sent_at = CURRENT_TIMESTAMP, html_body = NULL,
+                    locked_by = NULL, locked_at = NULL
+                WHERE id = ANY(%s)
+            """, (list(ids),))
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error(f"[Mailer] mark_sent failed for {len(ids)} message(s): {e}")
+        conn.rollback()
+        return False
+    finally:
+        release_connection(conn)
+
+
+def mark_failed(failures) -> dict:
+    """failures: [(message, error)]. Schedules retries or marks DEAD. Returns {id: status}."""
+    updates = []
+    for message, error in failures:
+        dead = is_permanent(error) or message["attempts"] >= message["max_attempts"]
+        delay = 0 if dead else retry_delay(message["attempts"])
+        updates.append((message["id"], "DEAD" if dead else "QUEUED", delay, f"{type(error).__name__}: {error}"[:4000]))
+    if not updates:
+        return {}
+    conn = get_connection()
+    if not conn:
+        return {}
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE client_onboarding.email_outbox o
+                SET status = u.status,
+                    last_error = u.error,
+                    run_after = CURRENT_TIMESTAMP + make_interval(secs => u.delay),
+                    locked_by = NULL,
+                    locked_at = NULL
+                FROM unnest(%s::bigint[], %s::text[], %s::float8[], %s::text[]) AS u(id, status, delay, error)
+                WHERE o.id = u.id
+            """, tuple(map(list, zip(*updates))))
+        conn.commit()
+        return {u[0]: u[1] for u in updates}
+    except Exception as e:
+        logger.error(f"[Mailer] mark_failed failed: {e}")
+        conn.rollback()
+        return {}
+    finally:
+        release_connection(conn)
+
+
+def requeue_stale_emails() -> int:
+    """Returns SENDING messages locked longer than EMAIL_VISIBILITY_TIMEOUT to the queue."""
+    conn = get_connection()
+    if not conn:
+        return 0
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                UPDATE client_onboarding.email_outbox
+                SET status = CASE WHEN attempts >= max_attempts THEN 'DEAD' ELSE 'QUEUED' END,
+                    last_error = 'sender lock expired',
+                    run_after = CURRENT_TIMESTAMP,
+                    locked_by = NULL,
+                    locked_at = NULL
+                WHERE status = 'SENDING'
+                  AND locked_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+            """, (EMAIL_VISIBILITY_TIMEOUT,))
+            count = cursor.rowcount
+        conn.commit()
+        if count:
+            logger.warning(f"[Mailer] Re-queued {count} abandoned email(s)")
+        return count
+    except Exception as e:
+        logger.error(f"[Mailer] requeue failed: {e}")
+        conn.rollback()
+        return 0
+    finally:
+        release_connection(conn)
+
+
+def deliver_batch(worker_id: str, pool: SMTPPool = None, limit: int = EMAIL_BATCH_SIZE) -> int:
+    """Claims and sends one batch. Returns the number of messages claimed."""
+    batch = claim_emails(worker_id, limit)
+    if not batch:
+        return 0
+    if SMTP_MOCK:
+        for m in batch:
+            logger.info(f"[Mailer] Mock send -> {m['recipient']} | {m['subject']} (set SMTP_PASS in .dbenv for real mail)")
+        mark_sent([m["id"] for m in batch])
+        return len(batch)
+
+    try:
+        results = (pool or get_pool()).send_batch(batch)
+    except Exception as e:
+        # Could not open a session at all: the whole batch retries later
+        logger.error(f"[Mailer] SMTP session failed for batch of {len(batch)}: {e}")
+        results = [(m, e) for m in batch]
+
+    sent = [m["id"] for m, error in results if error is None]
+    failures = [(m, error) for m, error in results if error is not None]
+    mark_sent(sent)
+    statuses = mark_failed(failures)
+    for message, error in failures:
+        logger.warning(f"[Mailer] {message['template']} to {message['recipient']} failed "
+                       f"({statuses.get(message['id'], 'SENDING')}): {error}")
+    logger.info(f"[Mailer] {worker_id} sent {len(sent)}/{len(batch)} email(s)")
+    return len(batch)
+
+
+def run_sender(stop: threading.Event, worker_id: str, pool: SMTPPool = None):
+    """Sender loop: drains full batches back to back, polls when the outbox is empty."""
+    while not stop.is_set():
+        try:
+            claimed = deliver_batch(worker_id, pool)
+        except Exception as e:
+            logger.error(f"[Mailer] {worker_id} batch failed: {e}", exc_info=True)
+            claimed = 0
+        if claimed < EMAIL_BATCH_SIZE:
+            stop.wait(EMAIL_POLL_SECONDS)
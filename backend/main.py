@@ -1,59 +1,116 @@
 from fastapi import FastAPI, Form, UploadFile, File, BackgroundTasks, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, RedirectResponse
+from starlette.concurrency import run_in_threadpool
 from .logger import logger_main as logger
 import uvicorn
+import asyncio
 import json
 import os
-import boto3
-from botocore.exceptions import ClientError
+import uuid
+from datetime import date, datetime, timezone
 from pydantic import BaseModel
-import bcrypt
-from .db import (
+from contextlib import asynccontextmanager
+from .async_db import (
+    init_pool,
+    close_pool,
     save_onboarding_details,
-    get_all_tickets,
+    get_tickets_page,
+    decode_ticket_cursor,
+    TICKET_PAGE_SIZE,
     get_ticket_by_id,
+    get_ticket_status,
     update_onboarding_status,
     get_document_content,
+    get_document_uri,
     get_user_by_email,
-    get_connection,
-    release_connection,
-    get_agent_logs, get_onboarding_by_user_id,
+    update_user_password,
+    get_agent_logs, get_agent_log, get_onboarding_by_user_id,
+    enqueue_agent_job, get_job_queue_stats, get_llm_cache_stats, enqueue_emails,
+    AGENT_LOG_FIELDS, AGENT_LOG_FIELD_SETS,
     get_next_tracking_id
 )
 from .email_utils import (
-    send_confirmation_email,
-    send_status_update_email,
-    send_kyc_complete_email,
-    send_aml_stage_complete_email,
-    send_kyc_rejected_email
+    confirmation_email,
+    status_update_email,
+    kyc_rejected_email,
+    EMAIL_DELIVERY_MODE
 )
-from .agents.orchestrator import run_document_agent_stage, run_kyc_stage, run_aml_risk_stage
+from .mailer import deliver_now
+from .ticket_events import ticket_events
+from .aws_clients import get_client
+from . import password_hasher
+from .password_hasher import (
+    hash_password, verify_password,
+    is_known_unknown_user, remember_unknown_user, forget_unknown_user
+)
+from .agents import rate_limiter
+from .job_queue import run_job
+from .document_store import (
+    upload_documents, UploadTooLarge,
+    open_document, iter_document, presigned_document_url, DOC_DOWNLOAD_MODE
+)
+
+# "queue": stages go to client_onboarding.agent_jobs for backend/worker.py (default)
+# "inline": stages run as FastAPI background tasks in this process (local development)
+AGENT_JOBS_MODE = os.getenv("AGENT_JOBS_MODE", "queue").lower()
+
+
+def _run_stage_inline(job_type: str, onboarding_id: str, payload: dict):
+    """Background task used when AGENT_JOBS_MODE=inline."""
+    try:
+        run_job(job_type, onboarding_id, payload)
+    except Exception as e:
+        logger.error(f"{job_type} background task failed for {onboarding_id}: {e}", exc_info=True)
+
+
+async def schedule_stage(background_tasks: BackgroundTasks, job_type: str, onboarding_id: str,
+                         email: str, tracking_id: str, use_llm_cache: bool = True):
+    """Queues an agent stage (idempotent per ticket and stage) or runs it in-process."""
+    payload = {"email": email, "tracking_id": tracking_id}
+    if not use_llm_cache:
+        payload["use_llm_cache"] = False
+    if AGENT_JOBS_MODE == "inline":
+        background_tasks.add_task(_run_stage_inline, job_type, onboarding_id, payload)
+        return
+    job_id, created = await enqueue_agent_job(job_type, onboarding_id, payload)
+    if job_id is None:
+        raise HTTPException(status_code=503, detail=f"Could not queue {job_type} stage")
+    if not created:
+        logger.info(f"{job_type} stage already queued for {onboarding_id} (job {job_id})")
+
+
+async def send_emails(background_tasks: BackgroundTasks, *messages):
+    """Queues notification emails on the outbox, or sends them after the response in inline mode."""
+    messages = [m for m in messages if m and m.get("recipient")]
+    if not messages:
+        return
+    if EMAIL_DELIVERY_MODE == "inline":
+        background_tasks.add_task(deliver_now, messages)
+        return
+    if not await enqueue_emails(messages):
+        logger.error(f"Could not queue email(s): {[(m['template'], m['recipient']) for m in messages]}")
+
 
 class ActionRequest(BaseModel):
     action: str
     remarks: str = None
 
-# S3 Client Configuration
+# S3 Client Configuration (shared client from the registry; see aws_clients.py)
 S3_BUCKET = os.getenv("S3_BUCKET_NAME", "kinetix-onboarding-docs")
-s3_client = boto3.client(
-    's3', 
-    aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-    aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
-    aws_session_token=os.getenv("AWS_SESSION_TOKEN"),
-    region_name=os.getenv("AWS_REGION", "us-west-2")
-)
 
-def upload_to_s3(file_obj, onboarding_id, filename):
-    """Uploads a file to S3 and returns the S3 URI."""
-    s3_key = f"uploads/{onboarding_id}/{filename}"
-    try:
-        s3_client.upload_fileobj(file_obj, S3_BUCKET, s3_key)
-        return f"s3://{S3_BUCKET}/{s3_key}"
-    except ClientError as e:
-        logger.error(f"S3 Upload failed for {filename} (Onboarding ID: {onboarding_id}): {e}", exc_info=True)
-        return None
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_pool()
+    await ticket_events.start()
+    await asyncio.to_thread(password_hasher.start)
+    yield
+    password_hasher.shutdown()
+    await ticket_events.stop()
+    await close_pool()
+
 
-app = FastAPI(title="Kinetix AML Onboarding Backend")
+app = FastAPI(title="Kinetix AML Onboarding Backend", lifespan=lifespan)
 
 # Enable CORS for frontend interaction
 app.add_middleware(
@@ -121,15 +178,6 @@ async def signup(
     mcc_code: str = Form(None),
     bank_name: str = Form(None),
 ):
-    # Read file contents
-    bod_content = await file_bod.read()
-    financials_content = await file_financials.read()
-    ownership_content = await file_ownership.read()
-    incorporation_content = await file_incorporation.read() if file_incorporation else None
-    bank_statement_content = await file_bank_statement.read() if file_bank_statement else None
-    ein_content = await file_ein.read() if file_ein else None
-    ubo_id_content = await file_ubo_id.read() if file_ubo_id else None
-
     # Parse JSON fields from frontend
     try:
         directors_list = json.loads(directors)
@@ -148,43 +196,30 @@ async def signup(
         "trading_address_different": trading_address_different,
     }
 
-    # Pre-generate Tracking ID to use as S3 folder name (organized auditing)
-    tracking_id = get_next_tracking_id()
+    # Pre-generate Tracking ID (returned to the applicant and used in notifications)
+    tracking_id = await get_next_tracking_id()
     if not tracking_id:
-        logger.error("Failed to pre-generate tracking ID for S3 upload")
+        logger.error("Failed to pre-generate tracking ID")
         raise HTTPException(status_code=500, detail="Internal server error pre-generating ID")
 
-    folder_id = tracking_id
-
-    # Stream uploads to S3
-    # Reset file pointers to 0 before upload since they might have been read
-    await file_bod.seek(0)
-    bod_s3_uri = upload_to_s3(file_bod.file, folder_id, "bod_list.pdf")
-    
-    await file_financials.seek(0)
-    financials_s3_uri = upload_to_s3(file_financials.file, folder_id, "financials_2024.pdf")
-    
-    await file_ownership.seek(0)
-    ownership_s3_uri = upload_to_s3(file_ownership.file, folder_id, "ownership_structure.pdf")
-    
-    if file_incorporation:
-        await file_incorporation.seek(0)
-        incorporation_s3_uri = upload_to_s3(file_incorporation.file, folder_id, "certificate_of_incorporation.pdf")
-
-    bank_statement_s3_uri = None
-    if file_bank_statement:
-        await file_bank_statement.seek(0)
-        bank_statement_s3_uri = upload_to_s3(file_bank_statement.file, folder_id, "bank_statement.pdf")
-
-    ein_s3_uri = None
-    if file_ein:
-        await file_ein.seek(0)
-        ein_s3_uri = upload_to_s3(file_ein.file, folder_id, "ein_certificate.pdf")
-
-    ubo_id_s3_uri = None
-    if file_ubo_id:
-        await file_ubo_id.seek(0)
-        ubo_id_s3_uri = upload_to_s3(file_ubo_id.file, folder_id, "ubo_id.pdf")
+    # Store documents by content hash (concurrently; already-stored blobs are not re-uploaded)
+    try:
+        uploads = await upload_documents(get_client("s3"), S3_BUCKET, {
+            "bod_list_s3_uri": (file_bod.file, "bod_list.pdf"),
+            "financials_s3_uri": (file_financials.file, "financials_2024.pdf"),
+            "ownership_s3_uri": (file_ownership.file, "ownership_structure.pdf"),
+            "incorporation_doc_s3_uri": (file_incorporation.file, "certificate_of_incorporation.pdf") if file_incorporation else None,
+            "bank_statement_s3_uri": (file_bank_statement.file, "bank_statement.pdf") if file_bank_statement else None,
+            "ein_certificate_s3_uri": (file_ein.file, "ein_certificate.pdf") if file_ein else None,
+            "ubo_id_s3_uri": (file_ubo_id.file, "ubo_id.pdf") if file_ubo_id else None,
+        })
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    s3_uris = {field: (u["uri"] if u else None) for field, u in uploads.items()}
+    documents = {
+        field[:-len("_s3_uri")]: {"sha256": u["sha256"], "size": u["size"], "uri": u["uri"]}
+        for field, u in uploads.items() if u
+    }
 
     db_data = {
         # Entity identity
@@ -205,13 +240,8 @@ async def signup(
         "regulatory_authority": regulatory_authority,
         "website": website,
         # S3 URIs (Replacing binary content)
-        "bod_list_s3_uri": bod_s3_uri,
-        "financials_s3_uri": financials_s3_uri,
-        "ownership_s3_uri": ownership_s3_uri,
-        "incorporation_doc_s3_uri": incorporation_s3_uri,
-        "bank_statement_s3_uri": bank_statement_s3_uri,
-        "ein_certificate_s3_uri": ein_s3_uri,
-        "ubo_id_s3_uri": ubo_id_s3_uri,
+        **s3_uris,
+        "documents": documents,
         # Legacy support (empty byte strings to avoid NULL constraints if any)
         "bod_list_content": b"",
         "financials_content": b"",
@@ -247,18 +277,19 @@ async def signup(
     user_agent = request.headers.get("user-agent", "Unknown")
 
     # Save to database using the pre-generated tracking ID
-    success, result, _, temp_password = save_onboarding_details(db_data, ip=client_ip, workstation=user_agent, provided_tracking_id=tracking_id)
+    success, result, _, temp_password = await save_onboarding_details(db_data, ip=client_ip, workstation=user_agent, provided_tracking_id=tracking_id)
 
     if not success:
         raise HTTPException(status_code=500, detail=f"Database insertion failed: {result}")
+    forget_unknown_user(email)
 
     # Send confirmation email with tracking ID and temp password
     logger.info(f"Signup successful for {email}. Tracking ID: {tracking_id}. Triggering background tasks.")
-    background_tasks.add_task(send_confirmation_email, email, fname, tracking_id, temp_password)
+    await send_emails(background_tasks, confirmation_email(email, fname, tracking_id, temp_password))
 
     # Trigger Document Agent automatically after signup (Stage 1)
     onboarding_id_str = str(result)
-    background_tasks.add_task(_run_doc_agent_and_notify, onboarding_id_str, email, tracking_id)
+    await schedule_stage(background_tasks, "document", onboarding_id_str, email, tracking_id)
 
     return {
         "status": "success",
@@ -268,32 +299,17 @@ async def signup(
     }
 
 
-def _run_doc_agent_and_notify(onboarding_id: str, email: str, tracking_id: str):
-    """Background task: run Document Verification stage."""
-    try:
-        run_document_agent_stage(onboarding_id)
-    except Exception as e:
-        logger.error(f"Document background task failed for {onboarding_id}: {e}", exc_info=True)
-
-
-def _run_kyc_and_notify(onboarding_id: str, email: str, tracking_id: str):
-    """Background task: run KYC stage and send completion email."""
-    try:
-        result = run_kyc_stage(onboarding_id)
-        risk = result.get("composite_risk", "UNKNOWN")
-        send_kyc_complete_email(email, tracking_id, risk)
-    except Exception as e:
-        logger.error(f"KYC background task failed for {onboarding_id}: {e}", exc_info=True)
-
-
 @app.post("/admin/login")
 async def admin_login(data: dict):
     username = (data.get("username") or "").strip()
     password = (data.get("password") or "").strip()
     logger.info(f"Admin login attempt for: {username}")
 
-    user = get_user_by_email(username)
+    if is_known_unknown_user(username):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    user = await get_user_by_email(username)
     if not user:
+        remember_unknown_user(username)
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     if not user.get('is_active'):
@@ -302,10 +318,7 @@ async def admin_login(data: dict):
     if 'ADMIN' not in user.get('roles', []):
         raise HTTPException(status_code=403, detail="Access denied. Admin credentials required.")
 
-    password_bytes = password.encode('utf-8')
-    hash_bytes = user['password_hash'].encode('utf-8')
-
-    if bcrypt.checkpw(password_bytes, hash_bytes):
+    if await verify_password(password, user['password_hash']):
         return {
             "status": "success",
             "role": "ADMIN",
@@ -321,14 +334,18 @@ async def participant_login(data: dict):
     email = (data.get("username") or "").strip()
     password = (data.get("password") or "").strip()
 
-    user = get_user_by_email(email)
+    if is_known_unknown_user(email):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    user = await get_user_by_email(email)
+    if not user:
+        remember_unknown_user(email)
     if not user or not user.get('is_active'):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     if 'ADMIN' in user.get('roles', []):
         raise HTTPException(status_code=403, detail="Please use the admin portal to log in.")
 
-    if bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+    if await verify_password(password, user['password_hash']):
         return {
             "status": "success",
             "user_id": str(user['id']),
@@ -348,42 +365,63 @@ class ChangePasswordRequest(BaseModel):
 
 @app.post("/auth/change-password")
 async def change_password(req: ChangePasswordRequest):
-    user = get_user_by_email(req.email)
+    user = await get_user_by_email(req.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if not bcrypt.checkpw(req.current_password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+    if not await verify_password(req.current_password, user['password_hash']):
         raise HTTPException(status_code=401, detail="Current password is incorrect")
 
-    new_hash = bcrypt.hashpw(req.new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    new_hash = await hash_password(req.new_password)
 
-    conn = get_connection()
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(
-                "UPDATE client_onboarding.users SET password_hash = %s, must_change_password = FALSE, updated_at = CURRENT_TIMESTAMP WHERE email = %s",
-                (new_hash, req.email)
-            )
-        conn.commit()
-        return {"status": "success", "message": "Password updated successfully"}
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        release_connection(conn)
+    success, message = await update_user_password(req.email, new_hash)
+    if not success:
+        raise HTTPException(status_code=500, detail=message)
+    return {"status": "success", "message": message}
 
 
 # --- ADMIN TICKET ENDPOINTS ---
 
 @app.get("/admin/tickets")
-async def list_tickets(status: str = None):
-    tickets = get_all_tickets(status)
-    return {"status": "success", "tickets": tickets}
+async def list_tickets(
+    status: str = None,
+    country: str = None,
+    risk_level: str = None,
+    entity_type: str = None,
+    submitted_from: date = None,
+    submitted_to: date = None,
+    q: str = None,
+    cursor: str = None,
+    limit: int = TICKET_PAGE_SIZE
+):
+    """
+    Newest-first page of applications. Pass next_cursor back as ?cursor= for the
+    following page. counts holds dashboard totals by status and risk level.
+    """
+    try:
+        after = decode_ticket_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    page = await get_tickets_page(
+        status=status, country=country, risk_level=risk_level, entity_type=entity_type,
+        submitted_from=submitted_from, submitted_to=submitted_to, search=q,
+        cursor=after, limit=limit
+    )
+    return {"status": "success", **page}
 
 
 @app.get("/admin/tickets/{ticket_id}")
 async def ticket_detail(ticket_id: str):
-    ticket = get_ticket_by_id(ticket_id)
+    ticket = await get_ticket_by_id(ticket_id)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return {"status": "success", "ticket": ticket}
+
+
+@app.get("/admin/tickets/{ticket_id}/status")
+async def ticket_status(ticket_id: str):
+    """Status-only view of a ticket for pollers; avoids loading history, UBOs and directors."""
+    ticket = await get_ticket_status(ticket_id)
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
     return {"status": "success", "ticket": ticket}
@@ -399,7 +437,7 @@ async def ticket_action(ticket_id: str, req: ActionRequest, request: Request, ba
     action = req.action.lower()
 
     # Fetch current ticket to determine stage
-    ticket = get_ticket_by_id(ticket_id)
+    ticket = await get_ticket_status(ticket_id)
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
 
@@ -410,7 +448,7 @@ async def ticket_action(ticket_id: str, req: ActionRequest, request: Request, ba
     # --- Stage-aware routing ---
     if action == "approve" and current_status == "DOCUMENT_COMPLETE":
         # Document check approved by admin → trigger KYC Screening
-        success, message = update_onboarding_status(
+        success, message = await update_onboarding_status(
             ticket_id, "KYC_IN_PROGRESS",
             action_by="ADMIN",
             ip=request.client.host,
@@ -419,12 +457,12 @@ async def ticket_action(ticket_id: str, req: ActionRequest, request: Request, ba
         )
         if not success:
             raise HTTPException(status_code=500, detail=message)
-        background_tasks.add_task(_run_kyc_and_notify, ticket_id, email, tracking_id)
+        await schedule_stage(background_tasks, "kyc", ticket_id, email, tracking_id)
         return {"status": "success", "message": "Documents approved. KYC Agent started."}
 
     if action == "approve" and current_status == "KYC_COMPLETE":
         # KYC approved by admin → trigger AML Risk stage
-        success, message = update_onboarding_status(
+        success, message = await update_onboarding_status(
             ticket_id, "AML_IN_PROGRESS",
             action_by="ADMIN",
             ip=request.client.host,
@@ -433,13 +471,13 @@ async def ticket_action(ticket_id: str, req: ActionRequest, request: Request, ba
         )
         if not success:
             raise HTTPException(status_code=500, detail=message)
-        background_tasks.add_task(_run_aml_and_notify, ticket_id, email, tracking_id)
+        await schedule_stage(background_tasks, "aml", ticket_id, email, tracking_id)
         return {"status": "success", "message": "KYC approved. AML Risk assessment started."}
 
     if action == "reject" and current_status == "KYC_COMPLETE":
         # KYC rejected → notify participant
         new_status = "REJECTED"
-        success, message = update_onboarding_status(
+        success, message = await update_onboarding_status(
             ticket_id, new_status,
             action_by="ADMIN",
             ip=request.client.host,
@@ -449,7 +487,7 @@ async def ticket_action(ticket_id: str, req: ActionRequest, request: Request, ba
         if not success:
             raise HTTPException(status_code=500, detail=message)
         if email:
-            background_tasks.add_task(send_kyc_rejected_email, email, tracking_id, req.remarks or "")
+            await send_emails(background_tasks, kyc_rejected_email(email, tracking_id, req.remarks or ""))
         return {"status": "success", "message": "Rejected at KYC stage."}
 
     # --- Default status map (all other combinations) ---
@@ -463,7 +501,7 @@ async def ticket_action(ticket_id: str, req: ActionRequest, request: Request, ba
     if not new_status:
         raise HTTPException(status_code=400, detail="Invalid action")
 
-    success, message = update_onboarding_status(
+    success, message = await update_onboarding_status(
         ticket_id, new_status,
         action_by="ADMIN",
         ip=request.client.host,
@@ -474,84 +512,226 @@ async def ticket_action(ticket_id: str, req: ActionRequest, request: Request, ba
         raise HTTPException(status_code=500, detail=message)
 
     if email:
-        background_tasks.add_task(send_status_update_email, email, tracking_id, new_status, req.remarks)
+        await send_emails(background_tasks, status_update_email(email, tracking_id, new_status, req.remarks))
 
     return {"status": "success", "message": f"Ticket {action} successful"}
 
 
-def _run_aml_and_notify(onboarding_id: str, email: str, tracking_id: str):
-    """Background task: run AML Risk stage and send completion email."""
-    try:
-        result = run_aml_risk_stage(onboarding_id)
-        risk = result.get("composite_risk", "UNKNOWN")
-        send_aml_stage_complete_email(email, tracking_id, risk)
-    except Exception as e:
-        print(f"[main] AML Risk background task failed for {onboarding_id}: {e}")
-
-
 @app.post("/admin/tickets/{ticket_id}/run-kyc")
-async def run_kyc_manual(ticket_id: str, background_tasks: BackgroundTasks):
-    """Manually trigger KYC agent for a ticket (admin can re-run)."""
-    ticket = get_ticket_by_id(ticket_id)
+async def run_kyc_manual(ticket_id: str, background_tasks: BackgroundTasks, refresh: bool = False):
+    """Manually trigger KYC agent for a ticket (admin can re-run). ?refresh=true bypasses the LLM cache."""
+    ticket = await get_ticket_status(ticket_id)
     if not ticket:
         raise HTTPException(status_code=404, detail="Ticket not found")
-    background_tasks.add_task(
-        _run_kyc_and_notify,
+    await schedule_stage(
+        background_tasks, "kyc",
         ticket_id,
         ticket.get("email", ""),
-        ticket.get("tracking_id", "")
+        ticket.get("tracking_id", ""),
+        use_llm_cache=not refresh
     )
     return {"status": "success", "message": "KYC agent started in background"}
 
 
+@app.get("/admin/jobs/stats")
+async def job_queue_stats():
+    """Agent job queue depth and latency per stage type."""
+    return {"status": "success", "mode": AGENT_JOBS_MODE, "queues": await get_job_queue_stats()}
+
+
+@app.get("/admin/bedrock/limits")
+async def bedrock_limits():
+    """Bedrock rate control state in this process (concurrency window, in-flight, queue length)."""
+    return {"status": "success", "mode": AGENT_JOBS_MODE, "limits": rate_limiter.get_stats()}
+
+
+@app.get("/admin/llm-cache/stats")
+async def llm_cache_stats():
+    """LLM response cache size, hits and model time saved per stage."""
+    return {"status": "success", "stages": await get_llm_cache_stats()}
+
+
+# Upper bound for one agent-logs page
+AGENT_LOGS_MAX_LIMIT = int(os.getenv("AGENT_LOGS_MAX_LIMIT", "500"))
+
+
+def _parse_log_fields(fields: str):
+    """Resolves ?fields= into a tuple of AGENT_LOG_FIELDS keys (named set or comma list)."""
+    if not fields:
+        return None
+    if fields in AGENT_LOG_FIELD_SETS:
+        return AGENT_LOG_FIELD_SETS[fields]
+    requested = tuple(f.strip() for f in fields.split(",") if f.strip())
+    unknown = [f for f in requested if f not in AGENT_LOG_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown agent log fields: {', '.join(unknown)}")
+    return requested
+
+
 @app.get("/admin/tickets/{ticket_id}/agent-logs")
-async def get_ticket_agent_logs(ticket_id: str):
-    """Returns all AI agent log entries for a ticket."""
-    logs = get_agent_logs(ticket_id)
-    return {"status": "success", "logs": logs}
+async def get_ticket_agent_logs(
+    ticket_id: str,
+    since_id: str = None,
+    since_ts: datetime = None,
+    limit: int = None,
+    stage: int = None,
+    fields: str = None
+):
+    """
+    Returns AI agent log entries for a ticket, oldest first.
+    - since_id / since_ts: only entries after that log id / timestamp
+    - limit: page size (max AGENT_LOGS_MAX_LIMIT); next_since_id is set when more may follow
+    - stage: 1 = documents, 2 = KYC, 3 = AML risk
+    - fields: 'summary', 'full' or a comma-separated column list
+    """
+    if since_id:
+        try:
+            since_id = str(uuid.UUID(since_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="since_id must be a log id")
+    if since_ts is not None and since_ts.tzinfo is None:
+        since_ts = since_ts.replace(tzinfo=timezone.utc)
+    if limit is not None:
+        limit = max(1, min(limit, AGENT_LOGS_MAX_LIMIT))
+
+    logs = await get_agent_logs(
+        ticket_id, since_id=since_id, since_ts=since_ts,
+        limit=limit, stage=stage, fields=_parse_log_fields(fields)
+    )
+    next_since_id = logs[-1]["id"] if limit and len(logs) == limit else None
+    return {"status": "success", "logs": logs, "next_since_id": next_since_id}
+
+
+@app.get("/admin/tickets/{ticket_id}/agent-logs/{log_id}")
+async def get_ticket_agent_log(ticket_id: str, log_id: str):
+    """Full input_context / output / ai_summary of one agent check."""
+    try:
+        log_id = str(uuid.UUID(log_id))
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Agent log not found")
+    log = await get_agent_log(ticket_id, log_id)
+    if not log:
+        raise HTTPException(status_code=404, detail="Agent log not found")
+    return {"status": "success", "log": log}
+
+
+# Seconds between SSE keep-alive comments (also how often disconnects are noticed)
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+
+def _sse(event: str, data: dict, event_id: str = None) -> str:
+    """Formats one server-sent event frame."""
+    frame = f"id: {event_id}\n" if event_id else ""
+    return frame + f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _ticket_event_stream(request: Request, ticket_id: str, last_id: str = None):
+    """
+    Yields status transitions and new agent log rows for one ticket.
+    Subscribes before reading the backlog so nothing committed in between is lost;
+    every agent_log notification is answered by reading rows after the last sent id.
+    """
+    queue = ticket_events.subscribe(ticket_id)
+    try:
+        status = await get_ticket_status(ticket_id)
+        if status:
+            yield _sse("status", {"onboarding_id": ticket_id, "new_status": status["status"]})
+
+        resync = True
+        while True:
+            if resync:
+                for log in await get_agent_logs(ticket_id, since_id=last_id, fields=AGENT_LOG_FIELD_SETS["summary"]):
+                    last_id = log["id"]
+                    yield _sse("agent_log", log, event_id=last_id)
+                resync = False
+
+            try:
+                event = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keep-alive\n\n"
+                continue
+
+            if event["type"] == "status":
+                yield _sse("status", event)
+            elif event["type"] == "agent_partial":
+                # Transient streaming output; the final row follows as agent_log
+                yield _sse("agent_partial", event)
+            else:
+                if event["type"] == "resync":
+                    status = await get_ticket_status(ticket_id)
+                    if status:
+                        yield _sse("status", {"onboarding_id": ticket_id, "new_status": status["status"]})
+                resync = True
+    finally:
+        ticket_events.unsubscribe(ticket_id, queue)
+
+
+@app.get("/admin/tickets/{ticket_id}/events")
+async def ticket_event_stream(ticket_id: str, request: Request, last_id: str = None):
+    """
+    Server-sent events for a ticket: `status` on every transition, `agent_log`
+    for each new ai_agent_logs row and `agent_partial` for fields/pillars of an
+    agent answer that is still streaming. Reconnecting clients send Last-Event-ID (or
+    ?last_id=) and receive only the rows written after it.
+    """
+    if not await get_ticket_status(ticket_id):
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    last_id = request.headers.get("last-event-id") or last_id
+    try:
+        last_id = str(uuid.UUID(last_id)) if last_id else None
+    except ValueError:
+        last_id = None
+    return StreamingResponse(
+        _ticket_event_stream(request, ticket_id, last_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.get("/portal/status/{user_id}")
 async def portal_status(user_id: str):
     """Returns the onboarding status for a participant's user_id."""
-    record = get_onboarding_by_user_id(user_id)
+    record = await get_onboarding_by_user_id(user_id)
     if not record:
         raise HTTPException(status_code=404, detail="No onboarding record found")
     return {"status": "success", "record": record}
 
 
 @app.get("/admin/tickets/{id}/docs/{doc_type}")
-async def get_ticket_doc(id: str, doc_type: str):
-    ticket = get_ticket_by_id(id)
-    if not ticket:
+async def get_ticket_doc(id: str, doc_type: str, request: Request):
+    """
+    Streams one document from S3. Range requests are honoured (206) so the PDF
+    viewer can load pages lazily, and ETag/Last-Modified revalidation returns 304.
+    With DOC_DOWNLOAD_MODE=presigned the client is redirected to S3 instead.
+    """
+    doc = await get_document_uri(id, doc_type)
+    if not doc:
         raise HTTPException(status_code=404, detail="Ticket not found")
 
-    # Map doc_type to S3 URI column
-    s3_col_map = {
-        "bod": "bod_list_s3_uri",
-        "financials": "financials_s3_uri",
-        "ownership": "ownership_s3_uri",
-        "incorporation": "incorporation_doc_s3_uri",
-        "bank": "bank_statement_s3_uri",
-        "ein": "ein_certificate_s3_uri",
-        "ubo_id": "ubo_id_s3_uri"
-    }
-    s3_uri = ticket.get(s3_col_map.get(doc_type))
-
+    s3_uri = doc.get("s3_uri")
     if s3_uri and s3_uri.startswith("s3://"):
+        if DOC_DOWNLOAD_MODE == "presigned":
+            url = presigned_document_url(get_client("s3"), s3_uri)
+            if url:
+                return RedirectResponse(url, status_code=307)
         try:
-            # Parse S3 URI: s3://bucket/key
-            path_parts = s3_uri.replace("s3://", "").split("/", 1)
-            bucket = path_parts[0]
-            key = path_parts[1]
-            # Use explicit client for fetching
-            obj = s3_client.get_object(Bucket=bucket, Key=key)
-            return Response(content=obj['Body'].read(), media_type="application/pdf")
+            status, headers, body = await run_in_threadpool(
+                open_document, get_client("s3"), s3_uri,
+                request.headers.get("range"),
+                request.headers.get("if-none-match"),
+                request.headers.get("if-modified-since"),
+            )
+            if body is None:
+                return Response(status_code=status, headers=headers)
+            # Sync iterator: Starlette pulls chunks in its threadpool
+            return StreamingResponse(iter_document(body), status_code=status, headers=headers, media_type="application/pdf")
         except Exception as e:
-            print(f"[S3] Download failed for {s3_uri}: {e}")
+            logger.error(f"[S3] Download failed for {s3_uri}: {e}")
 
     # Fallback to Database Binary
-    content = get_document_content(id, doc_type)
+    content = await get_document_content(id, doc_type)
     if not content:
         raise HTTPException(status_code=404, detail=" Document not found in S3 or DB")
     return Response(content=content, media_type="application/pdf")
@@ -0,0 +1,157 @@
+"""
+Password Hasher — bcrypt off the event loop
+bcrypt is deliberately slow (tens to hundreds of ms of CPU per call), so
+hashing or verifying inside an async handler stalls every other request on
+the loop. hash_password / verify_password run bcrypt on a dedicated process
+pool sized to the machine's cores and are awaitable.
+
+Two small negative caches blunt credential-stuffing load:
+- unknown usernames are remembered for UNKNOWN_USER_TTL seconds, so repeats
+  skip the user lookup;
+- failed (user, password) attempts are remembered (as an HMAC, never the
+  password) for FAILED_LOGIN_TTL seconds against the current hash, so the same
+  wrong credentials are rejected without running bcrypt again.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+from .logger import logger_main as logger
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+# "spawn" keeps workers independent of the API process's threads and sockets
+PASSWORD_HASH_START_METHOD = os.getenv("PASSWORD_HASH_START_METHOD", "spawn")
+
+UNKNOWN_USER_TTL = float(os.getenv("AUTH_UNKNOWN_USER_TTL_SECONDS", "60"))
+FAILED_LOGIN_TTL = float(os.getenv("AUTH_FAILED_LOGIN_TTL_SECONDS", "300"))
+NEGATIVE_CACHE_SIZE = int(os.getenv("AUTH_NEGATIVE_CACHE_SIZE", "10000"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Per-process key: cached failures are never comparable across restarts or processes
+_cache_key = secrets.token_bytes(32)
+
+
+# Module-level so they pickle by reference into the worker processes
+def _hashpw(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def _checkpw(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+class _ExpiringSet:
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        with self._lock:
+            self._items[key] = time.monotonic() + self.ttl
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __contains__(self, key):
+        with self._lock:
+            expires = self._items.get(key)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._items[key]
+                return False
+            return True
+
+
+_unknown_users = _ExpiringSet(UNKNOWN_USER_TTL, NEGATIVE_CACHE_SIZE)
+_failed_logins = _ExpiringSet(FAILED_LOGIN_TTL, NEGATIVE_CACHE_SIZE)
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context(PASSWORD_HASH_START_METHOD)
+            )
+        return _pool
+
+
+def start():
+    """Creates the pool and warms its processes so the first logins don't pay spawn cost."""
+    pool = _get_pool()
+    warm_hash = _hashpw("warm-up")
+    for future in [pool.submit(_checkpw, "", warm_hash) for _ in range(PASSWORD_HASH_WORKERS)]:
+        future.result()
+    logger.info(f"Password hashing pool ready ({PASSWORD_HASH_WORKERS} processes)")
+
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), _hashpw, password)
+
+
+def _attempt_key(password, password_hash):
+    return hmac.new(_cache_key, f"{password_hash}\0{password}".encode('utf-8'), hashlib.sha256).digest()
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    """Checks a password against a bcrypt hash; repeated identical failures skip bcrypt."""
+    if not password_hash:
+        return False
+    attempt = _attempt_key(password, password_hash)
+    if attempt in _failed_logins:
+        return False
+    loop = asyncio.get_running_loop()
+    try:
+        ok = await loop.run_in_executor(_get_pool(), _checkpw, password, password_hash)
+    except ValueError:
+        # Malformed stored hash
+        ok = False
+    if not ok:
+        _failed_logins.add(attempt)
+    return ok
+
+
+def _user_key(username):
+    return (username or "").strip().lower()
+
+
+def is_known_unknown_user(username: str) -> bool:
+    return _user_key(username) in _unknown_users
+
+
+def remember_unknown_user(username: str):
+    _unknown_users.add(_user_key(username))
+
+
+def forget_unknown_user(username: str):
+    """Called when an account is created so it can log in immediately."""
+    _unknown_users.discard(_user_key(username))
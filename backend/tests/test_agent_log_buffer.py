@@ -0,0 +1,57 @@
+import threading
+import time
+
+from backend.agents import agent_log_buffer
+
+
+def _capture(monkeypatch):
+    batches, direct = [], []
+    monkeypatch.setattr(agent_log_buffer, "insert_agent_logs", lambda rows: batches.append(rows) or True)
+    monkeypatch.setattr(agent_log_buffer, "_insert_agent_log_now", lambda row: direct.append(row) or True)
+    return batches, direct
+
+
+def test_batch_mode_writes_run_in_one_commit(monkeypatch):
+    batches, direct = _capture(monkeypatch)
+
+    with agent_log_buffer.buffered_agent_logs("run-1", mode="batch"):
+        threads = [threading.Thread(target=agent_log_buffer.insert_agent_log,
+                                    args=({"run_id": "run-1", "check_name": f"c{i}"},)) for i in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        agent_log_buffer.insert_agent_log({"run_id": "other", "check_name": "unbuffered"})
+        assert batches == []
+
+    assert len(batches) == 1 and len(batches[0]) == 5
+    assert len({row["id"] for row in batches[0]}) == 5
+    assert [row["check_name"] for row in direct] == ["unbuffered"]
+
+    # After the stage closed, late rows go straight to the table
+    agent_log_buffer.insert_agent_log({"run_id": "run-1", "check_name": "late"})
+    assert direct[-1]["check_name"] == "late"
+
+
+def test_size_threshold_and_failed_flush_retry(monkeypatch):
+    batches, _ = _capture(monkeypatch)
+    buffer = agent_log_buffer.AgentLogBuffer("run-2", mode="batch", max_rows=2)
+    buffer.add({"n": 1})
+    buffer.add({"n": 2})
+    assert [len(b) for b in batches] == [2]
+
+    monkeypatch.setattr(agent_log_buffer, "insert_agent_logs", lambda rows: False)
+    buffer.add({"n": 3})
+    assert not buffer.flush()
+    assert [row["n"] for row in buffer.rows] == [3]
+
+
+def test_stream_mode_flushes_after_interval(monkeypatch):
+    batches, _ = _capture(monkeypatch)
+    buffer = agent_log_buffer.AgentLogBuffer("run-3", mode="stream", flush_ms=20)
+    buffer.add({"n": 1})
+    buffer.add({"n": 2})
+    deadline = time.monotonic() + 2
+    while not batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [[row["n"] for row in b] for b in batches] == [[1, 2]]
@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("boto3")
+
+from backend import aws_clients
+
+
+def test_clients_are_shared_and_rebuilt_on_credential_change(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "AKIAOLD")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "secret")
+    monkeypatch.setenv("AWS_SESSION_TOKEN", "token-1")
+    monkeypatch.setattr(aws_clients, "AWS_CREDENTIALS_FILE", "/nonexistent/.dbenv")
+    aws_clients.refresh_clients(reload_env=False)
+
+    s3 = aws_clients.get_client("s3")
+    assert aws_clients.get_client("s3") is s3
+    assert s3.meta.config.max_pool_connections == aws_clients.AWS_MAX_POOL_CONNECTIONS
+    assert aws_clients.get_client("bedrock-agent-runtime").meta.config.read_timeout == \
+        aws_clients._READ_TIMEOUTS["bedrock-agent-runtime"]
+
+    monkeypatch.setenv("AWS_SESSION_TOKEN", "token-2")
+    assert aws_clients.get_client("s3") is not s3
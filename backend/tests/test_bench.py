@@ -0,0 +1,82 @@
+import random
+
+import pytest
+
+from backend.bench import report
+from backend.bench.probe import Recorder, percentile, summarize
+from backend.bench.synthetic import make_application, parse_document, read_pdf_text
+
+
+def test_synthetic_documents_round_trip_through_the_pdf_text():
+    app = make_application(3, "ab12cd34", random.Random(1), doc_bytes=16 * 1024, mismatch_rate=0.0)
+    form, files = app["form"], app["files"]
+
+    _, incorporation = files["file_incorporation"]
+    assert len(incorporation) >= 16 * 1024
+    fields = parse_document(read_pdf_text(incorporation))
+    assert fields["legal_name"] == form["company"] == app["company"]
+    assert fields["registration_number"] == form["registration_number"]
+    assert len(form["lei"]) == 20
+
+
+def test_mismatch_rate_changes_the_certificate_registration_number():
+    app = make_application(0, "ab12cd34", random.Random(1), doc_bytes=0, mismatch_rate=1.0)
+    fields = parse_document(read_pdf_text(app["files"]["file_incorporation"][1]))
+    assert fields["registration_number"] != app["form"]["registration_number"]
+
+
+def test_percentiles_and_summary():
+    samples = list(range(1, 101))
+    assert percentile(samples, 50) == 51
+    assert percentile(samples, 99) == 100
+    assert percentile([], 95) == 0.0
+    stats = summarize(samples)
+    assert stats["count"] == 100 and stats["max_ms"] == 100 and stats["mean_ms"] == 50.5
+    assert summarize([]) == {"count": 0}
+
+
+def _results(per_min, kyc_run_ms, kyc_queries):
+    recorder = Recorder()
+    for _ in range(20):
+        recorder.observe("stage.kyc.run", kyc_run_ms)
+        recorder.observe("api.signup", 40.0)
+    for _ in range(kyc_queries * 10):
+        recorder.observe("db.sync.kyc", 1.0)
+    results = report.build(recorder, {"run_id": "r"}, wall_seconds=60, applications=10, completed=10,
+                           failures=[], queue_waits={}, pool_stats={}, extra={})
+    results["throughput"]["applications_per_min"] = per_min
+    return results
+
+
+def test_compare_flags_regressions_beyond_threshold_and_floor():
+    baseline = _results(per_min=10.0, kyc_run_ms=1000.0, kyc_queries=12)
+    current = _results(per_min=8.0, kyc_run_ms=1050.0, kyc_queries=20)
+    rows = {metric: (change, regressed) for metric, _, _, change, regressed in report.compare(baseline, current)}
+
+    # Throughput is higher-is-better: a drop is a regression
+    assert rows["throughput.applications_per_min"] == (0.2, True)
+    # +5% latency is under the threshold
+    assert rows["stage.kyc.run.p95"][1] is False
+    assert rows["db.kyc.queries_per_application"][1] is True
+    assert rows["api.signup.p95"] == (0.0, False)
+
+
+def test_compare_ignores_changes_under_the_absolute_floor():
+    baseline = _results(per_min=10.0, kyc_run_ms=2.0, kyc_queries=1)
+    current = _results(per_min=10.2, kyc_run_ms=4.0, kyc_queries=1)
+    assert not any(regressed for *_, regressed in report.compare(baseline, current))
+
+
+def test_latency_specs():
+    pytest.importorskip("botocore")
+    from backend.bench.fake_aws import Latency
+
+    rng = random.Random(0)
+    assert Latency("fixed:250", scale=0.5).sample(rng) == 0.125
+    assert all(0.01 <= Latency("uniform:10,20").sample(rng) <= 0.02 for _ in range(50))
+    samples = sorted(Latency("lognormal:100,400").sample(rng) for _ in range(4000))
+    assert 0.09 < samples[2000] < 0.11
+    assert 0.33 < samples[3800] < 0.48
+    for spec in ("fixed", "uniform:5", "lognormal:400,100", "gamma:1,2"):
+        with pytest.raises(ValueError):
+            Latency(spec)
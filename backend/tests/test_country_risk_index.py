@@ -0,0 +1,81 @@
+from backend.agents import country_risk_index
+from backend.agents.country_risk_index import CountryRiskIndex
+
+ROWS = [
+    ("IR", "Iran", "BLACKLIST", "CRITICAL"),
+    ("KP", "North Korea", "BLACKLIST", "CRITICAL"),
+    ("NG", "Nigeria", "MONITORING", "MEDIUM"),
+    ("US", "United States", "COMPLIANT", "LOW"),
+    ("GB", "United Kingdom", "COMPLIANT", "LOW"),
+    ("AE", "United Arab Emirates", "MONITORING", "MEDIUM"),
+]
+
+
+def test_codes_names_and_aliases_resolve_exactly():
+    index = CountryRiskIndex(ROWS)
+    for value in ("IR", "irn", "Iran", "Islamic Republic of Iran", "Iran, Islamic Republic of"):
+        assert index.resolve(value)["risk_level"] == "CRITICAL", value
+    assert index.resolve("DPRK")["country_code"] == "KP"
+    assert index.resolve("U.S.A.")["country_code"] == "US"
+    assert index.resolve("the UK")["country_code"] == "GB"
+    assert index.resolve("UAE")["fatf_status"] == "MONITORING"
+
+
+def test_niger_is_not_nigeria():
+    index = CountryRiskIndex(ROWS)
+    niger = index.resolve("Niger")
+    assert niger["country_code"] == "NE" and niger["risk_level"] is None
+    assert index.resolve("Nigeria")["risk_level"] == "MEDIUM"
+    assert index.resolve("Atlantis") == {"country_code": None, "country_name": "Atlantis",
+                                         "fatf_status": None, "risk_level": None}
+
+
+class _Cursor:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.db["queries"] += 1
+        self._result = [self.db["signature"]] if "MAX(last_updated)" in sql else self.db["rows"]
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+
+class _Conn:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return _Cursor(self.db)
+
+
+def test_snapshot_reloads_only_when_table_changes(monkeypatch):
+    db = {"queries": 0, "signature": ("2026-01-01", 6, "a"), "rows": ROWS}
+    monkeypatch.setattr(country_risk_index, "get_connection", lambda: _Conn(db))
+    monkeypatch.setattr(country_risk_index, "release_connection", lambda conn: None)
+    monkeypatch.setattr(country_risk_index, "_index", None)
+    monkeypatch.setattr(country_risk_index, "REFRESH_INTERVAL", 3600)
+
+    first = country_risk_index.get_country_risk_index()
+    assert country_risk_index.get_country_risk_index() is first
+    assert db["queries"] == 2
+
+    # Interval elapsed but the table is unchanged: the snapshot is kept
+    monkeypatch.setattr(country_risk_index, "_last_check", 0.0)
+    assert country_risk_index.get_country_risk_index() is first
+
+    db["signature"] = ("2026-02-01", 6, "b")
+    db["rows"] = ROWS[:-1] + [("AE", "United Arab Emirates", "COMPLIANT", "LOW")]
+    monkeypatch.setattr(country_risk_index, "_last_check", 0.0)
+    refreshed = country_risk_index.get_country_risk_index()
+    assert refreshed is not first and refreshed.resolve("UAE")["risk_level"] == "LOW"
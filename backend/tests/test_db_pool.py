@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions
+
+from backend.db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        if self.conn.broken:
+            raise Exception("server closed the connection unexpectedly")
+        self.conn.executed.append(sql)
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.executed = []
+        self.rollbacks = 0
+        self.info = FakeInfo()
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect():
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    kwargs.setdefault("session_init", ["SET search_path TO client_onboarding, public;"])
+    return ConnectionPool(connect, **kwargs), opened
+
+
+def test_session_init_runs_once_per_connection():
+    pool, opened = make_pool(minconn=1, maxconn=2)
+    for _ in range(5):
+        conn = pool.getconn()
+        pool.putconn(conn)
+    assert len(opened) == 1
+    assert opened[0].executed == ["SET search_path TO client_onboarding, public;"]
+    assert pool.stats()["checkouts"] == 5
+
+
+def test_exhausted_pool_waits_then_times_out():
+    pool, _ = make_pool(minconn=0, maxconn=1)
+    held = pool.getconn()
+    threading.Timer(0.05, pool.putconn, args=(held,)).start()
+    assert pool.getconn(timeout=1) is held
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.05)
+    stats = pool.stats()
+    assert stats["exhaustion_events"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["in_use"] == 1
+
+
+def test_dirty_and_broken_connections_are_handled_on_return():
+    pool, opened = make_pool(minconn=0, maxconn=2, validate_after=0)
+    conn = pool.getconn()
+    conn.info.transaction_status = extensions.TRANSACTION_STATUS_INERROR
+    pool.putconn(conn)
+    assert conn.rollbacks == 1 and not conn.closed
+
+    time.sleep(0.01)
+    conn.broken = True
+    fresh = pool.getconn()
+    assert fresh is not conn and conn.closed
+    assert len(opened) == 2
+    assert pool.stats()["validation_failures"] == 1
+
+
+def test_releasing_a_connection_twice_is_ignored():
+    pool, _ = make_pool(minconn=0, maxconn=2)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    pool.putconn(conn)
+    stats = pool.stats()
+    assert stats["in_use"] == 0 and stats["idle"] == 1
+    assert pool.getconn() is conn
+    assert pool.getconn() is not conn
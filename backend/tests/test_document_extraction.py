@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("boto3")
+
+from backend.agents import orchestrator
+
+
+def test_extract_documents_reuses_cached_hashes(monkeypatch):
+    saved, calls = [], []
+    cache = {("aaa", "incorporation_doc"): {"legal_name": "Acme Ltd", "registration_number": "123"}}
+
+    monkeypatch.setattr(orchestrator, "get_document_extractions", lambda keys, version: {
+        k: v for k, v in cache.items() if k in list(keys)
+    })
+    monkeypatch.setattr(orchestrator, "save_document_extraction", lambda *a, **kw: saved.append(a[:3]))
+
+    def fake_ocr(prompt, uris, **kwargs):
+        calls.append((prompt, dict(uris)))
+        return {"directors": ["Jane Roe"]}
+
+    monkeypatch.setattr(orchestrator, "invoke_bedrock_model_multimodal", fake_ocr)
+
+    res = orchestrator._extract_documents(
+        {"incorporation_doc": "s3://b/inc", "bod_doc": "s3://b/bod"},
+        {"incorporation_doc": "aaa", "bod_list": "bbb"},
+    )
+
+    assert res["legal_name"] == "Acme Ltd" and res["directors"] == ["Jane Roe"]
+    assert len(calls) == 1 and list(calls[0][1]) == ["bod_doc"]
+    assert "legal_name" not in calls[0][0]
+    assert saved == [("bbb", "bod_doc", orchestrator.DOCUMENT_EXTRACTOR_VERSION)]
+    assert res["_document_cache"] == {"reused": ["incorporation_doc"], "extracted": ["bod_doc"]}
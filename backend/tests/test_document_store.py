@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import io
+from datetime import datetime, timedelta, tzinfo
+
+import pytest
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+
+from backend import document_store
+
+BUCKET = "test-onboarding-docs"
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def test_multipart_upload_hashes_while_streaming(s3):
+    data = bytes(range(256)) * (11 * MB // 256)
+    result = document_store.stream_to_s3(
+        s3, io.BytesIO(data), BUCKET, "uploads/T1/financials_2024.pdf", max_bytes=20 * MB, part_size=5 * MB
+    )
+
+    assert result["size"] == len(data)
+    assert result["sha256"] == hashlib.sha256(data).hexdigest()
+    body = s3.get_object(Bucket=BUCKET, Key="uploads/T1/financials_2024.pdf")["Body"].read()
+    assert body == data
+
+
+def test_small_file_uses_single_put(s3):
+    result = document_store.stream_to_s3(s3, io.BytesIO(b"%PDF-1.4"), BUCKET, "uploads/T1/ein.pdf")
+
+    head = s3.head_object(Bucket=BUCKET, Key="uploads/T1/ein.pdf")
+    assert head["Metadata"]["sha256"] == result["sha256"]
+    assert result["size"] == 8
+
+
+def test_oversized_file_aborts_multipart_upload(s3):
+    data = b"x" * (12 * MB)
+    with pytest.raises(document_store.UploadTooLarge):
+        document_store.stream_to_s3(
+            s3, io.BytesIO(data), BUCKET, "uploads/T1/bod_list.pdf", max_bytes=7 * MB, part_size=5 * MB
+        )
+
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+    assert not s3.list_multipart_uploads(Bucket=BUCKET).get("Uploads")
+
+
+def test_upload_documents_stores_by_hash_and_skips_missing(s3):
+    docs = {
+        "bod_list_s3_uri": (io.BytesIO(b"bod"), "bod_list.pdf"),
+        "financials_s3_uri": (io.BytesIO(b"fin"), "financials_2024.pdf"),
+        "ein_certificate_s3_uri": None,
+    }
+    results = asyncio.run(document_store.upload_documents(s3, BUCKET, docs))
+
+    sha = hashlib.sha256(b"fin").hexdigest()
+    assert results["financials_s3_uri"]["sha256"] == sha
+    assert results["financials_s3_uri"]["uri"] == f"s3://{BUCKET}/blobs/sha256/{sha[:2]}/{sha}.pdf"
+    assert results["financials_s3_uri"]["deduplicated"] is False
+    assert results["ein_certificate_s3_uri"] is None
+
+
+def test_upload_documents_reuses_existing_blob(s3):
+    first = asyncio.run(document_store.upload_documents(s3, BUCKET, {"ownership_s3_uri": (io.BytesIO(b"chart"), "o.pdf")}))
+    second = asyncio.run(document_store.upload_documents(s3, BUCKET, {"ownership_s3_uri": (io.BytesIO(b"chart"), "o.pdf")}))
+
+    assert second["ownership_s3_uri"]["deduplicated"] is True
+    assert second["ownership_s3_uri"]["uri"] == first["ownership_s3_uri"]["uri"]
+    assert s3.list_objects_v2(Bucket=BUCKET)["KeyCount"] == 1
+
+
+def test_upload_documents_rejects_oversize_before_uploading(s3):
+    docs = {
+        "bod_list_s3_uri": (io.BytesIO(b"small"), "bod_list.pdf"),
+        "financials_s3_uri": (io.BytesIO(b"y" * 2048), "financials_2024.pdf"),
+    }
+    with pytest.raises(document_store.UploadTooLarge):
+        asyncio.run(document_store.upload_documents(s3, BUCKET, docs, max_bytes=1024))
+
+    assert "Contents" not in s3.list_objects_v2(Bucket=BUCKET)
+
+
+def test_open_document_serves_ranges_and_revalidation(s3):
+    s3.put_object(Bucket=BUCKET, Key="blobs/doc.pdf", Body=b"0123456789")
+    uri = f"s3://{BUCKET}/blobs/doc.pdf"
+
+    status, headers, body = document_store.open_document(s3, uri, range_header="bytes=2-5")
+    assert status == 206
+    assert headers["Content-Range"] == "bytes 2-5/10"
+    assert b"".join(document_store.iter_document(body)) == b"2345"
+
+    status, headers, body = document_store.open_document(s3, uri)
+    assert status == 200 and headers["Accept-Ranges"] == "bytes" and "Last-Modified" in headers
+    body.close()
+
+    status, _, body = document_store.open_document(s3, uri, if_none_match=headers["ETag"])
+    assert status == 304 and body is None
+
+
+class _TzUtc(tzinfo):
+    """Like dateutil's tzutc (what botocore returns): UTC, but not timezone.utc."""
+
+    def utcoffset(self, dt):
+        return timedelta(0)
+
+    def dst(self, dt):
+        return timedelta(0)
+
+    def tzname(self, dt):
+        return "UTC"
+
+
+class _StubClient:
+    def get_object(self, **params):
+        return {"ContentLength": 3, "ETag": '"abc"', "Body": io.BytesIO(b"pdf"),
+                "LastModified": datetime(2024, 5, 1, 12, 30, tzinfo=_TzUtc())}
+
+
+def test_open_document_formats_botocore_last_modified():
+    status, headers, _ = document_store.open_document(_StubClient(), f"s3://{BUCKET}/blobs/doc.pdf")
+    assert status == 200
+    assert headers["Last-Modified"] == "Wed, 01 May 2024 12:30:00 GMT"
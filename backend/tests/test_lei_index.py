@@ -0,0 +1,119 @@
+import csv
+
+from backend.agents import lei_index
+from backend.agents.lei_index import LEIIndex, apply_delta, build_index, import_golden_copy, read_records
+
+ROWS = [
+    ("5493001KJY7UW9K12345", "Niger Trading Company Ltd", "US", "ISSUED"),
+    ("5493002ABCDEFGH12345", "Nigeria Trading Company Ltd", "GB", "ISSUED"),
+    ("5493003ABCDEFGH12345", "Evergreen Capital Partners LLC", "US", "LAPSED"),
+    ("5493004ABCDEFGH12345", "Meridian Holdings GmbH", "DE", "ISSUED"),
+]
+
+XML = """<?xml version="1.0" encoding="UTF-8"?>
+<lei:LEIData xmlns:lei="http://www.gleif.org/data/schema/leidata/2016">
+  <lei:LEIRecords>
+    <lei:LEIRecord>
+      <lei:LEI>5493004ABCDEFGH12345</lei:LEI>
+      <lei:Entity>
+        <lei:LegalName>Meridian Holding Group GmbH</lei:LegalName>
+        <lei:OtherEntityNames><lei:OtherEntityName>Meridian Group</lei:OtherEntityName></lei:OtherEntityNames>
+        <lei:LegalAddress><lei:Country>DE</lei:Country></lei:LegalAddress>
+        <lei:RegistrationAuthority>
+          <lei:RegistrationAuthorityID>RA000242</lei:RegistrationAuthorityID>
+          <lei:RegistrationAuthorityEntityID>HRB 123456</lei:RegistrationAuthorityEntityID>
+        </lei:RegistrationAuthority>
+      </lei:Entity>
+      <lei:Registration><lei:RegistrationStatus>LAPSED</lei:RegistrationStatus></lei:Registration>
+    </lei:LEIRecord>
+    <lei:LEIRecord>
+      <lei:LEI>5493005ABCDEFGH12345</lei:LEI>
+      <lei:Entity>
+        <lei:LegalName>Aurora Beacon Securities Inc.</lei:LegalName>
+        <lei:LegalAddress><lei:Country>US</lei:Country></lei:LegalAddress>
+      </lei:Entity>
+      <lei:Registration><lei:RegistrationStatus>ISSUED</lei:RegistrationStatus></lei:Registration>
+    </lei:LEIRecord>
+  </lei:LEIRecords>
+</lei:LEIData>
+"""
+
+
+def _write_csv(path, rows=ROWS):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["LEI", "Entity.LegalName", "Entity.LegalAddress.Country", "Registration.RegistrationStatus"])
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_exact_and_name_lookup(tmp_path):
+    path = tmp_path / "lei.idx"
+    assert build_index(read_records(_write_csv(tmp_path / "golden.csv")), str(path)) == len(ROWS)
+    index = LEIIndex(str(path))
+    try:
+        record = index.get("5493001kjy7uw9k12345")
+        assert record["company_name"] == "Niger Trading Company Ltd" and record["country"] == "US"
+        assert index.get("549300XXXXXXXXXXXXXX") is None and index.get("short") is None
+
+        # Whole-token matching: "Niger" does not pick up "Nigeria"
+        record, score = index.search_name(["Niger Trading Co"])
+        assert record["lei_number"] == "5493001KJY7UW9K12345" and score > 0.6
+        record, _ = index.search_name(["nope", "Evergreen Capital Partners"])
+        assert record["status"] == "LAPSED"
+        assert index.search_name(["Unknown Widgets"], min_score=0.6) == (None, 0.0)
+    finally:
+        index.close()
+
+
+def test_delta_merge_and_current_swap(tmp_path, monkeypatch):
+    monkeypatch.setattr(lei_index, "LEI_INDEX_REFRESH_SECONDS", 0)
+    monkeypatch.setattr(lei_index, "_index", None)
+    index_dir = str(tmp_path / "index")
+
+    first = import_golden_copy(_write_csv(tmp_path / "golden.csv"), index_dir)
+    before = lei_index.get_lei_index(index_dir)
+    assert before.path == first and len(before) == 4
+
+    delta = tmp_path / "delta.xml"
+    delta.write_text(XML, encoding="utf-8")
+    second = apply_delta(str(delta), index_dir)
+    assert second != first
+
+    after = lei_index.get_lei_index(index_dir)
+    assert after is not before and after.path == second and len(after) == 5
+    changed = after.get("5493004ABCDEFGH12345")
+    assert changed["company_name"] == "Meridian Holding Group GmbH" and changed["status"] == "LAPSED"
+    assert changed["dba_name"] == "Meridian Group"
+    assert changed["registration_authority_id"] == "HRB 123456" and changed["ein_number"] is None
+    assert after.get("5493005ABCDEFGH12345")["company_name"] == "Aurora Beacon Securities Inc."
+    assert after.get("5493001KJY7UW9K12345")["company_name"] == "Niger Trading Company Ltd"
+    # The mapping opened before the swap still answers
+    assert before.get("5493004ABCDEFGH12345")["company_name"] == "Meridian Holdings GmbH"
+
+
+def test_registration_authority_id_is_not_an_ein(tmp_path, monkeypatch):
+    from backend.agents import kyc_agent
+
+    path = tmp_path / "golden.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["LEI", "Entity.LegalName", "Entity.LegalAddress.Country",
+                         "Registration.RegistrationStatus", "Entity.RegistrationAuthority.RegistrationAuthorityEntityID"])
+        writer.writerow(["5493001KJY7UW9K12345", "Niger Trading Company Ltd", "US", "ISSUED", "4567891"])
+    build_index(read_records(str(path)), str(tmp_path / "lei.idx"))
+    index = LEIIndex(str(tmp_path / "lei.idx"))
+    monkeypatch.setattr(kyc_agent, "get_lei_index", lambda: index)
+    monkeypatch.setattr(kyc_agent, "insert_agent_log", lambda row: None)
+    try:
+        record = index.get("5493001KJY7UW9K12345")
+        assert record["registration_authority_id"] == "4567891" and record["ein_number"] is None
+
+        result = kyc_agent.lei_verify("5493001KJY7UW9K12345", "Niger Trading Company Ltd", "run", "ob",
+                                      ein_number="12-3456789")
+        assert result["recommendation"] == "PASS" and result["output"]["ein_match"]
+
+        result = kyc_agent.lei_verify("549300XXXXXXXXXXXXXX", "Unknown Widgets", "run", "ob")
+        assert result["flags"] == ["LEI '549300XXXXXXXXXXXXXX' not found in the LEI index"]
+    finally:
+        index.close()
@@ -0,0 +1,33 @@
+from backend.agents import llm_cache
+
+
+def test_cache_key_normalises_whitespace_and_tracks_documents():
+    a = llm_cache.cache_key("converse", "m", "Map  these\nresults ", system="Auditor")
+    b = llm_cache.cache_key("converse", "m", "Map these results", system="Auditor")
+    assert a == b
+    assert a != llm_cache.cache_key("converse", "m", "Map these results", system="Other")
+    assert llm_cache.cache_key("multimodal", "m", "p", documents={"bod_doc": "h1"}) != \
+        llm_cache.cache_key("multimodal", "m", "p", documents={"bod_doc": "h2"})
+
+
+def test_cached_call_hits_bypasses_and_skips_errors(monkeypatch):
+    store = {}
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "_stats", {})
+    monkeypatch.setattr(llm_cache, "_lookup", lambda key: (store[key], 1500) if key in store else None)
+    monkeypatch.setattr(llm_cache, "_store", lambda key, kind, model, stage, response, ms: store.__setitem__(key, response))
+    calls = []
+
+    def call():
+        calls.append(1)
+        return {"risk_level": "LOW"}
+
+    assert llm_cache.cached_call("converse", "m", "p", call, stage=2) == {"risk_level": "LOW"}
+    assert llm_cache.cached_call("converse", "m", "p", call, stage=2) == {"risk_level": "LOW"}
+    assert len(calls) == 1
+    llm_cache.cached_call("converse", "m", "p", call, stage=2, use_cache=False)
+    assert len(calls) == 2
+
+    llm_cache.cached_call("converse", "m", "q", lambda: {"error": "ThrottlingException"}, stage=2)
+    assert len(store) == 1
+    assert llm_cache.get_stats()["2"] == {"hits": 1, "misses": 2, "bypassed": 1, "saved_ms": 1500}
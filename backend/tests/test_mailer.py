@@ -0,0 +1,95 @@
+import socket
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+
+from backend import email_utils, mailer
+
+
+class RecordingHandler:
+    def __init__(self, reject=()):
+        self.sessions = set()
+        self.messages = []
+        self.reject = set(reject)
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.reject:
+            return "550 5.1.1 mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append((envelope.rcpt_tos[0], envelope.content.decode("utf-8", "replace")))
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler(reject={"gone@example.com"})
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+def _pool(port):
+    return mailer.SMTPPool(host="127.0.0.1", port=port, user="", password="", starttls=False,
+                           size=1, timeout=5, sender="ops@example.com")
+
+
+def test_bulk_status_changes_share_one_session(smtp_server):
+    handler, port = smtp_server
+    pool = _pool(port)
+    messages = [email_utils.status_update_email(f"p{i}@example.com", f"KX-{i}", "REJECTED") for i in range(50)]
+
+    results = pool.send_batch(messages[:25]) + pool.send_batch(messages[25:])
+    pool.close()
+
+    assert all(error is None for _, error in results)
+    assert len(handler.messages) == 50
+    assert pool.stats["connections"] == 1
+    assert len(handler.sessions) == 1
+
+
+def test_permanent_rejection_does_not_break_the_batch(smtp_server):
+    handler, port = smtp_server
+    pool = _pool(port)
+    messages = [email_utils.kyc_rejected_email(r, "KX-9", "n/a") for r in ("a@example.com", "gone@example.com", "b@example.com")]
+
+    results = pool.send_batch(messages)
+    pool.close()
+
+    errors = [error for _, error in results]
+    assert errors[0] is None and errors[2] is None
+    assert mailer.is_permanent(errors[1])
+    assert [rcpt for rcpt, _ in handler.messages] == ["a@example.com", "b@example.com"]
+
+
+def test_deliver_batch_marks_outcomes(smtp_server, monkeypatch):
+    _, port = smtp_server
+    queued = [
+        {"id": i, "attempts": 1, "max_attempts": 5, **email_utils.kyc_complete_email(r, "KX-1", "LOW")}
+        for i, r in enumerate(["a@example.com", "gone@example.com"], start=1)
+    ]
+    sent, failed = [], []
+    monkeypatch.setattr(mailer, "SMTP_MOCK", False)
+    monkeypatch.setattr(mailer, "claim_emails", lambda worker_id, limit: queued)
+    monkeypatch.setattr(mailer, "mark_sent", sent.extend)
+    monkeypatch.setattr(mailer, "mark_failed", lambda failures: failed.extend(m["id"] for m, _ in failures) or {})
+
+    assert mailer.deliver_batch("test", pool=_pool(port)) == 2
+    assert sent == [1] and failed == [2]
+
+
+def test_templates_escape_values():
+    message = email_utils.status_update_email("p@example.com", "KX-1", "CLARIFICATION_REQUIRED", "<b>docs</b> & more")
+    assert "&lt;b&gt;docs&lt;/b&gt; &amp; more" in message["html"]
+    assert "CLARIFICATION REQUIRED" in message["html"]
+    assert message["subject"] == "Update: Your Kinetix Application [KX-1]"
+    assert "Message from Operations" not in email_utils.status_update_email("p@example.com", "KX-1", "APPROVED")["html"]
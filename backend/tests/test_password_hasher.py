@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+bcrypt = pytest.importorskip("bcrypt")
+
+from backend import password_hasher
+
+
+@pytest.fixture(autouse=True)
+def thread_pool(monkeypatch):
+    # Same code path with threads: keeps the test independent of process start-up
+    from concurrent.futures import ThreadPoolExecutor
+    pool = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(password_hasher, "_get_pool", lambda: pool)
+    yield
+    pool.shutdown()
+
+
+def test_hash_and_verify_round_trip():
+    hashed = asyncio.run(password_hasher.hash_password("s3cret!"))
+    assert asyncio.run(password_hasher.verify_password("s3cret!", hashed))
+    assert not asyncio.run(password_hasher.verify_password("nope", hashed))
+
+
+def test_repeated_failure_skips_bcrypt(monkeypatch):
+    hashed = bcrypt.hashpw(b"right", bcrypt.gensalt(4)).decode()
+    calls = []
+    real = password_hasher._checkpw
+    monkeypatch.setattr(password_hasher, "_checkpw", lambda p, h: calls.append(p) or real(p, h))
+
+    for _ in range(3):
+        assert not asyncio.run(password_hasher.verify_password("wrong-again", hashed))
+    assert calls == ["wrong-again"]
+    assert asyncio.run(password_hasher.verify_password("right", hashed))
+
+
+def test_unknown_user_cache_is_case_insensitive_and_forgettable():
+    password_hasher.remember_unknown_user("Ghost@Example.com ")
+    assert password_hasher.is_known_unknown_user("ghost@example.com")
+    password_hasher.forget_unknown_user("ghost@example.com")
+    assert not password_hasher.is_known_unknown_user("ghost@example.com")
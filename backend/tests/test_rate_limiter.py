@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from backend.agents import rate_limiter
+
+
+class Throttled(Exception):
+    response = {"Error": {"Code": "ThrottlingException"}}
+
+
+def test_window_shrinks_on_throttle_and_grows_on_success(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "BEDROCK_THROTTLE_BACKOFF", 0.001)
+    limiter = rate_limiter.AdaptiveLimiter("m", rpm=6000, tpm=10**7, initial_concurrency=8, max_concurrency=8)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise Throttled()
+        return "ok"
+
+    assert limiter.call(flaky, timeout=5) == "ok"
+    assert len(attempts) == 2
+    snap = limiter.snapshot()
+    assert snap["throttled"] == 1 and snap["in_flight"] == 0
+    assert 4 <= snap["window"] < 8
+
+
+def test_concurrency_is_capped_by_window():
+    limiter = rate_limiter.AdaptiveLimiter("m", rpm=6000, tpm=10**7, initial_concurrency=2, max_concurrency=2)
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def work():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+
+    threads = [threading.Thread(target=limiter.call, args=(work,)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 2
+
+
+def test_request_bucket_times_out_when_quota_exhausted():
+    limiter = rate_limiter.AdaptiveLimiter("m", rpm=1, tpm=10**7)
+    limiter.call(lambda: None)
+    with pytest.raises(rate_limiter.RateLimitTimeout):
+        limiter.call(lambda: None, timeout=0.05)
+    assert limiter.snapshot()["timeouts"] == 1
+
+
+def test_exhausted_capacity_fails_the_stage_instead_of_returning_error(monkeypatch):
+    from backend.agents import orchestrator
+    from backend.agents.stage_executor import Check, StageExecutor
+
+    def no_capacity(name, fn, tokens=1, timeout=None):
+        raise rate_limiter.RateLimitTimeout(f"{name}: no capacity within deadline")
+
+    monkeypatch.setattr(orchestrator, "rate_limited", no_capacity)
+    monkeypatch.setattr(orchestrator, "get_bedrock_client", lambda client_type: object())
+    with pytest.raises(rate_limiter.RateLimitTimeout):
+        orchestrator._invoke_bedrock_model_direct("prompt", "auditor")
+
+    def throttled(results):
+        raise Throttled("ThrottlingException: Rate exceeded")
+
+    executor = StageExecutor([
+        Check("kyc_agent", throttled, default=dict),
+        Check("auditor", lambda r: {"kyc_pillars": []}, deps=["kyc_agent"], default=dict),
+    ])
+    executor.run()
+    with pytest.raises(Throttled):
+        orchestrator._raise_on_capacity_errors(executor, ["kyc_agent", "auditor"])
+
+    # Other failures keep degrading to the check's default
+    monkeypatch.setattr(orchestrator, "rate_limited", lambda name, fn, tokens=1, timeout=None: fn())
+    monkeypatch.setattr(orchestrator, "get_bedrock_client", lambda client_type: None)
+    assert "error" in orchestrator._invoke_bedrock_model_direct("prompt", "auditor")
@@ -0,0 +1,165 @@
+from psycopg2 import extensions
+
+from backend import db
+from backend.agents import rescreen
+from backend.db_pool import ConnectionPool
+from backend.agents.rescreen import DeltaIndex, PortfolioIndex, _delta_rows, _log_rows, _synthetic, min_matches
+
+
+def _brute_force(rows, delta_index, min_score):
+    hits = set()
+    for onboarding_id, role, name in rows:
+        for c in delta_index.match(name):
+            if c["score"] >= min_score:
+                hits.add((str(onboarding_id), role, name, c["matched_name"]))
+    return hits
+
+
+def _flatten(hits):
+    return {(oid, h["role"], h["name"], h["matched_name"]) for oid, hs in hits.items() for h in hs}
+
+
+def test_delta_rows_keep_latest_state_of_added_or_renamed_entries():
+    rows = [
+        (1, "ADD", "OFAC", "1", "Ocean Star", None, "vessel", "IRAN", "SDN", None),
+        (1, "ADD", "OFAC", "2", "Sea Breeze", None, "vessel", "IRAN", "SDN", None),
+        (2, "CHANGE", "OFAC", "1", "Ocean Star II", "Ocean Star", "vessel", "IRAN", "SDN", None),
+        (2, "REMOVE", "OFAC", "2", "Sea Breeze", None, "vessel", "IRAN", "SDN", None),
+        (2, "CHANGE", "OFAC", "3", "Gulf Trading", "Gulf Trading", "entity", "SDGT", "SDN", "Iran"),
+    ]
+    entries = _delta_rows(rows)
+    # Renamed entry screened under its new name; removed and program-only changes are not rescreened
+    assert [(e[0], e[5], e[6], e[8]) for e in entries] == [("Ocean Star II", "CHANGE", 2, "1")]
+
+
+def test_min_matches():
+    assert min_matches(1, 0.75) == 1
+    assert min_matches(2, 0.75) == 2
+    assert min_matches(3, 0.75) == 2
+    assert min_matches(4, 0.9) == 4
+
+
+def test_screen_matches_brute_force():
+    rows, entries = _synthetic(300, 60, seed=11)
+    delta_index = DeltaIndex(entries)
+    portfolio = PortfolioIndex(rows)
+    for min_score in (0.6, 0.75):
+        expected = _brute_force(rows, delta_index, min_score)
+        assert _flatten(portfolio.screen(delta_index, min_score)) == expected
+    assert expected
+
+
+def test_screen_counts_repeated_near_tokens_like_match():
+    entries = [("Petrov", "INDIVIDUAL", "RUSSIA-EO14024", "SDN", None, "ADD", 7, "OFAC", "99")]
+    rows = [("a1", "director", "Ivan Petrov Petrova"), ("a2", "ubo", "Petrova Petrov"),
+            ("a3", "ubo", "Anna Smith")]
+    delta_index = DeltaIndex(entries)
+    hits = PortfolioIndex(rows).screen(delta_index, 0.75)
+    assert _flatten(hits) == _brute_force(rows, delta_index, 0.75)
+    assert "a3" not in hits
+
+
+def test_log_rows_risk_by_role():
+    hit = {"matched_name": "Ocean Star", "program": "IRAN", "score": 0.9}
+    rows = _log_rows("run-1", {
+        "a1": [{**hit, "role": "director", "name": "Oceon Star"}],
+        "a2": [{**hit, "role": "ubo", "name": "Ocean Starr"}],
+    }, 3, 5, 10)
+    by_id = {r["onboarding_id"]: r for r in rows}
+    assert (by_id["a1"]["risk_level"], by_id["a1"]["recommendation"]) == ("HIGH", "FLAG")
+    assert (by_id["a2"]["risk_level"], by_id["a2"]["recommendation"]) == ("CRITICAL", "REJECT")
+    assert by_id["a2"]["output"]["list_version"] == 5
+    assert all(r["check_name"] == "sanctions_rescreen" and r["id"] for r in rows)
+
+
+class _Conn:
+    """Records the statements of each transaction; commit() closes one."""
+
+    def __init__(self):
+        self.pending, self.committed = [], []
+
+    def cursor(self, name=None):
+        return _Cursor(self)
+
+    def commit(self):
+        self.committed.append(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.pending.append((" ".join(sql.split()), params))
+
+    def fetchone(self):
+        sql = self.conn.pending[-1][0]
+        return (True,) if "advisory_lock" in sql else ((4,) if "list_version" in sql else (0,))
+
+
+def test_failed_log_write_leaves_no_hits_behind(monkeypatch):
+    rows, entries = _synthetic(300, 60, seed=11)
+    conn = _Conn()
+    writes = []
+
+    def write_agent_logs(cursor, batch):
+        if writes:
+            raise RuntimeError("connection lost")
+        writes.append(batch)
+        cursor.execute("INSERT INTO client_onboarding.ai_agent_logs", batch)
+
+    monkeypatch.setattr(rescreen, "get_connection", lambda: conn)
+    monkeypatch.setattr(rescreen, "release_connection", lambda c: None)
+    monkeypatch.setattr(rescreen, "load_delta", lambda cursor, a, b: entries)
+    monkeypatch.setattr(rescreen, "load_customer_names", lambda c: rows)
+    monkeypatch.setattr(rescreen, "write_agent_logs", write_agent_logs)
+    monkeypatch.setattr(rescreen, "RESCREEN_LOG_BATCH", 1)
+
+    assert rescreen.rescreen_portfolio(min_score=0.6) is None
+    statements = [sql for tx in conn.committed for sql, _ in tx]
+    assert writes and not any("ai_agent_logs" in sql for sql in statements)
+    finished = [params for tx in conn.committed for sql, params in tx if "SET status" in sql]
+    assert [p[0] for p in finished] == ["FAILED"]
+
+
+class _PooledConn(_Conn):
+    """A pooled connection on which another session holds the rescreen lock."""
+
+    closed = 0
+
+    class info:
+        transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+class _PoolLog:
+    def __init__(self):
+        self.errors = []
+
+    def error(self, msg):
+        self.errors.append(msg)
+
+    warning = info = error
+
+
+def test_lock_miss_returns_the_connection_once(monkeypatch):
+    monkeypatch.setattr(_Cursor, "fetchone", lambda self: (False,))
+    log = _PoolLog()
+    pool = ConnectionPool(_PooledConn, minconn=0, maxconn=2, logger=log)
+    monkeypatch.setattr(db, "connection_pool", pool)
+
+    assert rescreen.rescreen_portfolio() is None
+    assert pool.stats()["in_use"] == 0 and pool.stats()["idle"] == 1 and not log.errors
+    assert pool.getconn() is not pool.getconn()
@@ -0,0 +1,115 @@
+import csv
+import io
+
+from backend.agents import sanctions_ingest
+from backend.agents.sanctions_ingest import COLUMNS, read_records, record_hash, write_synthetic
+
+OFAC_CSV = (
+    '36,"AEROCARIBBEAN AIRLINES",-0- ,"CUBA",-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,"Havana, Cuba."\n'
+    '173,"ANGLO-CARIBBEAN CO., LTD.",-0- ,"CUBA] [SDGT",-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,-0- \n'
+    '306,"BANCO NACIONAL DE CUBA","individual","CUBA",-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,-0- ,-0- \n'
+    '9999,"OCEAN STAR","vessel","IRAN",-0- ,"9HA1234","Crude Oil Tanker",-0- ,-0- ,"Panama",-0- ,-0- \n'
+    '\x1a\n'
+)
+
+UN_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<CONSOLIDATED_LIST dateGenerated="2026-10-01T00:00:00">
+  <INDIVIDUALS>
+    <INDIVIDUAL>
+      <DATAID>6908555</DATAID>
+      <FIRST_NAME>RI</FIRST_NAME><SECOND_NAME>WON</SECOND_NAME><THIRD_NAME>HO</THIRD_NAME>
+      <UN_LIST_TYPE>DPRK</UN_LIST_TYPE><REFERENCE_NUMBER>KPi.033</REFERENCE_NUMBER>
+      <COMMENTS1>Official of the Ministry of State Security</COMMENTS1>
+      <NATIONALITY><VALUE>Democratic People's Republic of Korea</VALUE></NATIONALITY>
+      <INDIVIDUAL_ALIAS><QUALITY>Good</QUALITY><ALIAS_NAME>Li Won-ho</ALIAS_NAME></INDIVIDUAL_ALIAS>
+      <INDIVIDUAL_ALIAS><QUALITY>Low</QUALITY><ALIAS_NAME>Ri</ALIAS_NAME></INDIVIDUAL_ALIAS>
+      <INDIVIDUAL_ALIAS><QUALITY>Good</QUALITY><ALIAS_NAME>Ri Won-Ho</ALIAS_NAME></INDIVIDUAL_ALIAS>
+    </INDIVIDUAL>
+  </INDIVIDUALS>
+  <ENTITIES>
+    <ENTITY>
+      <DATAID>110404</DATAID>
+      <FIRST_NAME>AL-AKHTAR TRUST INTERNATIONAL</FIRST_NAME>
+      <UN_LIST_TYPE>Al-Qaida</UN_LIST_TYPE><REFERENCE_NUMBER>QDe.121</REFERENCE_NUMBER>
+      <ENTITY_ADDRESS><STREET>Gulshan-e-Iqbal</STREET><CITY>Karachi</CITY><COUNTRY>Pakistan</COUNTRY></ENTITY_ADDRESS>
+    </ENTITY>
+  </ENTITIES>
+</CONSOLIDATED_LIST>
+"""
+
+EU_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<export xmlns="http://eu.europa.ec/fpi/fsd/export" generationDate="2026-10-01T00:00:00">
+  <sanctionEntity logicalId="13" euReferenceNumber="EU.27.28">
+    <remark>Former President of Iraq</remark>
+    <regulation programme="IRQ"/>
+    <subjectType code="person"/>
+    <nameAlias wholeName="Saddam Hussein Al-Tikriti" logicalId="17"/>
+    <nameAlias wholeName="Abu Ali" logicalId="18"/>
+    <citizenship countryDescription="IRAQ"/>
+  </sanctionEntity>
+  <sanctionEntity logicalId="2200">
+    <regulation programme="RUS"/>
+    <subjectType code="enterprise"/>
+    <nameAlias wholeName="Joint Stock Company Example Bank" logicalId="2201"/>
+    <address street="1 Red Square" city="Moscow" countryDescription="RUSSIAN FEDERATION"/>
+  </sanctionEntity>
+</export>
+"""
+
+
+def test_ofac_csv(tmp_path):
+    path = tmp_path / "sdn.csv"
+    path.write_text(OFAC_CSV, encoding="utf-8")
+    records = read_records(str(path))
+    assert list(records) == ["36", "173", "306", "9999"]
+    assert records["36"]["entity_type"] == "ENTITY" and records["36"]["remarks"] == "Havana, Cuba."
+    assert records["173"]["program"] == "CUBA; SDGT" and records["173"]["list_type"] == "SDN"
+    assert records["306"]["entity_type"] == "INDIVIDUAL" and records["306"]["remarks"] is None
+    assert records["9999"]["entity_type"] == "VESSEL" and records["9999"]["country"] == "Panama"
+
+
+def test_un_xml_with_aliases(tmp_path):
+    path = tmp_path / "consolidated.xml"
+    path.write_text(UN_XML, encoding="utf-8")
+    records = read_records(str(path))
+    person = records["6908555"]
+    assert person["entity_name"] == "RI WON HO" and person["program"] == "DPRK"
+    assert person["tax_id"] == "KPi.033" and person["country"] == "Democratic People's Republic of Korea"
+    aliases = [r for uid, r in records.items() if uid.startswith("6908555#")]
+    # "Low" quality and same-as-primary aliases are dropped
+    assert [a["entity_name"] for a in aliases] == ["Li Won-ho"]
+    assert aliases[0]["remarks"] == "Alias of RI WON HO"
+    entity = records["110404"]
+    assert entity["entity_type"] == "ENTITY" and entity["entity_address"] == "Gulshan-e-Iqbal, Karachi, Pakistan"
+
+
+def test_eu_xml(tmp_path):
+    path = tmp_path / "eu.xml"
+    path.write_text(EU_XML, encoding="utf-8")
+    records = read_records(str(path))
+    assert records["13"]["entity_name"] == "Saddam Hussein Al-Tikriti"
+    assert records["13"]["entity_type"] == "INDIVIDUAL" and records["13"]["program"] == "IRQ"
+    assert any(r["entity_name"] == "Abu Ali" for uid, r in records.items() if uid.startswith("13#"))
+    assert records["2200"]["country"] == "RUSSIAN FEDERATION"
+    # Alias ids depend on the name only, so reordering aliases is not a change
+    assert read_records(str(path)).keys() == records.keys()
+
+
+def test_synthetic_revisions_make_a_small_delta(tmp_path):
+    write_synthetic(str(tmp_path / "r0.csv"), 5000)
+    write_synthetic(str(tmp_path / "r1.csv"), 5000, revision=1)
+    before, after = read_records(str(tmp_path / "r0.csv")), read_records(str(tmp_path / "r1.csv"))
+    changed = [uid for uid in before.keys() & after.keys() if record_hash(before[uid]) != record_hash(after[uid])]
+    assert len(after.keys() - before.keys()) == 100
+    assert len(before.keys() - after.keys()) == 5
+    assert len(changed) == 25
+
+
+def test_copy_buffer_writes_nulls_unquoted():
+    records = read_records("db/csv/sanctions_list.csv")
+    assert len(records) == 200 and all(r["list_type"] for r in records.values())
+    rows = list(csv.reader(io.StringIO(sanctions_ingest._copy_buffer(records.values()).getvalue())))
+    assert len(rows) == 200 and len(rows[0]) == len(COLUMNS) + 1
+    record = dict.fromkeys(COLUMNS)
+    record.update(source_uid="1", entity_name="Example")
+    assert sanctions_ingest._copy_buffer([record]).getvalue() == f"1,Example,,,,,,,,{record_hash(record)}\r\n"
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from backend.agents.stage_executor import Check, StageExecutor
+
+
+def slow(value, seconds=0.2):
+    def run(results):
+        time.sleep(seconds)
+        return value
+    return run
+
+
+def test_independent_checks_run_concurrently_and_deps_see_results():
+    start = time.monotonic()
+    results = StageExecutor([
+        Check("registry", slow("reg")),
+        Check("hygiene", slow("hyg")),
+        Check("sanctions", slow("san")),
+        Check("agent", lambda r: (r["registry"], r["hygiene"], r["sanctions"]),
+              deps=["registry", "hygiene", "sanctions"]),
+    ]).run()
+    elapsed = time.monotonic() - start
+    assert results["agent"] == ("reg", "hyg", "san")
+    assert elapsed < 0.45
+
+
+def test_timeout_and_failure_fall_back_to_default():
+    def boom(results):
+        raise RuntimeError("bedrock throttled")
+
+    executor = StageExecutor([
+        Check("slow", slow("late", seconds=1.0), timeout=0.1, default=dict),
+        Check("broken", boom, default="n/a"),
+        Check("downstream", lambda r: (r["slow"], r["broken"]), deps=["slow", "broken"]),
+    ])
+    results = executor.run()
+    assert results["downstream"] == ({}, "n/a")
+    assert executor.errors["slow"].startswith("timed out")
+    assert "bedrock throttled" in executor.errors["broken"]
+    assert isinstance(executor.exceptions["broken"], RuntimeError) and "slow" not in executor.exceptions
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError):
+        StageExecutor([Check("a", slow(1), deps=["missing"])])
+    with pytest.raises(ValueError):
+        StageExecutor([Check("a", slow(1), deps=["b"]), Check("b", slow(2), deps=["a"])])
@@ -0,0 +1,33 @@
+import json
+
+from backend.agents.streaming_json import IncrementalJSONExtractor
+
+
+def test_fields_and_pillars_emitted_as_soon_as_complete():
+    answer = json.dumps({
+        "risk_level": "LOW",
+        "kyc_pillars": [
+            {"pillar_name": "Institutional Registry", "evidence": "LEI {active}, \"ok\"", "result": "PASS"},
+            {"pillar_name": "Identity Hygiene", "result": "FLAG"},
+        ],
+        "final_risk_score": 12,
+    })
+    text = "Here is the result: " + answer + " done."
+    ex = IncrementalJSONExtractor()
+
+    seen = []
+    for i in range(0, len(text), 7):
+        for event in ex.feed(text[i:i + 7]):
+            seen.append((event, ex._pos))
+
+    events = [e for e, _ in seen]
+    assert events == [
+        ("field", "risk_level", "LOW"),
+        ("item", "kyc_pillars", {"pillar_name": "Institutional Registry", "evidence": "LEI {active}, \"ok\"", "result": "PASS"}),
+        ("item", "kyc_pillars", {"pillar_name": "Identity Hygiene", "result": "FLAG"}),
+        ("field", "kyc_pillars", json.loads(answer)["kyc_pillars"]),
+        ("field", "final_risk_score", 12),
+    ]
+    # The first pillar is available well before the answer finishes
+    first_pillar_at = seen[1][1]
+    assert first_pillar_at < text.index("Identity Hygiene")
@@ -0,0 +1,47 @@
+import threading
+
+from backend import job_queue, worker
+
+
+def test_retry_delay_backs_off_and_caps(monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_RETRY_BASE_SECONDS", 10)
+    monkeypatch.setattr(job_queue, "JOB_RETRY_MAX_SECONDS", 60)
+    assert 5 <= job_queue.retry_delay(1) <= 10
+    assert 20 <= job_queue.retry_delay(3) <= 40
+    assert 30 <= job_queue.retry_delay(10) <= 60
+
+
+def test_worker_completes_and_fails_jobs(monkeypatch):
+    jobs = [
+        {"id": 1, "onboarding_id": "a", "payload": {}, "attempts": 1, "max_attempts": 3},
+        {"id": 2, "onboarding_id": "boom", "payload": {}, "attempts": 3, "max_attempts": 3},
+    ]
+    completed, failed = [], []
+    w = worker.Worker(job_types=["kyc"], concurrency={"kyc": 1})
+
+    def claim(job_type, name):
+        if jobs:
+            return jobs.pop(0)
+        w._stop.set()
+        return None
+
+    def run(job_type, onboarding_id, payload):
+        if onboarding_id == "boom":
+            raise RuntimeError("bedrock unavailable")
+
+    def fail(job, error):
+        failed.append((job["id"], error))
+        return "DEAD"
+
+    monkeypatch.setattr(worker, "claim_job", claim)
+    monkeypatch.setattr(worker, "run_job", run)
+    monkeypatch.setattr(worker, "complete_job", completed.append)
+    monkeypatch.setattr(worker, "fail_job", fail)
+
+    t = threading.Thread(target=w._loop, args=("kyc", 0))
+    t.start()
+    t.join(5)
+
+    assert completed == [1]
+    assert failed == [(2, "RuntimeError: bedrock unavailable")]
+    assert w.stats["kyc"]["succeeded"] == 1 and w.stats["kyc"]["dead"] == 1
@@ -0,0 +1,117 @@
+"""
+Ticket event hub — fans PostgreSQL NOTIFY messages out to SSE subscribers.
+One dedicated asyncpg connection LISTENs on TICKET_EVENTS_CHANNEL (fed by
+insert_agent_log and update_onboarding_status in db.py / async_db.py) and
+pushes each event onto the queues of clients watching that ticket.
+
+If the listener connection drops, every subscriber receives a "resync"
+event once it is re-established so it can re-read the delta it may have
+missed instead of silently stalling.
+"""
+
+import asyncio
+import json
+import os
+
+import asyncpg
+
+from .db import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD, DB_SSL_MODE, TICKET_EVENTS_CHANNEL
+from .logger import logger_db as logger
+
+# Per-subscriber queue depth; on overflow the queue is collapsed to a single resync
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("TICKET_EVENTS_QUEUE_SIZE", "100"))
+
+# Seconds between listener reconnect attempts
+RECONNECT_DELAY = float(os.getenv("TICKET_EVENTS_RECONNECT_SECONDS", "5"))
+
+_RESYNC = {"type": "resync"}
+
+
+class TicketEventHub:
+    def __init__(self):
+        self._subscribers = {}      # onboarding_id -> set of asyncio.Queue
+        self._task = None
+        self._conn = None
+
+    # -- subscriptions ---------------------------------------------------
+
+    def subscribe(self, onboarding_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(str(onboarding_id), set()).add(queue)
+        return queue
+
+    def unsubscribe(self, onboarding_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(str(onboarding_id))
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                self._subscribers.pop(str(onboarding_id), None)
+
+    def _publish(self, queue: asyncio.Queue, event: dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: drop the backlog and let it re-read from the database
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(_RESYNC)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"[TicketEvents] Ignoring malformed payload: {payload[:200]}")
+            return
+        for queue in list(self._subscribers.get(event.get("onboarding_id"), ())):
+            self._publish(queue, event)
+
+    # -- listener lifecycle ----------------------------------------------
+
+    async def _listen_forever(self):
+        first = True
+        while True:
+            lost = asyncio.Event()
+            try:
+                self._conn = await asyncpg.connect(
+                    host=DB_HOST,
+                    port=int(DB_PORT),
+                    database=DB_NAME,
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    ssl=DB_SSL_MODE
+                )
+                self._conn.add_termination_listener(lambda _conn: lost.set())
+                await self._conn.add_listener(TICKET_EVENTS_CHANNEL, self._on_notify)
+                logger.info(f"[TicketEvents] Listening on '{TICKET_EVENTS_CHANNEL}'")
+                if not first:
+                    for queues in list(self._subscribers.values()):
+                        for queue in list(queues):
+                            self._publish(queue, _RESYNC)
+                first = False
+                await lost.wait()
+                logger.warning("[TicketEvents] Listener connection lost; reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[TicketEvents] Listener failed: {e}")
+            finally:
+                if self._conn is not None and not self._conn.is_closed():
+                    await self._conn.close()
+                self._conn = None
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+ticket_events = TicketEventHub()
@@ -0,0 +1,150 @@
+"""
+Agent stage worker — consumes client_onboarding.agent_jobs
+Run alongside the API:  python -m backend.worker [--types document,kyc,aml]
+
+Each stage type gets its own fixed number of threads (JOB_CONCURRENCY_<TYPE>),
+so a burst of signups queues document jobs instead of starving KYC/AML work
+or the API process. Several worker processes may run against the same table.
+The same process also drains the email outbox (EMAIL_SENDER_THREADS threads,
+see backend/mailer.py) unless started with --no-email.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+
+from . import mailer
+from .agents import llm_cache, rate_limiter
+from .job_queue import (
+    JOB_TYPES, claim_job, complete_job, fail_job, requeue_abandoned_jobs, run_job
+)
+from .logger import logger_agents as logger
+
+# Threads per stage type
+JOB_CONCURRENCY = {
+    job_type: int(os.getenv(f"JOB_CONCURRENCY_{job_type.upper()}", default))
+    for job_type, default in (("document", "2"), ("kyc", "4"), ("aml", "4"))
+}
+
+# Idle poll interval and how often abandoned RUNNING jobs are swept
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_REAP_SECONDS = float(os.getenv("JOB_REAP_SECONDS", "60"))
+
+# Outbox sender threads; they share mailer's SMTP session pool
+EMAIL_SENDER_THREADS = int(os.getenv("EMAIL_SENDER_THREADS", "1"))
+
+
+class Worker:
+    def __init__(self, job_types=JOB_TYPES, concurrency=None, email_senders=EMAIL_SENDER_THREADS):
+        self.job_types = tuple(job_types)
+        self.concurrency = {**JOB_CONCURRENCY, **(concurrency or {})}
+        self.email_senders = email_senders
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads = []
+        self._stats_lock = threading.Lock()
+        self.stats = {t: {"succeeded": 0, "retried": 0, "dead": 0, "run_ms_total": 0, "wait_ms_total": 0}
+                      for t in self.job_types}
+
+    def _record(self, job_type, outcome, run_ms, wait_ms=0):
+        with self._stats_lock:
+            s = self.stats[job_type]
+            s[outcome] += 1
+            s["run_ms_total"] += run_ms
+            s["wait_ms_total"] += wait_ms
+
+    def _loop(self, job_type, slot):
+        name = f"{self.worker_id}/{job_type}-{slot}"
+        while not self._stop.is_set():
+            job = claim_job(job_type, name)
+            if not job:
+                self._stop.wait(JOB_POLL_SECONDS)
+                continue
+
+            wait_ms = 0
+            if job["attempts"] == 1 and job.get("created_at"):
+                wait_ms = int((time.time() - job["created_at"].timestamp()) * 1000)
+            logger.info(
+                f"[Worker] {name} running {job_type} job {job['id']} for {job['onboarding_id']} "
+                f"(attempt {job['attempts']}/{job['max_attempts']}, queued {wait_ms}ms)"
+            )
+            start = time.time()
+            try:
+                run_job(job_type, job["onboarding_id"], job.get("payload") or {})
+            except Exception as e:
+                run_ms = int((time.time() - start) * 1000)
+                status = fail_job(job, f"{type(e).__name__}: {e}")
+                self._record(job_type, "dead" if status == "DEAD" else "retried", run_ms, wait_ms)
+                logger.error(f"[Worker] {job_type} job {job['id']} failed ({status}): {e}", exc_info=True)
+                continue
+            run_ms = int((time.time() - start) * 1000)
+            complete_job(job["id"])
+            self._record(job_type, "succeeded", run_ms, wait_ms)
+            logger.info(f"[Worker] {job_type} job {job['id']} done in {run_ms}ms")
+
+    def _reaper(self):
+        while not self._stop.wait(JOB_REAP_SECONDS):
+            requeue_abandoned_jobs()
+            if self.email_senders:
+                mailer.requeue_stale_emails()
+            limits = rate_limiter.get_stats()
+            if limits:
+                logger.info(f"[Worker] Bedrock rate control: {limits}")
+
+    def start(self):
+        requeue_abandoned_jobs()
+        if self.email_senders:
+            mailer.requeue_stale_emails()
+        for job_type in self.job_types:
+            for slot in range(self.concurrency.get(job_type, 1)):
+                t = threading.Thread(target=self._loop, args=(job_type, slot), name=f"{job_type}-{slot}", daemon=True)
+                t.start()
+                self._threads.append(t)
+        for slot in range(self.email_senders):
+            t = threading.Thread(target=mailer.run_sender, args=(self._stop, f"{self.worker_id}/email-{slot}"),
+                                 name=f"email-{slot}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        reaper = threading.Thread(target=self._reaper, name="job-reaper", daemon=True)
+        reaper.start()
+        self._threads.append(reaper)
+        logger.info(f"[Worker] {self.worker_id} started: {', '.join(f'{t}={self.concurrency.get(t, 1)}' for t in self.job_types)}, "
+                    f"email={self.email_senders}")
+
+    def stop(self, timeout=None):
+        """Stops claiming new jobs and waits for running ones to finish."""
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        mailer.close_pool()
+        logger.info(f"[Worker] {self.worker_id} stopped. Stats: {self.stats}. LLM cache: {llm_cache.get_stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run agent stage jobs from client_onboarding.agent_jobs")
+    parser.add_argument("--types", default=",".join(JOB_TYPES),
+                        help="Comma-separated stage types to process (default: all)")
+    parser.add_argument("--no-email", action="store_true",
+                        help="Do not send queued emails from this process")
+    args = parser.parse_args()
+
+    job_types = [t.strip() for t in args.types.split(",") if t.strip()]
+    unknown = [t for t in job_types if t not in JOB_TYPES]
+    if unknown:
+        parser.error(f"unknown job types: {', '.join(unknown)}")
+
+    worker = Worker(job_types, email_senders=0 if args.no_email else EMAIL_SENDER_THREADS)
+    done = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: done.set())
+    signal.signal(signal.SIGINT, lambda *_: done.set())
+    worker.start()
+    while not done.wait(1):
+        pass
+    worker.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+-- ============================================================
+-- AGENT LOG CURSOR INDEX MIGRATION
+-- Serves /admin/tickets/{id}/agent-logs (since_id / since_ts
+-- cursors, ORDER BY created_at, id) straight from the index
+-- instead of a filter + sort over every log row of the ticket.
+-- Run in psql: \i db/agent_logs_index_migration.sql
+-- ============================================================
+
+-- Keyset order used by get_agent_logs: (onboarding_id, created_at, id).
+-- stage is included so stage-filtered queries are resolved in the index.
+CREATE INDEX IF NOT EXISTS idx_ai_logs_onboarding_created
+    ON client_onboarding.ai_agent_logs (onboarding_id, created_at, id)
+    INCLUDE (stage);
+
+-- The single-column index is a prefix of the one above
+DROP INDEX IF EXISTS client_onboarding.idx_ai_logs_onboarding;
+
+ANALYZE client_onboarding.ai_agent_logs;
+
+-- ============================================================
+-- VERIFY (uncomment to check after running)
+-- ============================================================
+-- SELECT indexname, indexdef FROM pg_indexes
+--   WHERE schemaname = 'client_onboarding' AND tablename = 'ai_agent_logs';
+--
+-- EXPLAIN ANALYZE
+--   SELECT id, created_at FROM client_onboarding.ai_agent_logs
+--   WHERE onboarding_id = '00000000-0000-0000-0000-000000000000'
+--   ORDER BY created_at, id LIMIT 50;
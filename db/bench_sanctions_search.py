@@ -0,0 +1,105 @@
+"""
+Benchmark: legacy per-token ILIKE loop vs the batched pg_trgm query used by
+kyc_agent._ilike_match, at 10k and 100k sanctions rows.
+
+Synthetic rows are inserted into client_onboarding.sanctions_list inside a
+transaction that is rolled back at the end, so the real list is untouched.
+Requires db/trgm_search_migration.sql to have been applied.
+
+Usage (from repo root):  python -m db.bench_sanctions_search [--sizes 10000 100000]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from backend.db import get_connection, release_connection
+from backend.agents.kyc_agent import _ilike_match, _COMMON_TOKENS
+
+_SYLLABLES = [
+    "al", "ba", "cor", "da", "el", "fa", "gor", "ha", "is", "ka", "lo", "mir",
+    "na", "ov", "pet", "ra", "sa", "tov", "ur", "vek", "ya", "zan", "ser", "gei"
+]
+
+# One onboarding case: company + UBOs + directors
+_PARTIES = [
+    ["Wagner Shield Corp", "Dmitri Volkov", "Elena Sorokina", "Pavel Morozov", "Anna Kuznetsova"],
+    ["Evergreen Financial Group", "James Whitfield", "Sarah Chen", "Michael Grant", "Olivia Brooks"],
+    ["Persia Cargo Intl", "Reza Tehrani", "Mahmoud Karimi", "Leila Ahmadi", "Farid Nouri"],
+    ["Petroleo Phoenix SA", "Carlos Mendoza", "Luisa Ortega", "Diego Alvarez", "Rosa Jimenez"],
+]
+
+
+def _synthetic_name(rng):
+    words = ["".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+             for _ in range(rng.randint(2, 3))]
+    return " ".join(words)
+
+
+def _legacy_loop(cursor, names):
+    """The pre-trigram implementation: one ILIKE query per name token."""
+    results = {}
+    for name in names:
+        tokens = [t.lower() for t in name.split() if len(t) > 3 and t.lower() not in _COMMON_TOKENS]
+        hits = []
+        for token in tokens:
+            cursor.execute("""
+                SELECT entity_name, entity_type, program, list_type, country
+                FROM client_onboarding.sanctions_list
+                WHERE entity_name ILIKE %s
+                LIMIT 5
+            """, (f"%{token}%",))
+            hits.extend(cursor.fetchall())
+        results[name] = hits
+    return results
+
+
+def _time_ms(fn, cursor, repeats):
+    samples = []
+    for _ in range(repeats):
+        for party in _PARTIES:
+            start = time.perf_counter()
+            fn(cursor, party)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def run(sizes, repeats):
+    rng = random.Random(42)
+    conn = get_connection()
+    if not conn:
+        print("Failed to connect to DB")
+        return
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM client_onboarding.sanctions_list")
+            current = cursor.fetchone()[0]
+            print(f"{'rows':>8} | {'legacy mean':>12} {'p95':>8} | {'trgm mean':>10} {'p95':>8} | speedup")
+            for size in sorted(sizes):
+                missing = size - current
+                if missing > 0:
+                    rows = [(_synthetic_name(rng), "ENTITY", "BENCH", "SDN", "Nowhere") for _ in range(missing)]
+                    cursor.executemany("""
+                        INSERT INTO client_onboarding.sanctions_list
+                            (entity_name, entity_type, program, list_type, country)
+                        VALUES (%s, %s, %s, %s, %s)
+                    """, rows)
+                    current = size
+                cursor.execute("ANALYZE client_onboarding.sanctions_list")
+                legacy_mean, legacy_p95 = _time_ms(_legacy_loop, cursor, repeats)
+                trgm_mean, trgm_p95 = _time_ms(_ilike_match, cursor, repeats)
+                print(f"{size:>8} | {legacy_mean:>10.1f}ms {legacy_p95:>6.1f}ms | "
+                      f"{trgm_mean:>8.1f}ms {trgm_p95:>6.1f}ms | {legacy_mean / trgm_mean:>5.1f}x")
+    finally:
+        conn.rollback()
+        release_connection(conn)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+    run(args.sizes, args.repeats)
@@ -0,0 +1,57 @@
+-- ============================================================
+-- CONTENT-ADDRESSED DOCUMENT STORE MIGRATION
+-- Documents are stored once in S3 under their SHA-256
+-- (blobs/sha256/ab/abcd….pdf, see backend/document_store.py).
+-- onboarding_documents links each ticket to the hashes it
+-- submitted; document_extractions caches the multimodal OCR
+-- result per hash so the document agent skips Bedrock for
+-- documents it has already read.
+-- The *_s3_uri columns on onboarding_details keep pointing at
+-- the blob URIs, so downloads and older tickets are unaffected.
+-- Run in psql: \i db/document_store_migration.sql
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS client_onboarding.document_blobs (
+    sha256 VARCHAR(64) PRIMARY KEY,
+    s3_uri TEXT NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS client_onboarding.onboarding_documents (
+    onboarding_id UUID NOT NULL REFERENCES client_onboarding.onboarding_details(id) ON DELETE CASCADE,
+    doc_field VARCHAR(40) NOT NULL,         -- bod_list | financials | ownership | incorporation_doc | ...
+    sha256 VARCHAR(64) NOT NULL REFERENCES client_onboarding.document_blobs(sha256),
+    PRIMARY KEY (onboarding_id, doc_field)
+);
+
+-- "Which tickets submitted this document?"
+CREATE INDEX IF NOT EXISTS idx_onboarding_documents_sha256
+    ON client_onboarding.onboarding_documents (sha256);
+
+CREATE TABLE IF NOT EXISTS client_onboarding.document_extractions (
+    sha256 VARCHAR(64) NOT NULL REFERENCES client_onboarding.document_blobs(sha256),
+    doc_type VARCHAR(40) NOT NULL,          -- incorporation_doc | bod_doc | ownership_doc | ein_doc
+    extractor_version VARCHAR(80) NOT NULL, -- model + prompt version; bump to invalidate
+    result JSONB NOT NULL,
+    model_used VARCHAR(100),
+    hit_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_used_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (sha256, doc_type, extractor_version)
+);
+
+COMMENT ON TABLE client_onboarding.document_extractions IS
+    'OCR results keyed by document hash; reused by run_document_agent_stage';
+
+-- ============================================================
+-- VERIFY (uncomment to check after running)
+-- ============================================================
+-- SELECT COUNT(*) AS blobs, pg_size_pretty(SUM(size_bytes)) AS stored
+--   FROM client_onboarding.document_blobs;
+--
+-- SELECT COUNT(*) AS references, COUNT(DISTINCT sha256) AS distinct_documents
+--   FROM client_onboarding.onboarding_documents;
+--
+-- SELECT doc_type, COUNT(*) AS cached, SUM(hit_count) AS reused
+--   FROM client_onboarding.document_extractions GROUP BY doc_type;
@@ -0,0 +1,50 @@
+-- ============================================================
+-- EMAIL OUTBOX MIGRATION
+-- Durable queue for participant notifications. The API and the
+-- agent stages insert rendered messages; the mail sender in
+-- `python -m backend.worker` claims batches with
+-- SELECT ... FOR UPDATE SKIP LOCKED, delivers them over pooled
+-- SMTP sessions, retries with backoff and marks messages DEAD
+-- after max_attempts (or on a permanent 5xx rejection).
+-- Run in psql: \i db/email_outbox_migration.sql
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS client_onboarding.email_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    template VARCHAR(50) NOT NULL,          -- confirmation | status_update | kyc_complete | ...
+    recipient VARCHAR(320) NOT NULL,
+    subject TEXT NOT NULL,
+    html_body TEXT,                         -- cleared once SENT (may contain temporary passwords)
+    status VARCHAR(20) NOT NULL DEFAULT 'QUEUED',
+    -- Status values: QUEUED | SENDING | SENT | DEAD
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_by VARCHAR(100),
+    locked_at TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Claim order for senders
+CREATE INDEX IF NOT EXISTS idx_email_outbox_claim
+    ON client_onboarding.email_outbox (run_after, id)
+    WHERE status = 'QUEUED';
+
+-- Stale-lock reaper
+CREATE INDEX IF NOT EXISTS idx_email_outbox_sending
+    ON client_onboarding.email_outbox (locked_at)
+    WHERE status = 'SENDING';
+
+COMMENT ON TABLE client_onboarding.email_outbox IS
+    'Outbound email queue; delivered in batches by backend/mailer.py (run from backend/worker.py)';
+
+-- ============================================================
+-- VERIFY (uncomment to check after running)
+-- ============================================================
+-- SELECT template, status, COUNT(*) FROM client_onboarding.email_outbox
+--   GROUP BY template, status ORDER BY template, status;
+--
+-- SELECT id, recipient, attempts, last_error FROM client_onboarding.email_outbox
+--   WHERE status = 'DEAD' ORDER BY id DESC LIMIT 20;
@@ -0,0 +1,53 @@
+-- ============================================================
+-- AGENT JOB QUEUE MIGRATION
+-- Durable queue for the document / KYC / AML agent stages.
+-- The API enqueues, `python -m backend.worker` claims jobs with
+-- SELECT ... FOR UPDATE SKIP LOCKED, retries with backoff and
+-- marks jobs DEAD after max_attempts.
+-- Run in psql: \i db/job_queue_migration.sql
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS client_onboarding.agent_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    job_type VARCHAR(30) NOT NULL,          -- document | kyc | aml
+    onboarding_id UUID NOT NULL REFERENCES client_onboarding.onboarding_details(id) ON DELETE CASCADE,
+    payload JSONB DEFAULT '{}'::jsonb,      -- email, tracking_id for notifications
+    status VARCHAR(20) NOT NULL DEFAULT 'QUEUED',
+    -- Status values: QUEUED | RUNNING | SUCCEEDED | DEAD
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    locked_by VARCHAR(100),
+    locked_at TIMESTAMP WITH TIME ZONE,
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,    -- first claim; started_at - created_at = queue latency
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Idempotency: at most one active job per (onboarding_id, stage)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_agent_jobs_active
+    ON client_onboarding.agent_jobs (onboarding_id, job_type)
+    WHERE status IN ('QUEUED', 'RUNNING');
+
+-- Claim order for workers
+CREATE INDEX IF NOT EXISTS idx_agent_jobs_claim
+    ON client_onboarding.agent_jobs (job_type, run_after, id)
+    WHERE status = 'QUEUED';
+
+-- Stale-lock reaper
+CREATE INDEX IF NOT EXISTS idx_agent_jobs_running
+    ON client_onboarding.agent_jobs (locked_at)
+    WHERE status = 'RUNNING';
+
+COMMENT ON TABLE client_onboarding.agent_jobs IS
+    'Durable work queue for agent stages; consumed by backend/worker.py';
+
+-- ============================================================
+-- VERIFY (uncomment to check after running)
+-- ============================================================
+-- SELECT job_type, status, COUNT(*) FROM client_onboarding.agent_jobs
+--   GROUP BY job_type, status ORDER BY job_type, status;
+--
+-- SELECT indexname, indexdef FROM pg_indexes
+--   WHERE schemaname = 'client_onboarding' AND tablename = 'agent_jobs';
@@ -0,0 +1,39 @@
+-- ============================================================
+-- LLM RESPONSE CACHE MIGRATION
+-- Persistent cache for the orchestrator's Bedrock calls
+-- (agent, converse and multimodal OCR; all temperature 0).
+-- Keyed on a SHA-256 of model, system role, normalised prompt
+-- and document hashes; see backend/agents/llm_cache.py.
+-- Rows expire after LLM_CACHE_TTL_HOURS and are evicted LRU
+-- once the table exceeds LLM_CACHE_MAX_MB.
+-- Run in psql: \i db/llm_cache_migration.sql
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS client_onboarding.llm_response_cache (
+    cache_key VARCHAR(64) PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,              -- agent | converse | multimodal
+    model_id VARCHAR(120) NOT NULL,         -- model id, or agent_id/alias_id
+    stage VARCHAR(10),                      -- pipeline stage that produced the entry
+    response JSONB NOT NULL,
+    latency_ms INTEGER NOT NULL DEFAULT 0,  -- cost of the original call; added to saved_ms per hit
+    size_bytes INTEGER NOT NULL DEFAULT 0,
+    hit_count INTEGER NOT NULL DEFAULT 0,
+    saved_ms BIGINT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_hit_at TIMESTAMP WITH TIME ZONE,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- TTL sweep
+CREATE INDEX IF NOT EXISTS idx_llm_cache_expires
+    ON client_onboarding.llm_response_cache (expires_at);
+
+COMMENT ON TABLE client_onboarding.llm_response_cache IS
+    'Bedrock response cache for orchestrator stages; see backend/agents/llm_cache.py';
+
+-- ============================================================
+-- VERIFY (uncomment to check after running)
+-- ============================================================
+-- SELECT stage, kind, COUNT(*) AS entries, SUM(hit_count) AS hits,
+--        SUM(saved_ms) / 1000.0 AS saved_s, pg_size_pretty(SUM(size_bytes)) AS size
+--   FROM client_onboarding.llm_response_cache GROUP BY stage, kind ORDER BY stage, kind;
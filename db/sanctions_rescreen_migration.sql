@@ -0,0 +1,44 @@
+-- ============================================================
+-- SANCTIONS RESCREEN MIGRATION
+-- Bookkeeping for backend/agents/rescreen.py, which screens
+-- stored company / UBO / director names against the entries
+-- added or renamed in sanctions_list_changes since the last
+-- completed run, and writes hits to ai_agent_logs
+-- (check_name = 'sanctions_rescreen').
+-- Requires db/sanctions_versioning_migration.sql.
+-- Run in psql: \i db/sanctions_rescreen_migration.sql
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS client_onboarding.sanctions_rescreen_runs (
+    run_id UUID PRIMARY KEY,
+    from_version BIGINT NOT NULL,           -- exclusive
+    to_version BIGINT NOT NULL,             -- inclusive
+    status VARCHAR(20) NOT NULL DEFAULT 'RUNNING',
+    -- Status values: RUNNING | COMPLETED | FAILED
+    delta_entries INTEGER NOT NULL DEFAULT 0,
+    names_screened INTEGER NOT NULL DEFAULT 0,
+    customers_hit INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    duration_ms INTEGER,
+    error TEXT,
+    started_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Next run starts after the newest completed to_version
+CREATE INDEX IF NOT EXISTS idx_sanctions_rescreen_completed
+    ON client_onboarding.sanctions_rescreen_runs (to_version DESC)
+    WHERE status = 'COMPLETED';
+
+COMMENT ON TABLE client_onboarding.sanctions_rescreen_runs IS
+    'Portfolio rescreening runs against sanctions list deltas; written by backend/agents/rescreen.py';
+
+-- ============================================================
+-- VERIFY (uncomment to check after running)
+-- ============================================================
+-- SELECT run_id, from_version, to_version, status, delta_entries, names_screened,
+--        customers_hit, hits, duration_ms
+--   FROM client_onboarding.sanctions_rescreen_runs ORDER BY started_at DESC LIMIT 10;
+--
+-- SELECT onboarding_id, flags, created_at FROM client_onboarding.ai_agent_logs
+--   WHERE check_name = 'sanctions_rescreen' ORDER BY created_at DESC LIMIT 20;
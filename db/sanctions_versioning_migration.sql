@@ -0,0 +1,71 @@
+-- ============================================================
+-- SANCTIONS LIST VERSIONING MIGRATION
+-- Lets backend/agents/sanctions_ingest.py load OFAC / UN / EU
+-- files with COPY and publish each change set as a numbered
+-- list_version in one transaction:
+--   sanctions_list           rows carry their source, the list's
+--                            own id (source_uid), a content hash
+--                            and the version that last touched them
+--   sanctions_list_versions  one row per published version
+--   sanctions_list_changes   ADD / CHANGE / REMOVE per version, read
+--                            by screening caches and rescreening jobs
+-- Rows seeded by sanctions_data.sql stay source = 'MANUAL'.
+-- Run in psql: \i db/sanctions_versioning_migration.sql
+-- ============================================================
+
+ALTER TABLE client_onboarding.sanctions_list
+    ADD COLUMN IF NOT EXISTS source VARCHAR(20) NOT NULL DEFAULT 'MANUAL',  -- OFAC | UN | EU | LOCAL | MANUAL
+    ADD COLUMN IF NOT EXISTS source_uid VARCHAR(100),                        -- ent_num / DATAID / logicalId
+    ADD COLUMN IF NOT EXISTS record_hash CHAR(32),
+    ADD COLUMN IF NOT EXISTS list_version BIGINT,
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE;
+
+-- Delta joins against the staging table
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sanctions_list_source_uid
+    ON client_onboarding.sanctions_list (source, source_uid)
+    WHERE source_uid IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS client_onboarding.sanctions_list_versions (
+    list_version BIGSERIAL PRIMARY KEY,
+    source VARCHAR(20) NOT NULL,
+    file_name TEXT,
+    file_sha256 CHAR(64),
+    entries INTEGER NOT NULL DEFAULT 0,     -- rows for this source after the version
+    added INTEGER NOT NULL DEFAULT 0,
+    changed INTEGER NOT NULL DEFAULT 0,
+    removed INTEGER NOT NULL DEFAULT 0,
+    duration_ms INTEGER,
+    published_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_sanctions_list_versions_source
+    ON client_onboarding.sanctions_list_versions (source, list_version DESC);
+
+CREATE TABLE IF NOT EXISTS client_onboarding.sanctions_list_changes (
+    list_version BIGINT NOT NULL REFERENCES client_onboarding.sanctions_list_versions (list_version),
+    change_type VARCHAR(10) NOT NULL,       -- ADD | CHANGE | REMOVE
+    source VARCHAR(20) NOT NULL,
+    source_uid VARCHAR(100) NOT NULL,
+    entity_name VARCHAR(255) NOT NULL,      -- new name (old name for REMOVE)
+    previous_name VARCHAR(255),             -- CHANGE only
+    entity_type VARCHAR(50),
+    program VARCHAR(100),
+    list_type VARCHAR(50),
+    country VARCHAR(100)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sanctions_list_changes_version
+    ON client_onboarding.sanctions_list_changes (list_version);
+
+COMMENT ON TABLE client_onboarding.sanctions_list_versions IS
+    'Published sanctions list versions; written by backend/agents/sanctions_ingest.py';
+COMMENT ON TABLE client_onboarding.sanctions_list_changes IS
+    'Per-version sanctions list delta (ADD / CHANGE / REMOVE)';
+
+-- ============================================================
+-- VERIFY (uncomment to check after running)
+-- ============================================================
+-- SELECT list_version, source, entries, added, changed, removed, duration_ms, published_at
+--   FROM client_onboarding.sanctions_list_versions ORDER BY list_version DESC LIMIT 10;
+--
+-- SELECT source, COUNT(*) FROM client_onboarding.sanctions_list GROUP BY source;
@@ -2,6 +2,8 @@ import csv
 import re
 import os
 
+DB_DIR = os.path.dirname(os.path.abspath(__file__))
+
 def parse_sql_values(sql_file):
     with open(sql_file, 'r', encoding='utf-8') as f:
         content = f.read()
@@ -33,11 +35,11 @@ def parse_sql_values(sql_file):
     return rows
 
 def generate_csvs():
-    output_dir = r'd:\learning\aml\db\csv'
+    output_dir = os.path.join(DB_DIR, 'csv')
     os.makedirs(output_dir, exist_ok=True)
     
     # 1. Sanctions List
-    sanctions_rows = parse_sql_values(r'd:\learning\aml\db\sanctions_data.sql')
+    sanctions_rows = parse_sql_values(os.path.join(DB_DIR, 'sanctions_data.sql'))
     sanctions_headers = ['entity_name', 'entity_type', 'program', 'list_type', 'country', 'entity_address', 'tax_id', 'remarks']
     with open(os.path.join(output_dir, 'sanctions_list.csv'), 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
@@ -46,7 +48,7 @@ def generate_csvs():
     print(f"Created {os.path.join(output_dir, 'sanctions_list.csv')}")
 
     # 2. Entity Verification
-    verification_rows = parse_sql_values(r'd:\learning\aml\db\verification_data.sql')
+    verification_rows = parse_sql_values(os.path.join(DB_DIR, 'verification_data.sql'))
     verification_headers = ['lei_number', 'company_name', 'entity_type', 'registered_address', 'country', 'ein_number', 'dba_name']
     with open(os.path.join(output_dir, 'entity_verification.csv'), 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
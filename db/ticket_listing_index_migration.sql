@@ -0,0 +1,48 @@
+-- ============================================================
+-- TICKET LISTING INDEX MIGRATION
+-- Supports the paginated /admin/tickets API: keyset pagination
+-- on (submitted_at, id), equality filters on status / country /
+-- risk level / entity type, and substring search over company
+-- name and tracking id.
+-- Run in psql: \i db/ticket_listing_index_migration.sql
+-- ============================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Keyset pagination assumes submitted_at is set; backfill legacy rows
+UPDATE client_onboarding.onboarding_details
+SET submitted_at = COALESCE(updated_at, CURRENT_TIMESTAMP)
+WHERE submitted_at IS NULL;
+
+-- Unfiltered listing: ORDER BY submitted_at DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_onboarding_submitted_id
+    ON client_onboarding.onboarding_details (submitted_at DESC, id DESC);
+
+-- Filtered listings: equality column first, then the keyset order
+CREATE INDEX IF NOT EXISTS idx_onboarding_status_submitted
+    ON client_onboarding.onboarding_details (status, submitted_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_onboarding_risk_submitted
+    ON client_onboarding.onboarding_details (ai_risk_level, submitted_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_onboarding_country_submitted
+    ON client_onboarding.onboarding_details (country, submitted_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_onboarding_entity_type_submitted
+    ON client_onboarding.onboarding_details (entity_type, submitted_at DESC, id DESC);
+
+-- Free-text search: company_name / tracking_id ILIKE '%term%'
+CREATE INDEX IF NOT EXISTS idx_onboarding_company_name_trgm
+    ON client_onboarding.onboarding_details USING GIN (company_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_onboarding_tracking_id_trgm
+    ON client_onboarding.onboarding_details USING GIN (tracking_id gin_trgm_ops);
+
+ANALYZE client_onboarding.onboarding_details;
+
+-- ============================================================
+-- VERIFY (uncomment to check after running)
+-- ============================================================
+-- SELECT indexname, indexdef FROM pg_indexes
+--   WHERE schemaname = 'client_onboarding' AND tablename = 'onboarding_details';
+--
+-- EXPLAIN ANALYZE
+--   SELECT id, company_name FROM client_onboarding.onboarding_details
+--   WHERE status = 'PENDING_REVIEW'
+--   ORDER BY submitted_at DESC, id DESC LIMIT 51;
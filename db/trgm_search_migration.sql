@@ -0,0 +1,30 @@
+-- ============================================================
+-- TRIGRAM SEARCH MIGRATION
+-- Enables pg_trgm and adds GIN trigram indexes so sanctions
+-- screening and the LEI name fallback can run as a single
+-- indexed similarity query instead of ILIKE sequential scans.
+-- Run in psql: \i db/trgm_search_migration.sql
+-- ============================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Sanctions screening: token <% entity_name (word similarity)
+CREATE INDEX IF NOT EXISTS idx_sanctions_entity_name_trgm
+    ON client_onboarding.sanctions_list USING GIN (entity_name gin_trgm_ops);
+
+-- LEI verification fallback: company_name % candidate (similarity)
+CREATE INDEX IF NOT EXISTS idx_entity_verification_name_trgm
+    ON client_onboarding.entity_verification USING GIN (company_name gin_trgm_ops);
+
+ANALYZE client_onboarding.sanctions_list;
+ANALYZE client_onboarding.entity_verification;
+
+-- ============================================================
+-- VERIFY (uncomment to check after running)
+-- ============================================================
+-- SELECT indexname, indexdef FROM pg_indexes
+--   WHERE schemaname = 'client_onboarding' AND indexname LIKE '%trgm%';
+--
+-- EXPLAIN ANALYZE
+--   SELECT entity_name FROM client_onboarding.sanctions_list
+--   WHERE 'wagner' <% entity_name;
@@ -1,7 +1,13 @@
 /** PREMIUM ADMIN DASHBOARD LOGIC — AML Blueprint Edition **/
 let currentTickets = [];
+let ticketQuery = { status: '', q: '' };
+let nextTicketCursor = null;
 let activeTicketId = null;
 let logPollingInterval = null;
+let ticketEventSource = null;
+let agentLogsCache = [];
+let agentPartials = {};   // stage -> fields/pillars of an agent answer still streaming
+let renderedTicketStatus = null;   // status of the ticket currently shown in the modal
 
 // Dynamically determine the backend URL
 const API_BASE = (window.location.protocol === 'file:' || window.location.port !== '8000')
@@ -16,34 +22,63 @@ async function initAdminDashboard() {
     await fetchTickets();
 }
 
-async function fetchTickets(statusFilter = '') {
+function buildTicketUrl(cursor) {
+    const params = new URLSearchParams();
+    Object.entries(ticketQuery).forEach(([k, v]) => { if (v) params.set(k, v); });
+    if (cursor) params.set('cursor', cursor);
+    const qs = params.toString();
+    return `${API_BASE}/admin/tickets${qs ? `?${qs}` : ''}`;
+}
+
+async function fetchTickets(statusFilter = ticketQuery.status) {
     const listContainer = document.getElementById('ticket-list-container');
     listContainer.innerHTML = '<div style="padding: 60px; text-align: center; color: var(--dash-text-muted);">Syncing board status...</div>';
+    ticketQuery.status = statusFilter || '';
 
     try {
-        const url = statusFilter
-            ? `${API_BASE}/admin/tickets?status=${statusFilter}`
-            : `${API_BASE}/admin/tickets`;
-        const res = await fetch(url);
+        const res = await fetch(buildTicketUrl());
         const data = await res.json();
         currentTickets = data.tickets || [];
+        nextTicketCursor = data.next_cursor || null;
         renderTicketList(currentTickets);
-        updateStats(currentTickets);
+        updateStats(data.counts || {});
     } catch (err) {
         listContainer.innerHTML = `<div style="padding:60px;text-align:center;color:#ef4444;">⚠ Failed to connect to backend. Ensure backend is running on port 8000.</div>`;
     }
 }
 
-function updateStats(tickets) {
-    const total = tickets.length;
-    const pending = tickets.filter(t => t.status === 'PENDING_REVIEW').length;
-    const approved = tickets.filter(t => t.status === 'APPROVED').length;
-    const flagged = tickets.filter(t => t.ai_risk_level === 'HIGH_RISK' || t.ai_risk_level === 'FLAGGED').length;
+async function loadMoreTickets() {
+    if (!nextTicketCursor) return;
+    try {
+        const res = await fetch(buildTicketUrl(nextTicketCursor));
+        const data = await res.json();
+        currentTickets = currentTickets.concat(data.tickets || []);
+        nextTicketCursor = data.next_cursor || null;
+        renderTicketList(currentTickets);
+    } catch (err) {
+        alert('Failed to load more applications: ' + err.message);
+    }
+}
+
+let ticketSearchTimer = null;
+function searchTickets(term) {
+    clearTimeout(ticketSearchTimer);
+    ticketSearchTimer = setTimeout(() => {
+        ticketQuery.q = term.trim();
+        fetchTickets();
+    }, 300);
+}
+
+function updateStats(counts) {
+    const byStatus = counts.by_status || {};
+    const total = counts.total || 0;
+    const pending = byStatus['PENDING_REVIEW'] || 0;
+    const approved = byStatus['APPROVED'] || 0;
 
     const statEl = document.getElementById('ticket-stats');
     if (statEl) {
-        const kycComplete = tickets.filter(t => t.status === 'KYC_COMPLETE').length;
-        const amlComplete = tickets.filter(t => t.status === 'AML_COMPLETE').length;
+        const kycComplete = byStatus['KYC_COMPLETE'] || 0;
+        const amlComplete = byStatus['AML_COMPLETE'] || 0;
         statEl.innerHTML = `
             <span style="color:var(--dash-text-muted);font-size:0.78rem;">
                 <strong style="color:var(--dash-text);">${total}</strong> Total &nbsp;|&nbsp;
@@ -106,7 +141,9 @@ function renderTicketList(tickets) {
             </div>
             <div class="ticket-date">${new Date(t.submitted_at).toLocaleDateString('en-GB', { day: '2-digit', month: 'short', year: 'numeric' })}</div>
         </div>
-    `).join('');
+    `).join('') + (nextTicketCursor
+        ? '<button class="filter-btn" onclick="loadMoreTickets()" style="width:100%;margin:12px 0;text-align:center;">Load more</button>'
+        : '');
 }
 
 async function loadTicket(id) {
@@ -118,10 +155,12 @@ async function loadTicket(id) {
         const res = await fetch(`${API_BASE}/admin/tickets/${id}`);
         const data = await res.json();
         const t = data.ticket;
-        openTicketModal(t);
+        await openTicketModal(t);
 
-        // Start polling if ticket is in progress
-        if (['PENDING_REVIEW', 'AML_IN_PROGRESS', 'KYC_COMPLETE'].includes(t.status)) {
+        // Push updates over SSE; fall back to polling where EventSource is unavailable
+        if (window.EventSource) {
+            startTicketEvents(id);
+        } else if (['PENDING_REVIEW', 'AML_IN_PROGRESS', 'KYC_COMPLETE'].includes(t.status)) {
             startLogPolling(id);
         }
     } catch (err) {
@@ -144,11 +183,12 @@ function openTicketModal(t) {
     document.body.style.overflow = 'hidden';
     document.body.style.height = '100vh';
 
-    renderTicketDetail(t);
+    return renderTicketDetail(t);
 }
 
 function closeTicketModal() {
     activeTicketId = null;
+    stopTicketEvents();
     if (logPollingInterval) clearInterval(logPollingInterval);
 
     const modal = document.getElementById('ticket-modal');
@@ -162,6 +202,83 @@ function closeTicketModal() {
     document.querySelectorAll('.ticket-card').forEach(c => c.classList.remove('active'));
 }
 
+function stopTicketEvents() {
+    if (ticketEventSource) {
+        ticketEventSource.close();
+        ticketEventSource = null;
+    }
+    agentPartials = {};
+}
+
+function renderAgentPartials() {
+    const container = document.getElementById('agent-logs-container');
+    if (!container) return;
+    let live = document.getElementById('agent-live-partials');
+    if (!live) {
+        live = document.createElement('div');
+        live.id = 'agent-live-partials';
+        container.parentNode.insertBefore(live, container);
+    }
+    const text = (v) => String(v).replace(/[&<>]/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;' }[c]));
+    let html = '';
+    for (const [stage, parts] of Object.entries(agentPartials)) {
+        html += `<div style="margin-bottom:12px;padding:8px;border:1px dashed rgba(255,255,255,0.1);border-radius:6px;">
+            <div style="font-size:0.75rem;font-weight:700;color:var(--dash-text-muted);text-transform:uppercase;">Stage ${stage} — agent answer streaming…</div>`;
+        parts.forEach(p => {
+            const v = p.value || {};
+            const label = p.kind === 'item' && (v.pillar_name || v.name) ? `${p.key}: ${v.pillar_name || v.name}` : p.key;
+            const detail = p.truncated ? '(large value)' : (typeof v === 'object' ? (v.result || v.status || JSON.stringify(v).slice(0, 160)) : v);
+            html += `<div style="font-size:0.8rem;padding:2px 0;"><b>${text(label)}</b> <span style="color:var(--dash-text-muted);">${text(detail)}</span></div>`;
+        });
+        html += '</div>';
+    }
+    live.innerHTML = html;
+}
+
+function startTicketEvents(id) {
+    stopTicketEvents();
+    if (logPollingInterval) clearInterval(logPollingInterval);
+
+    // Resume after the newest log already rendered; the browser sends Last-Event-ID on reconnects
+    const lastLog = agentLogsCache[agentLogsCache.length - 1];
+    const query = lastLog && lastLog.id ? `?last_id=${encodeURIComponent(lastLog.id)}` : '';
+    const source = new EventSource(`${API_BASE}/admin/tickets/${id}/events${query}`);
+    ticketEventSource = source;
+
+    source.addEventListener('agent_log', (e) => {
+        if (activeTicketId !== id) return stopTicketEvents();
+        const log = JSON.parse(e.data);
+        if (agentLogsCache.some(l => l.id === log.id)) return;
+        agentLogsCache.push(log);
+        renderAgentLogs(agentLogsCache);
+        if (agentPartials[log.stage]) {
+            delete agentPartials[log.stage];
+            renderAgentPartials();
+        }
+    });
+
+    source.addEventListener('agent_partial', (e) => {
+        if (activeTicketId !== id) return stopTicketEvents();
+        const part = JSON.parse(e.data);
+        (agentPartials[part.stage] = agentPartials[part.stage] || []).push(part);
+        renderAgentPartials();
+    });
+
+    source.addEventListener('status', async (e) => {
+        if (activeTicketId !== id) return stopTicketEvents();
+        const evt = JSON.parse(e.data);
+        // Snapshots (on connect and after a listener resync) carry no old_status;
+        // re-render whenever the status differs from the one on screen so
+        // transitions missed while disconnected are not lost
+        if (evt.new_status === renderedTicketStatus) return;
+        const res = await fetch(`${API_BASE}/admin/tickets/${id}`);
+        const data = await res.json();
+        if (activeTicketId === id) {
+            renderTicketDetail(data.ticket);
+        }
+    });
+}
+
 function startLogPolling(id) {
     if (logPollingInterval) clearInterval(logPollingInterval);
     logPollingInterval = setInterval(async () => {
@@ -171,13 +288,15 @@ function startLogPolling(id) {
         }
         await fetchAgentLogs(id);
 
-        // Also check if status changed to enable buttons
-        const res = await fetch(`${API_BASE}/admin/tickets/${id}`);
+        // Also check if status changed to enable buttons (status-only endpoint, no full detail)
+        const res = await fetch(`${API_BASE}/admin/tickets/${id}/status`);
         const data = await res.json();
         if (data.ticket.status !== 'PENDING_REVIEW' && data.ticket.status !== 'AML_IN_PROGRESS') {
             // Status changed! Refresh full detail once to show buttons
             if (activeTicketId === id) {
-                renderTicketDetail(data.ticket);
+                const detailRes = await fetch(`${API_BASE}/admin/tickets/${id}`);
+                const detail = await detailRes.json();
+                renderTicketDetail(detail.ticket);
             }
             clearInterval(logPollingInterval);
         }
@@ -188,6 +307,7 @@ function renderTicketDetail(t) {
     const aml = t.aml_questions || {};
     const modal = document.getElementById('ticket-modal');
     if (!modal) return;
+    renderedTicketStatus = t.status;
 
     // Parse dates
     const submittedDate = t.submitted_at ? new Date(t.submitted_at).toLocaleString() : 'N/A';
@@ -377,7 +497,7 @@ function renderTicketDetail(t) {
         </div>
     `;
 
-    fetchAgentLogs(t.id);
+    return fetchAgentLogs(t.id);
 }
 
 function renderActionButtons(t) {
@@ -454,6 +574,15 @@ function agentRiskBadge(risk) {
 }
 
 function renderAgentEvidence(log) {
+    // Summary rows (fields=summary) only carry has_evidence; the payload is fetched on click
+    if (log.has_evidence && !log.output) {
+        return `<div style="margin-top:8px;">
+            <button onclick="openAgentEvidence('${log.id}')"
+                    style="margin-top:4px; background:rgba(0, 255, 163, 0.05); border:1px solid rgba(0, 255, 163, 0.2); color:var(--dash-accent); padding:4px 10px; border-radius:4px; font-size:0.65rem; cursor:pointer; font-weight:bold; transition:all 0.2s; width:100%; text-align:center;">
+                🔎 VIEW DECISION LOG & EVIDENCE
+            </button>
+        </div>`;
+    }
     if (!log.output && !log.ai_summary) return '';
 
     let html = '<div style="margin-top:8px;">';
@@ -471,6 +600,17 @@ function renderAgentEvidence(log) {
     return html;
 }
 
+window.openAgentEvidence = async function (logId) {
+    try {
+        const res = await fetch(`${API_BASE}/admin/tickets/${activeTicketId}/agent-logs/${logId}`);
+        const data = await res.json();
+        if (!res.ok) throw new Error(data.detail || 'Not found');
+        showEvidenceModal(data.log);
+    } catch (err) {
+        alert(`Failed to load evidence: ${err.message}`);
+    }
+};
+
 window.showEvidenceModal = function (log) {
     const isObject = typeof log === 'object';
     const logicText = isObject ? (log.output?.decision_logic || log.output?.rationale || log.ai_summary) : log;
@@ -550,49 +690,56 @@ async function fetchAgentLogs(ticketId) {
     const container = document.getElementById('agent-logs-container');
     if (!container) return;
     try {
-        const res = await fetch(`${API_BASE}/admin/tickets/${ticketId}/agent-logs`);
+        const res = await fetch(`${API_BASE}/admin/tickets/${ticketId}/agent-logs?fields=summary`);
         const data = await res.json();
-        const logs = (data.logs || []).sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
-        if (!logs.length) {
-            container.innerHTML = '<div style="color:var(--dash-text-muted);font-style:italic;">No agent logs yet. KYC check will run automatically after signup.</div>';
-            return;
-        }
-
-        // Group by stage
-        const byStage = {};
-        logs.forEach(log => {
-            const stageKey = log.stage === 1 ? '1 — Document Verification' : log.stage === 2 ? '2 — KYC Screening' : log.stage === 3 ? '3 — AML Risk Profiling' : `${log.stage} — Orchestrator`;
-            if (!byStage[stageKey]) byStage[stageKey] = [];
-            byStage[stageKey].push(log);
-        });
-
-        let html = '';
-        for (const [stageName, entries] of Object.entries(byStage)) {
-            html += `<div style="margin-bottom:16px;">
-                <div style="font-size:0.75rem;font-weight:700;color:var(--dash-text-muted);text-transform:uppercase;letter-spacing:1px;margin-bottom:8px;border-bottom:1px solid rgba(255,255,255,0.06);padding-bottom:4px;">Stage ${stageName}</div>`;
-            entries.forEach(log => {
-                const flags = Array.isArray(log.flags) && log.flags.length
-                    ? `<div style="margin-top:4px;color:#f59e0b;font-size:0.75rem;">⚠ ${log.flags.join(' | ')}</div>` : '';
-                html += `<div style="display:flex;align-items:flex-start;gap:10px;padding:8px 0;border-bottom:1px solid rgba(255,255,255,0.04);">
-                    <div style="min-width:160px;font-weight:600;color:var(--dash-text);">${(log.check_name || '').replace(/_/g, ' ')}</div>
-                    <div style="flex:1;">
-                        ${agentRiskBadge(log.risk_level)}
-                        <span style="margin-left:8px;font-size:0.75rem;color:var(--dash-text-muted);">${log.recommendation || ''}</span>
-                        <!-- Detailed summary hidden in main list -->
-                        ${renderAgentEvidence(log)}
-                        ${flags}
-                    </div>
-                    <div style="font-size:0.7rem;color:var(--dash-text-muted);min-width:80px;text-align:right;">${log.duration_ms || 0}ms</div>
-                </div>`;
-            });
-            html += '</div>';
-        }
-        container.innerHTML = html;
+        agentLogsCache = data.logs || [];
+        renderAgentLogs(agentLogsCache);
     } catch (err) {
         container.innerHTML = `<div style="color:#ef4444;font-size:0.8rem;">Failed to load agent logs: ${err.message}</div>`;
     }
 }
 
+function renderAgentLogs(allLogs) {
+    const container = document.getElementById('agent-logs-container');
+    if (!container) return;
+    const logs = [...allLogs].sort((a, b) => new Date(b.created_at) - new Date(a.created_at));
+    if (!logs.length) {
+        container.innerHTML = '<div style="color:var(--dash-text-muted);font-style:italic;">No agent logs yet. KYC check will run automatically after signup.</div>';
+        return;
+    }
+
+    // Group by stage
+    const byStage = {};
+    logs.forEach(log => {
+        const stageKey = log.stage === 1 ? '1 — Document Verification' : log.stage === 2 ? '2 — KYC Screening' : log.stage === 3 ? '3 — AML Risk Profiling' : `${log.stage} — Orchestrator`;
+        if (!byStage[stageKey]) byStage[stageKey] = [];
+        byStage[stageKey].push(log);
+    });
+
+    let html = '';
+    for (const [stageName, entries] of Object.entries(byStage)) {
+        html += `<div style="margin-bottom:16px;">
+            <div style="font-size:0.75rem;font-weight:700;color:var(--dash-text-muted);text-transform:uppercase;letter-spacing:1px;margin-bottom:8px;border-bottom:1px solid rgba(255,255,255,0.06);padding-bottom:4px;">Stage ${stageName}</div>`;
+        entries.forEach(log => {
+            const flags = Array.isArray(log.flags) && log.flags.length
+                ? `<div style="margin-top:4px;color:#f59e0b;font-size:0.75rem;">⚠ ${log.flags.join(' | ')}</div>` : '';
+            html += `<div style="display:flex;align-items:flex-start;gap:10px;padding:8px 0;border-bottom:1px solid rgba(255,255,255,0.04);">
+                <div style="min-width:160px;font-weight:600;color:var(--dash-text);">${(log.check_name || '').replace(/_/g, ' ')}</div>
+                <div style="flex:1;">
+                    ${agentRiskBadge(log.risk_level)}
+                    <span style="margin-left:8px;font-size:0.75rem;color:var(--dash-text-muted);">${log.recommendation || ''}</span>
+                    <!-- Detailed summary hidden in main list -->
+                    ${renderAgentEvidence(log)}
+                    ${flags}
+                </div>
+                <div style="font-size:0.7rem;color:var(--dash-text-muted);min-width:80px;text-align:right;">${log.duration_ms || 0}ms</div>
+            </div>`;
+        });
+        html += '</div>';
+    }
+    container.innerHTML = html;
+}
+
 async function takeAction(ticketId, action) {
     const remarks = prompt(`Enter remarks for action: ${action.toUpperCase()} (optional):\n`);
     if (remarks === null) return; // user cancelled